@@ -15,7 +15,7 @@ import ollama
 import pandas as pd
 import difflib
 import re
-from ingest import FactoryDataIngest
+from ingest import FactoryDataIngest, read_factory_csv, row_hash
 from portfolio import router as portfolio_router
 # from alibaba_api import router as alibaba_router  # Temporarily disabled due to import issues
 from routes.alibaba import router as alibaba_routes
@@ -44,18 +44,29 @@ from sla_ai_components.api.factories import router as factories_router
 from sla_ai_components.api.saved import router as saved_router
 from sla_ai_components.api.quotes import router as quotes_router
 from sla_ai_components.api.supply_metrics import router as supply_metrics_router
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from database import get_db
 from models import UserGoal, Factory
 import math
+import heapq
 from connectors.alibaba_client import dedup_and_merge, rerank_factories, search_suppliers, map_supplier
 import uuid
 import shutil
 import tempfile
-from threading import Thread
+from threading import Lock, Thread
 from sla_ai_components.ingest.daemon import bootstrap_scan, watch_loop
 from sla_ai_components.suggestions.scheduler import start_scheduler
+from sla_ai_components.algorithms.goals import GoalProfile, goal_rerank
+from autocomplete import KINDS as AUTOCOMPLETE_KINDS, AutocompleteIndex
+from snapshot import SnapshotRows
+from sla_ai_components.ingest.row_hashes import diff_rows
+from services.api.app.search.attributes import AttributeIndex
+from services.api.app.search.retrieval import CHANNEL_DEPTH, get_index
+from services.api.app.search import scoring_pool
+from services.api.app.search.shared_index import shared_index
+from services.api.app.utils.deadline import deadline, within_deadline
+from services.api.app.utils.singleflight import request_fingerprint, singleflight
 import base64
 import time
 import asyncio
@@ -132,6 +143,12 @@ async def readiness_check():
 
 # Rate limiting for authentication endpoints - handled by auth_router
 
+@app.exception_handler(scoring_pool.ScoringBusy)
+async def scoring_busy_handler(request: Request, exc: scoring_pool.ScoringBusy):
+    """Scoring queue full: shed the search instead of queueing it behind the backlog"""
+    return JSONResponse(status_code=503, content={"error": "Search busy", "detail": str(exc)},
+                        headers={"Retry-After": "1"})
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def unhandled_exception_handler(request: Request, exc: Exception):
@@ -216,6 +233,76 @@ def _current_user_id() -> int:
     # TODO: integrate with real auth; for now return demo user
     return 1
 
+try:
+    DEFAULT_GOAL_WEIGHT = float(os.getenv("GOAL_DEFAULT_WEIGHT", "0.30"))
+except ValueError:
+    DEFAULT_GOAL_WEIGHT = 0.30
+
+# Each user's active goals, compiled for the goal-aware search rerank. A profile is reused
+# while the user's goal version in the database (count, max id, max updated_at) is
+# unchanged, so a goal written through any worker process is seen by the next search
+_GOAL_PROFILES: Dict[int, GoalProfile] = {}  # user_id -> profile of the last version seen
+_GOAL_PROFILES_LOCK = Lock()
+_NO_GOALS = GoalProfile.from_goals([], default_weight=DEFAULT_GOAL_WEIGHT)
+
+def _load_active_goals(user_id: int = 1) -> List[Dict[str, Any]]:
+    """Active goals of `user_id` as plain dicts. Blocking; raises when the DB is unavailable."""
+    db = None
+    try:
+        from database import SessionLocal
+        db = SessionLocal()
+        goals = db.query(UserGoal).filter(UserGoal.user_id == user_id, UserGoal.is_active == True).all()
+        return [
+            {
+                "id": g.id,
+                "metric": g.metric,
+                "unit": g.unit,
+                "direction": g.direction,
+                "target_amount": float(getattr(g, 'target_amount', 0) or 0),
+                "baseline_amount": float(getattr(g, 'baseline_amount', 0) or 0) if getattr(g, 'baseline_amount', None) is not None else None,
+                "weight": float(getattr(g, 'weight', DEFAULT_GOAL_WEIGHT) or DEFAULT_GOAL_WEIGHT),
+            }
+            for g in goals
+        ]
+    finally:
+        if db:
+            try:
+                db.close()
+            except Exception:
+                pass
+
+def _goal_version(user_id: int = 1) -> Tuple:
+    """Version of `user_id`'s goals, from one aggregate query. Blocking; raises when the DB is unavailable."""
+    from sqlalchemy import func
+    db = None
+    try:
+        from database import SessionLocal
+        db = SessionLocal()
+        return tuple(db.query(func.count(UserGoal.id), func.max(UserGoal.id), func.max(UserGoal.updated_at))
+                     .filter(UserGoal.user_id == user_id).one())
+    finally:
+        if db:
+            try:
+                db.close()
+            except Exception:
+                pass
+
+def _goal_profile(user_id: int = 1) -> GoalProfile:
+    """Cached GoalProfile of `user_id`'s active goals; no goals when the DB is unavailable. Blocking."""
+    try:
+        version = _goal_version(user_id)
+        hit = _GOAL_PROFILES.get(user_id)
+        if hit is not None and hit.version == version:
+            return hit
+        # read after the version, so the goals are at least as new as the version they're cached under
+        goals = _load_active_goals(user_id)
+    except Exception:
+        return _NO_GOALS
+    profile = GoalProfile.from_goals(goals, version=version, default_weight=DEFAULT_GOAL_WEIGHT)
+    with _GOAL_PROFILES_LOCK:
+        _GOAL_PROFILES[user_id] = profile
+    return profile
+
 @app.get(f"{API_PREFIX}/goals")
 def goals_list(db: Session = Depends(get_db)):
     uid = _current_user_id()
@@ -282,6 +369,7 @@ def goals_update(goal_id: int, body: GoalUpdateModel, db: Session = Depends(get_
     data = body.dict(exclude_unset=True)
     for k, v in data.items():
         setattr(r, k, v)
+    r.updated_at = datetime.utcnow()  # sub-second, so the goal version moves even within a second
     db.commit()
     db.refresh(r)
     return {
@@ -357,6 +445,10 @@ def load_responses():
         return []
 
 def load_dataset():
+    """Factory dataset rows (the shared index's corpus; decoded from the shared snapshot on access)"""
+    return _factory_index().source
+
+def _read_dataset():
     """Load the factory dataset from normalized JSON file"""
     try:
         from ingest import FactoryDataIngest
@@ -425,7 +517,7 @@ def extract_product_keywords(text):
     
     return products, materials
 
-def search_factories(user_input, history, threshold=80):
+async def search_factories(user_input, history, threshold=80):
     """Search factories using unified search with Alibaba integration"""
     try:
         # Use the unified search endpoint internally
@@ -440,7 +532,7 @@ def search_factories(user_input, history, threshold=80):
         }
         
         # Call the unified search function
-        results = search_factories_fast(
+        results = await search_factories_fast(
             query=search_request["query"],
             location=search_request["location"],
             industry=search_request["industry"],
@@ -470,6 +562,8 @@ def search_factories(user_input, history, threshold=80):
         
         return "Here are some relevant factories I found:\n\n" + "\n".join(response_parts)
         
+    except scoring_pool.ScoringBusy:
+        return None  # overloaded: the legacy scan below would only add load on the event loop
     except Exception as e:
         print(f"[DEBUG] Unified search failed, falling back to legacy search: {e}", flush=True)
         # Fallback to legacy search
@@ -740,6 +834,7 @@ class FactorySearchResponse(BaseModel):
     results: list
     total_found: int
     search_time: float
+    meta: Dict[str, Any] = {}
 
 class ReverseImageSearchResponse(BaseModel):
     results: list
@@ -788,7 +883,7 @@ async def chat(request: ChatRequest):
     
     # Step 4: Search factory database
     if intent == "factory_sourcing":
-        factory_match = search_factories(request.message, history)
+        factory_match = await search_factories(request.message, history)
         if factory_match:
             print("[DEBUG] Using factory database match", flush=True)
             return ChatResponse(reply=factory_match or "", source="factory_database")
@@ -802,292 +897,228 @@ async def chat(request: ChatRequest):
     response = "I'm specialized in factory sourcing and manufacturing. I can help you find reliable manufacturers for your products. What would you like to manufacture?"
     return ChatResponse(reply=response, source="redirect_to_factory")
 
-def search_factories_fast(query: str, location: str | None = None, industry: str | None = None, size: str | None = None, brand: str | None = None, limit: int = 10):
-    """Fast factory search with scoring and ranking"""
+def _factory_index():
+    """
+    Hybrid index over the factory dataset, built once per host and shared read-only by all
+    workers; rebuilt when the data files change.
+    """
+    version = tuple(
+        os.path.getmtime(p) if os.path.exists(p) else None
+        for p in ("data/normalized_factories.json", "data/main_factory_data_only.csv")
+    )
+    return shared_index("factories", version, _read_dataset)
+
+async def search_factories_fast(query: str, location: str | None = None, industry: str | None = None, size: str | None = None, brand: str | None = None, limit: int = 10):
+    """Fast factory search over the shared hybrid (BM25 + fuzzy name + vector) index, scored in the scoring pool"""
     import time
     start_time = time.time()
     
-    dataset = load_dataset()
-    if not dataset:
+    index = _factory_index()
+    if not index.n:
         return {"results": [], "total_found": 0, "search_time": 0.0}
     
+    # Location / industry / size / brand rank matching factories first; with no query
+    # text they become hard filters (e.g. brand-only searches).
+    facets = {"location": location, "product": industry, "size": size, "brand": brand}
+    if query:
+        hits = await scoring_pool.asearch(index, query, max(limit, CHANNEL_DEPTH), prefer=facets)
+    else:
+        hits = index.browse(max(limit, CHANNEL_DEPTH), filters=facets) if any(facets.values()) else []
     
     scored = []
-    query_lower = query.lower() if query else ""
-    
-    
-    for idx, factory in enumerate(dataset):
-        score = 0.0
-        
-        # Text similarity scoring (70% weight)
-        # Handle both normalized and CSV formats
+    for hit in hits:
+        factory = hit.row
         factory_name = factory.get('factory_name', factory.get('Factory Name', ''))
         specialties = factory.get('product_specialties', factory.get('Product Specialties', ''))
         materials = factory.get('materials_handled', factory.get('Materials Handled', ''))
-        country = factory.get('country', factory.get('Country', ''))
-        city = factory.get('city', factory.get('City', ''))
-        past_clients = factory.get('past_clients', factory.get('Past Clients', ''))
-        
-        # Convert lists to strings for text matching
         if isinstance(specialties, list):
             specialties = ' '.join(specialties)
         if isinstance(materials, list):
             materials = ' '.join(materials)
-        if isinstance(past_clients, list):
-            past_clients = ' '.join(past_clients)
-        elif isinstance(past_clients, str):
-            # Handle comma-separated past clients
-            past_clients = past_clients.replace(',', ' ').replace(';', ' ').replace('|', ' ')
-            
-        factory_text = f"{factory_name} {specialties} {materials} {country} {city} {past_clients}"
-        factory_text = factory_text.lower()
         
-        if query_lower:
-            # Use fuzzy matching for text similarity
-            text_score = fuzz.token_set_ratio(query_lower, factory_text) / 100.0
-            score += 0.7 * text_score
-        else:
-            # If no query, give a base score for brand-only searches
-            if brand:
-                score += 0.2  # Higher base score for brand-only searches
-        
-        # Filter scoring (30% weight)
-        filter_score = 0.0
-        
-        # Location filter
-        if location:
-            location_lower = location.lower()
-            if location_lower in country.lower() or location_lower in city.lower():
-                filter_score += 0.3
-        
-        # Industry filter
-        if industry:
-            industry_lower = industry.lower()
-            if industry_lower in specialties.lower():
-                filter_score += 0.3
-        
-        # Size filter (based on monthly capacity)
-        if size:
-            capacity = factory.get('max_monthly_capacity', factory.get('Max Monthly Capacity', 0))
-            if capacity and isinstance(capacity, (int, float)):
-                if size == "small" and capacity < 10000:
-                    filter_score += 0.4
-                elif size == "medium" and 10000 <= capacity < 100000:
-                    filter_score += 0.4
-                elif size == "large" and 100000 <= capacity < 1000000:
-                    filter_score += 0.4
-                elif size == "enterprise" and capacity >= 1000000:
-                    filter_score += 0.4
-        
-        # Brand filter (check if factory has worked with the specified brand)
-        if brand:
-            brand_lower = brand.lower()
-            
-            # Handle both list and string formats for past_clients
-            if isinstance(past_clients, list):
-                past_clients_lower = [client.lower() for client in past_clients]
-                if brand_lower in past_clients_lower:
-                    filter_score += 0.5  # Higher weight for brand match
-            elif isinstance(past_clients, str):
-                past_clients_lower = past_clients.lower()
-                if brand_lower in past_clients_lower:
-                    filter_score += 0.5  # Higher weight for brand match
-        
-        score += filter_score
-        
-        
-        # Only include factories with some relevance (lowered threshold for brand search)
-        # For brand-only searches, include if brand matches regardless of other scores
-        if score > 0.05 or (brand and filter_score >= 0.5):
-            # Use the index as factory_id since the dataset doesn't have explicit IDs
-            factory_id = str(idx + 1)  # Use 1-based indexing to match database IDs
-            
-            result = {
-                "id": factory_name,  # Keep for backward compatibility
-                "factory_id": factory_id,  # Use index-based ID
-                "name": factory_name,
-                "status": "Active",  # Default status
-                "country": country,
-                "city": city,
-                "lat": factory.get('latitude', factory.get('Latitude', 0)),
-                "lng": factory.get('longitude', factory.get('Longitude', 0)),
-                "score": round(score, 3),
-                "specialties": specialties,
-                "materials": materials,
-                "certifications": factory.get('certifications', factory.get('Certifications', '')),
-                "contact_email": factory.get('contact_email', factory.get('Contact Email', '')),
-                "contact_phone": factory.get('contact_phone', factory.get('Contact Phone', ''))
-            }
-            scored.append(result)
-    
-    # Sort by score (descending) and limit results
-    scored.sort(key=lambda x: x["score"], reverse=True)
-    results = scored[:limit]
+        scored.append({
+            "id": factory_name,  # Keep for backward compatibility
+            "factory_id": str(hit.index + 1),  # 1-based dataset position, matches database IDs
+            "name": factory_name,
+            "status": "Active",  # Default status
+            "country": factory.get('country', factory.get('Country', '')),
+            "city": factory.get('city', factory.get('City', '')),
+            "lat": factory.get('latitude', factory.get('Latitude', 0)),
+            "lng": factory.get('longitude', factory.get('Longitude', 0)),
+            "score": round(hit.score, 3),
+            "specialties": specialties,
+            "materials": materials,
+            "certifications": factory.get('certifications', factory.get('Certifications', '')),
+            "contact_email": factory.get('contact_email', factory.get('Contact Email', '')),
+            "contact_phone": factory.get('contact_phone', factory.get('Contact Phone', ''))
+        })
     
     search_time = time.time() - start_time
     
     return {
-        "results": results,
+        "results": scored[:limit],
         "total_found": len(scored),
         "search_time": round(search_time, 3)
     }
 
+# Typeahead over the factory dataset, built straight from the shared rows. When the data
+# files change the rows are diffed by factory name and row hash (the ingest row manifest
+# when it describes the data, else hashes of the fields completed from) and only the
+# changed rows are applied, so the index is patched, not rebuilt.
+AUTOCOMPLETE_MAX_LIMIT = 50
+AUTOCOMPLETE_FIELDS = ('factory_name', 'product_specialties', 'materials_handled', 'past_clients', 'country')
+_AUTOCOMPLETE_LOCK = Lock()
+# (rows it was built from, hash kind, factory name -> row hash, index)
+_autocomplete: Optional[Tuple[Any, str, Dict[str, str], AutocompleteIndex]] = None
+
+def _autocomplete_rows(source, positions: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """AUTOCOMPLETE_FIELDS of every row of `source`, or of those at `positions`"""
+    table = getattr(source, 'table', None)
+    if table is not None:  # shared Arrow snapshot: decode only these columns
+        rows = SnapshotRows(table.select([c for c in AUTOCOMPLETE_FIELDS if c in table.column_names]))
+        return list(rows) if positions is None else rows.take(positions)
+    picked = source if positions is None else [source[i] for i in positions]
+    return [{c: row.get(c) for c in AUTOCOMPLETE_FIELDS} for row in picked]
+
+def _factory_names(source) -> List[str]:
+    table = getattr(source, 'table', None)
+    if table is not None and 'factory_name' in table.column_names:
+        return table.column('factory_name').to_pylist()
+    return [row.get('factory_name') for row in source]
+
+def _positions(names: List[str], wanted: Iterable[str]) -> List[int]:
+    wanted = set(wanted)
+    return [i for i, name in enumerate(names) if name in wanted]
+
+def _factory_autocomplete() -> AutocompleteIndex:
+    global _autocomplete
+    source = _factory_index().source
+    with _AUTOCOMPLETE_LOCK:
+        current = _autocomplete
+        if current is not None and current[0] is source:
+            return current[3]
+        names, rows = _factory_names(source), None
+        saved = FactoryDataIngest().saved_row_hashes()
+        if saved is not None and all(name in saved for name in names):
+            kind, hashes = 'manifest', {name: saved[name] for name in names}
+        else:
+            kind, hashes, rows = 'fields', {}, _autocomplete_rows(source)
+            for name, row in zip(names, rows):
+                hashes[name] = row_hash([hashes[name], row]) if name in hashes else row_hash(row)
+        if current is None or current[1] != kind:
+            index = AutocompleteIndex.build(rows if rows is not None else _autocomplete_rows(source))
+        else:
+            old_source, _, old_hashes, index = current
+            diff = diff_rows(old_hashes, hashes)
+            if diff.inserts or diff.updates or diff.deletes:
+                removed = _autocomplete_rows(old_source, _positions(_factory_names(old_source), diff.updates + diff.deletes))
+                added = _autocomplete_rows(source, _positions(names, diff.inserts + diff.updates))
+                index = index.apply(added, removed)
+        _autocomplete = (source, kind, hashes, index)
+        return index
+
+@app.get("/api/factories/autocomplete")
+async def factories_autocomplete(q: str = "", limit: int = 10, kinds: Optional[str] = None):
+    """Completions of `q` over factory names, products, materials, brands and countries"""
+    limit = max(0, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+    wanted = [k.strip() for k in kinds.split(",") if k.strip()] if kinds else None
+    if wanted and not set(wanted) <= set(AUTOCOMPLETE_KINDS):
+        raise HTTPException(status_code=400, detail=f"kinds must be among {', '.join(AUTOCOMPLETE_KINDS)}")
+    current = _autocomplete
+    if current is not None and current[0] is _factory_index().source:
+        index = current[3]
+    else:  # first use or new data: diff and apply off the event loop
+        index = await asyncio.to_thread(_factory_autocomplete)
+    return {"query": q, "suggestions": index.complete(q, limit, kinds=wanted)}
+
+_FACTORIES_SEARCH_FLIGHT = singleflight("factories_search")
+
+# /api/factories/search runs internal search, Alibaba search and the goal load concurrently,
+# each bounded by its own budget; a stage that runs out contributes nothing and is listed
+# in meta.timed_out_stages, so latency is the slowest stage rather than the sum of all three
+FACTORIES_INTERNAL_BUDGET_MS = int(os.getenv("FACTORIES_INTERNAL_BUDGET_MS", "8000"))
+FACTORIES_ALIBABA_BUDGET_MS = int(os.getenv("FACTORIES_ALIBABA_BUDGET_MS", "4000"))
+FACTORIES_GOALS_BUDGET_MS = int(os.getenv("FACTORIES_GOALS_BUDGET_MS", "1500"))
+
 @app.post("/api/factories/search", response_model=FactorySearchResponse)
 async def factories_search(request: FactorySearchRequest):
     """Unified factory search endpoint with Alibaba integration"""
+    # identical concurrent searches share one run (internal + Alibaba + goal rerank)
+    return await _FACTORIES_SEARCH_FLIGHT.do(request_fingerprint(request), lambda: _factories_search(request))
+
+async def _within_budget(stage: str, budget_ms: int, aw, default):
+    with deadline(budget_ms):
+        return await within_deadline(stage, aw, default)
+
+async def _internal_candidates(request: FactorySearchRequest) -> List[Dict[str, Any]]:
+    internal_results = await search_factories_fast(
+        query=request.query,
+        location=request.location,
+        industry=request.industry,
+        size=request.size,
+        brand=request.brand,
+        limit=request.limit
+    )
+    # Add source tag to internal results
+    for result in internal_results.get("results", []):
+        result["source"] = "internal"
+        result["tags"] = result.get("tags", []) + ["internal"]
+    return internal_results.get("results", [])
+
+async def _alibaba_candidates(request: FactorySearchRequest) -> List[Dict[str, Any]]:
+    try:
+        # For now, use a mock access token - in production, get from user's stored credentials
+        # TODO: Integrate with existing Alibaba credential system
+        mock_token = "mock_token_for_development"
+
+        # Search Alibaba suppliers (pooled client, short TTL cache in the connector)
+        alibaba_items = await search_suppliers(
+            mock_token,
+            request.query,
+            {
+                "location": request.location,
+                "industry": request.industry,
+                "size": request.size,
+                "brand": request.brand
+            }
+        )
+        return [map_supplier(x) for x in alibaba_items]
+    except Exception as e:
+        print(f"[DEBUG] Alibaba search failed: {str(e)}", flush=True)
+        return []
+
+async def _factories_search(request: FactorySearchRequest):
     try:
         print(f"[DEBUG] Factory search request: {request.query}, location: {request.location}, industry: {request.industry}, size: {request.size}, brand: {request.brand}, sources: {request.include_sources}", flush=True)
-        
-        all_results = []
-        
-        # Get internal results if requested
-        if "internal" in request.include_sources:
-            internal_results = search_factories_fast(
-                query=request.query,
-                location=request.location,
-                industry=request.industry,
-                size=request.size,
-                brand=request.brand,
-                limit=request.limit
+        start_time = time.time()
+
+        async def _skipped() -> List[Dict[str, Any]]:
+            return []
+
+        use_internal = "internal" in request.include_sources
+        use_alibaba = "alibaba" in request.include_sources and os.getenv("FEATURE_ALIBABA", "0") == "1"
+        budget = max(FACTORIES_INTERNAL_BUDGET_MS, FACTORIES_ALIBABA_BUDGET_MS, FACTORIES_GOALS_BUDGET_MS)
+        with deadline(budget) as dl:  # shares the timed-out stage record with the nested budgets
+            internal, alibaba, goals = await asyncio.gather(
+                _within_budget("internal", FACTORIES_INTERNAL_BUDGET_MS,
+                               _internal_candidates(request) if use_internal else _skipped(), []),
+                _within_budget("alibaba", FACTORIES_ALIBABA_BUDGET_MS,
+                               _alibaba_candidates(request) if use_alibaba else _skipped(), []),
+                _within_budget("goals", FACTORIES_GOALS_BUDGET_MS, asyncio.to_thread(_goal_profile), _NO_GOALS),
             )
-            # Add source tag to internal results
-            for result in internal_results.get("results", []):
-                result["source"] = "internal"
-                result["tags"] = result.get("tags", []) + ["internal"]
-            all_results.extend(internal_results.get("results", []))
-        
-        # Get Alibaba results if enabled and requested
-        if "alibaba" in request.include_sources and os.getenv("FEATURE_ALIBABA", "0") == "1":
-            try:
-                # For now, use a mock access token - in production, get from user's stored credentials
-                # TODO: Integrate with existing Alibaba credential system
-                mock_token = "mock_token_for_development"
-                
-                # Search Alibaba suppliers
-                alibaba_items = await search_suppliers(
-                    mock_token,
-                    request.query,
-                    {
-                        "location": request.location,
-                        "industry": request.industry,
-                        "size": request.size,
-                        "brand": request.brand
-                    }
-                )
-                alibaba_results = [map_supplier(x) for x in alibaba_items]
-                all_results.extend(alibaba_results)
-                
-            except Exception as e:
-                print(f"[DEBUG] Alibaba search failed: {str(e)}", flush=True)
-        
+        all_results = internal + alibaba
+        if dl.timed_out:
+            print(f"[DEBUG] Factory search stages over budget: {dl.timed_out}", flush=True)
+
         # Merge and deduplicate results
         if all_results:
             merged_results = dedup_and_merge(all_results)
             ranked_results = rerank_factories(request.query, merged_results)
 
-            # Goal-aware reranking and impact attachment
-            try:
-                from os import getenv
-                DEFAULT_GOAL_WEIGHT = float(getenv("GOAL_DEFAULT_WEIGHT", "0.30"))
-            except Exception:
-                DEFAULT_GOAL_WEIGHT = 0.30
-
-            # Load active goals from DB
-            db = None
-            try:
-                from sqlalchemy.orm import Session
-                from database import SessionLocal
-                from models import UserGoal
-                db = SessionLocal()
-                goals = db.query(UserGoal).filter(UserGoal.user_id == 1, UserGoal.is_active == True).all()
-                goals_dicts = [
-                    {
-                        "id": g.id,
-                        "metric": g.metric,
-                        "unit": g.unit,
-                        "direction": g.direction,
-                        "target_amount": float(getattr(g, 'target_amount', 0) or 0),
-                        "baseline_amount": float(getattr(g, 'baseline_amount', 0) or 0) if getattr(g, 'baseline_amount', None) is not None else None,
-                        "weight": float(getattr(g, 'weight', DEFAULT_GOAL_WEIGHT) or DEFAULT_GOAL_WEIGHT),
-                    }
-                    for g in goals
-                ]
-            except Exception:
-                goals_dicts = []
-            finally:
-                if db:
-                    try:
-                        db.close()
-                    except Exception:
-                        pass
-
-            def _goal_gain_fraction(item: Dict[str, Any], goals: List[Dict[str, Any]]) -> float:
-                if not goals:
-                    return 0.0
-                total_w = 0.0
-                acc = 0.0
-                for g in goals:
-                    w = float(g.get("weight") or DEFAULT_GOAL_WEIGHT)
-                    total_w += w
-                    metric = g.get("metric")
-                    direction = g.get("direction")
-                    target = float(g.get("target_amount") or 0)
-                    baseline = g.get("baseline_amount")
-                    if target <= 0:
-                        continue
-                    if metric == "cost":
-                        item_cost = float(item.get("total_cost") or item.get("unit_cost") or 0.0)
-                        ref = baseline if baseline is not None else float(item.get("avg_cost_benchmark") or 0.0)
-                        delta = (ref - item_cost) if direction == "decrease" else (item_cost - ref)
-                    elif metric == "time":
-                        item_days = float(item.get("total_days") or item.get("transit_days") or 0.0)
-                        ref = baseline if baseline is not None else float(item.get("avg_days_benchmark") or 0.0)
-                        delta = (ref - item_days) if direction == "decrease" else (item_days - ref)
-                    else:
-                        key = f"custom_value::{g.get('unit','custom')}"
-                        item_val = float(item.get(key) or 0.0)
-                        ref = float(baseline or 0.0)
-                        delta = (ref - item_val) if direction == "decrease" else (item_val - ref)
-                    improve = max(0.0, float(delta))
-                    frac = max(0.0, min(1.0, improve / target))
-                    acc += w * frac
-                return (acc / total_w) if total_w > 0 else 0.0
-
-            if goals_dicts:
-                for it in merged_results:
-                    gg = _goal_gain_fraction(it, goals_dicts)
-                    base = float(it.get("score") or it.get("base_score") or 0.0)
-                    it["goal_gain_fraction"] = gg
-                    it["final_score"] = base * (1.0 + DEFAULT_GOAL_WEIGHT * gg)
-                    # Attach per-goal impacts for UI
-                    it.setdefault("goal_impacts", [])
-                    for g in goals_dicts:
-                        if g["metric"] == "cost":
-                            cost = float(it.get("total_cost") or it.get("unit_cost") or 0.0)
-                            ref = g.get("baseline_amount") or float(it.get("avg_cost_benchmark") or 0.0)
-                            delta = max(0.0, ref - cost) if g["direction"] == "decrease" else max(0.0, cost - ref)
-                        elif g["metric"] == "time":
-                            days = float(it.get("total_days") or it.get("transit_days") or 0.0)
-                            ref = g.get("baseline_amount") or float(it.get("avg_days_benchmark") or 0.0)
-                            delta = max(0.0, ref - days) if g["direction"] == "decrease" else max(0.0, days - ref)
-                        else:
-                            key = f"custom_value::{g.get('unit','custom')}"
-                            val = float(it.get(key) or 0.0)
-                            ref = float(g.get("baseline_amount") or 0.0)
-                            delta = max(0.0, ref - val) if g["direction"] == "decrease" else max(0.0, val - ref)
-                        pct = min(1.0, (delta / float(g["target_amount"])) if g["target_amount"] else 0.0)
-                        it["goal_impacts"].append({
-                            "goal_id": g["id"],
-                            "metric": g["metric"],
-                            "unit": g["unit"],
-                            "direction": g["direction"],
-                            "delta": round(float(delta), 3),
-                            "target": float(g["target_amount"]),
-                            "pct_to_goal": pct,
-                        })
-                # sort by final_score when goals present
-                merged_results.sort(key=lambda x: float(x.get("final_score") or x.get("score") or 0.0), reverse=True)
-                ranked_results = merged_results
+            # Goal-aware reranking and impact attachment (goals loaded alongside the searches);
+            # impacts are only built for the results returned
+            if goals.goals:
+                ranked_results = goal_rerank(merged_results, goals, attach=request.limit)
         else:
             merged_results = []
             ranked_results = []
@@ -1098,8 +1129,11 @@ async def factories_search(request: FactorySearchRequest):
         return FactorySearchResponse(
             results=final_results,
             total_found=len(ranked_results),
-            search_time=0.0  # Will be calculated from internal search if available
+            search_time=round(time.time() - start_time, 3),
+            meta=dl.meta(),
         )
+    except scoring_pool.ScoringBusy:
+        raise  # 503 via scoring_busy_handler
     except Exception as e:
         print(f"[ERROR] Search endpoint error: {str(e)}", flush=True)
         import traceback
@@ -1187,65 +1221,83 @@ def merge_image_attributes(attributes_list: List[Dict[str, Any]]) -> Dict[str, A
     
     return merged
 
-def match_factories_by_attributes(attributes: Dict[str, Any], limit: int = 10) -> List[Dict[str, Any]]:
-    """Match factories based on extracted attributes"""
-    # Load factory data
+# Image-attribute matching over the factory CSV: parsed once into per-attribute inverted
+# indexes, reparsed when the file's mtime changes
+FACTORY_CSV_PATH = "data/main_factory_data_only.csv"
+_ATTRIBUTE_FIELDS = {
+    "product": ("Product Specialties",),
+    "material": ("Materials Handled",),
+    "style": ("Product Specialties", "Customization Capabilities", "Notes"),
+    "color": ("Product Specialties", "Materials Handled", "Customization Capabilities", "Notes"),
+    "region": ("Country", "City", "Nearest Port"),
+}
+_COLOR_WORDS = {
+    "black", "white", "grey", "gray", "navy", "blue", "red", "green", "olive", "khaki", "beige",
+    "cream", "ivory", "brown", "tan", "pink", "purple", "yellow", "orange", "indigo", "charcoal",
+}
+_ATTRIBUTE_INDEX: Optional[Tuple[int, AttributeIndex]] = None
+_ATTRIBUTE_INDEX_LOCK = Lock()
+
+def _attribute_index() -> Optional[AttributeIndex]:
+    global _ATTRIBUTE_INDEX
     try:
-        df = pd.read_csv("data/main_factory_data_only.csv")
+        version = os.stat(FACTORY_CSV_PATH).st_mtime_ns
     except FileNotFoundError:
+        return None
+    cached = _ATTRIBUTE_INDEX
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _ATTRIBUTE_INDEX_LOCK:
+        if _ATTRIBUTE_INDEX is None or _ATTRIBUTE_INDEX[0] != version:
+            index = AttributeIndex(read_factory_csv(FACTORY_CSV_PATH), _ATTRIBUTE_FIELDS, {"color": _COLOR_WORDS})
+            _ATTRIBUTE_INDEX = (version, index)
+        return _ATTRIBUTE_INDEX[1]
+
+def match_factories_by_attributes(attributes: Dict[str, Any], limit: int = 10) -> List[Dict[str, Any]]:
+    """Match factories based on extracted attributes"""
+    index = _attribute_index()
+    if index is None:
         return []
     
-    # Convert to list of dicts
-    factories = df.to_dict('records')
-    
-    # Score factories based on attribute matching
-    scored_factories = []
-    
-    for factory in factories:
-        score = 0.0
-        matched_attributes = []
-        
-        # Category matching
-        if attributes.get("product_category"):
-            factory_categories = str(factory.get("categories", "")).lower()
-            if attributes["product_category"] in factory_categories:
-                score += 0.3
-                matched_attributes.append("category")
-        
-        # Material matching
-        if attributes.get("primary_materials"):
-            factory_materials = str(factory.get("materials", "")).lower()
-            for material in attributes["primary_materials"]:
-                if material in factory_materials:
-                    score += 0.2
-                    matched_attributes.append(f"material_{material}")
-                    break
-        
-        # Capability matching
-        if attributes.get("key_features"):
-            factory_capabilities = str(factory.get("capabilities", "")).lower()
-            for feature in attributes["key_features"]:
-                if feature in factory_capabilities:
-                    score += 0.1
-                    matched_attributes.append(f"feature_{feature}")
-        
-        # Region boost
-        if attributes.get("region_hints"):
-            factory_region = str(factory.get("region", "")).lower()
-            for region in attributes["region_hints"]:
-                if region in factory_region:
-                    score += 0.1
-                    matched_attributes.append(f"region_{region}")
-                    break
-        
-        if score > 0:
-            factory["score"] = score
-            factory["matched_attributes"] = matched_attributes
-            scored_factories.append(factory)
-    
-    # Sort by score and return top results
-    scored_factories.sort(key=lambda x: x["score"], reverse=True)
-    return scored_factories[:limit]
+    scores: Dict[int, float] = {}
+    matched: Dict[int, List[str]] = {}
+    
+    def credit(rows, weight: float, label: str):
+        for i in rows:
+            scores[i] = scores.get(i, 0.0) + weight
+            matched.setdefault(i, []).append(label)
+    
+    def credit_first(attr: str, values, weight: float, prefix: str):
+        # only the first matching value counts for each factory
+        seen = frozenset()
+        for value in values or []:
+            rows = index.match(attr, value) - seen
+            credit(rows, weight, f"{prefix}_{value}")
+            seen |= rows
+    
+    # Category matching
+    if attributes.get("product_category"):
+        credit(index.match("product", attributes["product_category"]), 0.3, "category")
+    
+    # Material matching
+    credit_first("material", attributes.get("primary_materials"), 0.2, "material")
+    
+    # Feature / style matching
+    for feature in attributes.get("key_features") or []:
+        credit(index.match("style", feature), 0.1, f"feature_{feature}")
+    for style in attributes.get("style_tags") or []:
+        credit(index.match("style", style), 0.1, f"style_{style}")
+    
+    # Colour matching
+    for color in attributes.get("colors") or []:
+        credit(index.match("color", color), 0.05, f"color_{color}")
+    
+    # Region boost
+    credit_first("region", attributes.get("region_hints"), 0.1, "region")
+    
+    # Top results by score, ties in file order
+    top = heapq.nsmallest(limit, scores, key=lambda i: (-scores[i], i))
+    return [{**index.rows[i], "score": scores[i], "matched_attributes": matched[i]} for i in top]
 
 async def text_only_factory_search(query: str, limit: int = 10) -> List[Dict[str, Any]]:
     """Text-only factory search using existing search logic"""
@@ -1479,6 +1531,19 @@ async def create_quote(quote_data: dict, db: Session = Depends(get_db)):
         print(f"[ERROR] Create quote error: {str(e)}", flush=True)
         raise HTTPException(status_code=500, detail=f"Failed to create quote: {str(e)}")
 
+_SLA_FILTER_KEYS = ("country", "location", "product", "material", "brand", "size")
+
+def _db_factory_index(db: Session):
+    """Shared hybrid index over the factories table, rebuilt when rows are added or updated."""
+    from sqlalchemy import func
+    version = tuple(db.query(func.count(Factory.id), func.max(Factory.id), func.max(Factory.updated_at)).one())
+    def rows():
+        return [
+            {"id": f.id, "name": f.name, "country": f.country, "city": f.city, "certifications": f.certifications or []}
+            for f in db.query(Factory).all()
+        ]
+    return get_index("sla_factories", version, rows)
+
 @app.post("/api/sla/search", response_model=SLASearchResponse)
 async def sla_search(request: SLASearchRequest, db: Session = Depends(get_db)):
     """
@@ -1492,16 +1557,19 @@ async def sla_search(request: SLASearchRequest, db: Session = Depends(get_db)):
         need_profile = await parse_query_with_llm(request.q)
         
         # Step B: Retrieval (INGESTED ONLY) - get factories where ingestion_status = 'READY'
-        # For now, we'll use the existing factory search but filter for ingested factories
+        # Hybrid recall over the shared factories-table index; get more for reranking
         # TODO: Implement proper ingestion_status filtering when the field is available
-        factories = db.query(Factory).filter(
-            Factory.name.ilike(f"%{request.q}%")
-        ).limit(request.topK * 2).all()  # Get more for reranking
+        filters = {k: v for k, v in (request.filters or {}).items() if k in _SLA_FILTER_KEYS and isinstance(v, str)}
+        index = await asyncio.to_thread(_db_factory_index, db)  # version query and any rebuild
+        hits = await scoring_pool.asearch(index, request.q, request.topK * 2, filters=filters)
+        relevance = {int(h.row["id"]): h.score for h in hits}
+        by_id = {f.id: f for f in db.query(Factory).filter(Factory.id.in_(list(relevance))).all()} if relevance else {}
+        factories = [by_id[fid] for fid in relevance if fid in by_id]
         
         # Step C: Scoring/rerank - weighted blend of factors
         scored_factories = []
         for factory in factories:
-            score = calculate_factory_score(factory, need_profile, request.q)
+            score = calculate_factory_score(factory, need_profile, request.q, relevance.get(factory.id))
             if score > 0.1:  # Only include factories with reasonable scores
                 scored_factories.append({
                     'factory': factory,
@@ -1549,7 +1617,7 @@ async def sla_search(request: SLASearchRequest, db: Session = Depends(get_db)):
                 "tookMs": round(search_time * 1000, 2),
                 "retrievalK": len(factories),
                 "reranked": True,
-                "source": "vector+fts"
+                "source": "bm25+fuzzy+vector"
             }
         )
         
@@ -1578,12 +1646,14 @@ async def parse_query_with_llm(query: str) -> Dict[str, Any]:
         print(f"[DEBUG] LLM query parsing failed: {e}")
         return {"category": "general", "materials": [], "regionPrefs": [], "certs": [], "moq": None, "leadTimeDaysMax": None, "targetPriceUsd": None, "notes": query}
 
-def calculate_factory_score(factory: Factory, need_profile: Dict[str, Any], query: str) -> float:
+def calculate_factory_score(factory: Factory, need_profile: Dict[str, Any], query: str, relevance: Optional[float] = None) -> float:
     """Calculate weighted score for factory based on need profile"""
     score = 0.0
     
-    # Capability/material match (0.35)
-    if factory.name and query.lower() in factory.name.lower():
+    # Capability/material match (0.35): fused retrieval relevance when available
+    if relevance is not None:
+        score += 0.35 * relevance
+    elif factory.name and query.lower() in factory.name.lower():
         score += 0.35
     
     # Region/geo fit (0.15)
@@ -1675,6 +1745,42 @@ async def generate_explanation(factory: Factory, need_profile: Dict[str, Any], q
         print(f"[DEBUG] Explanation generation failed: {e}")
         return None
 
+# Uploads are streamed to disk in chunks; images are analyzed concurrently, each under its own timeout
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+MAX_IMAGE_BYTES = 12 * 1024 * 1024
+MAX_IMAGES_PER_SEARCH = 5
+# Defaults to every image of a search at once, so a full upload is analyzed in one wave
+IMAGE_ANALYSIS_CONCURRENCY = int(os.getenv("IMAGE_ANALYSIS_CONCURRENCY", str(MAX_IMAGES_PER_SEARCH)))
+IMAGE_ANALYSIS_TIMEOUT_S = float(os.getenv("IMAGE_ANALYSIS_TIMEOUT_S", "20"))
+
+async def _stream_upload(file: UploadFile, path: str) -> int:
+    """Copy `file` to `path` chunk by chunk, enforcing MAX_IMAGE_BYTES as it goes."""
+    size = 0
+    with open(path, "wb") as buffer:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            size += len(chunk)
+            if size > MAX_IMAGE_BYTES:
+                raise HTTPException(status_code=413, detail=f"File {file.filename} is too large (max 12MB)")
+            await asyncio.to_thread(buffer.write, chunk)
+    return size
+
+async def _analyze_images(image_paths: List[str], hints: str) -> List[Dict[str, Any]]:
+    """Attributes for every image that was analyzed in time; failures and timeouts are dropped."""
+    slots = asyncio.Semaphore(IMAGE_ANALYSIS_CONCURRENCY)
+
+    async def one(i: int, image_path: str) -> Optional[Dict[str, Any]]:
+        async with slots:
+            try:
+                return await asyncio.wait_for(analyze_image_with_mistral(image_path, hints), IMAGE_ANALYSIS_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                print(f"[ERROR] Image {i+1} analysis timed out after {IMAGE_ANALYSIS_TIMEOUT_S}s")
+            except Exception as e:
+                print(f"[ERROR] Failed to analyze image {i+1}: {str(e)}")
+            return None
+
+    results = await asyncio.gather(*(one(i, p) for i, p in enumerate(image_paths)))
+    return [r for r in results if r]
+
 # Image + text search endpoint
 @app.post("/api/search/unified/multipart", response_model=UnifiedSearchResponse)
 async def unified_multipart_search(
@@ -1692,24 +1798,18 @@ async def unified_multipart_search(
         
         if len(files) == 0:
             raise HTTPException(status_code=400, detail="At least one image is required for multipart search.")
+        if len(files) > MAX_IMAGES_PER_SEARCH:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_IMAGES_PER_SEARCH} images per search.")
 
         # Determine search mode and execute
         if files and len(files) > 0:
             # Image search (with optional text boost)
             print(f"[DEBUG] Running image search with {len(files)} files, text: '{text_query}'")
             
-            # Validate files
+            # Validate files (size is enforced while streaming to disk)
             for file in files:
                 if not file.content_type or not file.content_type.startswith('image/'):
                     raise HTTPException(status_code=400, detail=f"File {file.filename} is not an image")
-                
-                # Check file size (12MB limit)
-                file.file.seek(0, 2)
-                file_size = file.file.tell()
-                file.file.seek(0)
-                
-                if file_size > 12 * 1024 * 1024:  # 12MB
-                    raise HTTPException(status_code=413, detail=f"File {file.filename} is too large (max 12MB)")
 
             # Create temporary directory for processing
             temp_dir = tempfile.mkdtemp(prefix="unified_search_")
@@ -1722,23 +1822,12 @@ async def unified_multipart_search(
                     temp_filename = f"{uuid.uuid4()}{file_extension}"
                     temp_path = os.path.join(temp_dir, temp_filename)
                     
-                    with open(temp_path, "wb") as buffer:
-                        shutil.copyfileobj(file.file, buffer)
-                    
+                    await _stream_upload(file, temp_path)
                     image_paths.append(temp_path)
                 
                 # Analyze images with Mistral
                 print(f"[DEBUG] Analyzing {len(image_paths)} images with Mistral...")
-                attributes_list = []
-                
-                for i, image_path in enumerate(image_paths):
-                    print(f"[DEBUG] Analyzing image {i+1}/{len(image_paths)}")
-                    try:
-                        attributes = await analyze_image_with_mistral(image_path, text_query)
-                        attributes_list.append(attributes)
-                    except Exception as e:
-                        print(f"[ERROR] Failed to analyze image {i+1}: {str(e)}")
-                        continue
+                attributes_list = await _analyze_images(image_paths, text_query)
                 
                 if not attributes_list:
                     raise HTTPException(status_code=500, detail="Failed to analyze any images")
@@ -1747,9 +1836,9 @@ async def unified_multipart_search(
                 merged_attributes = merge_image_attributes(attributes_list)
                 print(f"[DEBUG] Merged attributes: {merged_attributes}")
                 
-                # Match factories based on attributes
+                # Match factories based on attributes: one pass over the corpus for all images
                 print(f"[DEBUG] Matching factories...")
-                matched_factories = match_factories_by_attributes(merged_attributes, k)
+                matched_factories = await asyncio.to_thread(match_factories_by_attributes, merged_attributes, k)
                 
                 search_time = time.time() - start_time
                 mode = "image+text" if text_query else "image"
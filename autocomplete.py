@@ -0,0 +1,242 @@
+"""
+Typeahead over factory names, products, materials, brands and countries
+"""
+
+import heapq
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from aliases import PRODUCT_ALIASES, MATERIAL_ALIASES, BRAND_ALIASES, COUNTRY_ALIASES
+
+KINDS = ('factory', 'product', 'material', 'brand', 'country')
+
+# Completions kept per prefix (and per kind) for prefixes matching more than SCAN_LIMIT keys;
+# narrower prefixes are answered by scanning their slice of the sorted keys
+TOP_K = 10
+SCAN_LIMIT = 256
+
+# Popularity is the number of live factories behind a completion; an alias ("jeans" for
+# denim) or a later word of a factory name ranks below the canonical term / full name
+ALIAS_WEIGHT = 0.5
+NAME_WORD_WEIGHT = 0.5
+
+Term = Tuple[str, str]  # (kind, canonical value)
+Key = Tuple[str, str, str]  # (normalized key, kind, value); the sorted array holds these
+
+def normalize_key(text: str) -> str:
+    """Lowercase with runs of whitespace collapsed"""
+    return ' '.join(str(text or '').lower().split())
+
+def _canonical_map(aliases: Dict[str, List[str]]) -> Dict[str, str]:
+    """alias -> canonical term, first match wins like the aliases.find_* helpers"""
+    out: Dict[str, str] = {}
+    for canonical, names in aliases.items():
+        for name in [canonical] + list(names):
+            out.setdefault(normalize_key(name), normalize_key(canonical))
+    return out
+
+_ALIASES = {'product': PRODUCT_ALIASES, 'material': MATERIAL_ALIASES,
+            'brand': BRAND_ALIASES, 'country': COUNTRY_ALIASES}
+_CANONICAL = {kind: _canonical_map(aliases) for kind, aliases in _ALIASES.items()}
+_ALIAS_KEYS = {kind: {normalize_key(c): [normalize_key(a) for a in names] for c, names in aliases.items()}
+               for kind, aliases in _ALIASES.items()}
+
+def factory_terms(factory: Dict[str, Any]) -> Iterator[Tuple[Term, str]]:
+    """((kind, value), display text) completions a factory contributes to"""
+    name = str(factory.get('factory_name') or '').strip()
+    if name:
+        yield ('factory', name), name
+    for kind, field in (('product', 'product_specialties'), ('material', 'materials_handled'),
+                        ('brand', 'past_clients')):
+        for raw in factory.get(field) or []:
+            key = normalize_key(raw)
+            if key:
+                yield (kind, _CANONICAL[kind].get(key, key)), str(raw).strip()
+    country = normalize_key(factory.get('country'))
+    if country:
+        canonical = _CANONICAL['country'].get(country)
+        yield ('country', canonical or country), canonical.title() if canonical else str(factory['country']).strip()
+
+def _term_keys(term: Term, count: int) -> Dict[str, float]:
+    """Normalized keys a term is completed from, with their weights"""
+    kind, value = term
+    keys: Dict[str, float] = {}
+    if kind == 'factory':
+        words = normalize_key(value).split(' ')
+        for i in range(len(words)):
+            keys[' '.join(words[i:])] = count * (NAME_WORD_WEIGHT if i else 1.0)
+        return keys
+    for alias in _ALIAS_KEYS[kind].get(value, ()):
+        keys[alias] = count * ALIAS_WEIGHT
+    keys[normalize_key(value)] = float(count)
+    return keys
+
+class AutocompleteIndex:
+    """
+    Sorted array of (key, kind, value) with per-entry weights. Prefix lookups bisect the
+    array; prefixes wider than SCAN_LIMIT keys keep a precomputed top list. Never mutated
+    once built: `apply` returns the next index, so lookups need no lock.
+    """
+
+    __slots__ = ('counts', 'displays', 'keys', 'weights', '_top')
+
+    def __init__(self, counts: Dict[Term, int], displays: Dict[Term, str], keys: List[Key],
+                 weights: List[float], top: Optional[Dict[str, Dict[Optional[str], list]]] = None):
+        self.counts = counts
+        self.displays = displays
+        self.keys = keys
+        self.weights = weights
+        self._top = {} if top is None else top
+
+    @classmethod
+    def build(cls, factories: Iterable[Dict[str, Any]]) -> 'AutocompleteIndex':
+        counts: Dict[Term, int] = {}
+        displays: Dict[Term, str] = {}
+        for factory in factories:
+            for term, display in factory_terms(factory):
+                counts[term] = counts.get(term, 0) + 1
+                displays.setdefault(term, display)
+        entries = sorted((key, term[0], term[1], weight)
+                         for term, count in counts.items() for key, weight in _term_keys(term, count).items())
+        index = cls(counts, displays, [e[:3] for e in entries], [e[3] for e in entries])
+        index._warm_from_root()
+        return index
+
+    def apply(self, added: Sequence[Dict[str, Any]], removed: Sequence[Dict[str, Any]]) -> 'AutocompleteIndex':
+        """Index with `added` factories counted in and `removed` ones counted out"""
+        counts, displays = dict(self.counts), dict(self.displays)
+        touched = set()
+        for factories, step in ((removed, -1), (added, 1)):
+            for factory in factories:
+                for term, display in factory_terms(factory):
+                    counts[term] = counts.get(term, 0) + step
+                    displays.setdefault(term, display)
+                    touched.add(term)
+
+        keys, weights = list(self.keys), list(self.weights)
+        changed = set()
+        for term in touched:
+            old = _term_keys(term, self.counts.get(term, 0)) if self.counts.get(term, 0) > 0 else {}
+            new = _term_keys(term, counts[term]) if counts[term] > 0 else {}
+            for key in old.keys() - new.keys():
+                i = bisect_left(keys, (key,) + term)
+                del keys[i], weights[i]
+            for key, weight in new.items():
+                entry = (key,) + term
+                i = bisect_left(keys, entry)
+                if i < len(keys) and keys[i] == entry:
+                    weights[i] = weight
+                else:
+                    keys.insert(i, entry)
+                    weights.insert(i, weight)
+            changed.update(old.keys() | new.keys())
+            if counts[term] <= 0:
+                del counts[term]
+                displays.pop(term, None)
+
+        dirty = {key[:n] for key in changed for n in range(1, len(key) + 1)}
+        index = AutocompleteIndex(counts, displays, keys, weights,
+                                  {p: top for p, top in self._top.items() if p not in dirty})
+        index._warm(dirty)
+        return index
+
+    def _range(self, prefix: str, lo: int = 0) -> Tuple[int, int]:
+        lo = bisect_left(self.keys, (prefix,), lo)
+        return lo, bisect_left(self.keys, (prefix + '\U0010ffff',), lo)
+
+    def _best(self, lo: int, hi: int, kinds: Optional[Iterable[str]] = None,
+              best: Optional[Dict[Term, Tuple[float, str]]] = None) -> Dict[Term, Tuple[float, str]]:
+        """Best (weight, matched key) per term among entries lo:hi"""
+        best = {} if best is None else best
+        for i in range(lo, hi):
+            key, kind, value = self.keys[i]
+            if kinds is not None and kind not in kinds:
+                continue
+            weight, term = self.weights[i], (kind, value)
+            current = best.get(term)
+            if current is None or weight > current[0]:
+                best[term] = (weight, key)
+        return best
+
+    def _ranked(self, best: Dict[Term, Tuple[float, str]], limit: int) -> list:
+        # most popular first, then shorter and alphabetically earlier text
+        if len(best) > limit:  # only terms weighing at least the limit-th weight can rank
+            cut = heapq.nlargest(limit, (weight for weight, _ in best.values()))[-1]
+            best = {term: wk for term, wk in best.items() if wk[0] >= cut}
+        return heapq.nsmallest(limit, ((-weight, len(self.displays[term]), self.displays[term], term, key)
+                                       for term, (weight, key) in best.items()))
+
+    def _children(self, prefix: str, lo: int, hi: int) -> Iterator[Tuple[Optional[str], int, int]]:
+        """(child prefix one character longer, or None for keys equal to `prefix`; its range)"""
+        n, start = len(prefix), lo
+        while lo < hi and len(self.keys[lo][0]) == n:  # these sort first
+            lo += 1
+        if lo > start:
+            yield None, start, lo
+        while lo < hi:
+            child = self.keys[lo][0][:n + 1]
+            _, end = self._range(child, lo)
+            yield child, lo, end
+            lo = end
+
+    def _compute_top(self, prefix: str, lo: int, hi: int) -> None:
+        """
+        Top lists of a wide prefix, merged from the cached top lists of its wide children
+        (computed first) and a scan of the narrow ones, like the nodes of a top-k trie.
+        """
+        ranked, best = [], {}
+        for child, c_lo, c_hi in self._children(prefix, lo, hi):
+            top = self._top.get(child) if child is not None else None
+            if top is None:
+                self._best(c_lo, c_hi, best=best)
+            else:
+                ranked.append(top)
+        by_kind: Dict[str, Dict[Term, Tuple[float, str]]] = {}
+        for term, weight_key in best.items():
+            by_kind.setdefault(term[0], {})[term] = weight_key
+        # the overall top TOP_K is among the per-kind ones
+        scanned = {kind: self._ranked(terms, TOP_K) for kind, terms in by_kind.items()}
+        scanned[None] = [row for rows in scanned.values() for row in rows]
+        out = {}
+        for kind in (None,) + KINDS:
+            merged, seen = [], set()
+            for row in sorted([r for top in ranked for r in top[kind]] + scanned.get(kind, [])):
+                if row[3] not in seen:
+                    seen.add(row[3])
+                    merged.append(row)
+                    if len(merged) == TOP_K:
+                        break
+            out[kind] = merged
+        self._top[prefix] = out
+
+    def _warm(self, prefixes: Iterable[str]) -> None:
+        """(Re)compute the top lists of those `prefixes` wider than SCAN_LIMIT, longest first"""
+        for prefix in sorted(prefixes, key=len, reverse=True):
+            lo, hi = self._range(prefix)
+            if hi - lo > SCAN_LIMIT:
+                self._compute_top(prefix, lo, hi)
+
+    def _warm_from_root(self) -> None:
+        wide, frontier = [], [('', 0, len(self.keys))]
+        while frontier:
+            prefix, lo, hi = frontier.pop()
+            for child, c_lo, c_hi in self._children(prefix, lo, hi):
+                if child is not None and c_hi - c_lo > SCAN_LIMIT:
+                    wide.append(child)
+                    frontier.append((child, c_lo, c_hi))
+        self._warm(wide)
+
+    def complete(self, prefix: str, limit: int = TOP_K, kinds: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Up to `limit` completions of `prefix`, most popular first, optionally only of `kinds`"""
+        p = normalize_key(prefix)
+        if not p or limit <= 0:
+            return []
+        kinds = None if kinds is None else tuple(k for k in KINDS if k in set(kinds))
+        top = self._top.get(p)
+        if top is not None and limit <= TOP_K:
+            ranked = top[None] if kinds is None else heapq.nsmallest(limit, (r for k in kinds for r in top[k]))
+        else:
+            ranked = self._ranked(self._best(*self._range(p), kinds=kinds), limit)
+        return [
+            {"text": display, "kind": term[0], "value": term[1], "matched": key, "weight": -neg_weight}
+            for neg_weight, _, display, term, key in ranked[:limit]
+        ]
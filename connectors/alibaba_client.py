@@ -2,8 +2,11 @@
 # Legal compliance: Uses official Alibaba.com Open Platform APIs only
 import os
 import time
+import asyncio
 import hashlib
+import weakref
 import httpx
+from collections import OrderedDict
 from typing import Dict, Any, List, Tuple, Optional
 
 API_BASE = os.getenv("ALIBABA_B2B_API_BASE", "https://api.alibaba.com/")
@@ -11,6 +14,12 @@ CLIENT_ID = os.getenv("ALIBABA_B2B_CLIENT_ID")
 CLIENT_SECRET = os.getenv("ALIBABA_B2B_CLIENT_SECRET")
 REDIRECT_URI = os.getenv("ALIBABA_B2B_REDIRECT_URI")
 
+# Search calls share one pooled client per event loop (no TLS handshake per request)
+SEARCH_TIMEOUT_S = float(os.getenv("ALIBABA_SEARCH_TIMEOUT_S", "30"))
+# Identical searches within this window are served from memory; 0 disables the cache
+SEARCH_CACHE_TTL_S = float(os.getenv("ALIBABA_SEARCH_CACHE_TTL_S", "120"))
+SEARCH_CACHE_ENTRIES = 256
+
 class AlibabaAuthError(Exception):
     """Alibaba authentication error"""
     pass
@@ -71,27 +80,45 @@ async def refresh_token(refresh_token: str) -> Dict[str, Any]:
         return r.json()
 
 # ---- SEARCH FUNCTIONS ----
+_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_SEARCH_CACHE: "OrderedDict[Tuple[Any, ...], Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+
+def search_client() -> httpx.AsyncClient:
+    """Shared client (and connection pool) of the running event loop for search calls."""
+    loop = asyncio.get_running_loop()
+    client = _CLIENTS.get(loop)
+    if client is None or client.is_closed:
+        client = _CLIENTS[loop] = httpx.AsyncClient(timeout=SEARCH_TIMEOUT_S)
+    return client
+
+async def _search(kind: str, label: str, access_token: str, query: str, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    params = {"q": query, **{k: v for k, v in (filters or {}).items() if v}}
+    # Results are per account, so the token is part of the key (hashed, not kept in memory)
+    token = hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+    key = (API_BASE, kind, token, tuple(sorted((k, str(v)) for k, v in params.items())))
+    hit = _SEARCH_CACHE.get(key)
+    if hit is not None and hit[0] > time.monotonic():
+        return [dict(x) for x in hit[1]]
+
+    r = await search_client().get(f"{API_BASE}b2b/{kind}/search", params=params,
+                                  headers={"Authorization": f"Bearer {access_token}"})
+    if r.status_code != 200:
+        raise AlibabaApiError(f"{label} search failed: {r.status_code} {r.text}")
+    items = r.json().get("items", [])
+    if SEARCH_CACHE_TTL_S > 0:
+        _SEARCH_CACHE[key] = (time.monotonic() + SEARCH_CACHE_TTL_S, [dict(x) for x in items])
+        _SEARCH_CACHE.move_to_end(key)
+        while len(_SEARCH_CACHE) > SEARCH_CACHE_ENTRIES:
+            _SEARCH_CACHE.popitem(last=False)
+    return items
+
 async def search_suppliers(access_token: str, query: str, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Search for suppliers on Alibaba"""
-    params = {"q": query, **{k: v for k, v in (filters or {}).items() if v}}
-    headers = {"Authorization": f"Bearer {access_token}"}
-    
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.get(f"{API_BASE}b2b/suppliers/search", params=params, headers=headers)
-        if r.status_code != 200:
-            raise AlibabaApiError(f"Supplier search failed: {r.status_code} {r.text}")
-        return r.json().get("items", [])
+    return await _search("suppliers", "Supplier", access_token, query, filters)
 
 async def search_products(access_token: str, query: str, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Search for products on Alibaba"""
-    params = {"q": query, **{k: v for k, v in (filters or {}).items() if v}}
-    headers = {"Authorization": f"Bearer {access_token}"}
-    
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.get(f"{API_BASE}b2b/products/search", params=params, headers=headers)
-        if r.status_code != 200:
-            raise AlibabaApiError(f"Product search failed: {r.status_code} {r.text}")
-        return r.json().get("items", [])
+    return await _search("products", "Product", access_token, query, filters)
 
 # ---- NORMALIZERS ----
 def map_supplier(raw: Dict[str, Any]) -> Dict[str, Any]:
@@ -139,8 +166,19 @@ def map_product(raw: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 # ---- UTILITY FUNCTIONS ----
+def _merge_supplier(existing: Dict[str, Any], item: Dict[str, Any]) -> None:
+    """Merge tags and best fields of item into existing"""
+    existing["tags"] = list(set((existing.get("tags") or []) + (item.get("tags") or [])))
+    if item.get("verified"):
+        existing["verified"] = True
+    if item.get("storefrontUrl") and not existing.get("storefrontUrl"):
+        existing["storefrontUrl"] = item["storefrontUrl"]
+    # Keep the higher score
+    if item.get("score", 0) > existing.get("score", 0):
+        existing["score"] = item["score"]
+
 def dedup_and_merge(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Deduplicate and merge suppliers by name, country, city"""
+    """Deduplicate and merge suppliers by name, country, city, then collapse near-duplicate names across sources"""
     def key_func(x):
         return (
             str(x.get("name", "")).lower().strip(),
@@ -154,18 +192,28 @@ def dedup_and_merge(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         if k not in bucket:
             bucket[k] = item
         else:
-            # Merge tags and best fields
-            existing = bucket[k]
-            existing["tags"] = list(set((existing.get("tags") or []) + (item.get("tags") or [])))
-            if item.get("verified"):
-                existing["verified"] = True
-            if item.get("storefrontUrl") and not existing.get("storefrontUrl"):
-                existing["storefrontUrl"] = item["storefrontUrl"]
-            # Keep the higher score
-            if item.get("score", 0) > existing.get("score", 0):
-                existing["score"] = item["score"]
+            _merge_supplier(bucket[k], item)
+    
+    merged = list(bucket.values())
+    if len(merged) < 2:
+        return merged
     
-    return list(bucket.values())
+    # Spelling variants ("Co., Ltd" vs "Company Limited") only meet in a shared LSH bucket
+    from sla_ai_components.ingest.dedupe import near_duplicate_clusters
+    clusters = near_duplicate_clusters(
+        [str(x.get("name") or "") for x in merged],
+        [str(x.get("country") or "") for x in merged],
+        addresses=[str(x.get("address") or "") for x in merged],
+        cities=[str(x.get("city") or "") for x in merged],
+    )
+    by_cluster: Dict[str, Dict[str, Any]] = {}
+    for cluster_id, item in zip(clusters, merged):
+        if cluster_id not in by_cluster:
+            item["clusterId"] = cluster_id
+            by_cluster[cluster_id] = item
+        else:
+            _merge_supplier(by_cluster[cluster_id], item)
+    return list(by_cluster.values())
 
 def rerank_factories(query: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Lightweight scoring for factory ranking"""
@@ -3,6 +3,8 @@ Data ingestion for factory dataset
 """
 
 import pandas as pd
+import csv
+import hashlib
 import json
 import os
 from typing import List, Dict, Any, Optional
@@ -10,6 +12,55 @@ from pathlib import Path
 from normalizers import normalize_dataset, FactoryDataNormalizer
 from search_builder import FactorySearchBuilder
 from schema import FactorySchema
+from snapshot import read_snapshot, snapshot_path, table_to_rows, write_snapshot
+
+# Per-row content hashes of the last ingested source file, next to the normalized JSON.
+# Re-ingesting diffs the cleaned rows against it so only new/changed rows are normalized.
+ROW_MANIFEST_SUFFIX = ".rows.json"
+ROW_MANIFEST_VERSION = 1
+
+def read_factory_csv(path) -> List[Dict[str, str]]:
+    """
+    Factory export CSV as records keyed by its header row. The export wraps every physical
+    line in a single quoted field (plus tab padding) and breaks some records across lines:
+    unwrap each line and stitch fragments back together until a full record parses.
+    """
+    with open(path, "r", encoding="latin-1", newline="") as f:
+        lines = f.read().split("\n")
+    columns: List[str] = []
+    records, pending, parts = [], None, 0
+    for line in lines:
+        s = line.rstrip("\t\r\n ")
+        if not s:
+            continue
+        if len(s) > 1 and s[0] == s[-1] == '"':
+            s = s[1:-1].replace('""', '"')
+        try:
+            fields = next(csv.reader([s if pending is None else pending + "\n" + s]))
+            if pending is not None:
+                s, parts = pending + "\n" + s, parts + 1
+        except csv.Error:  # the pending fragment was a short record after all
+            fields, pending, parts = next(csv.reader([s])), None, 0
+        if not columns:
+            columns = [c.strip() for c in fields if c.strip()]
+            continue
+        if len(fields) < len(columns) and parts < 6:
+            pending = s
+            continue
+        pending, parts = None, 0
+        records.append(dict(zip(columns, (v.strip() for v in fields))))
+    # the export's second row describes each column
+    if records and records[0].get(columns[0], "").startswith("Full name"):
+        records = records[1:]
+    return records
+
+def row_hash(record: Any) -> str:
+    """Stable content hash of one source row (independent of column order and process)"""
+    return hashlib.sha1(json.dumps(record, sort_keys=True, default=str, ensure_ascii=False).encode()).hexdigest()
+
+def _file_stamp(path: Path) -> str:
+    st = os.stat(path)
+    return f"{st.st_mtime_ns}:{st.st_size}"
 
 class FactoryDataIngest:
     """Handles ingestion and processing of factory data"""
@@ -28,10 +79,7 @@ class FactoryDataIngest:
             raise FileNotFoundError(f"Data file not found: {file_path}")
         
         try:
-            # Read the raw CSV with minimal processing
-            df = pd.read_csv(file_path, encoding='latin-1', header=None, low_memory=False)
-            
-            # The first row contains the actual column names
+            # Columns of the factory export
             column_names = [
                 'Factory Name', 'Country', 'City', 'Product Specialties', 
                 'Materials Handled', 'Minimum Order Quantity (MOQ)', 
@@ -44,11 +92,8 @@ class FactoryDataIngest:
                 'Contact Name', 'Contact Email', 'Contact Phone', 'Notes'
             ]
             
-            # Set the column names
-            df.columns = column_names
-            
-            # Remove the first few rows that contain header information
-            df = df.iloc[2:].reset_index(drop=True)
+            # Line-wrapped export: pandas' tokenizer sees one field per line, so parse it here
+            df = pd.DataFrame(read_factory_csv(file_path), columns=column_names)
             
             print(f"Successfully loaded data with {len(df)} records")
             return df
@@ -154,7 +199,7 @@ class FactoryDataIngest:
         return self.search_builder
     
     def save_normalized_data(self, factories: List[Dict[str, Any]], filename: str = "normalized_factories.json"):
-        """Save normalized data to JSON file"""
+        """Save normalized data to JSON file, plus the binary columnar snapshot next to it"""
         output_path = self.data_dir / filename
         
         try:
@@ -163,22 +208,39 @@ class FactoryDataIngest:
             print(f"Saved normalized data to {output_path}")
         except Exception as e:
             print(f"Error saving normalized data: {e}")
+            return
+        self._save_snapshot(factories, output_path)
+    
+    def _save_snapshot(self, factories: List[Dict[str, Any]], json_path: Path):
+        try:
+            if write_snapshot(factories, snapshot_path(json_path), json_path):
+                print(f"Saved snapshot to {snapshot_path(json_path)}")
+        except Exception as e:
+            print(f"Error saving snapshot: {e}")
     
     def load_normalized_data(self, filename: str = "normalized_factories.json") -> List[Dict[str, Any]]:
-        """Load normalized data from JSON file"""
+        """Load normalized data, from the memory-mapped snapshot when it is current"""
         file_path = self.data_dir / filename
         
         if not file_path.exists():
             raise FileNotFoundError(f"Normalized data file not found: {file_path}")
         
+        table = read_snapshot(snapshot_path(file_path), file_path)
+        if table is not None:
+            factories = table_to_rows(table)
+            print(f"Loaded {len(factories)} normalized factories from snapshot")
+            return factories
+        
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 factories = json.load(f)
             print(f"Loaded {len(factories)} normalized factories")
-            return factories
         except Exception as e:
             print(f"Error loading normalized data: {e}")
             raise
+        # missing or stale snapshot: write one so the next start skips JSON parsing
+        self._save_snapshot(factories, file_path)
+        return factories
     
     def ingest_from_csv(self, filename: str, save_normalized: bool = True) -> FactorySearchBuilder:
         """Complete ingestion process from CSV file"""
@@ -188,27 +250,7 @@ class FactoryDataIngest:
         df = self.load_csv_data(filename)
         print(f"Loaded {len(df)} raw records")
         
-        # Clean raw data
-        cleaned_df = self.clean_raw_data(df)
-        
-        # Normalize data
-        normalized_factories = self.normalize_data(cleaned_df)
-        
-        # Filter valid factories
-        valid_factories = self.filter_valid_factories(normalized_factories)
-        
-        # Save normalized data if requested
-        if save_normalized:
-            self.save_normalized_data(valid_factories)
-        
-        # Build search index
-        search_builder = self.build_search_index(valid_factories)
-        
-        # Store data
-        self.factories_data = valid_factories
-        
-        print("Ingestion completed successfully!")
-        return search_builder
+        return self._ingest_frame(df, save_normalized)
     
     def ingest_from_excel(self, filename: str, save_normalized: bool = True) -> FactorySearchBuilder:
         """Complete ingestion process from Excel file"""
@@ -218,28 +260,98 @@ class FactoryDataIngest:
         df = self.load_excel_data(filename)
         print(f"Loaded {len(df)} raw records")
         
-        # Clean raw data
+        return self._ingest_frame(df, save_normalized)
+    
+    def _ingest_frame(self, df: pd.DataFrame, save_normalized: bool,
+                      filename: str = "normalized_factories.json") -> FactorySearchBuilder:
+        # Clean raw data and hash each row, keyed by its normalized factory name
         cleaned_df = self.clean_raw_data(df)
-        
-        # Normalize data
-        normalized_factories = self.normalize_data(cleaned_df)
-        
-        # Filter valid factories
-        valid_factories = self.filter_valid_factories(normalized_factories)
+        keys = [self.normalizer.clean_text(name) for name in cleaned_df['Factory Name']]
+        hashes: Dict[str, str] = {}
+        for key, record in zip(keys, cleaned_df.to_dict(orient='records')):
+            hashes[key] = row_hash([hashes[key], record]) if key in hashes else row_hash(record)
+        
+        # Re-ingest: only rows whose key or content changed since the saved run are normalized
+        previous = self._load_incremental_base(filename) if save_normalized else None
+        if previous is not None:
+            factories, old_hashes = previous
+            changed = {k for k, h in hashes.items() if old_hashes.get(k) != h}
+            deleted = [k for k in old_hashes if k not in hashes]
+            print(f"Row diff: {len(changed)} new or changed, {len(deleted)} deleted, "
+                  f"{len(hashes) - len(changed)} unchanged")
+            normalized = self.normalize_data(cleaned_df[[k in changed for k in keys]]) if changed else []
+            upserts = self.filter_valid_factories(normalized)
+            # changed rows that no longer validate drop out like deleted ones
+            removed = deleted + sorted(changed - {f['factory_name'] for f in upserts})
+            search_builder = self.apply_changes(factories, upserts, removed)
+        else:
+            # Normalize data
+            normalized_factories = self.normalize_data(cleaned_df)
+            
+            # Filter valid factories
+            valid_factories = self.filter_valid_factories(normalized_factories)
+            
+            # Build search index
+            search_builder = self.build_search_index(valid_factories)
+            
+            # Store data
+            self.factories_data = valid_factories
         
         # Save normalized data if requested
         if save_normalized:
-            self.save_normalized_data(valid_factories)
-        
-        # Build search index
-        search_builder = self.build_search_index(valid_factories)
-        
-        # Store data
-        self.factories_data = valid_factories
+            self.save_normalized_data(self.factories_data, filename)
+            self._save_row_manifest(hashes, filename)
         
         print("Ingestion completed successfully!")
         return search_builder
     
+    def apply_changes(self, factories: List[Dict[str, Any]], upserts: List[Dict[str, Any]],
+                      deletes: List[str]) -> FactorySearchBuilder:
+        """Apply upserted/deleted factories to `factories` as the next generation of the current search index"""
+        if self.search_builder is None or self.search_builder.factories_data is not factories:
+            self.build_search_index(factories)
+        self.search_builder.apply_changes(upserts, deletes)
+        self.factories_data = self.search_builder.factories_data
+        return self.search_builder
+    
+    def _row_manifest_path(self, filename: str) -> Path:
+        return (self.data_dir / filename).with_suffix(ROW_MANIFEST_SUFFIX)
+    
+    def _save_row_manifest(self, hashes: Dict[str, str], filename: str):
+        output_path = self.data_dir / filename
+        if not output_path.exists():
+            return
+        manifest = {"version": ROW_MANIFEST_VERSION, "normalized": _file_stamp(output_path), "rows": hashes}
+        path = self._row_manifest_path(filename)
+        tmp = path.with_name(path.name + ".tmp")
+        try:
+            tmp.write_text(json.dumps(manifest), encoding='utf-8')
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"Error saving row manifest: {e}")
+    
+    def saved_row_hashes(self, filename: str = "normalized_factories.json") -> Optional[Dict[str, str]]:
+        """Row hashes (by factory name) saved with `filename`, or None when they don't describe it"""
+        path, output_path = self._row_manifest_path(filename), self.data_dir / filename
+        if not path.exists() or not output_path.exists():
+            return None
+        try:
+            manifest = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        # the normalized file was rewritten by something else since the manifest was saved
+        if manifest.get("version") != ROW_MANIFEST_VERSION or manifest.get("normalized") != _file_stamp(output_path):
+            return None
+        return manifest["rows"]
+    
+    def _load_incremental_base(self, filename: str):
+        """(normalized factories, row hashes) of the last run, or None when a full ingest is needed"""
+        hashes = self.saved_row_hashes(filename)
+        if hashes is None:
+            return None
+        factories = self.factories_data if self.search_builder is not None else self.load_normalized_data(filename)
+        return factories, hashes
+    
     def ingest_from_normalized(self, filename: str = "normalized_factories.json") -> FactorySearchBuilder:
         """Load from pre-normalized data"""
         print(f"Loading from normalized data: {filename}")
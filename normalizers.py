@@ -2,12 +2,221 @@
 Data normalizers for cleaning and standardizing factory data
 """
 
+import os
 import re
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Any, Optional
 from schema import ProductType, MaterialType, CertificationType, FactorySchema
 from aliases import find_product_type, find_material_type, find_brand, find_country, normalize_text
 
+# normalize_dataset works a column at a time over chunks of NORMALIZE_CHUNK_ROWS rows;
+# frames with more than one chunk are spread over NORMALIZE_WORKERS processes
+NORMALIZE_CHUNK_ROWS = int(os.getenv("NORMALIZE_CHUNK_ROWS", "20000"))
+NORMALIZE_WORKERS = int(os.getenv("NORMALIZE_WORKERS", str(os.cpu_count() or 1)))
+
+WHITESPACE_PATTERN = r'\s+'
+UNSAFE_CHARS_PATTERN = r'[^\w\s\-.,&()]'
+
+# Numeric parsers: the first pattern that matches wins
+QUANTITY_PATTERNS = [
+    r'(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:pcs|pieces|units|items)',
+    r'(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:k|thousand)',
+    r'(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:m|million)',
+    r'(\d+(?:,\d+)*(?:\.\d+)?)'
+]
+# Price ranges like "$1.20 - $5.00" or "$1.20-$5.00", else a single price
+PRICE_RANGE_PATTERN = r'\$?(\d+(?:\.\d+)?)\s*[-–—]\s*\$?(\d+(?:\.\d+)?)'
+SINGLE_PRICE_PATTERN = r'\$?(\d+(?:\.\d+)?)'
+DAY_PATTERNS = [
+    r'(\d+)\s*days?',
+    r'(\d+)\s*-\s*(\d+)\s*days?',
+    r'(\d+)\s*to\s*(\d+)\s*days?'
+]
+WEEK_PATTERNS = [
+    r'(\d+)\s*weeks?',
+    r'(\d+)\s*-\s*(\d+)\s*weeks?',
+    r'(\d+)\s*to\s*(\d+)\s*weeks?'
+]
+
+# Common brand patterns
+BRAND_PATTERNS = [
+    r'\b(H&M|H&M Group|Hennes & Mauritz)\b',
+    r'\b(Zara|Zara Fashion|Inditex)\b',
+    r'\b(Gap|Gap Inc|Gap Corporation)\b',
+    r'\b(Nike|Nike Inc|Nike Corporation)\b',
+    r'\b(Adidas|Adidas AG|Adidas Group)\b',
+    r'\b(Levi\'s|Levis|Levi Strauss)\b',
+    r'\b(Uniqlo|Fast Retailing|Uniqlo Co)\b',
+    r'\b(Target|Target Corporation|Target Stores)\b',
+    r'\b(Walmart|Walmart Inc|Walmart Stores)\b',
+    r'\b(Mango|Mango Fashion|Mango Group)\b',
+    r'\b(Tommy Hilfiger|Tommy Hilfiger Corporation)\b',
+    r'\b(Ralph Lauren|Ralph Lauren Corporation)\b',
+    r'\b(Calvin Klein|Calvin Klein Inc)\b',
+    r'\b(Victoria\'s Secret|Victoria Secret|L Brands)\b',
+    r'\b(American Eagle|American Eagle Outfitters|AEO)\b',
+    r'\b(Abercrombie|Abercrombie & Fitch|Abercrombie and Fitch)\b',
+    r'\b(Express|Express Inc|Express Fashion)\b',
+    r'\b(Urban Outfitters|Urban Outfitters Inc)\b',
+    r'\b(Anthropologie|Anthropologie Group)\b',
+    r'\b(J\.Crew|Jcrew|J\.Crew Group)\b',
+    r'\b(Banana Republic|Banana Republic Co)\b',
+    r'\b(Old Navy|Old Navy Co)\b',
+    r'\b(Lululemon|Lululemon Athletica|Lululemon Inc)\b',
+    r'\b(Under Armour|Under Armor|Under Armour Inc)\b',
+    r'\b(Patagonia|Patagonia Inc|Patagonia Works)\b',
+    r'\b(North Face|The North Face|VF Corporation)\b',
+    r'\b(Columbia|Columbia Sportswear|Columbia Sportswear Company)\b',
+    r'\b(Decathlon|Decathlon Sport|Decathlon Group)\b',
+    r'\b(Speedo|Speedo International|Pentland Group)\b',
+    r'\b(New Era|New Era Cap|New Era Cap Company)\b',
+    r'\b(New Balance|New Balance Athletic|New Balance Inc)\b',
+    r'\b(Converse|Converse Inc)\b',
+    r'\b(Vans|Vans Inc)\b',
+    r'\b(Timberland|Timberland Co)\b',
+    r'\b(Dr\. Martens|Dr Martens|Airwair International)\b',
+    r'\b(Clarks|Clarks Shoes|Clarks International)\b',
+    r'\b(Steve Madden|Steve Madden Ltd|Steve Madden Inc)\b',
+    r'\b(Nine West|Nine West Group|Authentic Brands Group)\b',
+    r'\b(Michael Kors|Michael Kors Holdings|Capri Holdings)\b',
+    r'\b(Kate Spade|Kate Spade & Company|Tapestry Inc)\b',
+    r'\b(Coach|Coach Inc)\b',
+    r'\b(Tory Burch|Tory Burch LLC|Tory Burch Company)\b',
+    r'\b(Longchamp|Longchamp SA|Longchamp Company)\b',
+    r'\b(Furla|Furla Spa|Furla Group)\b',
+    r'\b(Guess|Guess Inc|Guess Corporation)\b',
+    r'\b(DKNY|Donna Karan New York|G-III Apparel Group)\b',
+    r'\b(Brooks Brothers|Brooks Brothers Inc)\b',
+    r'\b(Costco|Costco Wholesale|Costco Wholesale Corporation)\b',
+    r'\b(Kohl\'s|Kohls|Kohl\'s Corporation)\b',
+    r'\b(JC Penney|J\.C\. Penney|J\.C\. Penney Company)\b',
+    r'\b(Macy\'s|Macys|Macy\'s Inc)\b',
+    r'\b(Nordstrom|Nordstrom Inc|Nordstrom Company)\b',
+    r'\b(Bloomingdale\'s|Bloomingdales|Macy\'s Inc)\b',
+    r'\b(Saks Fifth Avenue|Saks|Hudson\'s Bay Company)\b',
+    r'\b(Neiman Marcus|Neiman Marcus Group|Neiman Marcus Company)\b',
+    r'\b(Bergdorf Goodman|Bergdorf|Neiman Marcus Group)\b',
+    r'\b(Barneys New York|Barneys|Authentic Brands Group)\b',
+    r'\b(Saks Off 5th|Saks Off Fifth|Hudson\'s Bay Company)\b',
+    r'\b(Nordstrom Rack|Nordstrom Rack Inc|Nordstrom Inc)\b',
+    r'\b(TJ Maxx|TJMaxx|TJX Companies)\b',
+    r'\b(Marshalls|Marshalls Inc|TJX Companies)\b',
+    r'\b(HomeGoods|HomeGoods Inc|TJX Companies)\b',
+    r'\b(Ross|Ross Stores|Ross Stores Inc)\b',
+    r'\b(Burlington|Burlington Stores|Burlington Coat Factory)\b',
+    r'\b(Dollar General|Dollar General Corporation)\b',
+    r'\b(Family Dollar|Family Dollar Stores|Dollar Tree Inc)\b',
+    r'\b(Dollar Tree|Dollar Tree Inc)\b',
+    r'\b(Five Below|Five Below Inc)\b',
+    r'\b(Big Lots|Big Lots Inc)\b',
+    r'\b(Ollie\'s Bargain Outlet|Ollie\'s|Ollie\'s Bargain Outlet Inc)\b',
+    r'\b(Gabriel Brothers|Gabriel Brothers Inc)\b',
+    r'\b(DD\'s Discounts|DD\'s|Ross Stores Inc)\b',
+    r'\b(Sierra|Sierra Trading Post|TJX Companies)\b',
+    r'\b(HomeSense|HomeSense Inc|TJX Companies)\b',
+    r'\b(Winners|Winners Inc|TJX Companies)\b',
+    r'\b(Home Sense|HomeSense|TJX Companies)\b',
+    r'\b(TK Maxx|TKMaxx|TJX Companies)\b'
+]
+
+_WHITESPACE_RE = re.compile(WHITESPACE_PATTERN)
+_UNSAFE_CHARS_RE = re.compile(UNSAFE_CHARS_PATTERN)
+_QUANTITY_RES = [re.compile(p) for p in QUANTITY_PATTERNS]
+_PRICE_RANGE_RE = re.compile(PRICE_RANGE_PATTERN)
+_SINGLE_PRICE_RE = re.compile(SINGLE_PRICE_PATTERN)
+_DAY_RES = [re.compile(p) for p in DAY_PATTERNS]
+_WEEK_RES = [re.compile(p) for p in WEEK_PATTERNS]
+_BRAND_RES = [re.compile(p, re.IGNORECASE) for p in BRAND_PATTERNS]
+# Matches iff at least one brand pattern does: texts without a hit skip the per-brand scan
+_ANY_BRAND_RE = re.compile("|".join(f"(?:{p})" for p in BRAND_PATTERNS), re.IGNORECASE)
+
+def _blank(value: Any) -> bool:
+    return not value or pd.isna(value)
+
+def _unique(items) -> List[Any]:
+    # first-seen order, so output doesn't depend on string hash seeds
+    return list(dict.fromkeys(items))
+
+def _texts(values: List[Any], errors: Dict[int, Exception]) -> pd.Series:
+    """str(value) per row, '' for blanks; a value that can't be tested fails its row"""
+    out = []
+    for i, value in enumerate(values):
+        try:
+            out.append("" if _blank(value) else str(value))
+        except Exception as e:
+            errors.setdefault(i, e)
+            out.append("")
+    return pd.Series(out, dtype=object)
+
+def _clean(values: List[Any], errors: Dict[int, Exception]) -> pd.Series:
+    """FactoryDataNormalizer.clean_text over a column"""
+    return (_texts(values, errors).str.strip()
+            .str.replace(_WHITESPACE_RE, ' ', regex=True)
+            .str.replace(_UNSAFE_CHARS_RE, '', regex=True))
+
+def _search(texts: pd.Series, regex: re.Pattern) -> np.ndarray:
+    return texts.map(regex.search).notna().to_numpy()
+
+def _first_match(texts: pd.Series, regexes: List[re.Pattern]) -> pd.Series:
+    """Group 1 of the first regex that matches each text (NaN when none does)"""
+    found = pd.Series(np.nan, index=texts.index, dtype=object)
+    todo = texts
+    for regex in regexes:
+        if todo.empty:
+            break
+        hits = todo.str.extract(regex, expand=False).dropna()
+        found[hits.index] = hits
+        todo = todo.drop(hits.index)
+    return found
+
+def _convert(found: pd.Series, convert: Callable[[str], Any], errors: Dict[int, Exception]) -> List[Any]:
+    out = []
+    for i, value in found.items():
+        if not isinstance(value, str):
+            out.append(None)
+            continue
+        try:
+            out.append(convert(value))
+        except Exception as e:
+            errors.setdefault(i, e)
+            out.append(None)
+    return out
+
+def _quantities(texts: pd.Series, errors: Dict[int, Exception]) -> List[Optional[int]]:
+    """FactoryDataNormalizer.parse_quantity over a column"""
+    found = _first_match(texts.str.lower(), _QUANTITY_RES)
+    return _convert(found, lambda number: int(float(number.replace(',', ''))), errors)
+
+def _price_ranges(texts: pd.Series) -> List[Optional[tuple]]:
+    """FactoryDataNormalizer.parse_price_range over a column"""
+    texts = texts.str.lower()
+    ranges = texts.str.extract(_PRICE_RANGE_RE)
+    singles = texts[ranges[0].isna()].str.extract(_SINGLE_PRICE_RE, expand=False).reindex(texts.index)
+    out = []
+    for low, high, single in zip(ranges[0], ranges[1], singles):
+        if isinstance(low, str):
+            out.append((float(low), float(high)))
+        elif isinstance(single, str):
+            out.append((float(single), float(single)))
+        else:
+            out.append(None)
+    return out
+
+def _lead_times(texts: pd.Series, errors: Dict[int, Exception]) -> List[Optional[int]]:
+    """
+    FactoryDataNormalizer.parse_lead_time over a column. Only the first day and week
+    patterns are needed: the range patterns end in "<n> days", so the first one already
+    matches any text they would.
+    """
+    texts = texts.str.lower()
+    days = texts.str.extract(_DAY_RES[0], expand=False)
+    weeks = texts[days.isna()].str.extract(_WEEK_RES[0], expand=False).reindex(texts.index)
+    days, weeks = _convert(days, int, errors), _convert(weeks, lambda w: int(w) * 7, errors)
+    return [d if d is not None else w for d, w in zip(days, weeks)]
+
 class FactoryDataNormalizer:
     """Normalizes and cleans factory data from various sources"""
     
@@ -44,6 +253,14 @@ class FactoryDataNormalizer:
             'BLUESIGN': r'\b(BLUESIGN|Bluesign|blue\s+sign)\b',
             'C2C': r'\b(C2C|Cradle\s+to\s+Cradle)\b'
         }
+        
+        # Precompiled forms of the pattern tables above, plus the enum values whose alias
+        # lookup succeeds (those are also matched as plain substrings)
+        self._product_res = {k: re.compile(p) for k, p in self.product_patterns.items()}
+        self._material_res = {k: re.compile(p) for k, p in self.material_patterns.items()}
+        self._certification_res = {k: re.compile(p, re.IGNORECASE) for k, p in self.certification_patterns.items()}
+        self._product_alias_values = [t.value for t in ProductType if find_product_type(t.value)]
+        self._material_alias_values = [t.value for t in MaterialType if find_material_type(t.value)]
     
     def clean_text(self, text: str) -> str:
         """Clean and normalize text data"""
@@ -54,10 +271,10 @@ class FactoryDataNormalizer:
         text = str(text).strip()
         
         # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = _WHITESPACE_RE.sub(' ', text)
         
         # Remove special characters that might cause issues
-        text = re.sub(r'[^\w\s\-.,&()]', '', text)
+        text = _UNSAFE_CHARS_RE.sub('', text)
         
         return text
     
@@ -65,148 +282,25 @@ class FactoryDataNormalizer:
         """Extract product types from text"""
         if not text:
             return []
-        
-        text_lower = text.lower()
-        found_products = []
-        
-        for product_type, pattern in self.product_patterns.items():
-            if re.search(pattern, text_lower):
-                found_products.append(product_type)
-        
-        # Also check aliases
-        for product_type in ProductType:
-            if find_product_type(product_type.value) and product_type.value in text_lower:
-                if product_type.value not in found_products:
-                    found_products.append(product_type.value)
-        
-        return list(set(found_products))
+        return self._product_types(pd.Series([text], dtype=object))[0]
     
     def extract_materials(self, text: str) -> List[str]:
         """Extract materials from text"""
         if not text:
             return []
-        
-        text_lower = text.lower()
-        found_materials = []
-        
-        for material_type, pattern in self.material_patterns.items():
-            if re.search(pattern, text_lower):
-                found_materials.append(material_type)
-        
-        # Also check aliases
-        for material_type in MaterialType:
-            if find_material_type(material_type.value) and material_type.value in text_lower:
-                if material_type.value not in found_materials:
-                    found_materials.append(material_type.value)
-        
-        return list(set(found_materials))
+        return self._materials(pd.Series([text], dtype=object))[0]
     
     def extract_certifications(self, text: str) -> List[str]:
         """Extract certifications from text"""
         if not text:
             return []
-        
-        text_upper = text.upper()
-        found_certifications = []
-        
-        for cert_type, pattern in self.certification_patterns.items():
-            if re.search(pattern, text_upper, re.IGNORECASE):
-                found_certifications.append(cert_type)
-        
-        return list(set(found_certifications))
+        return self._certifications(pd.Series([text], dtype=object))[0]
     
     def extract_past_clients(self, text: str) -> List[str]:
         """Extract past clients/brands from text"""
         if not text:
             return []
-        
-        # Common brand patterns
-        brand_patterns = [
-            r'\b(H&M|H&M Group|Hennes & Mauritz)\b',
-            r'\b(Zara|Zara Fashion|Inditex)\b',
-            r'\b(Gap|Gap Inc|Gap Corporation)\b',
-            r'\b(Nike|Nike Inc|Nike Corporation)\b',
-            r'\b(Adidas|Adidas AG|Adidas Group)\b',
-            r'\b(Levi\'s|Levis|Levi Strauss)\b',
-            r'\b(Uniqlo|Fast Retailing|Uniqlo Co)\b',
-            r'\b(Target|Target Corporation|Target Stores)\b',
-            r'\b(Walmart|Walmart Inc|Walmart Stores)\b',
-            r'\b(Mango|Mango Fashion|Mango Group)\b',
-            r'\b(Tommy Hilfiger|Tommy Hilfiger Corporation)\b',
-            r'\b(Ralph Lauren|Ralph Lauren Corporation)\b',
-            r'\b(Calvin Klein|Calvin Klein Inc)\b',
-            r'\b(Victoria\'s Secret|Victoria Secret|L Brands)\b',
-            r'\b(American Eagle|American Eagle Outfitters|AEO)\b',
-            r'\b(Abercrombie|Abercrombie & Fitch|Abercrombie and Fitch)\b',
-            r'\b(Express|Express Inc|Express Fashion)\b',
-            r'\b(Urban Outfitters|Urban Outfitters Inc)\b',
-            r'\b(Anthropologie|Anthropologie Group)\b',
-            r'\b(J\.Crew|Jcrew|J\.Crew Group)\b',
-            r'\b(Banana Republic|Banana Republic Co)\b',
-            r'\b(Old Navy|Old Navy Co)\b',
-            r'\b(Lululemon|Lululemon Athletica|Lululemon Inc)\b',
-            r'\b(Under Armour|Under Armor|Under Armour Inc)\b',
-            r'\b(Patagonia|Patagonia Inc|Patagonia Works)\b',
-            r'\b(North Face|The North Face|VF Corporation)\b',
-            r'\b(Columbia|Columbia Sportswear|Columbia Sportswear Company)\b',
-            r'\b(Decathlon|Decathlon Sport|Decathlon Group)\b',
-            r'\b(Speedo|Speedo International|Pentland Group)\b',
-            r'\b(New Era|New Era Cap|New Era Cap Company)\b',
-            r'\b(New Balance|New Balance Athletic|New Balance Inc)\b',
-            r'\b(Converse|Converse Inc)\b',
-            r'\b(Vans|Vans Inc)\b',
-            r'\b(Timberland|Timberland Co)\b',
-            r'\b(Dr\. Martens|Dr Martens|Airwair International)\b',
-            r'\b(Clarks|Clarks Shoes|Clarks International)\b',
-            r'\b(Steve Madden|Steve Madden Ltd|Steve Madden Inc)\b',
-            r'\b(Nine West|Nine West Group|Authentic Brands Group)\b',
-            r'\b(Michael Kors|Michael Kors Holdings|Capri Holdings)\b',
-            r'\b(Kate Spade|Kate Spade & Company|Tapestry Inc)\b',
-            r'\b(Coach|Coach Inc)\b',
-            r'\b(Tory Burch|Tory Burch LLC|Tory Burch Company)\b',
-            r'\b(Longchamp|Longchamp SA|Longchamp Company)\b',
-            r'\b(Furla|Furla Spa|Furla Group)\b',
-            r'\b(Guess|Guess Inc|Guess Corporation)\b',
-            r'\b(DKNY|Donna Karan New York|G-III Apparel Group)\b',
-            r'\b(Brooks Brothers|Brooks Brothers Inc)\b',
-            r'\b(Costco|Costco Wholesale|Costco Wholesale Corporation)\b',
-            r'\b(Kohl\'s|Kohls|Kohl\'s Corporation)\b',
-            r'\b(JC Penney|J\.C\. Penney|J\.C\. Penney Company)\b',
-            r'\b(Macy\'s|Macys|Macy\'s Inc)\b',
-            r'\b(Nordstrom|Nordstrom Inc|Nordstrom Company)\b',
-            r'\b(Bloomingdale\'s|Bloomingdales|Macy\'s Inc)\b',
-            r'\b(Saks Fifth Avenue|Saks|Hudson\'s Bay Company)\b',
-            r'\b(Neiman Marcus|Neiman Marcus Group|Neiman Marcus Company)\b',
-            r'\b(Bergdorf Goodman|Bergdorf|Neiman Marcus Group)\b',
-            r'\b(Barneys New York|Barneys|Authentic Brands Group)\b',
-            r'\b(Saks Off 5th|Saks Off Fifth|Hudson\'s Bay Company)\b',
-            r'\b(Nordstrom Rack|Nordstrom Rack Inc|Nordstrom Inc)\b',
-            r'\b(TJ Maxx|TJMaxx|TJX Companies)\b',
-            r'\b(Marshalls|Marshalls Inc|TJX Companies)\b',
-            r'\b(HomeGoods|HomeGoods Inc|TJX Companies)\b',
-            r'\b(Ross|Ross Stores|Ross Stores Inc)\b',
-            r'\b(Burlington|Burlington Stores|Burlington Coat Factory)\b',
-            r'\b(Dollar General|Dollar General Corporation)\b',
-            r'\b(Family Dollar|Family Dollar Stores|Dollar Tree Inc)\b',
-            r'\b(Dollar Tree|Dollar Tree Inc)\b',
-            r'\b(Five Below|Five Below Inc)\b',
-            r'\b(Big Lots|Big Lots Inc)\b',
-            r'\b(Ollie\'s Bargain Outlet|Ollie\'s|Ollie\'s Bargain Outlet Inc)\b',
-            r'\b(Gabriel Brothers|Gabriel Brothers Inc)\b',
-            r'\b(DD\'s Discounts|DD\'s|Ross Stores Inc)\b',
-            r'\b(Sierra|Sierra Trading Post|TJX Companies)\b',
-            r'\b(HomeSense|HomeSense Inc|TJX Companies)\b',
-            r'\b(Winners|Winners Inc|TJX Companies)\b',
-            r'\b(Home Sense|HomeSense|TJX Companies)\b',
-            r'\b(TK Maxx|TKMaxx|TJX Companies)\b'
-        ]
-        
-        found_brands = []
-        for pattern in brand_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            found_brands.extend(matches)
-        
-        return list(set([brand.strip() for brand in found_brands if brand.strip()]))
+        return self._past_clients(pd.Series([text], dtype=object))[0]
     
     def parse_quantity(self, text: str) -> Optional[int]:
         """Parse quantity information from text"""
@@ -216,15 +310,8 @@ class FactoryDataNormalizer:
         text = str(text).lower()
         
         # Extract numbers followed by common quantity units
-        patterns = [
-            r'(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:pcs|pieces|units|items)',
-            r'(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:k|thousand)',
-            r'(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:m|million)',
-            r'(\d+(?:,\d+)*(?:\.\d+)?)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
+        for regex in _QUANTITY_RES:
+            match = regex.search(text)
             if match:
                 number = match.group(1).replace(',', '')
                 try:
@@ -238,160 +325,132 @@ class FactoryDataNormalizer:
         """Parse price range from text"""
         if not text or pd.isna(text):
             return None
-        
-        text = str(text).lower()
-        
-        # Extract price ranges like "$1.20 - $5.00" or "$1.20-$5.00"
-        price_pattern = r'\$?(\d+(?:\.\d+)?)\s*[-–—]\s*\$?(\d+(?:\.\d+)?)'
-        match = re.search(price_pattern, text)
-        
-        if match:
-            try:
-                min_price = float(match.group(1))
-                max_price = float(match.group(2))
-                return (min_price, max_price)
-            except ValueError:
-                pass
-        
-        # Extract single price
-        single_price_pattern = r'\$?(\d+(?:\.\d+)?)'
-        match = re.search(single_price_pattern, text)
-        
-        if match:
-            try:
-                price = float(match.group(1))
-                return (price, price)
-            except ValueError:
-                pass
-        
-        return None
+        return _price_ranges(pd.Series([str(text)], dtype=object))[0]
     
     def parse_lead_time(self, text: str) -> Optional[int]:
         """Parse lead time in days from text"""
         if not text or pd.isna(text):
             return None
-        
-        text = str(text).lower()
-        
-        # Extract days
-        day_patterns = [
-            r'(\d+)\s*days?',
-            r'(\d+)\s*-\s*(\d+)\s*days?',
-            r'(\d+)\s*to\s*(\d+)\s*days?'
-        ]
-        
-        for pattern in day_patterns:
-            match = re.search(pattern, text)
-            if match:
-                if len(match.groups()) == 1:
-                    return int(match.group(1))
-                elif len(match.groups()) == 2:
-                    # Return average of range
-                    min_days = int(match.group(1))
-                    max_days = int(match.group(2))
-                    return (min_days + max_days) // 2
-        
-        # Extract weeks and convert to days
-        week_patterns = [
-            r'(\d+)\s*weeks?',
-            r'(\d+)\s*-\s*(\d+)\s*weeks?',
-            r'(\d+)\s*to\s*(\d+)\s*weeks?'
-        ]
-        
-        for pattern in week_patterns:
-            match = re.search(pattern, text)
-            if match:
-                if len(match.groups()) == 1:
-                    return int(match.group(1)) * 7
-                elif len(match.groups()) == 2:
-                    # Return average of range
-                    min_weeks = int(match.group(1))
-                    max_weeks = int(match.group(2))
-                    avg_weeks = (min_weeks + max_weeks) // 2
-                    return avg_weeks * 7
-        
-        return None
+        errors: Dict[int, Exception] = {}
+        days = _lead_times(pd.Series([str(text)], dtype=object), errors)[0]
+        if errors:
+            raise errors[0]
+        return days
+    
+    def _term_lists(self, texts: pd.Series, regexes: Dict[str, re.Pattern], alias_values: List[str]) -> List[List[str]]:
+        found: List[List[str]] = [[] for _ in range(len(texts))]
+        for term, regex in regexes.items():
+            for i in np.flatnonzero(_search(texts, regex)):
+                found[i].append(term)
+        # Also check aliases
+        for value in alias_values:
+            for i in np.flatnonzero(texts.str.contains(value, regex=False).to_numpy()):
+                found[i].append(value)
+        return [_unique(terms) for terms in found]
+    
+    def _product_types(self, texts: pd.Series) -> List[List[str]]:
+        return self._term_lists(texts.str.lower(), self._product_res, self._product_alias_values)
+    
+    def _materials(self, texts: pd.Series) -> List[List[str]]:
+        return self._term_lists(texts.str.lower(), self._material_res, self._material_alias_values)
+    
+    def _certifications(self, texts: pd.Series) -> List[List[str]]:
+        return self._term_lists(texts.str.upper(), self._certification_res, [])
+    
+    def _past_clients(self, texts: pd.Series) -> List[List[str]]:
+        found: List[List[str]] = [[] for _ in range(len(texts))]
+        candidates = texts[_search(texts, _ANY_BRAND_RE)]
+        for regex in _BRAND_RES:
+            for i, matches in candidates.str.findall(regex).items():
+                found[i].extend(matches)
+        return [_unique(brand.strip() for brand in brands if brand.strip()) for brands in found]
     
     def normalize_factory_data(self, row: Dict[str, Any]) -> Dict[str, Any]:
         """Normalize a single factory data row"""
-        normalized = {}
+        rows, errors = self._normalize_columns({k: [v] for k, v in row.items()}, 1)
+        if errors:
+            raise errors[0]
+        return rows[0]
+    
+    def normalize_frame(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Normalize every row of `df` column by column; rows that fail are reported and skipped"""
+        # The same cell values iterrows() yields (it reads df.values, with its dtype upcasting)
+        values = df.to_numpy()
+        columns = {name: values[:, j].tolist() for j, name in enumerate(df.columns)}
+        rows, errors = self._normalize_columns(columns, len(df))
+        for i in sorted(errors):
+            print(f"Error normalizing row: {errors[i]}")
+        return [row for i, row in enumerate(rows) if i not in errors]
+    
+    def _normalize_columns(self, columns: Dict[str, List[Any]], n: int):
+        errors: Dict[int, Exception] = {}
         
-        # Basic information
-        normalized['factory_name'] = self.clean_text(row.get('Factory Name', ''))
-        normalized['country'] = self.clean_text(row.get('Country', ''))
-        normalized['city'] = self.clean_text(row.get('City', ''))
+        def raw(name: str) -> List[Any]:
+            return columns.get(name, [''] * n)
         
-        # Product specialties
-        product_text = self.clean_text(row.get('Product Specialties', ''))
-        normalized['product_specialties'] = self.extract_product_types(product_text)
+        def clean(name: str) -> pd.Series:
+            return _clean(raw(name), errors)
         
-        # Materials handled
-        materials_text = self.clean_text(row.get('Materials Handled', ''))
-        normalized['materials_handled'] = self.extract_materials(materials_text)
+        out: Dict[str, List[Any]] = {}
         
-        # Capacity and pricing
-        moq_text = self.clean_text(row.get('Minimum Order Quantity (MOQ)', ''))
-        normalized['min_order_quantity'] = self.parse_quantity(moq_text)
+        # Basic information
+        out['factory_name'] = clean('Factory Name').tolist()
+        out['country'] = clean('Country').tolist()
+        out['city'] = clean('City').tolist()
         
-        price_text = self.clean_text(row.get('Price Per Unit', ''))
-        normalized['price_per_unit'] = self.parse_price_range(price_text)
+        # Product specialties and materials handled
+        out['product_specialties'] = self._product_types(clean('Product Specialties'))
+        out['materials_handled'] = self._materials(clean('Materials Handled'))
         
-        capacity_text = self.clean_text(row.get('Max Monthly Capacity', ''))
-        normalized['max_monthly_capacity'] = self.parse_quantity(capacity_text)
+        # Capacity and pricing
+        out['min_order_quantity'] = _quantities(clean('Minimum Order Quantity (MOQ)'), errors)
+        out['price_per_unit'] = _price_ranges(clean('Price Per Unit'))
+        out['max_monthly_capacity'] = _quantities(clean('Max Monthly Capacity'), errors)
         
         # Lead times
-        standard_lead_text = self.clean_text(row.get('Standard Lead Time', ''))
-        normalized['standard_lead_time'] = self.parse_lead_time(standard_lead_text)
-        
-        peak_lead_text = self.clean_text(row.get('Peak Season Lead Time', ''))
-        normalized['peak_season_lead_time'] = self.parse_lead_time(peak_lead_text)
-        
-        sample_lead_text = self.clean_text(row.get('Sample Lead Time', ''))
-        normalized['sample_lead_time'] = self.parse_lead_time(sample_lead_text)
-        
-        # Certifications
-        cert_text = self.clean_text(row.get('Certifications', ''))
-        normalized['certifications'] = self.extract_certifications(cert_text)
-        
-        # Quality control
-        qc_text = self.clean_text(row.get('Quality Control Processes', ''))
-        normalized['quality_control_processes'] = qc_text
-        
-        # Past clients
-        clients_text = self.clean_text(row.get('Past Clients', ''))
-        normalized['past_clients'] = self.extract_past_clients(clients_text)
-        
-        # Location and logistics
-        normalized['nearest_port'] = self.clean_text(row.get('Nearest Port', ''))
-        
-        # Labor and operations
-        normalized['labor_practices'] = self.clean_text(row.get('Labor Practices', ''))
-        normalized['labor_cost'] = self.clean_text(row.get('Labor Cost', ''))
-        normalized['number_of_workers'] = self.parse_quantity(row.get('Number of Workers', ''))
-        
-        year_text = self.clean_text(row.get('Year Established', ''))
-        try:
-            normalized['year_established'] = int(year_text) if year_text and year_text.isdigit() else None
-        except ValueError:
-            normalized['year_established'] = None
+        out['standard_lead_time'] = _lead_times(clean('Standard Lead Time'), errors)
+        out['peak_season_lead_time'] = _lead_times(clean('Peak Season Lead Time'), errors)
+        out['sample_lead_time'] = _lead_times(clean('Sample Lead Time'), errors)
+        
+        # Certifications, quality control and past clients
+        out['certifications'] = self._certifications(clean('Certifications'))
+        out['quality_control_processes'] = clean('Quality Control Processes').tolist()
+        out['past_clients'] = self._past_clients(clean('Past Clients'))
+        
+        # Location, labor and operations
+        out['nearest_port'] = clean('Nearest Port').tolist()
+        out['labor_practices'] = clean('Labor Practices').tolist()
+        out['labor_cost'] = clean('Labor Cost').tolist()
+        out['number_of_workers'] = _quantities(_texts(raw('Number of Workers'), errors), errors)
+        
+        years = []
+        for year_text in clean('Year Established'):
+            try:
+                years.append(int(year_text) if year_text and year_text.isdigit() else None)
+            except ValueError:
+                years.append(None)
+        out['year_established'] = years
         
-        normalized['factory_size'] = self.clean_text(row.get('Factory Size', ''))
+        out['factory_size'] = clean('Factory Size').tolist()
         
         # Communication and customization
-        languages_text = self.clean_text(row.get('Languages Spoken', ''))
-        normalized['languages_spoken'] = [lang.strip() for lang in languages_text.split(',') if lang.strip()]
-        
-        normalized['customization_capabilities'] = self.clean_text(row.get('Customization Capabilities', ''))
-        
-        # Contact information
-        normalized['contact_name'] = self.clean_text(row.get('Contact Name', ''))
-        normalized['contact_email'] = self.clean_text(row.get('Contact Email', ''))
-        normalized['contact_phone'] = self.clean_text(row.get('Contact Phone', ''))
-        
-        # Additional information
-        normalized['notes'] = self.clean_text(row.get('Notes', ''))
-        
-        # Generate search keywords
+        out['languages_spoken'] = [[lang.strip() for lang in text.split(',') if lang.strip()]
+                                   for text in clean('Languages Spoken')]
+        out['customization_capabilities'] = clean('Customization Capabilities').tolist()
+        
+        # Contact information and notes
+        out['contact_name'] = clean('Contact Name').tolist()
+        out['contact_email'] = clean('Contact Email').tolist()
+        out['contact_phone'] = clean('Contact Phone').tolist()
+        out['notes'] = clean('Notes').tolist()
+        
+        names = list(out)
+        rows = [dict(zip(names, values)) for values in zip(*out.values())]
+        for row in rows:
+            row['search_keywords'] = self._search_keywords(row)
+        return rows, errors
+    
+    def _search_keywords(self, normalized: Dict[str, Any]) -> List[str]:
         keywords = []
         
         # Add basic info
@@ -402,35 +461,34 @@ class FactoryDataNormalizer:
         if normalized['city']:
             keywords.extend(normalized['city'].lower().split())
             
-        # Add product and material keywords
+        # Add product, material, client and certification keywords
         keywords.extend([p.lower() for p in normalized['product_specialties']])
         keywords.extend([m.lower() for m in normalized['materials_handled']])
         keywords.extend([c.lower() for c in normalized['past_clients']])
-        
-        # Add certification keywords
         keywords.extend([cert.lower() for cert in normalized['certifications']])
         
-        # Clean and deduplicate keywords
-        clean_keywords = []
-        for keyword in keywords:
-            if keyword and len(keyword) > 1:  # Skip empty and single character keywords
-                clean_keywords.append(keyword.strip())
-        
-        normalized['search_keywords'] = list(set(clean_keywords))
-        
-        return normalized
+        # Clean and deduplicate keywords (skip empty and single character keywords)
+        return _unique(keyword.strip() for keyword in keywords if keyword and len(keyword) > 1)
+
+_CHUNK_NORMALIZER: Optional[FactoryDataNormalizer] = None
+
+def _normalize_chunk(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    global _CHUNK_NORMALIZER
+    if _CHUNK_NORMALIZER is None:
+        _CHUNK_NORMALIZER = FactoryDataNormalizer()
+    return _CHUNK_NORMALIZER.normalize_frame(df)
 
-def normalize_dataset(df: pd.DataFrame) -> List[Dict[str, Any]]:
+def normalize_dataset(df: pd.DataFrame, workers: Optional[int] = None, chunk_rows: Optional[int] = None) -> List[Dict[str, Any]]:
     """Normalize entire dataset"""
-    normalizer = FactoryDataNormalizer()
-    normalized_data = []
+    chunk_rows = chunk_rows or NORMALIZE_CHUNK_ROWS
+    workers = NORMALIZE_WORKERS if workers is None else workers
+    chunks = [df.iloc[i:i + chunk_rows] for i in range(0, len(df), chunk_rows)]
     
-    for _, row in df.iterrows():
+    if workers > 1 and len(chunks) > 1:
         try:
-            normalized_row = normalizer.normalize_factory_data(row.to_dict())
-            normalized_data.append(normalized_row)
-        except Exception as e:
-            print(f"Error normalizing row: {e}")
-            continue
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+                return [row for rows in pool.map(_normalize_chunk, chunks) for row in rows]
+        except (OSError, BrokenProcessPool) as e:
+            print(f"Process pool unavailable ({e}); normalizing in-process")
     
-    return normalized_data
+    return [row for chunk in chunks for row in _normalize_chunk(chunk)]
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Factory autocomplete (AutocompleteIndex): build, top-10 lookup latency and incremental apply.
+
+    python scripts/bench_autocomplete.py            # 50000 factories
+    python scripts/bench_autocomplete.py 5000 20000
+"""
+
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from autocomplete import AutocompleteIndex
+
+LOOKUPS = 20000
+APPLY_BATCH = 100
+PRODUCTS = ["denim", "knitwear", "t-shirts", "hoodies", "dresses", "jackets", "socks", "swimwear", "uniforms"]
+MATERIALS = ["cotton", "polyester", "linen", "wool", "silk", "nylon", "spandex"]
+BRANDS = ["levis", "zara", "h&m", "uniqlo", "gap", "nike", "adidas", "primark"]
+COUNTRIES = ["Bangladesh", "Vietnam", "China", "India", "Turkey", "Cambodia", "Pakistan"]
+
+def _word(rnd):
+    return "".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(4, 9))).title()
+
+def _factories(n, seed=1):
+    rnd = random.Random(seed)
+    return [{"factory_name": f"{_word(rnd)} {_word(rnd)} {rnd.choice(['Garments', 'Textiles', 'Apparel'])} {seed}-{i}",
+             "product_specialties": rnd.sample(PRODUCTS, 2), "materials_handled": rnd.sample(MATERIALS, 2),
+             "past_clients": rnd.sample(BRANDS, rnd.randint(0, 3)), "country": rnd.choice(COUNTRIES)}
+            for i in range(n)]
+
+def main(sizes):
+    print(f"{'factories':>10} {'keys':>8} {'build s':>8} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7} {'apply ms':>9}")
+    for size in sizes:
+        factories = _factories(size)
+        t0 = time.perf_counter()
+        index = AutocompleteIndex.build(factories)
+        build = time.perf_counter() - t0
+
+        rnd = random.Random(2)
+        took = []
+        for _ in range(LOOKUPS):
+            name = rnd.choice(factories)["factory_name"].lower()
+            prefix = name[:rnd.randint(1, 4)] if rnd.random() < 0.7 else rnd.choice(PRODUCTS + BRANDS)[:2]
+            t0 = time.perf_counter()
+            index.complete(prefix)
+            took.append(time.perf_counter() - t0)
+        took.sort()
+
+        t0 = time.perf_counter()
+        index.apply(_factories(APPLY_BATCH, seed=3), rnd.sample(factories, APPLY_BATCH))
+        apply = time.perf_counter() - t0
+        print(f"{size:>10} {len(index.keys):>8} {build:>8.2f} {took[len(took) // 2] * 1000:>7.3f} "
+              f"{took[int(len(took) * 0.99)] * 1000:>7.3f} {took[-1] * 1000:>7.3f} {apply * 1000:>9.1f}")
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [50000])
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Goal-aware rerank of merged /api/factories/search candidates (goal_rerank), best of REPEAT.
+
+    python scripts/bench_goal_rerank.py            # 5000 candidates
+    python scripts/bench_goal_rerank.py 1000 20000
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sla_ai_components.algorithms.goals import GoalProfile, goal_rerank
+
+REPEAT = 20
+GOAL_COUNTS = [1, 2, 5, 10]
+
+def _goals(n):
+    kinds = [("cost", "USD", "avg_cost_benchmark"), ("time", "days", None), ("custom", "co2", None)]
+    rnd = random.Random(1)
+    return [{"id": i, "metric": kinds[i % 3][0], "unit": kinds[i % 3][1], "direction": rnd.choice(["decrease", "increase"]),
+             "target_amount": rnd.uniform(1, 10), "baseline_amount": None if i % 2 else rnd.uniform(2, 20),
+             "weight": rnd.choice([0.1, 0.3, 0.5])} for i in range(n)]
+
+def _candidates(n):
+    rnd = random.Random(2)
+    return [{"id": f"f{i}", "score": rnd.random(), "unit_cost": rnd.uniform(1, 20), "avg_cost_benchmark": 9.0,
+             "transit_days": rnd.randint(5, 60), "custom_value::co2": rnd.uniform(0, 5)} for i in range(n)]
+
+def main(sizes):
+    print(f"{'candidates':>10} {'goals':>6} {'ms':>8} {'ms/goal':>8}")
+    for size in sizes:
+        items = _candidates(size)
+        for count in GOAL_COUNTS:
+            profile = GoalProfile.from_goals(_goals(count))
+            best = float("inf")
+            for _ in range(REPEAT):
+                t0 = time.perf_counter()
+                goal_rerank(items, profile, attach=10)
+                best = min(best, time.perf_counter() - t0)
+            print(f"{size:>10} {count:>6} {best * 1000:>8.2f} {best * 1000 / count:>8.3f}")
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [5000])
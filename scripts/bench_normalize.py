@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+normalize_dataset throughput on the bundled factory CSV, scaled up.
+
+    python scripts/bench_normalize.py            # 1x and 100x, in-process and pooled
+    python scripts/bench_normalize.py 1 10 100
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ingest import FactoryDataIngest
+from normalizers import NORMALIZE_WORKERS, normalize_dataset
+
+def main(scales):
+    ingest = FactoryDataIngest()
+    base = ingest.clean_raw_data(ingest.load_csv_data("main_factory_data_only.csv"))
+    print(f"{'rows':>9} {'workers':>8} {'seconds':>9} {'rows/s':>9}")
+    for scale in scales:
+        df = pd.concat([base] * scale, ignore_index=True)
+        for workers in sorted({1, NORMALIZE_WORKERS}):
+            t0 = time.perf_counter()
+            out = normalize_dataset(df, workers=workers)
+            elapsed = time.perf_counter() - t0
+            assert len(out) == len(df)
+            print(f"{len(df):>9} {workers:>8} {elapsed:>9.2f} {len(df) / elapsed:>9.0f}")
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1, 100])
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Per-worker memory: private in-process corpus + HybridIndex vs. the shared memory-mapped one.
+
+Starts N worker processes the way uvicorn/gunicorn would (fresh interpreters), each loading
+a corpus of data/normalized_factories.json scaled to ROWS rows and running a few searches.
+"private" builds the rows and index in every worker; "shared" goes through shared_index,
+so one worker builds and the rest attach. RSS counts shared pages in full in every worker;
+PSS splits them between the processes mapping them, so the PSS sum is the real footprint.
+
+    python scripts/bench_shared_corpus.py [ROWS] [WORKERS]
+"""
+
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+QUERIES = ["denim jeans", "organic cotton t-shirts", "knitwear sweaters", "leather bags"]
+
+def _scaled(base, n):
+    rows = []
+    for i in range(n):
+        row = dict(base[i % len(base)])
+        row["factory_name"] = f"{row.get('factory_name') or ''} #{i}"
+        rows.append(row)
+    return rows
+
+def _memory_mb():
+    """(RSS, PSS) of this process in MB, from /proc/self/smaps_rollup."""
+    out = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                out[parts[0]] = int(parts[1]) / 1024
+    return out["Rss:"], out["Pss:"]
+
+def _worker(mode, src, ready, done, results):
+    os.chdir(ROOT)
+    from services.api.app.search.retrieval import HybridIndex
+    from services.api.app.search.shared_index import shared_index
+    load = lambda: json.load(open(src, encoding="utf-8"))
+    t0 = time.perf_counter()
+    if mode == "private":
+        index = HybridIndex(load())
+    else:
+        index = shared_index("bench_factories", (src, os.path.getmtime(src)), load)
+    for q in QUERIES:
+        index.search(q, 20, filters={"country": "India"} if "cotton" in q else None)
+    t_load = time.perf_counter() - t0
+    ready.wait()  # measure while every worker is holding its corpus
+    rss, pss = _memory_mb()
+    results.put((rss, pss, t_load))
+    done.wait()
+
+def run(mode, src, workers):
+    ctx = mp.get_context("spawn")
+    ready, done, results = ctx.Barrier(workers), ctx.Barrier(workers + 1), ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(mode, src, ready, done, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    stats = [results.get() for _ in procs]
+    done.wait()
+    for p in procs:
+        p.join()
+    return stats
+
+def main(rows, workers):
+    base = json.load(open(ROOT / "data/normalized_factories.json", encoding="utf-8"))
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "factories.json"
+        src.write_text(json.dumps(_scaled(base, rows)), encoding="utf-8")
+        os.environ["SHARED_INDEX_DIR"] = str(Path(tmp) / "shared_index")
+        print(f"{rows} rows, {workers} workers")
+        print(f"{'mode':>8} {'RSS/worker':>11} {'PSS/worker':>11} {'PSS total':>10} {'slowest load':>13}")
+        for mode in ("private", "shared"):
+            stats = run(mode, str(src), workers)
+            rss = sum(s[0] for s in stats) / workers
+            pss = sum(s[1] for s in stats)
+            print(f"{mode:>8} {rss:>9.0f}MB {pss / workers:>9.0f}MB {pss:>8.0f}MB {max(s[2] for s in stats):>12.2f}s")
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(args[0] if args else 20_000, args[1] if len(args) > 1 else 8)
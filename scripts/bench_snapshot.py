@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Startup / reload benchmark: normalized_factories.json vs. the Arrow snapshot.
+
+Scales data/normalized_factories.json up to each target size (names and contacts made
+unique per copy) and times json.load, the snapshot's memory-mapped open and the full
+conversion back to row dicts.
+
+    python scripts/bench_snapshot.py 8000 100000 1000000
+"""
+
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from snapshot import read_snapshot, snapshot_path, table_to_rows, write_snapshot
+
+# json.load of a 1M-row file needs several GB of RAM; above this only the snapshot is timed
+JSON_MAX_ROWS = 200_000
+
+def _scaled(base, n):
+    rows = []
+    for i in range(n):
+        row = dict(base[i % len(base)])
+        for key in ("factory_name", "contact_email", "contact_phone"):
+            row[key] = f"{row.get(key) or ''} #{i}"
+        rows.append(row)
+    return rows
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+def main(sizes):
+    base = json.load(open("data/normalized_factories.json", encoding="utf-8"))
+    print(f"{'rows':>9} {'json MB':>8} {'arrow MB':>9} {'json.load':>10} {'mmap open':>10} {'to rows':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            rows = _scaled(base, n)
+            src = Path(tmp) / f"factories_{n}.json"
+            source = None
+            if n <= JSON_MAX_ROWS:
+                with open(src, "w", encoding="utf-8") as f:
+                    json.dump(rows, f, indent=2, ensure_ascii=False)
+                source = src
+            snap = snapshot_path(src)
+            write_snapshot(rows, snap, source)
+
+            table, t_open = _timed(lambda: read_snapshot(snap, source))
+            decoded, t_rows = _timed(lambda: table_to_rows(table))
+            assert decoded == rows
+            del decoded
+
+            json_mb = json_load = "-"
+            if source is not None:
+                loaded, t_json = _timed(lambda: json.load(open(src, encoding="utf-8")))
+                assert loaded == rows
+                json_mb, json_load = f"{src.stat().st_size / 1e6:.1f}", f"{t_json:.3f}s"
+                del loaded
+            print(f"{n:>9} {json_mb:>8} {snap.stat().st_size / 1e6:>9.1f} {json_load:>10} "
+                  f"{t_open:>9.4f}s {t_rows:>8.3f}s")
+            del rows, table
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [8000, 100000, 1000000])
@@ -3,80 +3,188 @@ Search builder for factory matching and ranking
 """
 
 import time
-from typing import List, Dict, Any, Optional
+from threading import Lock
+from typing import List, Dict, Any, FrozenSet, Iterable, Iterator, Optional, Tuple
 from rapidfuzz import fuzz, process
 from schema import SearchQuery, SearchResult, SearchResponse, FactorySchema
 from aliases import find_product_type, find_material_type, find_brand, find_country, normalize_text
+from autocomplete import AutocompleteIndex
+
+INDEX_NAMES = ('by_product', 'by_material', 'by_country', 'by_certification', 'by_brand', 'by_keywords')
+
+# Replaced/deleted factories stay in posting lists as tombstones; once they pass this
+# fraction of the live factories the next generation is compacted (rebuilt from scratch)
+COMPACT_DEAD_FRACTION = 0.25
+
+class IndexGeneration:
+    """
+    One published state of the factory list and its posting lists. Never mutated once
+    published: updates build the next generation, sharing untouched posting lists and
+    tombstoning (by object id) the factories they replace or delete.
+    """
+    
+    __slots__ = ('number', 'factories', 'postings', 'dead', '_live')
+    
+    def __init__(self, number: int, factories: List[Dict[str, Any]], postings: Dict[str, Dict[str, List[Dict[str, Any]]]],
+                 dead: FrozenSet[int] = frozenset()):
+        self.number = number
+        self.factories = factories
+        self.postings = postings
+        self.dead = dead
+        self._live = None
+    
+    def lookup(self, index: str, key: str) -> List[Dict[str, Any]]:
+        """Live factories listed under `key` in `index`"""
+        postings = self.postings[index].get(key, [])
+        if not self.dead:
+            return postings
+        return [f for f in postings if id(f) not in self.dead]
+    
+    def live_postings(self) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """Posting lists without tombstones (built once per generation when needed)"""
+        if not self.dead:
+            return self.postings
+        if self._live is None:
+            live = {name: {} for name in self.postings}
+            for name, index in self.postings.items():
+                for key in index:
+                    factories = self.lookup(name, key)
+                    if factories:
+                        live[name][key] = factories
+            self._live = live
+        return self._live
 
 class FactorySearchBuilder:
     """Builds and executes factory search queries"""
     
     def __init__(self, factories_data: List[Dict[str, Any]]):
-        self.factories_data = factories_data
-        self.indexed_factories = self._build_search_index()
+        self._write_lock = Lock()
+        self._generation = IndexGeneration(0, factories_data, self._build_search_index(factories_data))
+        self._autocomplete: Optional[AutocompleteIndex] = None
+    
+    @property
+    def generation(self) -> IndexGeneration:
+        """Current generation; readers take it once and search it without locking"""
+        return self._generation
+    
+    @property
+    def factories_data(self) -> List[Dict[str, Any]]:
+        return self._generation.factories
+    
+    @property
+    def indexed_factories(self) -> Dict[str, Any]:
+        return self._generation.live_postings()
+    
+    @property
+    def autocomplete(self) -> AutocompleteIndex:
+        """Typeahead index of the live factories; built on first use, then kept current by apply_changes"""
+        index = self._autocomplete
+        if index is None:
+            with self._write_lock:
+                if self._autocomplete is None:
+                    self._autocomplete = AutocompleteIndex.build(self._generation.factories)
+                index = self._autocomplete
+        return index
     
-    def _build_search_index(self) -> Dict[str, Any]:
+    def _build_search_index(self, factories: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """Build search index for faster querying"""
-        indexed = {
-            'by_product': {},
-            'by_material': {},
-            'by_country': {},
-            'by_certification': {},
-            'by_brand': {},
-            'by_keywords': {}
-        }
-        
-        for factory in self.factories_data:
-            # Index by product types
-            for product in factory.get('product_specialties', []):
-                if product not in indexed['by_product']:
-                    indexed['by_product'][product] = []
-                indexed['by_product'][product].append(factory)
-            
-            # Index by materials
-            for material in factory.get('materials_handled', []):
-                if material not in indexed['by_material']:
-                    indexed['by_material'][material] = []
-                indexed['by_material'][material].append(factory)
-            
-            # Index by country
-            country = factory.get('country', '').lower()
-            if country:
-                if country not in indexed['by_country']:
-                    indexed['by_country'][country] = []
-                indexed['by_country'][country].append(factory)
+        indexed = {name: {} for name in INDEX_NAMES}
+        for factory in (self.factories_data if factories is None else factories):
+            for name, key in self._index_entries(factory):
+                indexed[name].setdefault(key, []).append(factory)
+        return indexed
+    
+    @staticmethod
+    def _index_entries(factory: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
+        """(index name, key) pairs a factory is listed under"""
+        # Product types, materials and country
+        for product in factory.get('product_specialties', []):
+            yield 'by_product', product
+        for material in factory.get('materials_handled', []):
+            yield 'by_material', material
+        country = factory.get('country', '').lower()
+        if country:
+            yield 'by_country', country
+        
+        # Certifications and past clients/brands
+        for cert in factory.get('certifications', []):
+            yield 'by_certification', cert
+        for client in factory.get('past_clients', []):
+            yield 'by_brand', client.lower()
+        
+        # Keywords
+        for keyword in factory.get('search_keywords', []):
+            yield 'by_keywords', keyword
+    
+    def apply_changes(self, upserts: List[Dict[str, Any]], deletes: Iterable[str] = ()) -> IndexGeneration:
+        """
+        Publish a generation where `upserts` replace the factories with the same factory_name
+        (or are appended) and names in `deletes` are dropped. Replaced factories are only
+        tombstoned and just the posting lists the upserts appear in are copied; searches
+        running meanwhile keep the generation they started on.
+        """
+        with self._write_lock:
+            current = self._generation
+            replaced = {f.get('factory_name', ''): f for f in upserts}
+            removed = set(deletes) | set(replaced)
             
-            # Index by certifications
-            for cert in factory.get('certifications', []):
-                if cert not in indexed['by_certification']:
-                    indexed['by_certification'][cert] = []
-                indexed['by_certification'][cert].append(factory)
+            # updated factories keep their place, new ones go to the end
+            factories, placed, dead, gone = [], set(), set(current.dead), []
+            for factory in current.factories:
+                name = factory.get('factory_name', '')
+                if name not in removed:
+                    factories.append(factory)
+                    continue
+                if replaced.get(name) is factory:  # re-upsert of the live record
+                    replaced.pop(name)
+                    factories.append(factory)
+                    placed.add(name)
+                    continue
+                dead.add(id(factory))
+                gone.append(factory)
+                if name in replaced and name not in placed:
+                    factories.append(replaced[name])
+                    placed.add(name)
+            factories.extend(f for name, f in replaced.items() if name not in placed)
             
-            # Index by past clients/brands
-            for client in factory.get('past_clients', []):
-                client_lower = client.lower()
-                if client_lower not in indexed['by_brand']:
-                    indexed['by_brand'][client_lower] = []
-                indexed['by_brand'][client_lower].append(factory)
+            if len(dead) > COMPACT_DEAD_FRACTION * max(len(factories), 1):
+                generation = IndexGeneration(current.number + 1, factories, self._build_search_index(factories))
+            else:
+                postings = {name: dict(index) for name, index in current.postings.items()}
+                copied = set()
+                for factory in replaced.values():
+                    for name, key in self._index_entries(factory):
+                        if (name, key) not in copied:
+                            postings[name][key] = list(postings[name].get(key, []))
+                            copied.add((name, key))
+                        postings[name][key].append(factory)
+                generation = IndexGeneration(current.number + 1, factories, postings, frozenset(dead))
             
-            # Index by keywords
-            for keyword in factory.get('search_keywords', []):
-                if keyword not in indexed['by_keywords']:
-                    indexed['by_keywords'][keyword] = []
-                indexed['by_keywords'][keyword].append(factory)
-        
-        return indexed
+            self._generation = generation
+            if self._autocomplete is not None:
+                self._autocomplete = self._autocomplete.apply(list(replaced.values()), gone)
+            return generation
+    
+    def compact(self) -> IndexGeneration:
+        """Publish a rebuilt generation without tombstones"""
+        with self._write_lock:
+            current = self._generation
+            if current.dead:
+                self._generation = IndexGeneration(current.number + 1, current.factories,
+                                                   self._build_search_index(current.factories))
+            return self._generation
     
     def search_factories(self, query: SearchQuery) -> SearchResponse:
         """Search factories based on query criteria"""
         start_time = time.time()
+        generation = self._generation
         
         # Get candidate factories
-        candidates = self._get_candidates(query)
+        candidates = self._get_candidates(query, generation)
         
         # If no specific filters, use all factories
         if not candidates:
-            candidates = self.factories_data
+            candidates = generation.factories
         
         # Score and rank candidates
         scored_results = []
@@ -106,8 +214,9 @@ class FactorySearchBuilder:
             query=query
         )
     
-    def _get_candidates(self, query: SearchQuery) -> List[Dict[str, Any]]:
+    def _get_candidates(self, query: SearchQuery, generation: Optional[IndexGeneration] = None) -> List[Dict[str, Any]]:
         """Get candidate factories based on query criteria"""
+        generation = generation or self._generation
         candidates = []
         seen_factories = set()
         
@@ -121,43 +230,44 @@ class FactorySearchBuilder:
         # Filter by product types
         if query.product_types:
             for product_type in query.product_types:
-                product_factories = self.indexed_factories['by_product'].get(product_type.value, [])
+                product_factories = generation.lookup('by_product', product_type.value)
                 add_factories(product_factories)
         
         # Filter by materials
         if query.materials:
             for material in query.materials:
-                material_factories = self.indexed_factories['by_material'].get(material.value, [])
+                material_factories = generation.lookup('by_material', material.value)
                 add_factories(material_factories)
         
         # Filter by preferred countries
         if query.preferred_countries:
             for country in query.preferred_countries:
                 country_lower = country.lower()
-                country_factories = self.indexed_factories['by_country'].get(country_lower, [])
+                country_factories = generation.lookup('by_country', country_lower)
                 add_factories(country_factories)
         
         # Filter by required certifications
         if query.required_certifications:
             for cert in query.required_certifications:
-                cert_factories = self.indexed_factories['by_certification'].get(cert.value, [])
+                cert_factories = generation.lookup('by_certification', cert.value)
                 add_factories(cert_factories)
         
         # Filter by preferred clients
         if query.preferred_clients:
             for client in query.preferred_clients:
                 client_lower = client.lower()
-                client_factories = self.indexed_factories['by_brand'].get(client_lower, [])
+                client_factories = generation.lookup('by_brand', client_lower)
                 add_factories(client_factories)
         
         # If no specific filters, use keyword search
         if not candidates:
-            candidates = self._keyword_search(query.search_text)
+            candidates = self._keyword_search(query.search_text, generation)
             
         return candidates
     
-    def _keyword_search(self, search_text: str) -> List[Dict[str, Any]]:
+    def _keyword_search(self, search_text: str, generation: Optional[IndexGeneration] = None) -> List[Dict[str, Any]]:
         """Search factories by keywords"""
+        generation = generation or self._generation
         normalized_text = normalize_text(search_text)
         search_words = normalized_text.split()
         
@@ -165,8 +275,8 @@ class FactorySearchBuilder:
         seen_factories = set()
         
         for word in search_words:
-            if word in self.indexed_factories['by_keywords']:
-                for factory in self.indexed_factories['by_keywords'][word]:
+            if word in generation.postings['by_keywords']:
+                for factory in generation.lookup('by_keywords', word):
                     factory_id = factory.get('factory_name', '')
                     if factory_id not in seen_factories:
                         candidates.append(factory)
@@ -358,20 +468,20 @@ class FactorySearchBuilder:
     def get_factories_by_country(self, country: str) -> List[Dict[str, Any]]:
         """Get all factories in a specific country"""
         country_lower = country.lower()
-        return self.indexed_factories['by_country'].get(country_lower, [])
+        return self._generation.lookup('by_country', country_lower)
     
     def get_factories_by_product(self, product: str) -> List[Dict[str, Any]]:
         """Get all factories that produce a specific product type"""
-        return self.indexed_factories['by_product'].get(product.lower(), [])
+        return self._generation.lookup('by_product', product.lower())
     
     def get_factories_by_material(self, material: str) -> List[Dict[str, Any]]:
         """Get all factories that work with a specific material"""
-        return self.indexed_factories['by_material'].get(material.lower(), [])
+        return self._generation.lookup('by_material', material.lower())
     
     def get_factories_by_certification(self, certification: str) -> List[Dict[str, Any]]:
         """Get all factories with a specific certification"""
-        return self.indexed_factories['by_certification'].get(certification.upper(), [])
+        return self._generation.lookup('by_certification', certification.upper())
     
     def get_factories_by_brand(self, brand: str) -> List[Dict[str, Any]]:
         """Get all factories that have worked with a specific brand"""
-        return self.indexed_factories['by_brand'].get(brand.lower(), [])
+        return self._generation.lookup('by_brand', brand.lower())
@@ -2,14 +2,27 @@ from __future__ import annotations
 import os, json, glob, time
 import pandas as pd
 from rapidfuzz import fuzz, process
-from typing import List, Dict, Any, Tuple, Iterable
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Iterable
+from threading import RLock
 import numpy as np
-from functools import lru_cache
 from .utils.url_utils import prefer_url
 from .search.normalize import slug, tokens, expand_product_terms
+from .search.retrieval import CHANNEL_DEPTH, index_for_rows, update_index
+from .search import scoring_pool
+from sla_ai_components.algorithms.scoring_pool import SCORING_WORKERS
+from .search.shared_index import shared_index
+from sla_ai_components.ingest.row_hashes import diff_rows, row_hash
 
-_DATAF = None
+_DATAF = None  # preloaded rows; normally the data path is read by the building worker only
 _INDEX_READY = False
+_DATA_PATH: Optional[str] = None
+# Source file stamps of the data; with it set, the corpus and its index are shared
+# read-only across workers (see shared_index) instead of built per process
+_DATA_VERSION: Optional[Tuple] = None
+# Live corpus generation: a row sequence that is replaced, never mutated, on reload or
+# incremental update, so a search keeps the generation it started with
+_CORPUS: Optional[Sequence[Dict[str, Any]]] = None
+_CORPUS_LOCK = RLock()
 _CACHE_PATH = os.getenv("INDEX_CACHE_PATH", ".cache/internal_index.parquet")
 
 # Category normalization mapping
@@ -60,8 +73,9 @@ def load_internal_data(data_path: str) -> pd.DataFrame:
     """Load supplier data from various file formats with caching support"""
     print(f"Loading supplier data from: {data_path}")
     
-    # Try to load from cache first
-    if os.path.exists(_CACHE_PATH):
+    # Try to load from cache first, unless a source file changed after it was written
+    if os.path.exists(_CACHE_PATH) and all(
+            stamp[1] <= os.path.getmtime(_CACHE_PATH) for stamp in _data_version(data_path)):
         try:
             print(f"Loading from cache: {_CACHE_PATH}")
             df = pd.read_parquet(_CACHE_PATH)
@@ -135,34 +149,95 @@ def load_internal_data(data_path: str) -> pd.DataFrame:
     
     return df
 
+def _data_version(data_path: str) -> Tuple:
+    # the parquet cache is derived from these files, so it isn't part of the version
+    if os.path.isdir(data_path):
+        paths = sorted(glob.glob(os.path.join(data_path, "**", "*"), recursive=True))
+    else:
+        paths = [data_path]
+    return tuple((p, os.path.getmtime(p), os.path.getsize(p))
+                 for p in paths if os.path.isfile(p) and os.path.abspath(p) != os.path.abspath(_CACHE_PATH))
+
 def init_index(data_path: str):
-    global _DATAF, _INDEX_READY
-    _DATAF = load_internal_data(data_path)
-    _INDEX_READY = not _DATAF.empty
+    """
+    Point the internal corpus at `data_path`. The rows are read by whichever worker builds
+    the shared index; the others attach to it. When a corpus is already live (a re-ingest),
+    only the rows whose content changed are applied to it, by supplier_key, as the next
+    index generation; searches keep running on the current one meanwhile.
+    """
+    global _DATAF, _DATA_PATH, _INDEX_READY, _CORPUS, _DATA_VERSION
+    with _CORPUS_LOCK:
+        version = ("internal", data_path, _data_version(data_path))
+        if _CORPUS is not None and version != _DATA_VERSION:
+            df = load_internal_data(data_path)
+            latest = {supplier_key(r): r for r in ([] if df.empty else df.to_dict('records'))}
+            live = {supplier_key(r): row_hash(r) for r in _CORPUS}
+            diff = diff_rows(live, {k: row_hash(r) for k, r in latest.items()})
+            if diff.inserts or diff.updates or diff.deletes:
+                apply_internal_changes([latest[k] for k in diff.inserts + diff.updates], diff.deletes)
+            print(f"Applied {len(diff.inserts)} new, {len(diff.updates)} changed and {len(diff.deletes)} "
+                  f"removed suppliers ({diff.unchanged} unchanged)")
+        _DATAF, _DATA_PATH, _DATA_VERSION = None, data_path, version
+    _INDEX_READY = internal_count() > 0
 
 def internal_count() -> int:
-    return 0 if _DATAF is None else len(_DATAF)
+    return len(get_internal_corpus())
 
 def by_country() -> Dict[str,int]:
-    if _DATAF is None or _DATAF.empty: return {}
-    return _DATAF["country"].fillna("Unknown").value_counts().to_dict()
+    counts: Dict[str,int] = {}
+    for row in get_internal_corpus():
+        cc = row.get("country")
+        if cc is None or cc != cc:  # missing or NaN
+            cc = "Unknown"
+        counts[cc] = counts.get(cc, 0) + 1
+    return dict(sorted(counts.items(), key=lambda kv: -kv[1]))
 
 def internal_health() -> Dict[str, Any]:
     """Return health status of internal index"""
-    if _DATAF is None or _DATAF.empty:
-        return {"count": 0, "by_country": {}}
+    corpus = get_internal_corpus()
     countries = {}
-    for _, row in _DATAF.iterrows():
+    for row in corpus:
         cc = (row.get("country") or "unknown").lower()
         countries[cc] = countries.get(cc, 0) + 1
-    return {"count": len(_DATAF), "by_country": countries}
+    return {"count": len(corpus), "by_country": countries}
 
-@lru_cache(maxsize=128)
-def get_internal_corpus() -> List[Dict[str, Any]]:
-    """Get the internal corpus as a list of dictionaries (cached)"""
-    if _DATAF is None or _DATAF.empty:
-        return []
-    return _DATAF.to_dict('records')
+def _records() -> List[Dict[str, Any]]:
+    """Rows of the data path; read here, only when this worker builds the index."""
+    df = _DATAF if _DATAF is not None or _DATA_PATH is None else load_internal_data(_DATA_PATH)
+    return [] if df is None or df.empty else df.to_dict('records')
+
+def get_internal_corpus() -> Sequence[Dict[str, Any]]:
+    """Get the internal corpus as a sequence of dictionaries (current generation)"""
+    global _CORPUS
+    corpus = _CORPUS
+    if corpus is not None:
+        return corpus
+    with _CORPUS_LOCK:
+        if _CORPUS is None:
+            # the shared index publishes itself for its rows, so index_for_rows won't rebuild
+            _CORPUS = _records() if _DATA_VERSION is None else \
+                shared_index("internal_index", _DATA_VERSION, _records).source
+        return _CORPUS
+
+def supplier_key(row: Dict[str, Any]) -> str:
+    """Identity of a supplier row for incremental updates: its id, else its normalized name"""
+    for k in ("id", "_id", "supplier_id"):
+        v = row.get(k)
+        if v is not None and v == v and str(v).strip():
+            return str(v).strip()
+    return "name:" + slug(str(row.get("name") or ""))
+
+def apply_internal_changes(upserts: Iterable[Dict[str, Any]] = (), deletes: Iterable[str] = ()) -> int:
+    """
+    Add/replace suppliers (matched by `supplier_key`) and delete keys from the live corpus.
+    The search index moves to its next generation incrementally and both are published
+    together; searches already running finish on the previous generation.
+    """
+    global _CORPUS
+    with _CORPUS_LOCK:
+        index = update_index("internal_index", get_internal_corpus(), list(upserts), list(deletes), supplier_key)
+        _CORPUS = index.source
+        return index.generation
 
 def data_path_info() -> Dict[str, Any]:
     """Return information about the data path and files"""
@@ -216,7 +291,8 @@ def index_meta() -> Dict[str, Any]:
         "cache_exists": cache_exists,
         "cache_info": cache_info,
         "index_ready": _INDEX_READY,
-        "data_shape": _DATAF.shape if _DATAF is not None else None
+        "data_shape": _DATAF.shape if _DATAF is not None else None,
+        "corpus_rows": internal_count(),
     }
 
 def _field_text(row: Dict[str,Any]) -> str:
@@ -269,11 +345,23 @@ def score_row(row: Dict[str,Any], q_terms: set[str], req) -> tuple[float, Dict[s
     }
     return score01*100.0, debug
 
+def _score_rows(rows: List[Dict[str, Any]], q_terms: set[str], req) -> List[tuple[float, Dict[str, Any]]]:
+    return [score_row(row, q_terms, req) for row in rows]
+
 async def recall_internal(corpus: Iterable[Dict[str,Any]], req) -> list[Dict[str,Any]]:
+    corpus = corpus if isinstance(corpus, Sequence) else list(corpus)
     q_terms = expand_product_terms(req.q or "", req.product_type)
+    # hybrid recall narrows the corpus; the weighted score_row only runs on candidates.
+    # Both run in the scoring pool, off the event loop.
+    hits = await scoring_pool.asearch(index_for_rows("internal_recall", corpus), req.q or "", CHANNEL_DEPTH,
+                                      product_type=req.product_type, prefer={"country": req.country})
+    size = max(1, -(-len(hits) // SCORING_WORKERS))
+    shards = [([h.row for h in hits[i:i + size]], q_terms, req) for i in range(0, len(hits), size)]
+    scores = [s for part in await scoring_pool.amap_shards(_score_rows, shards) for s in part] if shards else []
     out = []
-    for row in corpus:  # full scan (fast enough with RF). If huge, shard or pre-index.
-        s, dbg = score_row(row, q_terms, req)
+    for hit, (s, dbg) in zip(hits, scores):
+        row = hit.row
+        dbg["retrieval"] = round(hit.score, 4)
         row_id = row.get("id") or row.get("_id") or row.get("supplier_id")
         url = row.get("url") or row.get("website") or row.get("alibaba_url") or None
         out.append({
@@ -295,7 +383,8 @@ async def recall_internal(corpus: Iterable[Dict[str,Any]], req) -> list[Dict[str
 # Legacy compatibility functions
 def recall_internal_legacy(structured_query: Dict[str, Any], top_k: int = 200) -> List[Dict[str, Any]]:
     """Legacy function for backward compatibility - synchronous version"""
-    if _DATAF is None or _DATAF.empty:
+    corpus = get_internal_corpus()
+    if not len(corpus):
         return []
     
     # Extract query parameters
@@ -306,10 +395,10 @@ def recall_internal_legacy(structured_query: Dict[str, Any], top_k: int = 200) -
     customization = structured_query.get("customization", "any")
     quantity = structured_query.get("quantity")
     
-    # Filter by country if specified
-    df = _DATAF
-    if country and country.lower() != "any":
-        df = df[df["country"].fillna("").str.lower().eq(country.lower())]
+    # Candidates from the shared hybrid index, filtered by country if specified
+    filters = {"country": country} if country and country.lower() != "any" else None
+    hits = index_for_rows("internal_index", corpus).search(
+        q or "", max(top_k, CHANNEL_DEPTH), product_type=category or None, filters=filters)
     
     # Score candidates using simple scoring
     def score_row(row):
@@ -372,15 +461,14 @@ def recall_internal_legacy(structured_query: Dict[str, Any], top_k: int = 200) -
         )
         return score
     
-    df = df.copy()
-    df["_score"] = df.apply(score_row, axis=1)
-    df = df.sort_values("_score", ascending=False).head(top_k)
+    ranked = sorted(((score_row(h.row), h) for h in hits), key=lambda x: x[0], reverse=True)[:top_k]
     
     # Convert to normalized format
     out = []
-    for _, r in df.iterrows():
+    for score, h in ranked:
+        r = h.row
         out.append({
-            "id": r.get("id") or f"int_{_}",
+            "id": r.get("id") or f"int_{h.index}",
             "name": r.get("name"),
             "country": r.get("country"),
             "region": r.get("region"),
@@ -389,9 +477,9 @@ def recall_internal_legacy(structured_query: Dict[str, Any], top_k: int = 200) -
             "capabilities": r.get("capabilities", []),
             "min_moq": r.get("min_moq"),
             "lead_time_days": r.get("lead_time_days"),
-            "url": prefer_url(r.to_dict()),
+            "url": prefer_url(dict(r)),
             "source": "internal",
-            "score": round(score_row(r), 2),
-            "raw": r.to_dict()
+            "score": round(score, 2),
+            "raw": dict(r)
         })
-    return out
\ No newline at end of file
+    return out
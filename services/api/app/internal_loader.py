@@ -1,5 +1,7 @@
-import os, json, csv, glob
-from typing import Dict, Any, Iterable, List
+import asyncio, os, json, csv, glob
+from typing import Dict, Any, Iterable, List, Sequence, Tuple
+
+from .search.shared_index import shared_index
 
 DATA_DIR = os.getenv("SUPPLIERS_DATA", "data/suppliers")
 
@@ -31,14 +33,9 @@ def _files() -> List[str]:
         files += glob.glob(os.path.join(DATA_DIR, p))
     return files
 
-_CACHE: List[Dict[str,Any]]|None = None
-
-async def get_corpus() -> List[Dict[str,Any]]:
-    global _CACHE
-    if _CACHE is not None: return _CACHE
-    files = _files()
+def _load_all() -> List[Dict[str,Any]]:
     out=[]
-    for p in files:
+    for p in _files():
         if p.endswith(".json"):   out += _load_json(p)
         elif p.endswith(".ndjson"): out += _load_ndjson(p)
         elif p.endswith(".csv"):    out += _load_csv(p)
@@ -49,5 +46,23 @@ async def get_corpus() -> List[Dict[str,Any]]:
             if "moq" in r and isinstance(r["moq"], str) and r["moq"].isdigit():
                 r["moq"] = int(r["moq"])
         except: pass
-    _CACHE = out
-    return _CACHE
+    return out
+
+def _version() -> Tuple:
+    """Generation of the supplier files: a file added, removed or rewritten starts a new one."""
+    out=[]
+    for p in sorted(_files()):
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        out.append((p, st.st_mtime_ns, st.st_size))
+    return ("supplier_files", DATA_DIR, tuple(out))
+
+async def get_corpus() -> Sequence[Dict[str,Any]]:
+    """
+    Supplier rows of the current file generation. Built once per host and shared read-only
+    by all workers; index_for_rows on the returned rows reuses the shared index. Stats the
+    files (and may wait for or run the build) in a worker thread, off the event loop.
+    """
+    return await asyncio.to_thread(lambda: shared_index("supplier_files", _version(), _load_all).source)
@@ -1,19 +1,90 @@
 from __future__ import annotations
 import json
+import os
 import asyncio
 from typing import List, Dict, Any, Optional
 from ..core.settings import settings
 from ..web.search_providers import search_all_providers
-from ..web.fetch import fetch_multiple_urls, extract_supplier_info
-from openai import OpenAI
+from ..web.fetch import fetch_url_content, extract_supplier_info
+from openai import AsyncOpenAI
 
 # Initialize OpenAI client
 _openai_api_key = getattr(settings, 'OPENAI_API_KEY', None)
-_client = OpenAI(api_key=_openai_api_key) if _openai_api_key else None
+_client = AsyncOpenAI(api_key=_openai_api_key) if _openai_api_key else None
 
-async def call_tools_loop(system_prompt: str, user_input: Dict[str, Any], max_steps: int = 8) -> str:
+TOOL_FETCH_MAX_URLS = int(os.getenv("TOOL_FETCH_MAX_URLS", "20"))  # per web_fetch call
+TOOL_FETCH_CONCURRENCY = int(os.getenv("TOOL_FETCH_CONCURRENCY", "10"))
+
+class _ToolMemo:
+    """
+    Per-conversation memo of tool work. Entries are tasks, so the same query or URL
+    requested twice (in one step or across steps) is only searched / fetched once.
+    """
+
+    def __init__(self):
+        self.searches: Dict[tuple, asyncio.Task] = {}
+        self.pages: Dict[str, asyncio.Task] = {}
+        self.fetch_slots = asyncio.Semaphore(TOOL_FETCH_CONCURRENCY)
+
+    def search(self, query: str, max_results: int) -> asyncio.Task:
+        key = (" ".join(query.lower().split()), max_results)
+        if key not in self.searches:
+            self.searches[key] = asyncio.ensure_future(search_all_providers(query, max_results, enough=max_results))
+        return self.searches[key]
+
+    async def _fetch(self, url: str) -> Optional[str]:
+        async with self.fetch_slots:
+            return await fetch_url_content(url)
+
+    def page(self, url: str) -> asyncio.Task:
+        if url not in self.pages:
+            self.pages[url] = asyncio.ensure_future(self._fetch(url))
+        return self.pages[url]
+
+async def _run_tool(tool_call, memo: _ToolMemo) -> Dict[str, Any]:
+    function_name = tool_call.function.name
+    try:
+        function_args = json.loads(tool_call.function.arguments or "{}")
+    except ValueError:
+        function_args = {}
+
+    if function_name == "web_search":
+        # Perform web search
+        query = function_args.get("query", "")
+        max_results = function_args.get("max_results", 10)
+        search_results = await memo.search(query, max_results)
+        content = {
+            "results": search_results,
+            "count": len(search_results)
+        }
+    elif function_name == "web_fetch":
+        # Fetch and analyze URLs
+        urls = list(dict.fromkeys(function_args.get("urls", [])))[:TOOL_FETCH_MAX_URLS]
+        pages = await asyncio.gather(*(memo.page(url) for url in urls), return_exceptions=True)
+
+        # Extract supplier info from each URL
+        supplier_info = []
+        for url, page in zip(urls, pages):
+            if isinstance(page, str) and page:
+                supplier_info.append(extract_supplier_info(page, url))
+        content = {
+            "urls_analyzed": len(urls),
+            "supplier_info": supplier_info
+        }
+    else:
+        # every tool call needs an answer or the next request is rejected
+        content = {"error": f"unknown tool: {function_name}"}
+
+    return {
+        "role": "tool",
+        "tool_call_id": tool_call.id,
+        "content": json.dumps(content)
+    }
+
+async def call_tools_loop(system_prompt: str, user_input: Dict[str, Any], max_steps: int = 8, client=None) -> str:
     """Use OpenAI tool calling to search the web and extract supplier information"""
-    if not _client:
+    client = client or _client
+    if not client:
         return "[]"
     
     # Define tools for web search and content fetching
@@ -65,11 +136,12 @@ async def call_tools_loop(system_prompt: str, user_input: Dict[str, Any], max_st
         {"role": "user", "content": json.dumps(user_input)}
     ]
     
+    memo = _ToolMemo()
     step = 0
     while step < max_steps:
         try:
             # Call OpenAI with tools
-            response = _client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model=getattr(settings, 'OPENAI_MODEL', 'gpt-4o-mini'),
                 messages=messages,
                 tools=tools,
@@ -84,49 +156,8 @@ async def call_tools_loop(system_prompt: str, user_input: Dict[str, Any], max_st
             
             # Check if we need to call tools
             if message.tool_calls:
-                for tool_call in message.tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
-                    
-                    if function_name == "web_search":
-                        # Perform web search
-                        query = function_args.get("query", "")
-                        max_results = function_args.get("max_results", 10)
-                        
-                        search_results = await search_all_providers(query, max_results)
-                        
-                        # Add tool result to conversation
-                        messages.append({
-                            "role": "tool",
-                            "tool_call_id": tool_call.id,
-                            "content": json.dumps({
-                                "results": search_results,
-                                "count": len(search_results)
-                            })
-                        })
-                    
-                    elif function_name == "web_fetch":
-                        # Fetch and analyze URLs
-                        urls = function_args.get("urls", [])
-                        
-                        url_contents = await fetch_multiple_urls(urls[:5])  # Limit to 5 URLs
-                        
-                        # Extract supplier info from each URL
-                        supplier_info = []
-                        for url, content in url_contents.items():
-                            if content:
-                                info = extract_supplier_info(content, url)
-                                supplier_info.append(info)
-                        
-                        # Add tool result to conversation
-                        messages.append({
-                            "role": "tool",
-                            "tool_call_id": tool_call.id,
-                            "content": json.dumps({
-                                "urls_analyzed": len(url_contents),
-                                "supplier_info": supplier_info
-                            })
-                        })
+                # all calls of a step run concurrently; results keep the model's call order
+                messages.extend(await asyncio.gather(*(_run_tool(tc, memo) for tc in message.tool_calls)))
             else:
                 # No more tool calls, return the final response
                 return message.content or "[]"
@@ -139,7 +170,7 @@ async def call_tools_loop(system_prompt: str, user_input: Dict[str, Any], max_st
     
     # If we've exhausted steps, try to extract a final response
     try:
-        final_response = _client.chat.completions.create(
+        final_response = await client.chat.completions.create(
             model=getattr(settings, 'OPENAI_MODEL', 'gpt-4o-mini'),
             messages=messages + [{"role": "user", "content": "Based on all the search results, return a JSON array of suppliers with id, name, url, source, country, product_types, score (0-100), and reasoning."}],
             temperature=0.1
@@ -147,4 +178,4 @@ async def call_tools_loop(system_prompt: str, user_input: Dict[str, Any], max_st
         return final_response.choices[0].message.content or "[]"
     except Exception as e:
         print(f"Final response error: {e}")
-        return "[]"
\ No newline at end of file
+        return "[]"
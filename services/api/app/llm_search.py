@@ -1,13 +1,27 @@
 # -*- coding: utf-8 -*-
-from typing import List, Dict, Any, Optional
-import os, json, re, time
+from typing import List, Dict, Any, Optional, Tuple
+from threading import Lock
+import asyncio, os, json, re, time
 from pydantic import BaseModel, Field, ValidationError
 from openai import OpenAI
 from .internal_loader import get_corpus
 from .search.normalize import expand_product_terms, tokens
+from .search.retrieval import field_value, index_for_rows
+from sla_ai_components.ai.llm_cache import cache_site, deterministic_temperature, sampling_params
 
 OPENAI_MODEL = os.getenv("OPENAI_MODEL_SEARCH", "gpt-5")  # fallback handled below
-MAX_INTERNAL_ROWS = int(os.getenv("LLM_INTERNAL_ROWS", "250"))  # snapshot size
+MAX_INTERNAL_ROWS = int(os.getenv("LLM_INTERNAL_ROWS", "250"))  # recall depth before the token budget
+SNAPSHOT_TOKEN_BUDGET = int(os.getenv("LLM_SNAPSHOT_TOKENS", "6000"))  # prompt tokens spent on the snapshot
+# Snapshot projection: column -> max chars per value (list columns are dictionary-encoded per item).
+# Rows are identified by a short ref (r0, r1 ...) instead of their id / url, which are
+# restored from the snapshot rows afterwards, so identifying fields are never truncated
+SNAPSHOT_COLUMNS = {"name": 60, "country": 24, "product_types": 40, "materials": 40,
+                    "capabilities": 60, "moq": 12}
+SNAPSHOT_DICT_COLUMNS = {"country": "c", "product_types": "p", "materials": "m"}
+_ORCHESTRATED_SEARCH_CACHE = cache_site("orchestrated_search", ttl_s=6 * 3600)
+
+class _NonJSONResponse(ValueError):
+    pass
 
 class LLMVendor(BaseModel):
     id: Optional[str] = None
@@ -39,38 +53,85 @@ def _build_query_string(q: Optional[str], country: Optional[str], product_type:
 def _compact_row(r: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "id": r.get("id") or r.get("supplier_id") or r.get("_id"),
-        "name": r.get("name") or r.get("company") or r.get("title"),
-        "country": r.get("country"),
-        "product_types": r.get("product_types") or r.get("category") or r.get("categories"),
-        "materials": r.get("materials"),
-        "capabilities": r.get("capabilities"),
+        "name": field_value(r, "name"),
+        "country": field_value(r, "country"),
+        "product_types": field_value(r, "products"),
+        "materials": field_value(r, "materials"),
+        "capabilities": r.get("capabilities") or r.get("customization_capabilities"),
         "tags": r.get("tags"),
-        "moq": r.get("moq"),
+        "moq": r.get("moq") or r.get("min_order_quantity"),
         "url": r.get("website") or r.get("url") or r.get("alibaba_url"),
         "_raw": r,
     }
 
 def _slice_internal(corpus: List[Dict[str, Any]], q: str, product_type: Optional[str], country: Optional[str]) -> List[Dict[str, Any]]:
-    """Very light prefilter so we don't send the whole corpus to the model."""
-    q_terms = set(tokens(q))
-    if product_type:
-        q_terms |= set(tokens(product_type))
-    out = []
-    for r in corpus:
-        blob = " ".join(filter(None, [
-            str(r.get("name","")), str(r.get("description","")), str(r.get("materials","")),
-            str(r.get("product_types","")), str(r.get("tags","")), str(r.get("capabilities",""))
-        ])).lower()
-        # cheap checks
-        hits = sum(1 for t in q_terms if t in blob)
-        if country:
-            rc = (r.get("country") or "").lower()
-            if country.lower() != rc and hits == 0:
-                continue
-        if hits > 0 or (product_type and (product_type.lower() in blob)):
-            out.append(_compact_row(r))
-    # cap snapshot
-    return out[:MAX_INTERNAL_ROWS] if len(out) > MAX_INTERNAL_ROWS else out
+    """Hybrid-recall prefilter (country matches first) so we don't send the whole corpus to the model."""
+    hits = index_for_rows("supplier_files", corpus).search(
+        q, MAX_INTERNAL_ROWS, product_type=product_type, prefer={"country": country})
+    return [_compact_row(h.row) for h in hits]
+
+def _cell(v: Any, limit: int) -> str:
+    s = ", ".join(map(str, v)) if isinstance(v, (list, tuple)) else ("" if v is None else str(v))
+    s = re.sub(r"[\s|]+", " ", s).strip()
+    if s.lower() in ("nan", "none"):
+        return ""
+    return s if len(s) <= limit else s[:limit - 1] + "…"
+
+def _items(v: Any) -> List[str]:
+    parts = v if isinstance(v, (list, tuple)) else re.split(r"[;,/]", "" if v is None else str(v))
+    return [p for p in (str(x).strip().lower() for x in parts) if p and p not in ("nan", "none")]
+
+def _estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+def _snapshot_table(rows: List[Dict[str, Any]], budget_tokens: int = SNAPSHOT_TOKEN_BUDGET) -> Tuple[str, int]:
+    """
+    Pipe-separated snapshot of the best-ranked rows that fit `budget_tokens`, row i under
+    ref "r<i>". Fields are projected and truncated; country / product type / material
+    values repeat across suppliers, so they are dictionary-encoded (c0, p3, m1 ...) with
+    the legend up front. Returns (text, rows included).
+    """
+    codes: Dict[str, Dict[str, str]] = {col: {} for col in SNAPSHOT_DICT_COLUMNS}
+    header = "|".join(["ref", *SNAPSHOT_COLUMNS])
+    lines: List[str] = []
+    used = _estimate_tokens(header) + 8
+    for r in rows:
+        new_codes: Dict[str, Dict[str, str]] = {col: {} for col in SNAPSHOT_DICT_COLUMNS}
+        cells = [f"r{len(lines)}"]
+        for col, limit in SNAPSHOT_COLUMNS.items():
+            if col in SNAPSHOT_DICT_COLUMNS:
+                refs = []
+                for item in _items(r.get(col))[:6]:
+                    item = _cell(item, limit)
+                    code = codes[col].get(item) or new_codes[col].get(item)
+                    if code is None:
+                        code = new_codes[col][item] = f"{SNAPSHOT_DICT_COLUMNS[col]}{len(codes[col]) + len(new_codes[col])}"
+                    refs.append(code)
+                cells.append(",".join(refs))
+            else:
+                cells.append(_cell(r.get(col), limit))
+        line = "|".join(cells)
+        cost = _estimate_tokens(line) + sum(_estimate_tokens(f"{c}={v};") for d in new_codes.values() for v, c in d.items())
+        if used + cost > budget_tokens:
+            break
+        used += cost
+        lines.append(line)
+        for col, d in new_codes.items():
+            codes[col].update(d)
+    legend = [f"{col}: " + "; ".join(f"{c}={v}" for v, c in d.items()) for col, d in codes.items() if d]
+    return "\n".join(["DICT"] + legend + ["ROWS", header] + lines), len(lines)
+
+def _restore_refs(items: List[LLMVendor], rows: List[Dict[str, Any]]) -> None:
+    """Replace the id / url / name the model echoed for snapshot ref "r<i>" with rows[i]'s own."""
+    for it in items:
+        m = re.fullmatch(r"r(\d+)", (it.id or "").strip())
+        if it.source != "internal" or m is None or int(m.group(1)) >= len(rows):
+            continue
+        r = rows[int(m.group(1))]
+        rid = r.get("id")
+        it.id = None if rid is None else str(rid)
+        it.url = r.get("url") or None
+        it.name = str(r.get("name") or it.name)
 
 def _system_prompt() -> str:
     return (
@@ -81,14 +142,45 @@ def _system_prompt() -> str:
         "Mark source='internal' for all results since they come from the internal snapshot.\n"
         "For each item include a short rationale explaining the match.\n"
         "If info is ambiguous, be conservative and lower the score.\n"
-        "Return JSON with items array containing: id, name, url, country, product_type, moq, score, source, rationale."
+        "INTERNAL_SNAPSHOT is a pipe-separated table (header after ROWS, best recall first); codes such as c0, p3, m1 "
+        "in country / product_types / materials refer to the DICT legend above it.\n"
+        "Return JSON with items array containing: id (the row's ref, e.g. r4), name, country, product_type, moq, "
+        "score, source, rationale."
     )
 
-def _user_prompt(query_string: str, snapshot: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def _user_prompt(query_string: str, snapshot_table: str) -> List[Dict[str, Any]]:
     return [
-        {"role": "user", "content": f"USER_QUERY: {query_string}\n\nINTERNAL_SNAPSHOT: {json.dumps(snapshot, ensure_ascii=False)}\n\nProvide up to 10 best matches from the snapshot."}
+        {"role": "user", "content": f"USER_QUERY: {query_string}\n\nINTERNAL_SNAPSHOT:\n{snapshot_table}\n\nProvide up to 10 best matches from the snapshot."}
     ]
 
+_CLIENTS: Dict[str, OpenAI] = {}
+_MODEL_CHECKS: Dict[str, str] = {}  # requested model -> model to use, for the life of the process
+_MODEL_LOCK = Lock()
+
+def _openai_client(api_key: str) -> OpenAI:
+    with _MODEL_LOCK:
+        client = _CLIENTS.get(api_key)
+        if client is None:
+            client = _CLIENTS[api_key] = OpenAI(api_key=api_key)
+        return client
+
+def _resolve_model(client, model: str, fallback: str = "gpt-4o-mini") -> str:
+    """`model` if the account can use it, else `fallback`; only definitive answers are remembered."""
+    with _MODEL_LOCK:
+        known = _MODEL_CHECKS.get(model)
+    if known is not None:
+        return known
+    try:
+        client.models.retrieve(model)
+        resolved = model
+    except Exception as e:
+        if getattr(e, "status_code", None) not in (400, 401, 403, 404):
+            return fallback  # transient (network, 5xx): check again next time
+        resolved = fallback
+    with _MODEL_LOCK:
+        _MODEL_CHECKS[model] = resolved
+    return resolved
+
 def _web_tools():
     """
     Try to enable OpenAI web search tool if available in this account.
@@ -172,28 +264,48 @@ async def llm_orchestrated_search(req: Dict[str, Any]) -> LLMSearchResponse:
         )
 
     # OpenAI path
-    client = OpenAI(api_key=openai_key)
-    model = OPENAI_MODEL
-    # simple fallback
-    try:
-        client.models.retrieve(model)
-    except Exception:
-        model = "gpt-4o-mini"
+    client = _openai_client(openai_key)
+    model = await asyncio.to_thread(_resolve_model, client, OPENAI_MODEL)
 
-    messages = [{"role": "system", "content": _system_prompt()}] + _user_prompt(query_string, snapshot)
+    snapshot_table, snapshot_rows = _snapshot_table(snapshot)
+    messages = [{"role": "system", "content": _system_prompt()}] + _user_prompt(query_string, snapshot_table)
 
     # Ask for strict JSON:
-    response = None
     tools = _web_tools()
+    temperature = deterministic_temperature(model)
+
+    async def _complete() -> Dict[str, Any]:
+        try:
+            # Simplified approach - use chat completions instead of responses
+            response = await asyncio.to_thread(
+                client.chat.completions.create,
+                model=model,
+                messages=messages,
+                tools=tools,             # if unsupported, server will ignore
+                response_format={"type": "json_object"},
+                **sampling_params(temperature)
+            )
+            return json.loads(response.choices[0].message.content)
+        except Exception as e:
+            if "quota" in str(e).lower() or "429" in str(e):
+                raise
+            # fallback: no tools / plain JSON
+            response = await asyncio.to_thread(
+                client.chat.completions.create,
+                model=model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                **sampling_params(temperature)
+            )
+            try:
+                return json.loads(response.choices[0].message.content)
+            except Exception:
+                raise _NonJSONResponse("model returned non-JSON")  # never cached
+
     try:
-        # Simplified approach - use chat completions instead of responses
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            tools=tools,             # if unsupported, server will ignore
-            response_format={"type": "json_object"}
-        )
-        raw = json.loads(response.choices[0].message.content)
+        raw = await _ORCHESTRATED_SEARCH_CACHE.acall(_complete, model=model, prompt=messages, tools=tools, temperature=temperature)
+    except _NonJSONResponse:
+        raw = {"items":[],"meta":{"note":"model returned non-JSON"}}
     except Exception as e:
         error_msg = str(e)
         if "quota" in error_msg.lower() or "429" in error_msg:
@@ -251,17 +363,7 @@ async def llm_orchestrated_search(req: Dict[str, Any]) -> LLMSearchResponse:
                     "note": "OpenAI quota exceeded, using fallback scoring"
                 }
             )
-        else:
-            # fallback: no tools / plain JSON
-            response = client.chat.completions.create(
-                model=model, 
-                messages=messages,
-                response_format={"type": "json_object"}
-            )
-            try:
-                raw = json.loads(response.choices[0].message.content)
-            except Exception:
-                raw = {"items":[],"meta":{"note":"model returned non-JSON"}}
+        raise
 
     # Validate & repair once
     try:
@@ -272,27 +374,21 @@ async def llm_orchestrated_search(req: Dict[str, Any]) -> LLMSearchResponse:
             {"role":"system","content":"You returned invalid JSON. Repair to EXACTLY the JSON schema used before."},
             {"role":"user","content":json.dumps(raw, ensure_ascii=False)}
         ]
-        rep = client.chat.completions.create(model=model, messages=repair_prompt,
+        rep = await asyncio.to_thread(client.chat.completions.create, model=model, messages=repair_prompt,
                                       response_format={"type":"json_object"})
         raw2 = json.loads(rep.choices[0].message.content)
         parsed = LLMSearchResponse(**raw2)
 
-    # normalize URLs: if source internal and url missing, try to fetch from snapshot map
-    urlmap = {}
-    for r in snapshot:
-        rid = str(r.get("id") or "")
-        if rid:
-            urlmap[rid] = r.get("url")
-    for it in parsed.items:
-        if it.source == "internal" and (not it.url) and it.id and it.id in urlmap:
-            it.url = urlmap[it.id]
+    _restore_refs(parsed.items, snapshot[:snapshot_rows])
 
     # meta attachments
     meta = parsed.meta or {}
     meta.update({
         "openai_model": model,
         "openai_web": True,    # we attempted tools; actual search depends on account feature
-        "snapshot_size": len(snapshot)
+        "snapshot_size": len(snapshot),
+        "snapshot_rows": snapshot_rows,
+        "snapshot_tokens_est": _estimate_tokens(snapshot_table),
     })
     parsed.meta = meta
     return parsed
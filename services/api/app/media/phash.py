@@ -0,0 +1,94 @@
+from __future__ import annotations
+from threading import Lock
+from typing import List, Optional, Tuple
+import json
+import os
+
+import numpy as np
+from PIL import Image
+
+# Perceptual hashes (64-bit dHash + pHash) and a Hamming-distance index over them, so a
+# re-encoded, resized or lightly edited copy of an image finds the earlier result.
+
+def dhash(img: Image.Image) -> int:
+    """Difference hash: sign of horizontal gradients on a 9x8 grayscale thumbnail."""
+    g = np.asarray(img.convert("L").resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    return _pack(g[:, 1:] > g[:, :-1])
+
+_DCT32 = np.cos(np.pi * (2 * np.arange(32)[None, :] + 1) * np.arange(32)[:, None] / 64)
+
+def phash(img: Image.Image) -> int:
+    """DCT hash: low-frequency 8x8 DCT coefficients of a 32x32 thumbnail vs. their median."""
+    g = np.asarray(img.convert("L").resize((32, 32), Image.LANCZOS), dtype=np.float64)
+    low = (_DCT32 @ g @ _DCT32.T)[:8, :8].ravel()
+    return _pack(low > np.median(low[1:]))
+
+def _pack(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel().astype(np.uint8)).tobytes(), "big")
+
+def _popcount(x: np.ndarray) -> np.ndarray:
+    return np.unpackbits(x.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+class PerceptualIndex:
+    """
+    Append-only (key, dhash, phash) table persisted as JSON lines. A lookup is a vectorized
+    XOR + popcount over all entries; both hashes must be within their distance thresholds.
+    """
+
+    def __init__(self, path: str, max_dhash: int = 6, max_phash: int = 10):
+        self.path = path
+        self.max_dhash = max_dhash
+        self.max_phash = max_phash
+        self._keys: List[str] = []
+        self._hashes = np.zeros((0, 2), dtype=np.uint64)
+        self._loaded = False
+        self._lock = Lock()
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        rows = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        k, d, p = json.loads(line)
+                        rows.append((k, int(d, 16), int(p, 16)))
+                    except (ValueError, TypeError):
+                        continue
+        except OSError:
+            pass
+        self._keys = [r[0] for r in rows]
+        self._hashes = np.array([r[1:] for r in rows], dtype=np.uint64).reshape(-1, 2)
+        self._loaded = True
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self._keys)
+
+    def nearest(self, d: int, p: int) -> Optional[Tuple[str, int]]:
+        """(key, combined distance) of the closest entry within both thresholds, else None."""
+        with self._lock:
+            self._load()
+            if not self._keys:
+                return None
+            q = np.array([d, p], dtype=np.uint64)
+            dist = _popcount(self._hashes[:, 0] ^ q[0]), _popcount(self._hashes[:, 1] ^ q[1])
+        ok = np.flatnonzero((dist[0] <= self.max_dhash) & (dist[1] <= self.max_phash))
+        if not len(ok):
+            return None
+        best = ok[np.argmin(dist[0][ok] + dist[1][ok])]
+        return self._keys[best], int(dist[0][best] + dist[1][best])
+
+    def add(self, key: str, d: int, p: int) -> None:
+        with self._lock:
+            self._load()
+            self._keys.append(key)
+            self._hashes = np.vstack([self._hashes, np.array([[d, p]], dtype=np.uint64)])
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps([key, f"{d:016x}", f"{p:016x}"]) + "\n")
+            except OSError:
+                pass
@@ -1,13 +1,28 @@
 from __future__ import annotations
-import hashlib, os, json, time
-from typing import Dict, Any
+import asyncio, base64, hashlib, os, json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, List
 from PIL import Image
 from io import BytesIO
 from ..llm.openai_client import respond, output_text
 from ..core.settings import settings
+from ..utils.deadline import remaining
+from ..utils.singleflight import singleflight
+from .phash import PerceptualIndex, dhash, phash
 
 CACHE_DIR = os.getenv("VISION_CACHE_DIR", ".cache/vision")
+THUMB_DIR = os.getenv("VISION_THUMB_DIR", ".cache/vision_thumbs")
 os.makedirs(CACHE_DIR, exist_ok=True)
+os.makedirs(THUMB_DIR, exist_ok=True)
+
+# Decoding / hashing / resizing is CPU work; it runs here instead of on the event loop
+_IMAGE_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("VISION_IMAGE_WORKERS", "4")), thread_name_prefix="vision")
+VISION_CONCURRENCY = int(os.getenv("VISION_CONCURRENCY", "4"))  # model calls per multi-image request
+_INDEX = PerceptualIndex(os.path.join(CACHE_DIR, "phash_index.jsonl"),
+                         max_dhash=int(os.getenv("VISION_MAX_DHASH", "6")),
+                         max_phash=int(os.getenv("VISION_MAX_PHASH", "10")))
+_VISION_FLIGHT = singleflight("vision")
 
 def _sha1(b: bytes) -> str:
     return hashlib.sha1(b).hexdigest()
@@ -32,8 +47,8 @@ PROMPT = ("You see a product photo related to manufacturing. "
           "Return JSON with keys: productName, category, materials[], processes[]. "
           "Be brief and specific (e.g., 'cotton knit sweater', category 'knitwear').")
 
-def downscale_jpeg(data: bytes, max_px=1024, quality=80) -> bytes:
-    img = Image.open(BytesIO(data)).convert("RGB")
+def _downscale(img: Image.Image, max_px=1024, quality=80) -> bytes:
+    img = img.convert("RGB")
     w, h = img.size
     scale = min(1.0, max_px/max(w,h))
     if scale < 1.0:
@@ -42,22 +57,70 @@ def downscale_jpeg(data: bytes, max_px=1024, quality=80) -> bytes:
     img.save(out, format="JPEG", optimize=True, quality=quality)
     return out.getvalue()
 
-async def extract_needs_from_image(data: bytes) -> dict:
+def downscale_jpeg(data: bytes, max_px=1024, quality=80) -> bytes:
+    return _downscale(Image.open(BytesIO(data)), max_px, quality)
+
+def thumbnail_path(key: str, max_px: int = 1024) -> str:
+    return os.path.join(THUMB_DIR, f"{key}_{max_px}.jpg")
+
+def cached_thumbnail(data: bytes, key: str|None = None, max_px: int = 1024) -> bytes:
+    """Downscaled JPEG of `data`, kept in THUMB_DIR; the source image is never modified."""
+    path = thumbnail_path(key or _sha1(data), max_px)
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        pass
+    thumb = downscale_jpeg(data, max_px)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(thumb)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return thumb
+
+@dataclass
+class _Prepared:
+    key: str
+    dhash: int
+    phash: int
+
+def _prepare(data: bytes) -> _Prepared:
     key = _sha1(data)
-    cached = _load_cache(key)
+    img = Image.open(BytesIO(data))
+    img.draft("RGB", (256, 256))  # JPEG: decode at reduced scale, plenty for 32px hashes
+    return _Prepared(key, dhash(img), phash(img))
+
+async def _run_in_pool(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_IMAGE_POOL, fn, *args)
+
+def _lookup(prep: _Prepared) -> dict|None:
+    cached = _load_cache(prep.key)
+    if cached:
+        return cached
+    near = _INDEX.nearest(prep.dhash, prep.phash)
+    return _load_cache(near[0]) if near else None
+
+async def extract_needs_from_image(data: bytes) -> dict:
+    prep = await _run_in_pool(_prepare, data)
+    cached = await _run_in_pool(_lookup, prep)
     if cached:
         return cached
+    # the same picture twice in one upload (or across concurrent requests) costs one call
+    return await _VISION_FLIGHT.do(prep.key, lambda: _extract(data, prep))
 
-    img = downscale_jpeg(data)
+async def _extract(data: bytes, prep: _Prepared) -> dict:
+    img = await _run_in_pool(cached_thumbnail, data, prep.key)
 
     # simple retry/backoff for 429
     delay = 1.5
     for attempt in range(4):
         try:
             # Convert to base64 for OpenAI vision
-            import base64
             img_b64 = base64.b64encode(img).decode('utf-8')
-            
+
             resp = await respond(settings.OPENAI_MODEL, [
                 {
                     "role": "user",
@@ -72,22 +135,36 @@ async def extract_needs_from_image(data: bytes) -> dict:
                     ]
                 }
             ])
-            
+
             text_output = output_text(resp)
             data = {}
             try:
                 data = json.loads(text_output)
             except Exception:
                 pass
-            
+
             if data:
-                _save_cache(key, data)
+                _save_cache(prep.key, data)
+                _INDEX.add(prep.key, prep.dhash, prep.phash)
             return data or {}
         except Exception as e:
             msg = str(e)
-            if "rate limit" in msg.lower() or "429" in msg:
-                time.sleep(delay)
-                delay *= 2
-                continue
-            return {"_error": msg}
+            if not ("rate limit" in msg.lower() or "429" in msg):
+                return {"_error": msg}
+            left = remaining()
+            if left is not None and left <= delay:
+                break  # backing off would overrun the request deadline
+            await asyncio.sleep(delay)
+            delay *= 2
     return {"_error":"vision_rate_limited"}
+
+async def extract_needs_from_images(images: List[bytes]) -> List[dict]:
+    """Per-image needs for a multi-image upload, VISION_CONCURRENCY model calls at a time."""
+    slots = asyncio.Semaphore(VISION_CONCURRENCY)
+    async def one(data: bytes) -> dict:
+        async with slots:
+            try:
+                return await extract_needs_from_image(data)
+            except Exception as e:  # undecodable image
+                return {"_error": str(e)}
+    return await asyncio.gather(*(one(d) for d in images))
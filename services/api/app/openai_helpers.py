@@ -1,7 +1,10 @@
 from __future__ import annotations
-import json, time, os
+import asyncio, json, time, os
 from typing import Optional, List, Dict, Any
 from .llm.openai_client import respond, output_text
+from sla_ai_components.ai.llm_cache import cache_site, deterministic_temperature, sampling_params
+from .utils.singleflight import request_fingerprint, singleflight
+from .utils.deadline import remaining, within_deadline
 from .core.settings import settings
 
 def normalize_url(url: str) -> str:
@@ -22,13 +25,19 @@ async def retry_openai(fn, max_attempts: int = 3, base_delay: float = 1.0):
             return await fn()
         except Exception as e:
             if "rate limit" in str(e).lower() or "429" in str(e):
-                if attempt < max_attempts - 1:
-                    delay = base_delay * (2 ** attempt)
-                    time.sleep(delay)
+                delay = base_delay * (2 ** attempt)
+                left = remaining()
+                # back off without blocking the loop, and never past the request deadline
+                if attempt < max_attempts - 1 and (left is None or left > delay):
+                    await asyncio.sleep(delay)
                     continue
             raise e
     return None
 
+_STRUCTURED_QUERY_CACHE = cache_site("structured_query", ttl_s=7 * 24 * 3600)
+_STRUCTURED_QUERY_FLIGHT = singleflight("structured_query")
+_WEB_VENDORS_FLIGHT = singleflight("web_collect_vendors")
+
 async def llm_structured_query(q: str, image_bytes: Optional[bytes] = None, filename: Optional[str] = None) -> Dict[str, Any]:
     """Extract structured query from text and optional image"""
     
@@ -60,43 +69,41 @@ Be specific and accurate. Infer materials and processes from product types."""
             }
         ]
     
-    try:
-        async def _call():
-            return await respond(settings.OPENAI_MODEL, [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_content}
-            ])
-        
+    model = settings.OPENAI_MODEL
+    temperature = deterministic_temperature(model)
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_content}
+    ]
+    
+    async def _call():
+        return await respond(model, messages, **sampling_params(temperature))
+    
+    async def _extract():
         resp = await retry_openai(_call)
-        text_output = output_text(resp)
-        
-        try:
-            data = json.loads(text_output)
+        return json.loads(output_text(resp))  # non-JSON raises and is never cached
+    
+    try:
+        # identical concurrent queries share one cache lookup / model call
+        data = await within_deadline("needs", _STRUCTURED_QUERY_FLIGHT.do(
+            request_fingerprint(model, q, image_bytes),
+            lambda: _STRUCTURED_QUERY_CACHE.acall(_extract, model=model, prompt=messages, temperature=temperature),
+        ), None)
+        if data is not None:
             return data
-        except Exception:
-            # Fallback to basic structure
-            return {
-                "product_title": q,
-                "category": "general",
-                "materials": [],
-                "country": None,
-                "quantity": None,
-                "customization": "any",
-                "query_terms": [q],
-                "image_summary": None
-            }
     except Exception as e:
         print(f"LLM structured query error: {e}")
-        return {
-            "product_title": q,
-            "category": "general", 
-            "materials": [],
-            "country": None,
-            "quantity": None,
-            "customization": "any",
-            "query_terms": [q],
-            "image_summary": None
-        }
+    # Fallback to basic structure
+    return {
+        "product_title": q,
+        "category": "general",
+        "materials": [],
+        "country": None,
+        "quantity": None,
+        "customization": "any",
+        "query_terms": [q],
+        "image_summary": None
+    }
 
 async def web_collect_vendors(structured_query: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Collect vendors from web using OpenAI web search"""
@@ -104,7 +111,12 @@ async def web_collect_vendors(structured_query: Dict[str, Any]) -> List[Dict[str
     # Check if web search is enabled
     if not os.getenv("OPENAI_USE_WEB", "0") == "1":
         return []
-    
+    return await within_deadline("web_recall", _WEB_VENDORS_FLIGHT.do(
+        request_fingerprint(settings.OPENAI_MODEL, structured_query),
+        lambda: _collect_web_vendors(structured_query),
+    ), [])
+
+async def _collect_web_vendors(structured_query: Dict[str, Any]) -> List[Dict[str, Any]]:
     try:
         system_prompt = """You are a sourcing assistant. Use web search to find real manufacturers and suppliers.
 
@@ -1,9 +1,32 @@
+import asyncio
+import hashlib
+import json
+import os
+import statistics
+import time
+from typing import Any, Dict, List
 from ..llm.openai_client import respond, output_text
+from sla_ai_components.ai.llm_cache import deterministic_temperature, get_llm_cache, is_deterministic, sampling_params
 from ..core.settings import settings
+from ..utils.deadline import within_deadline
+from ..utils.singleflight import request_fingerprint
 
-async def rerank_with_llm(query: str, candidates: list[dict], quantity: int | None, customization: bool | None, top_k: int = 200):
-    # Build a compact prompt with JSON-safe candidates (cap length upstream as needed)
-    sys = "You are a sourcing ranking assistant. Score 0-100. Higher is better. Return JSON with id, score, reasons."
+# Candidates are scored in small striped chunks (chunk i gets ranks i, i+n, i+2n, ...) so
+# every chunk sees a similar quality mix; per-chunk scores are then z-calibrated onto the
+# pooled distribution. Calibrated scores are cached per (query fingerprint, candidate id).
+RERANK_CHUNK_SIZE = int(os.getenv("RERANK_CHUNK_SIZE", "20"))
+RERANK_CONCURRENCY = int(os.getenv("RERANK_CONCURRENCY", "4"))
+RERANK_CACHE_TTL_S = float(os.getenv("RERANK_CACHE_TTL_S", str(24 * 3600)))
+
+SYS = "You are a sourcing ranking assistant. Score 0-100. Higher is better. Return JSON with id, score, reasons."
+
+def _cid(c: Dict[str, Any]) -> str:
+    return str(c.get("id") or c.get("url") or c.get("name") or "")
+
+def _score_key(query_fp: str, cid: str) -> str:
+    return hashlib.sha256(f"rerank|{query_fp}|{cid}".encode("utf-8")).hexdigest()
+
+def _prompt(query: str, chunk: List[Dict[str, Any]], quantity, customization) -> List[Dict[str, str]]:
     user = {
       "task": "score_suppliers",
       "query": query,
@@ -11,7 +34,7 @@ async def rerank_with_llm(query: str, candidates: list[dict], quantity: int | No
       "customization": customization,
       "candidates": [
         {
-          "id": c.get("id"),
+          "id": _cid(c),
           "name": c.get("name"),
           "country": c.get("country"),
           "product_types": c.get("product_types"),
@@ -20,35 +43,106 @@ async def rerank_with_llm(query: str, candidates: list[dict], quantity: int | No
           "lead_days": c.get("lead_days"),
           "url": c.get("url"),
           "source": c.get("source"),
-        } for c in candidates[:top_k]
+        } for c in chunk
       ]
     }
-    resp = await respond(settings.OPENAI_MODEL, [{"role":"system","content":sys},{"role":"user","content":str(user)}])
-    text = output_text(resp)
+    return [{"role":"system","content":SYS},{"role":"user","content":str(user)}]
 
-    # Parse and map back (expecting a JSON-ish array; be defensive)
-    import json
+def _parse(text: str) -> Dict[str, Dict[str, Any]]:
+    """id -> {score, reasons}; a malformed response only loses its own chunk."""
     try:
         data = json.loads(text)
     except Exception:
-        # fallback: no JSON -> return empty scores with a generic reason
-        data = []
-
+        return {}
+    if isinstance(data, dict):  # {"items": [...]} and similar wrappers
+        data = next((v for v in data.values() if isinstance(v, list)), [])
     scores = {}
     for item in (data if isinstance(data, list) else []):
-        sid = item.get("id")
-        sc  = float(item.get("score", 0))
-        rsn = item.get("reasons") or "Ranked by OpenAI LLM."
+        try:
+            sid = item.get("id")
+            sc = float(item.get("score", 0))
+        except (AttributeError, TypeError, ValueError):
+            continue
         if sid is not None:
-            scores[sid] = {"score": sc, "reasons": rsn}
-
-    # Attach scores to candidates
-    out = []
-    for c in candidates[:top_k]:
-        s = scores.get(c.get("id"), {"score": 0, "reasons": "No extra reasoning available."})
-        c2 = {**c, "score": s["score"], "reasoning": s["reasons"]}
-        out.append(c2)
-
-    # sort by score desc
-    out.sort(key=lambda x: x.get("score", 0), reverse=True)
-    return out
+            scores[str(sid)] = {"score": sc, "reasons": item.get("reasons") or "Ranked by OpenAI LLM."}
+    return scores
+
+def _calibrate(chunks: List[Dict[str, Dict[str, Any]]], pooled: List[float]) -> None:
+    """Map each chunk's scores onto the pooled mean/stdev (in place), clipped to 0..100."""
+    if len(pooled) < 2:
+        return
+    mu, sd = statistics.fmean(pooled), statistics.pstdev(pooled)
+    for chunk in chunks:
+        vals = [s["score"] for s in chunk.values()]
+        if len(vals) < 2:
+            continue
+        c_mu, c_sd = statistics.fmean(vals), statistics.pstdev(vals)
+        for s in chunk.values():
+            z = (s["score"] - c_mu) / c_sd if c_sd > 0 else 0.0
+            s["score"] = round(max(0.0, min(100.0, mu + z * sd)), 2)
+
+async def rerank_with_llm(query: str, candidates: list[dict], quantity: int | None, customization: bool | None, top_k: int = 200):
+    candidates = candidates[:top_k]
+    model = settings.OPENAI_MODEL
+    temperature = deterministic_temperature(model)
+    cacheable = is_deterministic(temperature)
+    query_fp = request_fingerprint(model, query, quantity, customization)
+    cache = get_llm_cache()
+
+    # one batched lookup (and below one write) off the event loop instead of a query per candidate
+    keys = {_cid(c): _score_key(query_fp, _cid(c)) for c in candidates} if cacheable else {}
+    hits = await asyncio.to_thread(cache.get_many, list(keys.values())) if keys else {}
+    scores: Dict[str, Dict[str, Any]] = {}
+    todo, queued = [], set()
+    for c in candidates:
+        cid = _cid(c)
+        hit = hits.get(keys.get(cid))
+        if hit is not None:
+            scores[cid] = hit[0]
+        elif cid not in queued:
+            queued.add(cid)
+            todo.append(c)
+
+    n_chunks = -(-len(todo) // RERANK_CHUNK_SIZE)
+    chunks = [todo[i::n_chunks] for i in range(n_chunks)]
+    slots = asyncio.Semaphore(RERANK_CONCURRENCY)
+
+    async def score_chunk(chunk: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        async with slots:
+            t0 = time.perf_counter()
+            resp = await within_deadline(
+                "rerank", respond(model, _prompt(query, chunk, quantity, customization), **sampling_params(temperature)), None)
+        if resp is None:
+            return {}
+        got = _parse(output_text(resp))
+        elapsed_ms = (time.perf_counter() - t0) * 1000 / max(1, len(chunk))
+        return {cid: dict(s, elapsed_ms=elapsed_ms) for cid, s in got.items() if cid in {_cid(c) for c in chunk}}
+
+    fresh = [r if isinstance(r, dict) else {} for r in
+             await asyncio.gather(*(score_chunk(ch) for ch in chunks), return_exceptions=True)]
+    if fresh:
+        pooled = [s["score"] for s in scores.values()] + [s["score"] for ch in fresh for s in ch.values()]
+        _calibrate(fresh, pooled)
+    writes = []
+    for ch in fresh:
+        for cid, s in ch.items():
+            elapsed_ms = s.pop("elapsed_ms")
+            scores[cid] = s
+            writes.append((keys.get(cid) or _score_key(query_fp, cid), s, elapsed_ms))
+    if cacheable and writes:
+        await asyncio.to_thread(cache.set_many, "rerank", writes, RERANK_CACHE_TTL_S)
+
+    # Attach scores to candidates. Unscored ones (failed chunk, deadline) keep their upstream
+    # score, which isn't on the calibrated 0-100 scale, so they rank after every scored one.
+    scored, unscored = [], []
+    for c in candidates:
+        s = scores.get(_cid(c))
+        if s is None:
+            unscored.append({**c, "score": c.get("score", 0), "reasoning": c.get("reasoning") or "No extra reasoning available."})
+        else:
+            scored.append({**c, "score": s["score"], "reasoning": s["reasons"]})
+
+    # sort by score desc within each group
+    scored.sort(key=lambda x: x.get("score", 0), reverse=True)
+    unscored.sort(key=lambda x: x.get("score", 0) or 0, reverse=True)
+    return scored + unscored
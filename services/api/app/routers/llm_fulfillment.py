@@ -2,9 +2,12 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Optional, Literal, Dict, Any
 import os
+import json
 from openai import OpenAI
+from sla_ai_components.ai.llm_cache import cache_site, deterministic_temperature, sampling_params
 
 router = APIRouter()
+_PLAN_CACHE = cache_site("fulfillment_plan", ttl_s=6 * 3600)  # rates and port conditions move daily
 
 # ---------- Input ----------
 Incoterm = Literal["EXW","FCA","FAS","FOB","CFR","CIF","CPT","CIP","DAP","DPU","DDP"]
@@ -156,13 +159,22 @@ def llm_fulfillment_plan(payload: FulfillmentRequest):
     client = OpenAI()
 
     model = os.getenv("OPENAI_MODEL_SEARCH", "gpt-4o-mini")
-    try:
+    temperature = deterministic_temperature(model)
+    messages = [{"role": "user", "content": prompt}]
+
+    def _plan():
         resp = client.chat.completions.create(
             model=model,
-            messages=[{"role": "user", "content": prompt}],
+            messages=messages,
             response_format={"type": "json_object"},
+            **sampling_params(temperature),
         )
-        text = resp.choices[0].message.content
+        return json.loads(resp.choices[0].message.content)  # parse errors are never cached
+
+    try:
+        data = _PLAN_CACHE.call(_plan, model=model, prompt=messages, temperature=temperature)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=500, detail=f"LLM JSON parse error: {e}")
     except Exception as e:
         error_msg = str(e)
         if "quota" in error_msg.lower() or "429" in error_msg:
@@ -197,10 +209,4 @@ def llm_fulfillment_plan(payload: FulfillmentRequest):
         else:
             raise HTTPException(status_code=502, detail=f"OpenAI error: {e}")
 
-    import json
-    try:
-        data = json.loads(text)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"LLM JSON parse error: {e}")
-
     return data
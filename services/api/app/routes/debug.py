@@ -1,5 +1,7 @@
 from fastapi import APIRouter
 from ..internal_loader import get_corpus
+from sla_ai_components.ai.llm_cache import cache_stats
+from ..utils.singleflight import singleflight_stats
 
 router = APIRouter(prefix="/v1/debug", tags=["debug"])
 
@@ -12,3 +14,13 @@ async def internal_stats():
         c = (r.get("country") or "unknown").lower()
         by[c] = by.get(c, 0) + 1
     return {"count": len(corpus), "by_country": by}
+
+@router.get("/llm-cache")
+async def llm_cache_stats():
+    """Per-call-site LLM cache counters (hits, misses, bypasses, latency saved)"""
+    return {"sites": cache_stats()}
+
+@router.get("/singleflight")
+async def singleflight_counters():
+    """Per-group request coalescing counters (calls, backend executions, coalesced, in flight)"""
+    return {"groups": singleflight_stats()}
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from ..core.settings import settings
-from ..internal_index import internal_health, get_internal_corpus
+from ..internal_index import internal_health, init_index
 import os, json, pathlib, random
 
 router = APIRouter(prefix="/v1/integration", tags=["integration"])
@@ -64,7 +64,7 @@ def seed_dev():
     # Tell the running process where to read suppliers from (you still need to set env for prod)
     os.environ["SUPPLIERS_DATA"] = str(data_dir)
 
-    # Warm the cache
-    _ = get_internal_corpus()
+    # Load it into the live corpus (only the rows that changed, if one is already loaded)
+    init_index(str(data_dir))
 
     return {"ok": True, "path": str(data_dir), "count": len(sample)}
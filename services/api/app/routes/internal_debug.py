@@ -1,8 +1,19 @@
-from fastapi import APIRouter
-from ..internal_index import internal_health
+from fastapi import APIRouter, HTTPException
+import asyncio
+import os
+from ..internal_index import init_index, internal_health
 
 router = APIRouter(prefix="/v1/debug", tags=["debug"])
 
 @router.get("/internal-health")
 def _internal_health():
     return internal_health()
+
+@router.post("/reload-internal")
+async def _reload_internal():
+    """Re-ingest SUPPLIERS_DATA; changed rows are applied to the live index incrementally."""
+    data_path = os.getenv("SUPPLIERS_DATA")
+    if not data_path:
+        raise HTTPException(status_code=400, detail="SUPPLIERS_DATA not set")
+    await asyncio.to_thread(init_index, data_path)
+    return internal_health()
@@ -4,6 +4,7 @@ from typing import Optional, Literal, List, Dict, Any
 import asyncio
 import time
 from ..internal_loader import get_corpus
+from ..search.retrieval import CHANNEL_DEPTH, index_for_rows
 from rapidfuzz import fuzz
 
 router = APIRouter(prefix="/v1", tags=["search"])
@@ -68,11 +69,12 @@ async def search_suppliers(req: SearchRequest):
             }
         }
     
-    # Score all suppliers
+    # Score hybrid-recall candidates
     query = req.q or ""
     scored_suppliers = []
     
-    for supplier in corpus:
+    hits = index_for_rows("supplier_files", corpus).search(query, CHANNEL_DEPTH, prefer={"country": req.country})
+    for supplier in (h.row for h in hits):
         score = score_supplier(supplier, query, req.country)
         if score >= (req.min_score or 80):
             supplier_id = supplier.get("id") or supplier.get("supplier_id") or f"supplier_{len(scored_suppliers)}"
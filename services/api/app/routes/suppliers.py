@@ -1,6 +1,6 @@
 from __future__ import annotations
 from fastapi import APIRouter, HTTPException, UploadFile, File
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 import time, json, asyncio
 
@@ -12,6 +12,8 @@ from ..scoring.rank import score_supplier
 from ..utils.url_utils import prefer_url
 from ..llm.openai_client import respond, output_text
 from ..core.settings import settings
+from ..internal_index import recall_internal_legacy
+from ..utils.deadline import deadline, within_deadline
 
 router = APIRouter(prefix="/v1/suppliers", tags=["suppliers"])
 
@@ -23,7 +25,7 @@ class SearchReq(BaseModel):
     quantity: int | None = None
     min_score: int = 70
     top_k: int = 10
-    time_budget_ms: int = 60000
+    time_budget_ms: int = Field(60000, gt=0)
     # optional image caption to boost query tokens
     image_caption: str | None = None
 
@@ -34,6 +36,13 @@ class SearchRes(BaseModel):
 @router.post("/search", response_model=SearchRes)
 async def suppliers_search(body: SearchReq):
     """Capability-first unified search: internal + web with weighted scoring"""
+    # time_budget_ms bounds the whole request; see utils/deadline.py
+    with deadline(body.time_budget_ms) as dl:
+        res = await _suppliers_search(body)
+    res.meta.update(dl.meta())
+    return res
+
+async def _suppliers_search(body: SearchReq) -> SearchRes:
     t0 = time.perf_counter()
     
     # 1) Build Needs from text
@@ -46,23 +55,23 @@ async def suppliers_search(body: SearchReq):
         needs.productName = needs.productName or body.image_caption
     
     # 3) Internal recall (broad; we'll score later)
-    internal = search_internal(
-        q=needs.productName or needs.category or body.q,
-        country=None,  # do not hard filter—country will be a *preference* weight
-        product_type=None,
-        customization=body.customization,
-        quantity=body.quantity,
-        top_k=200
-    )
+    q = needs.productName or needs.category or body.q
+    internal = await within_deadline("internal_recall", asyncio.to_thread(recall_internal_legacy, {
+        "product_title": q,
+        "country": None,  # do not hard filter—country will be a *preference* weight
+        "customization": "yes" if body.customization else "any",
+        "quantity": body.quantity,
+        "query_terms": [q],
+    }, 200), [])
     
     # 4) OpenAI web search (only OpenAI; use tools:[{type:"web"}])
     web_items = []
     try:
         prompt = f"Find manufacturers or factories for: {needs.productName or needs.category or body.q}. Return a short JSON array of items with keys: name, country (if known), url (homepage preferred), product_types[], materials[], processes[], moq (if known)."
-        resp = await respond(settings.OPENAI_MODEL, [
+        resp = await within_deadline("web_recall", respond(settings.OPENAI_MODEL, [
             {"role": "user", "content": prompt}
-        ])
-        text_output = output_text(resp)
+        ]), None)
+        text_output = output_text(resp) if resp is not None else ""
         try:
             arr = json.loads(text_output)
             if isinstance(arr, list):
@@ -5,9 +5,10 @@ from typing import List, Dict, Any, Optional
 import time, json, asyncio, os
 from rapidfuzz import fuzz
 
-from ..internal_index import recall_internal, get_internal_corpus
+from ..internal_index import recall_internal_legacy, get_internal_corpus
 from ..openai_helpers import llm_structured_query, web_collect_vendors, normalize_url
 from ..core.settings import settings
+from ..utils.deadline import deadline, within_deadline
 
 router = APIRouter(prefix="/v1", tags=["unified-search"])
 
@@ -133,6 +134,14 @@ def score_vendor(vendor: Dict[str, Any], structured_query: Dict[str, Any]) -> Di
 @router.post("/unified-search", response_model=UnifiedSearchRes)
 async def unified_search(body: UnifiedSearchReq, file: Optional[UploadFile] = File(None)):
     """Unified search: internal + OpenAI web with weighted scoring"""
+    # Every stage below reads this deadline; stages still running at expiry are
+    # cancelled and the response carries whatever finished, flagged partial in meta.
+    with deadline(float(os.getenv("SEARCH_TIME_BUDGET_MS", "45000"))) as dl:
+        res = await _unified_search(body, file)
+    res.meta.update(dl.meta())
+    return res
+
+async def _unified_search(body: UnifiedSearchReq, file: Optional[UploadFile]) -> UnifiedSearchRes:
     t0 = time.perf_counter()
     
     # Validate required parameters
@@ -148,10 +157,9 @@ async def unified_search(body: UnifiedSearchReq, file: Optional[UploadFile] = Fi
     structured_query = await llm_structured_query(body.q, image_bytes)
     
     # 2. Parallel search: internal + web
-    time_budget = float(os.getenv("SEARCH_TIME_BUDGET_MS", "45000")) / 1000.0
-    
     async def search_internal_async():
-        return recall_internal(structured_query, top_k=200)
+        return await within_deadline(
+            "internal_recall", asyncio.to_thread(recall_internal_legacy, structured_query, 200), [])
     
     async def search_web_async():
         return await web_collect_vendors(structured_query)
@@ -244,7 +252,7 @@ async def search_dry_run(q: str):
     """Debug endpoint to test structured query extraction"""
     try:
         structured_query = await llm_structured_query(q)
-        internal_count = len(recall_internal(structured_query, top_k=50))
+        internal_count = len(recall_internal_legacy(structured_query, top_k=50))
         return {
             "structured_query": structured_query,
             "internal_candidates": internal_count,
@@ -3,6 +3,8 @@ from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from ..llm.openai_client import respond, output_text
 from ..core.settings import settings
+from sla_ai_components.ai.llm_cache import cache_site, deterministic_temperature, sampling_params
+from ..utils.deadline import within_deadline
 import json
 
 class Needs(BaseModel):
@@ -23,6 +25,8 @@ SYS = ("You are a sourcing assistant. Convert input into a compact JSON object "
        "Infer likely materials/processes if not provided (e.g., sweater→knit/wool/cotton). "
        "Return ONLY JSON, no commentary.")
 
+_NEEDS_CACHE = cache_site("needs", ttl_s=7 * 24 * 3600)
+
 async def from_text(text: str, country: Optional[str], product_type: Optional[str],
               customization: Optional[bool], quantity: Optional[int]) -> Needs:
     user = {
@@ -33,18 +37,21 @@ async def from_text(text: str, country: Optional[str], product_type: Optional[st
         "quantity": quantity
     }
     
+    model = settings.OPENAI_MODEL
+    temperature = deterministic_temperature(model)
+    messages = [
+        {"role":"system","content":SYS},
+        {"role":"user","content":str(user)}
+    ]
+
+    async def _extract():
+        resp = await respond(model, messages, **sampling_params(temperature))
+        return json.loads(output_text(resp))  # non-JSON raises and is never cached
+
     try:
-        resp = await respond(settings.OPENAI_MODEL, [
-            {"role":"system","content":SYS},
-            {"role":"user","content":str(user)}
-        ])
-        text_output = output_text(resp)
-        data = {}
-        try:
-            data = json.loads(text_output)
-        except Exception:
-            pass
-        return Needs(**data)
+        data = await within_deadline(
+            "needs", _NEEDS_CACHE.acall(_extract, model=model, prompt=messages, temperature=temperature), None)
+        return Needs(**data) if data is not None else Needs()
     except Exception:
         return Needs()
 
@@ -0,0 +1,60 @@
+from __future__ import annotations
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Sequence, Set
+
+from .normalize import tokens
+from .retrieval import field_text
+
+# Per-attribute inverted indexes (term -> row ids) for structured matching, e.g. image
+# attributes against factory product types, materials, colours and styles. Candidates come
+# from posting-set intersections, so scoring only touches rows that share a term.
+
+_EMPTY: FrozenSet[int] = frozenset()
+
+def stem(t: str) -> str:
+    """Plural folding good enough for catalogue terms: knits -> knit, dresses -> dress."""
+    if len(t) > 4 and t.endswith("es") and t[-3] in "sxz":
+        return t[:-2]
+    if len(t) > 3 and t.endswith("s") and not t.endswith("ss"):
+        return t[:-1]
+    return t
+
+def terms(text: str) -> Set[str]:
+    return {stem(t) for t in tokens(text)}
+
+class AttributeIndex:
+    """
+    `fields` maps an attribute name to the row columns it is built from; `vocab` optionally
+    restricts an attribute to a closed term list (colour words out of free-text notes).
+    """
+
+    def __init__(self, rows: Sequence[Mapping[str, Any]], fields: Mapping[str, Sequence[str]],
+                 vocab: Optional[Mapping[str, Set[str]]] = None):
+        self.rows: List[Mapping[str, Any]] = list(rows)
+        self.postings: Dict[str, Dict[str, FrozenSet[int]]] = {}
+        for attr, cols in fields.items():
+            allowed = {stem(t) for t in vocab[attr]} if vocab and attr in vocab else None
+            posting: Dict[str, List[int]] = defaultdict(list)
+            for i, row in enumerate(self.rows):
+                row_terms = set().union(*(terms(field_text(row.get(c))) for c in cols))
+                if allowed is not None:
+                    row_terms &= allowed
+                for t in row_terms:
+                    posting[t].append(i)
+            self.postings[attr] = {t: frozenset(ids) for t, ids in posting.items()}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def match(self, attr: str, phrase: str) -> FrozenSet[int]:
+        """Rows whose `attr` terms include every term of `phrase`."""
+        posting = self.postings.get(attr, {})
+        sets = sorted((posting.get(t, _EMPTY) for t in terms(phrase)), key=len)
+        if not sets:
+            return _EMPTY
+        out = sets[0]
+        for s in sets[1:]:
+            if not out:
+                break
+            out = out & s
+        return out
@@ -1,3 +1,5 @@
+import asyncio
+import base64
 import os
 from typing import Optional
 from openai import OpenAI
@@ -7,17 +9,20 @@ client = OpenAI(api_key=OPENAI_KEY) if OPENAI_KEY else None
 
 async def summarize_image(path: str) -> str|None:
     try:
-        from PIL import Image
-        im = Image.open(path)
-        im.thumbnail((1024,1024))
-        im.save(path)  # overwrite smaller
+        # the upload stays untouched; the model gets a cached 1024px thumbnail
+        from ..media.vision import cached_thumbnail
+        with open(path, "rb") as f:
+            data = f.read()
+        thumb = await asyncio.to_thread(cached_thumbnail, data)
     except Exception:
-        pass
+        return None
     try:
         if client:  # OpenAI available
-            r = client.responses.create(
+            image_url = "data:image/jpeg;base64," + base64.b64encode(thumb).decode("ascii")
+            r = await asyncio.to_thread(
+                client.responses.create,
                 model="gpt-4o-mini",
-                input=[{"role":"user","content":[{"type":"input_text","text":"Briefly label this product in 8 words max."},{"type":"input_image","image_url": f"file://{path}"}]}],
+                input=[{"role":"user","content":[{"type":"input_text","text":"Briefly label this product in 8 words max."},{"type":"input_image","image_url": image_url}]}],
                 temperature=0
             )
             return (r.output_text or "").strip()[:120]
@@ -2,9 +2,13 @@ import os, asyncio
 from typing import List, Dict, Any
 from openai import OpenAI
 from .normalize import expand_product_terms
+from sla_ai_components.ai.llm_cache import cache_site
+from ..utils.deadline import within_deadline
 
 OPENAI_KEY = os.getenv("OPENAI_API_KEY")
 client = OpenAI(api_key=OPENAI_KEY) if OPENAI_KEY else None
+RECALL_MODEL = "gpt-4o-mini"
+_WEB_RECALL_CACHE = cache_site("web_recall", ttl_s=24 * 3600)
 
 async def web_recall(req) -> List[Dict[str,Any]]:
     if not client:
@@ -15,14 +19,17 @@ async def web_recall(req) -> List[Dict[str,Any]]:
     # Use a lightweight model just to get vendor names + URLs
     prompt = f"""Return up to 12 suppliers with website URLs for: "{q}".
     Only return JSON list of objects: name, country(if obvious), url."""
-    try:
-        r = client.responses.create(model="gpt-4o-mini",
+    async def _fetch():
+        r = await asyncio.to_thread(client.responses.create, model=RECALL_MODEL,
             input=prompt, temperature=0)
-        # naive parse
+        # naive parse; unparseable output raises and is never cached
         txt = (r.output_text or "").strip()
         import json, re
         json_str = re.search(r'\[.*\]', txt, re.S).group(0)
-        data = json.loads(json_str)
+        return json.loads(json_str)
+    try:
+        data = await within_deadline(
+            "web_recall", _WEB_RECALL_CACHE.acall(_fetch, model=RECALL_MODEL, prompt=prompt, temperature=0), [])
         items=[]
         for i in data[:12]:
             items.append({
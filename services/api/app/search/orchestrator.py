@@ -1,15 +1,32 @@
-import asyncio, time
+import asyncio, json, os, time
 from typing import List, Dict, Any, Tuple
 from ..internal_loader import get_corpus
 from .normalize import expand_product_terms
+from ..utils.singleflight import request_fingerprint, singleflight
+from ..utils.deadline import deadline, within_deadline
+from .retrieval import CHANNEL_DEPTH, index_for_rows
 from rapidfuzz import fuzz
 
+# Whole-request budget; each stage is cut off (and flagged in meta) once it is spent
+SEARCH_HARD_BUDGET_MS = int(os.getenv("SEARCH_HARD_BUDGET_MS", "12000"))
+
+_SEARCH_FLIGHT = singleflight("orchestrator_search")
+
 async def perform_unified_search(req) -> Tuple[List[Dict[str,Any]], Dict[str,Any]]:
+    """Identical concurrent requests share one search (and its web / LLM calls)."""
+    return await _SEARCH_FLIGHT.do(request_fingerprint(req), lambda: _perform_unified_search(req))
+
+async def _perform_unified_search(req) -> Tuple[List[Dict[str,Any]], Dict[str,Any]]:
+    with deadline(getattr(req, "time_budget_ms", None) or SEARCH_HARD_BUDGET_MS) as dl:
+        final, meta = await _run_passes(req, dl)
+    meta.update(dl.meta())
+    return final, meta
+
+async def _run_passes(req, dl) -> Tuple[List[Dict[str,Any]], Dict[str,Any]]:
     t0 = time.time()
     passes = []
     results: Dict[str,Dict[str,Any]] = {}
     target = 10
-    hard_budget_ms = 12000
     thresholds = [req.min_score or 80, 75, 70, 65, 60, 55, 50]
 
     # Gather internal corpus once
@@ -26,10 +43,10 @@ async def perform_unified_search(req) -> Tuple[List[Dict[str,Any]], Dict[str,Any
 
     for p, thr in enumerate(thresholds, start=1):
         # Internal search
-        internal = await search_internal(corpus, req)
+        internal = await within_deadline("internal_recall", search_internal(corpus, req), [])
 
         # Web search (optional)
-        web = await search_web(req)
+        web = await within_deadline("web_recall", search_web(req), [])
 
         # Apply threshold, sort
         cand = [x for x in (internal[:200] + (web or [])) if x["score"] >= thr]
@@ -38,7 +55,7 @@ async def perform_unified_search(req) -> Tuple[List[Dict[str,Any]], Dict[str,Any
         kept = await keep(cand, f"pass{p}")
         passes.append({"pass": p, "thr": thr, "candidates": len(cand), "kept": kept, "t": int((time.time()-t0)*1000)})
         if len(results) >= target: break
-        if (time.time()-t0)*1000 >= hard_budget_ms: break
+        if dl.expired: break
 
         # Relax country after first pass
         if p==2 and req.country:
@@ -57,10 +74,17 @@ async def perform_unified_search(req) -> Tuple[List[Dict[str,Any]], Dict[str,Any
 
 async def search_internal(corpus: List[Dict[str,Any]], req) -> List[Dict[str,Any]]:
     """Search internal corpus with weighted scoring"""
+    # scored off the loop so a deadline can stop waiting on it
+    return await asyncio.to_thread(_rank_internal, corpus, req)
+
+def _rank_internal(corpus: List[Dict[str,Any]], req) -> List[Dict[str,Any]]:
     q_terms = expand_product_terms(req.q or "", req.product_type)
     out = []
     
-    for row in corpus:
+    hits = index_for_rows("supplier_files", corpus).search(
+        req.q or "", CHANNEL_DEPTH, product_type=req.product_type, prefer={"country": req.country})
+    for hit in hits:
+        row = hit.row
         score = score_row(row, q_terms, req)
         if score > 0:  # Only include items with some score
             row_id = row.get("id") or row.get("_id") or row.get("supplier_id")
@@ -180,7 +204,7 @@ async def search_web(req) -> List[Dict[str,Any]]:
     Only return JSON list of objects: name, country(if obvious), url."""
     
     try:
-        r = client.responses.create(model="gpt-4o-mini", input=prompt, temperature=0)
+        r = await asyncio.to_thread(client.responses.create, model="gpt-4o-mini", input=prompt, temperature=0)
         txt = (r.output_text or "").strip()
         import re
         json_str = re.search(r'\[.*\]', txt, re.S).group(0)
@@ -0,0 +1,670 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+import copy
+import json
+import os
+import weakref
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple
+import math
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from .normalize import slug, tokens, expand_product_terms
+
+try:  # shared local embedder; standalone deploys of this app may not ship the root package
+    from sla_ai_components.embeddings.local import LocalEmbedder
+except ImportError:  # pragma: no cover
+    LocalEmbedder = None
+
+# Hybrid internal retrieval: BM25 over all text fields, fuzzy matching on names and
+# cosine similarity over local embeddings run side by side on one precomputed corpus
+# and are fused with reciprocal rank fusion (score = sum_c w_c / (RRF_K + rank_c)).
+# Filters are precomputed per-facet bitsets combined with a bitwise AND.
+RRF_K = 60
+CHANNEL_WEIGHTS = {"bm25": 1.0, "name": 1.0, "vector": 1.0}
+CHANNEL_DEPTH = 200  # candidates each channel contributes before fusion
+BM25_K1 = 1.2
+BM25_B = 0.75
+NAME_MIN_SCORE = 75.0  # rapidfuzz WRatio cutoff for the fuzzy-name channel
+VECTOR_MIN_SIM = 0.2  # below this cosine a neighbour is noise, not recall
+DENSE_FACET_FRAC = 1 / 256  # facet values on more rows than this keep a packed bitset
+# Incremental updates append changed rows to a small tail and tombstone the rows they
+# replace; once tail + tombstones pass this share of the live corpus the next generation
+# is compacted into a fresh build instead.
+COMPACT_FRACTION = 0.2
+
+# Row keys tried in order for each logical field (normalized JSON, CSV headers, supplier files)
+FIELD_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "name": ("name", "factory_name", "Factory Name", "company", "title"),
+    "country": ("country", "Country"),
+    "city": ("city", "City"),
+    "products": ("product_types", "product_specialties", "Product Specialties", "category", "categories"),
+    "materials": ("materials", "materials_handled", "Materials Handled"),
+    "brands": ("past_clients", "Past Clients"),
+    "capacity": ("max_monthly_capacity", "Max Monthly Capacity"),
+}
+EXTRA_TEXT_FIELDS = (
+    "description", "tags", "capabilities", "certifications", "Certifications",
+    "customization_capabilities", "search_keywords", "notes",
+)
+SIZE_BANDS = (("small", 0, 10_000), ("medium", 10_000, 100_000),
+              ("large", 100_000, 1_000_000), ("enterprise", 1_000_000, math.inf))
+
+def _channel_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=len(CHANNEL_WEIGHTS), thread_name_prefix="retrieval")
+
+def _after_fork() -> None:
+    global _POOL
+    _POOL = _channel_pool()  # a forked child (e.g. a scoring pool worker) has none of the threads
+
+_POOL = _channel_pool()
+os.register_at_fork(after_in_child=_after_fork)
+
+def field_value(row: Mapping[str, Any], name: str) -> Any:
+    for key in FIELD_ALIASES[name]:
+        v = row.get(key)
+        if v is None or (isinstance(v, (str, list, tuple)) and not v):
+            continue
+        return v
+    return None
+
+def field_text(v: Any) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, (list, tuple, set, np.ndarray)):
+        return " ".join(str(x) for x in v if x is not None)
+    if isinstance(v, float) and math.isnan(v):
+        return ""
+    return str(v)
+
+def _brand_list(v: Any) -> List[str]:
+    if isinstance(v, (list, tuple, set, np.ndarray)):
+        return [str(x) for x in v if x]
+    return [p for p in str(v or "").replace(";", ",").replace("|", ",").split(",") if p.strip()]
+
+def size_band(capacity: Any) -> Optional[str]:
+    try:
+        cap = float(capacity)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(cap) or cap <= 0:
+        return None
+    for band, lo, hi in SIZE_BANDS:
+        if lo <= cap < hi:
+            return band
+    return None
+
+def _load_array(path: Path) -> np.ndarray:
+    """Read-only memmap of a saved array (plain load for empty ones, which can't be mapped)."""
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        return np.load(path)
+
+class _PackedStrings:
+    """Strings stored as one UTF-8 buffer plus offsets, so they can live in a shared memmap."""
+
+    def __init__(self, buf: np.ndarray, offsets: np.ndarray):
+        self.buf, self.offsets = buf, offsets
+
+    @staticmethod
+    def pack(strings: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        encoded = [s.encode() for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(e) for e in encoded])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def raw(self, i: int) -> bytes:
+        return self.buf[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def __getitem__(self, i: int) -> str:
+        return self.raw(i).decode()
+
+class _SortedVocab:
+    """term -> id lookup by binary search over packed, byte-sorted terms (no per-process dict)."""
+
+    def __init__(self, terms: _PackedStrings, ids: np.ndarray):
+        self.terms, self.ids = terms, ids
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def get(self, term: str, default: Optional[int] = None) -> Optional[int]:
+        key = term.encode()
+        lo, hi = 0, len(self.terms)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.terms.raw(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.terms) and self.terms.raw(lo) == key:
+            return int(self.ids[lo])
+        return default
+
+Ranked = Tuple[np.ndarray, np.ndarray]  # (row ids, scores), best first
+_NO_HITS: Ranked = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+
+def merge_channels(parts: Sequence[Mapping[str, Ranked]], depth: int) -> Dict[str, Ranked]:
+    """Per-channel top-`depth` over the partial rankings of disjoint row shards."""
+    merged: Dict[str, Ranked] = {}
+    for channel in parts[0]:
+        rows = np.concatenate([p[channel][0] for p in parts]).astype(np.int64)
+        scores = np.concatenate([p[channel][1] for p in parts])
+        order = np.lexsort((rows, -scores))[:depth]  # score desc, then corpus order
+        merged[channel] = rows[order], scores[order]
+    return merged
+
+FACETS = ("country", "location", "products", "materials", "brands", "size")
+
+class _Facet:
+    """value -> rows, kept as packed bitsets for common values and sorted row ids for rare ones."""
+
+    def __init__(self, n: int, postings: Dict[str, List[int]]):
+        self.n = n
+        dense_min = max(8, int(n * DENSE_FACET_FRAC))
+        self.bits: Dict[str, np.ndarray] = {}
+        self.rows: Dict[str, np.ndarray] = {}
+        for value, idx in postings.items():
+            idx = np.unique(np.asarray(idx, dtype=np.int64))
+            if len(idx) >= dense_min:
+                mask = np.zeros(n, dtype=bool)
+                mask[idx] = True
+                self.bits[value] = np.packbits(mask)
+            else:
+                self.rows[value] = idx
+
+    def bitset(self, value: str) -> np.ndarray:
+        bits = self.bits.get(value)
+        if bits is not None:
+            return bits
+        mask = np.zeros(self.n, dtype=bool)
+        mask[self.rows.get(value, np.empty(0, dtype=np.int64))] = True
+        return np.packbits(mask)
+
+@dataclass
+class Hit:
+    index: int
+    row: Mapping[str, Any]
+    score: float  # fused RRF score scaled to 0..1 (1 = ranked first by every channel)
+    ranks: Dict[str, int] = field(default_factory=dict)  # 1-based rank per contributing channel
+
+class HybridIndex:
+    """
+    Precomputed retrieval structures over a list of supplier/factory rows.
+
+    Built once per corpus version (see `get_index`) and shared by every search path;
+    `search` never scans rows in Python.
+    """
+
+    def __init__(self, rows: Sequence[Mapping[str, Any]], generation: int = 0):
+        self.rows = rows if isinstance(rows, list) else list(rows)  # keeps the source list alive
+        self.source = self.rows  # live rows in corpus order; see `apply`
+        n = self.n = self.base_n = len(self.rows)
+        self.generation = generation
+        self.names = [slug(field_text(field_value(r, "name"))) for r in self.rows]
+        texts = [self._doc_text(r) for r in self.rows]
+        self._build_bm25(texts)
+        self._build_facets()
+        self.embedder = None
+        self.vectors: Optional[np.ndarray] = None
+        if LocalEmbedder is not None and n:
+            self.embedder = LocalEmbedder.fit(texts)
+            self.vectors = self.embedder.transform(texts)
+        self.path: Optional[Path] = None  # saved generation this index was opened from
+        # incremental state: rows appended after the build and tombstones over all rows
+        self.dead: Optional[np.ndarray] = None
+        self.tail_postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.tail_facets: Dict[str, Dict[str, List[int]]] = {}
+        self.tail_vectors: Optional[np.ndarray] = None
+        self._positions: Optional[Dict[Hashable, int]] = None
+
+    # -- build ------------------------------------------------------------------
+
+    @staticmethod
+    def _doc_text(row: Mapping[str, Any]) -> str:
+        parts = [field_text(field_value(row, f)) for f in ("name", "products", "materials", "country", "city", "brands")]
+        parts += [field_text(row.get(f)) for f in EXTRA_TEXT_FIELDS]
+        return " ".join(p for p in parts if p)
+
+    def _build_bm25(self, texts: Sequence[str]) -> None:
+        vocab: Dict[str, int] = {}
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        lengths = np.zeros(self.n, dtype=np.float32)
+        for i, text in enumerate(texts):
+            toks = slug(text).split()
+            lengths[i] = len(toks)
+            for t in toks:
+                term_ids.append(vocab.setdefault(t, len(vocab)))
+            doc_ids.extend([i] * len(toks))
+        keys = np.asarray(term_ids, dtype=np.int64) * max(self.n, 1) + np.asarray(doc_ids, dtype=np.int64)
+        keys, tf = np.unique(keys, return_counts=True)  # sorted by term, then doc
+        terms = keys // max(self.n, 1)
+        self.vocab = vocab
+        self.post_docs = (keys % max(self.n, 1)).astype(np.int32)
+        self.post_tf = tf.astype(np.float32)
+        self.post_offsets = np.searchsorted(terms, np.arange(len(vocab) + 1)).astype(np.int64)
+        df = np.diff(self.post_offsets).astype(np.float32)
+        self.idf = np.log(1.0 + (self.n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self.doc_len = lengths
+        self.avg_len = float(lengths.mean()) if self.n else 0.0
+
+    @staticmethod
+    def _facet_entries(r: Mapping[str, Any]) -> Iterable[Tuple[str, str]]:
+        country = slug(field_text(field_value(r, "country")))
+        city = slug(field_text(field_value(r, "city")))
+        if country:
+            yield "country", country
+        for t in tokens(country) | tokens(city):
+            yield "location", t
+        for f in ("products", "materials"):
+            for t in tokens(field_text(field_value(r, f))):
+                yield f, t
+        for b in _brand_list(field_value(r, "brands")):
+            for t in tokens(b):
+                yield "brands", t
+        band = size_band(field_value(r, "capacity"))
+        if band:
+            yield "size", band
+
+    def _build_facets(self) -> None:
+        postings: Dict[str, Dict[str, List[int]]] = {f: {} for f in FACETS}
+        for i, r in enumerate(self.rows):
+            for f, value in self._facet_entries(r):
+                postings[f].setdefault(value, []).append(i)
+        self.facets = {f: _Facet(self.n, p) for f, p in postings.items()}
+
+    # -- persistence ----------------------------------------------------------------
+
+    _ARRAYS = ("post_docs", "post_tf", "post_offsets", "idf", "doc_len")
+
+    def save(self, path: Path) -> None:
+        """
+        Write the built structures (not the rows) as .npy files plus meta.json, so other
+        processes can `open` them as read-only memmaps. Only a compacted index can be saved.
+        """
+        if self.dead is not None or self.n != self.base_n:
+            raise ValueError("only a compacted index can be saved")
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in self._ARRAYS:
+            np.save(path / f"{name}.npy", getattr(self, name))
+        terms = sorted(self.vocab, key=str.encode)
+        buf, offsets = _PackedStrings.pack(terms)
+        np.save(path / "vocab_buf.npy", buf)
+        np.save(path / "vocab_offsets.npy", offsets)
+        np.save(path / "vocab_ids.npy", np.asarray([self.vocab[t] for t in terms], dtype=np.int64))
+        buf, offsets = _PackedStrings.pack(self.names)
+        np.save(path / "names_buf.npy", buf)
+        np.save(path / "names_offsets.npy", offsets)
+
+        facets: Dict[str, Dict[str, List[str]]] = {}
+        for f, facet in self.facets.items():
+            dense = sorted(facet.bits)
+            sparse = sorted(facet.rows)
+            facets[f] = {"bits": dense, "rows": sparse}
+            nbytes = (self.n + 7) // 8
+            np.save(path / f"facet_{f}_bits.npy",
+                    np.vstack([facet.bits[v] for v in dense]) if dense else np.zeros((0, nbytes), dtype=np.uint8))
+            idx = [facet.rows[v] for v in sparse]
+            offsets = np.zeros(len(idx) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(i) for i in idx])
+            np.save(path / f"facet_{f}_rows.npy", np.concatenate(idx) if idx else np.zeros(0, dtype=np.int64))
+            np.save(path / f"facet_{f}_offsets.npy", offsets)
+
+        if self.embedder is not None:
+            np.save(path / "embedder_idf.npy", self.embedder.idf)
+            np.save(path / "embedder_components.npy", self.embedder.components)
+            np.save(path / "vectors.npy", self.vectors)
+        meta = {"n": self.n, "avg_len": self.avg_len, "facets": facets,
+                "embedder_fitted": None if self.embedder is None else bool(self.embedder.fitted)}
+        (path / "meta.json").write_text(json.dumps(meta))
+
+    @classmethod
+    def open(cls, path: Path, rows: Sequence[Mapping[str, Any]]) -> "HybridIndex":
+        """Attach to a saved index read-only; `rows` are the rows it was built over, in order."""
+        path = Path(path)
+        meta = json.loads((path / "meta.json").read_text())
+        idx = cls.__new__(cls)
+        idx.rows = idx.source = rows
+        idx.n = idx.base_n = int(meta["n"])
+        if len(rows) != idx.n:
+            raise ValueError(f"index has {idx.n} rows, got {len(rows)}")
+        idx.generation = 0
+        for name in cls._ARRAYS:
+            setattr(idx, name, _load_array(path / f"{name}.npy"))
+        idx.avg_len = float(meta["avg_len"])
+        idx.vocab = _SortedVocab(_PackedStrings(_load_array(path / "vocab_buf.npy"), _load_array(path / "vocab_offsets.npy")),
+                                 _load_array(path / "vocab_ids.npy"))
+        names = _PackedStrings(_load_array(path / "names_buf.npy"), _load_array(path / "names_offsets.npy"))
+        idx.names = [names[i] for i in range(len(names))]  # rapidfuzz scans these per query
+
+        idx.facets = {}
+        for f, keys in meta["facets"].items():
+            facet = _Facet.__new__(_Facet)
+            facet.n = idx.n
+            bits = _load_array(path / f"facet_{f}_bits.npy")
+            facet.bits = {v: bits[i] for i, v in enumerate(keys["bits"])}
+            rows_idx = _load_array(path / f"facet_{f}_rows.npy")
+            offsets = _load_array(path / f"facet_{f}_offsets.npy")
+            facet.rows = {v: rows_idx[offsets[i]:offsets[i + 1]] for i, v in enumerate(keys["rows"])}
+            idx.facets[f] = facet
+
+        idx.embedder, idx.vectors = None, None
+        if meta["embedder_fitted"] is not None and LocalEmbedder is not None:
+            idx.embedder = LocalEmbedder(_load_array(path / "embedder_idf.npy"),
+                                         _load_array(path / "embedder_components.npy"), meta["embedder_fitted"])
+            idx.vectors = _load_array(path / "vectors.npy")
+        idx.path, idx.dead = path, None
+        idx.tail_postings, idx.tail_facets, idx.tail_vectors = {}, {}, None
+        idx._positions = None
+        return idx
+
+    # -- incremental generations --------------------------------------------------
+
+    def positions(self, key: Callable[[Mapping[str, Any]], Hashable]) -> Dict[Hashable, int]:
+        """key -> row position of the live rows (built on first use, then carried forward)."""
+        if self._positions is None:
+            dead = self.dead
+            self._positions = {key(r): i for i, r in enumerate(self.rows) if dead is None or not dead[i]}
+        return self._positions
+
+    def apply(self, upserts: Sequence[Mapping[str, Any]], deletes: Iterable[Hashable],
+              key: Callable[[Mapping[str, Any]], Hashable]) -> "HybridIndex":
+        """
+        Next generation with `upserts` added or replacing the rows with the same key and the
+        `deletes` keys removed. This index is left untouched, so searches running on it are
+        unaffected; the new generation shares its built structures and only indexes the
+        changed rows, unless enough has changed that a compacted rebuild is due.
+        """
+        positions = dict(self.positions(key))
+        upserts = list({key(r): r for r in upserts}.values())
+        gone = [positions.pop(k) for k in list(deletes) + [key(r) for r in upserts] if k in positions]
+        n = self.n + len(upserts)
+        dead = np.zeros(n, dtype=bool)
+        if self.dead is not None:
+            dead[:self.n] = self.dead
+        dead[gone] = True
+        rows = (self.rows if isinstance(self.rows, list) else list(self.rows)) + upserts
+        tail = n - self.base_n
+        if tail + int(dead.sum()) > COMPACT_FRACTION * max(n - int(dead.sum()), 1):
+            return HybridIndex([r for i, r in enumerate(rows) if not dead[i]], self.generation + 1)
+
+        nxt = copy.copy(self)
+        nxt.generation, nxt.path = self.generation + 1, None
+        nxt.rows, nxt.n, nxt.dead = rows, n, dead
+        nxt.source = [r for i, r in enumerate(rows) if not dead[i]]
+        nxt.names = self.names + [slug(field_text(field_value(r, "name"))) for r in upserts]
+        for j, r in enumerate(upserts, start=self.n):
+            positions[key(r)] = j
+        nxt._positions = positions
+
+        texts = [self._doc_text(r) for r in upserts]
+        lengths = np.zeros(len(upserts), dtype=np.float32)
+        added: Dict[str, Dict[int, int]] = {}
+        for j, text in enumerate(texts):
+            toks = slug(text).split()
+            lengths[j] = len(toks)
+            for t in toks:
+                tf = added.setdefault(t, {})
+                tf[self.n + j] = tf.get(self.n + j, 0) + 1
+        nxt.tail_postings = dict(self.tail_postings)
+        for t, tf in added.items():
+            docs = np.fromiter(tf.keys(), dtype=np.int32, count=len(tf))
+            freqs = np.fromiter(tf.values(), dtype=np.float32, count=len(tf))
+            old = self.tail_postings.get(t)
+            nxt.tail_postings[t] = (docs, freqs) if old is None else (np.concatenate((old[0], docs)), np.concatenate((old[1], freqs)))
+        nxt.doc_len = np.concatenate((self.doc_len, lengths))
+        nxt.avg_len = float(nxt.doc_len.mean()) if n else 0.0
+
+        nxt.tail_facets = {f: dict(p) for f, p in self.tail_facets.items()}
+        for j, r in enumerate(upserts, start=self.n):
+            for f, value in self._facet_entries(r):
+                p = nxt.tail_facets.setdefault(f, {})
+                p[value] = p.get(value, []) + [j]
+
+        if self.embedder is not None and upserts:
+            vecs = self.embedder.transform(texts)
+            nxt.tail_vectors = vecs if self.tail_vectors is None else np.vstack((self.tail_vectors, vecs))
+        return nxt
+
+    # -- filters ----------------------------------------------------------------
+
+    def mask(self, country: Optional[str] = None, location: Optional[str] = None,
+             product: Optional[str] = None, material: Optional[str] = None,
+             brand: Optional[str] = None, size: Optional[str] = None) -> Optional[np.ndarray]:
+        """
+        Boolean row mask for the given filters (None when nothing is filtered).
+
+        `country` matches the whole normalized value; the other text filters require
+        every token to be present (e.g. location="hong kong" matches country or city).
+        """
+        wanted: List[Tuple[str, str]] = []
+        if country:
+            wanted.append(("country", slug(country)))
+        for facet, value in (("location", location), ("products", product), ("materials", material), ("brands", brand)):
+            wanted += [(facet, t) for t in sorted(tokens(value or ""))]
+        if size:
+            wanted.append(("size", size.lower()))
+        if not wanted:
+            return None
+        bits = None
+        for facet, value in wanted:
+            b = self.facets[facet].bitset(value)
+            bits = b if bits is None else np.bitwise_and(bits, b)
+        mask = np.unpackbits(bits, count=self.base_n).astype(bool)
+        if self.n == self.base_n:
+            return mask
+        tail = np.ones(self.n - self.base_n, dtype=bool)
+        for facet, value in wanted:
+            hit = np.zeros_like(tail)
+            hit[np.asarray(self.tail_facets.get(facet, {}).get(value, []), dtype=np.int64) - self.base_n] = True
+            tail &= hit
+        return np.concatenate((mask, tail))
+
+    def _live(self, allowed: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if self.dead is None:
+            return allowed
+        return ~self.dead if allowed is None else allowed & ~self.dead
+
+    # -- channels ---------------------------------------------------------------
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> Ranked:
+        live = np.flatnonzero(scores > 0)
+        if len(live) > k:
+            live = live[np.argpartition(-scores[live], k - 1)[:k]]
+        live = live[np.argsort(-scores[live], kind="stable")]
+        return live, scores[live]
+
+    def _bm25(self, terms: Iterable[str], allowed: Optional[np.ndarray], k: int,
+              rows: Optional[Tuple[int, int]] = None) -> Ranked:
+        lo, hi = rows or (0, self.n)
+        scores = np.zeros(hi - lo, dtype=np.float32)
+        for t in set(terms):
+            tid = self.vocab.get(t)
+            parts = [self.tail_postings[t]] if t in self.tail_postings else []
+            if tid is not None:
+                a, b = self.post_offsets[tid], self.post_offsets[tid + 1]
+                parts.append((self.post_docs[a:b], self.post_tf[a:b]))
+            if not parts:
+                continue
+            # tombstoned rows still count towards document frequency until compaction
+            df = sum(len(docs) for docs, _ in parts)
+            idf = np.float32(np.log(1.0 + (self.n - df + 0.5) / (df + 0.5)))
+            for docs, tf in parts:
+                a, b = np.searchsorted(docs, (lo, hi))  # postings are sorted by row
+                docs, tf = docs[a:b], tf[a:b]
+                norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self.doc_len[docs] / max(self.avg_len, 1e-9))
+                scores[docs - lo] += idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+        if allowed is not None:
+            scores[~allowed[lo:hi]] = 0.0
+        top, top_scores = self._top(scores, k)
+        return top + lo, top_scores
+
+    def _fuzzy_name(self, query: str, allowed: Optional[np.ndarray], k: int) -> Ranked:
+        if not query:
+            return _NO_HITS
+        idx = np.flatnonzero(allowed) if allowed is not None else None
+        choices = self.names if idx is None else [self.names[i] for i in idx]
+        found = process.extract(query, choices, scorer=fuzz.WRatio, limit=k, score_cutoff=NAME_MIN_SCORE)
+        pos = np.fromiter((j for _, _, j in found), dtype=np.int64, count=len(found))
+        scores = np.fromiter((sc for _, sc, _ in found), dtype=np.float32, count=len(found))
+        return (pos if idx is None else idx[pos]), scores
+
+    def _vector(self, query: str, allowed: Optional[np.ndarray], k: int,
+                rows: Optional[Tuple[int, int]] = None) -> Ranked:
+        if self.vectors is None or not query:
+            return _NO_HITS
+        lo, hi = rows or (0, self.n)
+        q = self.embedder.transform([query])[0]
+        base = len(self.vectors)  # rows past the base matrix are in tail_vectors
+        parts = []
+        if lo < base:
+            parts.append(self.vectors[lo:min(hi, base)] @ q)
+        if hi > base and self.tail_vectors is not None:
+            parts.append(self.tail_vectors[max(lo - base, 0):hi - base] @ q)
+        sims = np.concatenate(parts) if len(parts) > 1 else parts[0] if parts else np.zeros(0, dtype=np.float32)
+        sims[sims < VECTOR_MIN_SIM] = 0.0
+        if allowed is not None:
+            sims[~allowed[lo:hi]] = 0.0
+        top, top_scores = self._top(sims, k)
+        return top + lo, top_scores
+
+    # -- search -----------------------------------------------------------------
+
+    def channels(self, query: str, *, product_type: Optional[str] = None,
+                 filters: Optional[Mapping[str, Optional[str]]] = None, depth: int = CHANNEL_DEPTH,
+                 shard: Optional[Tuple[int, int]] = None) -> Optional[Dict[str, Ranked]]:
+        """
+        Top-`depth` (row ids, raw scores) per channel, or None for an empty query. With
+        `shard=(lo, hi)` only rows lo..hi-1 are scored (BM25 and vector scoring touch only
+        that slice of the postings / matrix); `merge_channels` over the shards gives the same
+        lists as one unsharded call (scores don't depend on the shard).
+        """
+        allowed = self._live(self.mask(**(filters or {})))
+        name_allowed = allowed
+        if shard is not None:
+            part = np.zeros(self.n, dtype=bool)
+            part[shard[0]:shard[1]] = True
+            name_allowed = part if allowed is None else allowed & part
+        terms = {t for term in expand_product_terms(query or "", product_type) for t in term.split()}
+        text = " ".join(filter(None, [query, product_type]))
+        if not terms and not slug(text):
+            return None
+        futures = {
+            "bm25": _POOL.submit(self._bm25, terms, allowed, depth, shard),
+            "name": _POOL.submit(self._fuzzy_name, slug(text), name_allowed, depth),
+            "vector": _POOL.submit(self._vector, text, allowed, depth, shard),
+        }
+        return {channel: fut.result() for channel, fut in futures.items()}
+
+    def search(self, query: str, k: int = 50, *, product_type: Optional[str] = None,
+               filters: Optional[Mapping[str, Optional[str]]] = None,
+               prefer: Optional[Mapping[str, Optional[str]]] = None,
+               depth: int = CHANNEL_DEPTH) -> List[Hit]:
+        """
+        Top-k rows for `query` under hard `filters`; rows matching the soft `prefer`
+        filters are ranked ahead of the rest. Filter keys are the `mask` arguments.
+        An empty query returns the filtered rows in corpus order with score 0.
+        """
+        ranked = self.channels(query, product_type=product_type, filters=filters, depth=max(depth, k))
+        if ranked is None:
+            return self.browse(k, filters=filters, prefer=prefer)
+        return self.fuse(ranked, k, prefer)
+
+    def browse(self, k: int, *, filters: Optional[Mapping[str, Optional[str]]] = None,
+               prefer: Optional[Mapping[str, Optional[str]]] = None) -> List[Hit]:
+        """The first k filtered rows in corpus order (`prefer` matches first), score 0."""
+        allowed = self._live(self.mask(**(filters or {})))
+        rows = np.flatnonzero(allowed) if allowed is not None else np.arange(self.n)
+        return [Hit(int(i), self.rows[i], 0.0) for i in self._prefer(rows, prefer)[:k]]
+
+    def fuse(self, ranked: Mapping[str, Ranked], k: int,
+             prefer: Optional[Mapping[str, Optional[str]]] = None) -> List[Hit]:
+        """Reciprocal rank fusion of per-channel rankings (see `channels`) into the top-k hits."""
+        fused: Dict[int, float] = {}
+        ranks: Dict[int, Dict[str, int]] = {}
+        active = 0.0
+        for channel, (rows, _) in ranked.items():
+            if not len(rows):
+                continue
+            w = CHANNEL_WEIGHTS[channel]
+            active += w
+            for r, i in enumerate(rows.tolist(), start=1):
+                fused[i] = fused.get(i, 0.0) + w / (RRF_K + r)
+                ranks.setdefault(i, {})[channel] = r
+        if not fused:
+            return []
+        best = active / (RRF_K + 1)
+        order = sorted(fused, key=lambda i: -fused[i])
+        order = self._prefer(np.asarray(order, dtype=np.int64), prefer)[:k]
+        return [Hit(int(i), self.rows[i], fused[i] / best, ranks[i]) for i in order]
+
+    def _prefer(self, order: np.ndarray, prefer: Optional[Mapping[str, Optional[str]]]) -> np.ndarray:
+        soft = self.mask(**(prefer or {}))
+        if soft is None or not len(order):
+            return order
+        hit = soft[order]
+        return np.concatenate((order[hit], order[~hit]))
+
+# -- shared corpus indexes ------------------------------------------------------
+
+_INDEXES: Dict[str, Tuple[Hashable, HybridIndex]] = {}
+_INDEX_LOCK = Lock()
+
+# Published generations by id(source); weak so superseded generations can still be freed
+_BY_SOURCE: "weakref.WeakValueDictionary[int, HybridIndex]" = weakref.WeakValueDictionary()
+
+def get_index(name: str, version: Hashable, load_rows: Callable[[], Sequence[Mapping[str, Any]]]) -> HybridIndex:
+    """
+    Shared HybridIndex for corpus `name`, rebuilt only when `version` changes
+    (e.g. a file mtime or a row count + last-updated marker).
+    """
+    cached = _INDEXES.get(name)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _INDEX_LOCK:
+        cached = _INDEXES.get(name)
+        if cached is None or cached[0] != version:
+            cached = (version, HybridIndex(load_rows()))
+            _INDEXES[name] = cached
+        return cached[1]
+
+def index_for_rows(name: str, rows: Sequence[Mapping[str, Any]]) -> HybridIndex:
+    """Index for an in-memory corpus that is replaced (not mutated) when it reloads."""
+    published = _BY_SOURCE.get(id(rows))
+    if published is not None and published.source is rows:
+        return published
+    return get_index(name, (id(rows), len(rows)), lambda: rows)
+
+def update_index(name: str, rows: Sequence[Mapping[str, Any]], upserts: Sequence[Mapping[str, Any]],
+                 deletes: Iterable[Hashable], key: Callable[[Mapping[str, Any]], Hashable]) -> HybridIndex:
+    """
+    Apply row changes to the index of corpus `name` (currently `rows`) and publish the next
+    generation in one swap. Its `source` is the new live row list, which `index_for_rows`
+    then resolves to this generation without a rebuild. The next generation is built (or
+    compacted) outside the lock, which only covers the publish; callers serialize updates
+    of the same corpus.
+    """
+    cached = _INDEXES.get(name)
+    base = cached[1] if cached is not None and cached[0] == (id(rows), len(rows)) else HybridIndex(rows)
+    nxt = base.apply(upserts, deletes, key)
+    with _INDEX_LOCK:
+        publish_index(name, nxt)
+    return nxt
+
+def publish_index(name: str, index: HybridIndex) -> None:
+    """
+    Make `index` what `index_for_rows` returns for `index.source`, under `name` or any other
+    corpus name the same rows are passed in with.
+    """
+    _INDEXES[name] = ((id(index.source), len(index.source)), index)
+    _BY_SOURCE[id(index.source)] = index
@@ -0,0 +1,72 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+import asyncio
+import os
+
+from sla_ai_components.algorithms import scoring_pool as pool
+from sla_ai_components.algorithms.scoring_pool import STATS, ScoringBusy, admitted, amap_shards, map_shards
+from .retrieval import CHANNEL_DEPTH, Hit, HybridIndex, Ranked, merge_channels
+
+# Index searches over the library's scoring pool (sla_ai_components.algorithms.scoring_pool).
+# They ship only the shared generation's path (see shared_index); workers memory-map the
+# same files instead of receiving the corpus.
+SCORING_SHARD_ROWS = int(os.getenv("SCORING_SHARD_ROWS", "5000"))  # smallest index shard worth a task
+
+# -- index search ---------------------------------------------------------------
+
+_WORKER_INDEXES: Dict[str, HybridIndex] = {}  # generation path -> attached index, per worker
+_WORKER_KEEP = 4
+
+def _worker_index(path: str) -> HybridIndex:
+    index = _WORKER_INDEXES.get(path)
+    if index is None:
+        from .shared_index import attach
+        if len(_WORKER_INDEXES) >= _WORKER_KEEP:
+            _WORKER_INDEXES.pop(next(iter(_WORKER_INDEXES)))
+        index = _WORKER_INDEXES[path] = attach(Path(path))
+    return index
+
+def _channels_shard(path: str, query: str, product_type: Optional[str],
+                    filters: Optional[Mapping[str, Optional[str]]], depth: int,
+                    shard: Tuple[int, int]) -> Optional[Dict[str, Ranked]]:
+    return _worker_index(path).channels(query, product_type=product_type, filters=filters, depth=depth, shard=shard)
+
+def _search_shards(index: HybridIndex, query: str, product_type: Optional[str],
+                   filters: Optional[Mapping[str, Optional[str]]], depth: int) -> List[Tuple]:
+    count = max(1, min(pool.SCORING_WORKERS, index.n // max(SCORING_SHARD_ROWS, 1)))
+    bounds = [index.n * i // count for i in range(count + 1)]
+    return [(str(index.path), query, product_type, dict(filters) if filters else None, depth, (lo, hi))
+            for lo, hi in zip(bounds, bounds[1:])]
+
+def _fused(index: HybridIndex, parts: List[Optional[Dict[str, Ranked]]], k: int, depth: int,
+           filters: Optional[Mapping[str, Optional[str]]], prefer: Optional[Mapping[str, Optional[str]]]) -> List[Hit]:
+    if parts[0] is None:  # empty query
+        return index.browse(k, filters=filters, prefer=prefer)
+    return index.fuse(merge_channels(parts, depth), k, prefer)
+
+def search(index: HybridIndex, query: str, k: int = 50, *, product_type: Optional[str] = None,
+           filters: Optional[Mapping[str, Optional[str]]] = None,
+           prefer: Optional[Mapping[str, Optional[str]]] = None, depth: int = CHANNEL_DEPTH) -> List[Hit]:
+    """
+    `index.search` with the channel scoring sharded over the pool. Only a shared generation
+    (`index.path` set) can be attached by the workers; any other index is searched here.
+    """
+    if index.path is None:
+        with admitted():
+            return index.search(query, k, product_type=product_type, filters=filters, prefer=prefer, depth=depth)
+    depth = max(depth, k)
+    parts = map_shards(_channels_shard, _search_shards(index, query, product_type, filters, depth))
+    return _fused(index, parts, k, depth, filters, prefer)
+
+async def asearch(index: HybridIndex, query: str, k: int = 50, *, product_type: Optional[str] = None,
+                  filters: Optional[Mapping[str, Optional[str]]] = None,
+                  prefer: Optional[Mapping[str, Optional[str]]] = None, depth: int = CHANNEL_DEPTH) -> List[Hit]:
+    """`search` for the event loop."""
+    if index.path is None:
+        with admitted():
+            return await asyncio.to_thread(index.search, query, k, product_type=product_type,
+                                           filters=filters, prefer=prefer, depth=depth)
+    depth = max(depth, k)
+    parts = await amap_shards(_channels_shard, _search_shards(index, query, product_type, filters, depth))
+    return _fused(index, parts, k, depth, filters, prefer)
@@ -0,0 +1,106 @@
+from __future__ import annotations
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional, Sequence, Tuple
+import fcntl
+import json
+import logging
+import os
+import shutil
+import time
+
+from .retrieval import HybridIndex, get_index, publish_index
+
+try:  # Arrow row snapshots; standalone deploys of this app may not ship the root package
+    from snapshot import SnapshotRows, read_snapshot, write_snapshot
+except ImportError:  # pragma: no cover
+    SnapshotRows = read_snapshot = write_snapshot = None
+
+log = logging.getLogger(__name__)
+
+# Corpus + HybridIndex shared by all server workers on a host: the first worker to see a
+# new data version builds it once into a generation directory (rows as an Arrow snapshot,
+# index structures as .npy files) and repoints current.json; every worker then attaches
+# read-only through memory maps, so the pages are shared instead of copied per process.
+SHARED_INDEX_DIR = os.getenv("SHARED_INDEX_DIR", ".cache/shared_index")
+# Old generations kept on disk for workers that haven't re-attached yet
+KEEP_GENERATIONS = 2
+
+_ATTACHED: Dict[str, Tuple[str, str, HybridIndex]] = {}  # name -> (version key, generation, index)
+_ATTACH_LOCK = Lock()
+
+def _version_key(version: Hashable) -> str:
+    return json.dumps(version, default=str)
+
+def _current(root: Path) -> Optional[Dict[str, str]]:
+    try:
+        return json.loads((root / "current.json").read_text())
+    except (OSError, ValueError):
+        return None
+
+def attach(path: Path) -> HybridIndex:
+    """Open the saved generation directory `path` read-only (rows and index memory-mapped)."""
+    path = Path(path)
+    table = read_snapshot(path / "rows.arrow")
+    if table is None:
+        raise OSError(f"missing rows snapshot in {path}")
+    return HybridIndex.open(path, SnapshotRows(table))
+
+def _build(root: Path, key: str, load_rows: Callable[[], Sequence[Mapping[str, Any]]]) -> str:
+    rows = list(load_rows())
+    index = HybridIndex(rows)
+    generation = f"gen-{time.time_ns()}-{os.getpid()}"
+    tmp = root / f".{generation}.tmp"
+    tmp.mkdir(parents=True)
+    if not write_snapshot(rows, tmp / "rows.arrow"):
+        raise OSError("pyarrow unavailable")
+    index.save(tmp)
+    os.replace(tmp, root / generation)
+    pointer = root / f"current.json.{os.getpid()}.tmp"
+    pointer.write_text(json.dumps({"generation": generation, "version": key}))
+    os.replace(pointer, root / "current.json")
+    _prune(root, generation)
+    return generation
+
+def _prune(root: Path, current: str) -> None:
+    # Workers still mapping a removed generation keep their pages until they re-attach
+    old = sorted((p for p in root.glob("gen-*") if p.name != current), key=lambda p: p.stat().st_mtime)
+    for path in old[:max(0, len(old) - (KEEP_GENERATIONS - 1))]:
+        shutil.rmtree(path, ignore_errors=True)
+
+def shared_index(name: str, version: Hashable,
+                 load_rows: Callable[[], Sequence[Mapping[str, Any]]]) -> HybridIndex:
+    """
+    HybridIndex for corpus `name` at data `version` (e.g. source file stamps), built at most
+    once per host and attached read-only by every worker. Its `source` is a lazily decoded
+    row sequence, and `index_for_rows` resolves that sequence to this index. Falls back to
+    the process-local `get_index` when pyarrow is missing or the cache dir isn't writable.
+    """
+    key = _version_key(version)
+    attached = _ATTACHED.get(name)
+    if attached is not None and attached[0] == key:
+        return attached[2]
+    if write_snapshot is None:
+        return get_index(name, version, load_rows)
+    root = Path(SHARED_INDEX_DIR) / name
+    with _ATTACH_LOCK:
+        attached = _ATTACHED.get(name)
+        if attached is not None and attached[0] == key:
+            return attached[2]
+        try:
+            root.mkdir(parents=True, exist_ok=True)
+            current = _current(root)
+            if current is None or current.get("version") != key:
+                with open(root / ".lock", "w") as lock:
+                    fcntl.flock(lock, fcntl.LOCK_EX)  # one builder per host; others wait, then attach
+                    current = _current(root)
+                    if current is None or current.get("version") != key:
+                        current = {"generation": _build(root, key, load_rows), "version": key}
+            index = attach(root / current["generation"])
+        except (OSError, ValueError) as e:
+            log.warning("shared index %s unavailable, building in-process: %s", name, e)
+            return get_index(name, version, load_rows)
+        publish_index(name, index)
+        _ATTACHED[name] = (key, current["generation"], index)
+        log.info("attached shared index %s generation %s (%d rows)", name, current["generation"], index.n)
+        return index
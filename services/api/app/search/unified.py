@@ -1,15 +1,31 @@
-import asyncio, time
+import asyncio, os, time
 from typing import List, Dict, Any, Tuple
 from .normalize import expand_product_terms
+from ..utils.singleflight import request_fingerprint, singleflight
+from ..utils.deadline import deadline, within_deadline
 from ..internal_index import recall_internal_legacy, score_row, get_internal_corpus
 from .live import web_recall
 
+# Whole-request budget; each stage is cut off (and flagged in meta) once it is spent
+SEARCH_HARD_BUDGET_MS = int(os.getenv("SEARCH_HARD_BUDGET_MS", "12000"))
+
+_SEARCH_FLIGHT = singleflight("unified_search")
+
 async def perform_unified_search(req) -> Tuple[List[Dict[str,Any]], Dict[str,Any]]:
+    """Identical concurrent requests share one search (and its web / LLM calls)."""
+    return await _SEARCH_FLIGHT.do(request_fingerprint(req), lambda: _perform_unified_search(req))
+
+async def _perform_unified_search(req) -> Tuple[List[Dict[str,Any]], Dict[str,Any]]:
+    with deadline(getattr(req, "time_budget_ms", None) or SEARCH_HARD_BUDGET_MS) as dl:
+        final, meta = await _run_passes(req, dl)
+    meta.update(dl.meta())
+    return final, meta
+
+async def _run_passes(req, dl) -> Tuple[List[Dict[str,Any]], Dict[str,Any]]:
     t0 = time.time()
     passes = []
     results: Dict[str,Dict[str,Any]] = {}
     target = 10
-    hard_budget_ms = 12000
     thresholds = [req.min_score or 80, 75, 70, 65, 60, 55, 50]
 
     # Gather internal corpus once
@@ -35,7 +51,8 @@ async def perform_unified_search(req) -> Tuple[List[Dict[str,Any]], Dict[str,Any
             "customization": req.customization or "any",
             "query_terms": [req.q] if req.q else []
         }
-        internal = recall_internal_legacy(structured_query, top_k=200)
+        internal = await within_deadline(
+            "internal_recall", asyncio.to_thread(recall_internal_legacy, structured_query, 200), [])
 
         # web optionally
         web = await web_recall(req)
@@ -57,7 +74,7 @@ async def perform_unified_search(req) -> Tuple[List[Dict[str,Any]], Dict[str,Any
         kept = await keep(cand, f"pass{p}")
         passes.append({"pass": p, "thr": thr, "candidates": len(cand), "kept": kept, "t": int((time.time()-t0)*1000)})
         if len(results) >= target: break
-        if (time.time()-t0)*1000 >= hard_budget_ms: break
+        if dl.expired: break
 
         # slight relaxation between passes (country softening)
         if p==2 and req.country:
@@ -0,0 +1,97 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Dict, Iterator, List, Optional, TypeVar
+import asyncio
+import inspect
+import math
+import time
+
+# Request deadline carried in a contextvar so every search stage (needs extraction,
+# internal/web recall, rerank, enrichment) bounds its own work without threading a
+# budget argument through each call. Tasks and to_thread workers inherit the context.
+T = TypeVar("T")
+
+@dataclass
+class Deadline:
+    budget_ms: Optional[int]  # None: unbounded
+    at: float  # time.monotonic() deadline
+    started: float = field(default_factory=time.monotonic)
+    timed_out: List[str] = field(default_factory=list)
+
+    def remaining(self) -> float:
+        """Seconds left, never negative."""
+        return max(0.0, self.at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.at
+
+    def skip(self, stage: str) -> None:
+        if stage not in self.timed_out:
+            self.timed_out.append(stage)
+
+    def meta(self) -> Dict[str, Any]:
+        """Fields merged into a response `meta`; `partial` is set when any stage was cut short."""
+        return {
+            "time_budget_ms": self.budget_ms,
+            "partial": bool(self.timed_out),
+            "timed_out_stages": list(self.timed_out),
+        }
+
+_DEADLINE: ContextVar[Optional[Deadline]] = ContextVar("search_deadline", default=None)
+
+def current_deadline() -> Optional[Deadline]:
+    return _DEADLINE.get()
+
+def remaining() -> Optional[float]:
+    """Seconds until the active deadline, or None when no deadline is set."""
+    d = _DEADLINE.get()
+    return None if d is None else d.remaining()
+
+@contextmanager
+def deadline(budget_ms: Optional[float]) -> Iterator[Deadline]:
+    """
+    Bound everything awaited inside the block by `budget_ms`. A nested scope can only
+    tighten an outer deadline, and shares its record of timed-out stages. Without a
+    budget (None or <= 0) the outer deadline applies; with none either, the block gets
+    an unbounded Deadline, so callers can always report `meta()`.
+    """
+    outer = _DEADLINE.get()
+    if not budget_ms or budget_ms <= 0:
+        yield outer if outer is not None else Deadline(None, math.inf)
+        return
+    at = time.monotonic() + float(budget_ms) / 1000.0
+    if outer is not None and outer.at <= at:
+        yield outer
+        return
+    d = Deadline(int(budget_ms), at)
+    if outer is not None:
+        d.started, d.timed_out = outer.started, outer.timed_out
+    token = _DEADLINE.set(d)
+    try:
+        yield d
+    finally:
+        _DEADLINE.reset(token)
+
+async def within_deadline(stage: str, aw: Awaitable[T], default: T) -> T:
+    """
+    Await `aw` for at most the time left on the active deadline. On expiry the stage is
+    cancelled, recorded on the deadline and `default` is returned (best-effort partial result).
+    """
+    d = _DEADLINE.get()
+    if d is None:
+        return await aw
+    if d.expired:
+        if inspect.iscoroutine(aw):
+            aw.close()
+        else:
+            asyncio.ensure_future(aw).cancel()
+        d.skip(stage)
+        return default
+    try:
+        return await asyncio.wait_for(aw, d.remaining())
+    except asyncio.TimeoutError:
+        d.skip(stage)
+        return default
@@ -0,0 +1,109 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+import asyncio
+import hashlib
+import json
+
+# Single-flight request coalescing: concurrent callers with the same fingerprint await
+# one in-flight task instead of each hitting the backend. Nothing is kept once the task
+# finishes, so this complements (and sits in front of) the LLM response cache.
+T = TypeVar("T")
+
+def _normalize(v: Any) -> Any:
+    if isinstance(v, str):
+        return " ".join(v.split())
+    if isinstance(v, dict):
+        return {str(k): _normalize(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple, set)):
+        items = [_normalize(x) for x in v]
+        return sorted(items, key=repr) if isinstance(v, set) else items
+    if isinstance(v, bytes):
+        return hashlib.sha256(v).hexdigest()
+    if hasattr(v, "model_dump"):  # pydantic request bodies
+        return _normalize(v.model_dump())
+    return v
+
+def request_fingerprint(*parts: Any, **named: Any) -> str:
+    """
+    Stable hash of a request: whitespace runs in strings collapsed, bytes hashed, models
+    dumped. Case is kept: "US" vs "us" or a case-sensitive id can change the answer.
+    """
+    payload = json.dumps([_normalize(list(parts)), _normalize(named)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+@dataclass
+class SingleFlight:
+    """
+    Coalesces concurrent `do(key, fn)` calls per event loop.
+
+    Errors raised by `fn` reach every waiter. A cancelled waiter only detaches; the
+    shared task is cancelled once its last waiter has gone.
+    """
+    name: str
+    calls: int = 0
+    executions: int = 0
+    _flights: Dict[Tuple[int, str], _Flight] = field(default_factory=dict)
+
+    @property
+    def coalesced(self) -> int:
+        return self.calls - self.executions
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        fkey = (id(loop), key)
+        flight = self._flights.get(fkey)
+        self.calls += 1
+        if flight is None or flight.task.done():
+            self.executions += 1
+            task = loop.create_task(fn())
+            flight = self._flights[fkey] = _Flight(task)
+            task.add_done_callback(lambda t, fkey=fkey: self._forget(fkey, t))
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and self._detach(fkey, flight):
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _detach(self, fkey: Tuple[int, str], flight: _Flight) -> bool:
+        """True when the cancelled caller was the last waiter; the flight is dropped so new callers start fresh."""
+        if flight.waiters > 1:
+            return False
+        if self._flights.get(fkey) is flight:
+            del self._flights[fkey]
+        return True
+
+    def _forget(self, fkey: Tuple[int, str], task: asyncio.Task) -> None:
+        flight = self._flights.get(fkey)
+        if flight is not None and flight.task is task:
+            del self._flights[fkey]
+        if not task.cancelled():
+            task.exception()  # mark retrieved; waiters already got it
+
+    def stats(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "executions": self.executions, "coalesced": self.coalesced,
+                "in_flight": len(self._flights)}
+
+_GROUPS: Dict[str, SingleFlight] = {}
+_GROUPS_LOCK = Lock()
+
+def singleflight(name: str) -> SingleFlight:
+    with _GROUPS_LOCK:
+        group = _GROUPS.get(name)
+        if group is None:
+            group = _GROUPS[name] = SingleFlight(name)
+        return group
+
+def singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    with _GROUPS_LOCK:
+        return {name: g.stats() for name, g in sorted(_GROUPS.items())}
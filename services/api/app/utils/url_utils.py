@@ -1,4 +1,5 @@
 import re
+from urllib.parse import parse_qsl, urlencode, urlsplit
 
 def _ensure_scheme(u: str) -> str:
     u = u.strip()
@@ -28,3 +29,21 @@ def prefer_url(row: dict) -> str:
             if "." in u:
                 return u
     return ""
+
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|gclid|fbclid|msclkid|spm|ref|ref_src|source)$", re.I)
+
+def canonical_url(u: str) -> str:
+    """Dedupe key for a URL: scheme-, www-, fragment-, tracking-param- and trailing-slash-insensitive."""
+    u = _ensure_scheme(u or "")
+    if not u:
+        return ""
+    p = urlsplit(u)
+    host = (p.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if p.port and p.port not in (80, 443):
+        host = f"{host}:{p.port}"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(p.query, keep_blank_values=True)
+                             if not _TRACKING_PARAMS.match(k)))
+    path = re.sub(r"/+$", "", p.path) or ""
+    return f"{host}{path}" + (f"?{query}" if query else "")
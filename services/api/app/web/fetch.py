@@ -1,24 +1,180 @@
 from __future__ import annotations
 import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
 import httpx
-from typing import List, Dict, Any, Optional
-import trafilatura
-from urllib.parse import urljoin, urlparse
+
+# One pooled client per event loop, a per-host concurrency cap, a byte cap on bodies,
+# conditional re-fetches (ETag / Last-Modified) and an on-disk cache of extracted
+# text, read and written in threads. Extraction (trafilatura) is CPU-bound and runs
+# in a process pool.
+FETCH_CACHE_DIR = os.getenv("WEB_FETCH_CACHE_DIR", ".cache/web_fetch")
+FETCH_FRESH_S = float(os.getenv("WEB_FETCH_FRESH_S", str(6 * 3600)))  # served without revalidating
+FETCH_MAX_BYTES = int(os.getenv("WEB_FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+FETCH_PER_HOST = int(os.getenv("WEB_FETCH_PER_HOST", "4"))
+FETCH_MAX_CONNECTIONS = int(os.getenv("WEB_FETCH_MAX_CONNECTIONS", "64"))
+FETCH_EXTRACT_WORKERS = int(os.getenv("WEB_FETCH_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+FETCH_USER_AGENT = "Mozilla/5.0 (compatible; SLA-supplier-fetch/1.0)"
+_TEXT_TYPES = ("text/", "application/xhtml", "application/xml")
+
+def _extract_readable(html: str, url: str) -> Optional[str]:
+    """Runs in a worker process; trafilatura is only imported there."""
+    import trafilatura
+    return trafilatura.extract(html, url=url) or None
+
+_EXTRACT_POOL: Optional[ProcessPoolExecutor] = None
+_EXTRACT_POOL_LOCK = threading.Lock()
+
+def extract_pool() -> ProcessPoolExecutor:
+    global _EXTRACT_POOL
+    with _EXTRACT_POOL_LOCK:
+        if _EXTRACT_POOL is None:
+            _EXTRACT_POOL = ProcessPoolExecutor(max_workers=FETCH_EXTRACT_WORKERS)
+        return _EXTRACT_POOL
+
+class TextCache:
+    """Extracted text plus validators, one JSON file per URL."""
+
+    def __init__(self, root: str = FETCH_CACHE_DIR):
+        self.root = Path(root)
+
+    def _path(self, url: str) -> Path:
+        return self.root / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json"
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self._path(url).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, entry: Dict[str, Any]) -> None:
+        path = self._path(url)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+class WebFetcher:
+    """
+    Loop-bound fetcher; use `get_fetcher()` for the shared instance of the running loop.
+    `extractor` must be picklable when `executor` is a process pool.
+    """
+
+    def __init__(self, *, cache: Optional[TextCache] = None, per_host: int = FETCH_PER_HOST,
+                 max_bytes: int = FETCH_MAX_BYTES, fresh_s: float = FETCH_FRESH_S,
+                 extractor: Callable[[str, str], Optional[str]] = _extract_readable,
+                 executor: Optional[Executor] = None, timeout: float = 10.0):
+        self.cache = cache or TextCache()
+        self.per_host = per_host
+        self.max_bytes = max_bytes
+        self.fresh_s = fresh_s
+        self.extractor = extractor
+        self.executor = executor
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=True,
+            headers={"User-Agent": FETCH_USER_AGENT},
+            limits=httpx.Limits(max_connections=FETCH_MAX_CONNECTIONS, max_keepalive_connections=FETCH_MAX_CONNECTIONS // 2),
+        )
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self.counts = {"fresh_hits": 0, "not_modified": 0, "fetched": 0, "truncated": 0, "errors": 0}
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc.lower()
+        sem = self._hosts.get(host)
+        if sem is None:
+            sem = self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return sem
+
+    async def _read_capped(self, response: httpx.Response) -> tuple[bytes, bool]:
+        declared = response.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > self.max_bytes * 4:
+            return b"", True  # far over the cap; don't bother downloading
+        chunks, size = [], 0
+        async for chunk in response.aiter_bytes():
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.max_bytes:
+                return b"".join(chunks)[:self.max_bytes], True
+        return b"".join(chunks), False
+
+    async def fetch_text(self, url: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Readable text of `url`, from cache when fresh or unchanged upstream; None on failure."""
+        cached = await asyncio.to_thread(self.cache.get, url)
+        if cached is not None and time.time() - cached.get("fetched_at", 0) < self.fresh_s:
+            self.counts["fresh_hits"] += 1
+            return cached.get("text") or None
+
+        headers = {}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        try:
+            async with self._host_slot(url):
+                request = self.client.build_request("GET", url, headers=headers, timeout=timeout or httpx.USE_CLIENT_DEFAULT)
+                response = await self.client.send(request, stream=True)
+                try:
+                    if response.status_code == 304 and cached is not None:
+                        self.counts["not_modified"] += 1
+                        await asyncio.to_thread(self.cache.put, url, {**cached, "fetched_at": time.time()})
+                        return cached.get("text") or None
+                    response.raise_for_status()
+                    ctype = response.headers.get("content-type", "text/html").lower()
+                    if not ctype.startswith(_TEXT_TYPES):
+                        return None
+                    body, truncated = await self._read_capped(response)
+                finally:
+                    await response.aclose()
+            html = body.decode(response.charset_encoding or "utf-8", errors="replace")
+            loop = asyncio.get_running_loop()
+            text = await loop.run_in_executor(self.executor or extract_pool(), self.extractor, html, url) if html else None
+        except Exception as e:
+            self.counts["errors"] += 1
+            print(f"Failed to fetch {url}: {e}")
+            return None
+
+        self.counts["fetched"] += 1
+        self.counts["truncated"] += truncated
+        await asyncio.to_thread(self.cache.put, url, {
+            "url": url,
+            "text": text or "",
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "truncated": truncated,
+            "fetched_at": time.time(),
+        })
+        return text
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+_FETCHERS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, WebFetcher]" = weakref.WeakKeyDictionary()
+
+def get_fetcher() -> WebFetcher:
+    """Shared fetcher (and connection pool) of the running event loop."""
+    loop = asyncio.get_running_loop()
+    fetcher = _FETCHERS.get(loop)
+    if fetcher is None:
+        fetcher = _FETCHERS[loop] = WebFetcher()
+    return fetcher
 
 async def fetch_url_content(url: str, timeout: float = 10.0) -> Optional[str]:
     """Fetch and extract readable text from a URL"""
-    try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.get(url, follow_redirects=True)
-            response.raise_for_status()
-            
-            # Extract readable text using trafilatura
-            text = trafilatura.extract(response.text, url=url)
-            return text if text else None
-            
-    except Exception as e:
-        print(f"Failed to fetch {url}: {e}")
-        return None
+    return await get_fetcher().fetch_text(url, timeout=timeout)
 
 async def fetch_multiple_urls(urls: List[str], max_concurrent: int = 5) -> Dict[str, Optional[str]]:
     """Fetch multiple URLs concurrently with rate limiting"""
@@ -29,7 +185,7 @@ async def fetch_multiple_urls(urls: List[str], max_concurrent: int = 5) -> Dict[
             content = await fetch_url_content(url)
             return url, content
     
-    tasks = [fetch_with_semaphore(url) for url in urls]
+    tasks = [fetch_with_semaphore(url) for url in dict.fromkeys(urls)]
     results = await asyncio.gather(*tasks, return_exceptions=True)
     
     url_contents = {}
@@ -42,14 +198,24 @@ async def fetch_multiple_urls(urls: List[str], max_concurrent: int = 5) -> Dict[
     
     return url_contents
 
+_BG_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_BG_LOOP_LOCK = threading.Lock()
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Long-lived loop thread for sync callers, so they share one pooled client too."""
+    global _BG_LOOP
+    with _BG_LOOP_LOCK:
+        if _BG_LOOP is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="web-fetch-loop", daemon=True).start()
+            _BG_LOOP = loop
+        return _BG_LOOP
+
 def fetch_readable(url: str, timeout: float = 10.0) -> Optional[str]:
-    """Fetch and extract readable text from a URL (single URL version)"""
+    """Fetch and extract readable text from a URL (single URL version, for sync callers)"""
     try:
-        async def _fetch():
-            return await fetch_url_content(url, timeout)
-        
-        import asyncio
-        return asyncio.run(_fetch())
+        future = asyncio.run_coroutine_threadsafe(fetch_url_content(url, timeout), _background_loop())
+        return future.result(timeout=timeout * 3)
     except Exception as e:
         print(f"Failed to fetch {url}: {e}")
         return None
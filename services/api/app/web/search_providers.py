@@ -1,24 +1,39 @@
 from __future__ import annotations
 import os
 import asyncio
-from typing import List, Dict, Any, Optional
-from duckduckgo_search import DDGS
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Dict, Any, Optional, Tuple
 import httpx
 from ..core.settings import settings
+from ..utils.url_utils import canonical_url
+
+# Fan-out knobs: each provider gets its own timeout, the fan-out returns as soon as
+# `enough` unique (canonical-URL) results are in, and answers are kept briefly per query.
+PROVIDER_TIMEOUT_S = float(os.getenv("SEARCH_PROVIDER_TIMEOUT_S", "8"))
+SEARCH_CACHE_TTL_S = float(os.getenv("SEARCH_PROVIDER_CACHE_TTL_S", "300"))
+SEARCH_CACHE_ENTRIES = 256
+
+Provider = Callable[[str, int], Awaitable[List[Dict[str, Any]]]]
+
+def _ddg_text(query: str, max_results: int) -> List[Dict[str, Any]]:
+    # DDGS is a blocking client; this runs in a worker thread
+    from duckduckgo_search import DDGS
+    with DDGS() as ddgs:
+        return list(ddgs.text(query, max_results=max_results))
 
 async def duckduckgo_search(query: str, max_results: int = 20) -> List[Dict[str, Any]]:
     """Search using DuckDuckGo (free, no API key required)"""
     try:
-        with DDGS() as ddgs:
-            results = []
-            for result in ddgs.text(query, max_results=max_results):
-                results.append({
-                    "title": result.get("title", ""),
-                    "url": result.get("href", ""),
-                    "snippet": result.get("body", ""),
-                    "source": "duckduckgo"
-                })
-            return results
+        results = []
+        for result in await asyncio.to_thread(_ddg_text, query, max_results):
+            results.append({
+                "title": result.get("title", ""),
+                "url": result.get("href", ""),
+                "snippet": result.get("body", ""),
+                "source": "duckduckgo"
+            })
+        return results
     except Exception as e:
         print(f"DuckDuckGo search error: {e}")
         return []
@@ -81,30 +96,61 @@ async def serper_search(query: str, max_results: int = 20) -> List[Dict[str, Any
         print(f"Serper search error: {e}")
         return []
 
-async def search_all_providers(query: str, max_results_per_provider: int = 20) -> List[Dict[str, Any]]:
-    """Search all available providers concurrently"""
-    tasks = [
-        duckduckgo_search(query, max_results_per_provider),
-        bing_search(query, max_results_per_provider),
-        serper_search(query, max_results_per_provider)
-    ]
-    
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    
-    all_results = []
-    for result in results:
-        if isinstance(result, list):
-            all_results.extend(result)
-        else:
-            print(f"Search provider error: {result}")
-    
-    # Deduplicate by URL
+PROVIDERS: Dict[str, Provider] = {
+    "duckduckgo": duckduckgo_search,
+    "bing": bing_search,
+    "serper": serper_search,
+}
+
+_RESULT_CACHE: "OrderedDict[Tuple[Any, ...], Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+
+async def _timed(name: str, provider: Provider, query: str, max_results: int, timeout_s: float) -> List[Dict[str, Any]]:
+    try:
+        return await asyncio.wait_for(provider(query, max_results), timeout_s)
+    except asyncio.TimeoutError:
+        print(f"Search provider {name} timed out after {timeout_s}s")
+        return []
+
+async def search_all_providers(query: str, max_results_per_provider: int = 20, *, enough: Optional[int] = None,
+                               timeout_s: float = PROVIDER_TIMEOUT_S,
+                               providers: Optional[Dict[str, Provider]] = None) -> List[Dict[str, Any]]:
+    """
+    Search all available providers concurrently, each bounded by `timeout_s`. Results are
+    merged in arrival order and deduplicated by canonical URL. By default this is the union
+    of every provider; callers that can settle for fewer (tool calls) opt in with `enough`,
+    and slower providers are cancelled once that many unique results are in.
+    """
+    providers = PROVIDERS if providers is None else providers
+    key = (tuple(providers), " ".join(query.lower().split()), max_results_per_provider, enough)
+    hit = _RESULT_CACHE.get(key)
+    if hit is not None and hit[0] > time.monotonic():
+        return [dict(r) for r in hit[1]]
+
+    tasks = [asyncio.create_task(_timed(name, fn, query, max_results_per_provider, timeout_s))
+             for name, fn in providers.items()]
     seen_urls = set()
     deduped = []
-    for item in all_results:
-        url = item.get("url", "")
-        if url and url not in seen_urls:
-            seen_urls.add(url)
-            deduped.append(item)
-    
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                result = await next_done
+            except Exception as e:
+                print(f"Search provider error: {e}")
+                continue
+            for item in result:
+                url = canonical_url(item.get("url", ""))
+                if url and url not in seen_urls:
+                    seen_urls.add(url)
+                    deduped.append(item)
+            if enough and len(deduped) >= enough:
+                break
+    finally:
+        for t in tasks:
+            t.cancel()
+
+    if deduped:
+        _RESULT_CACHE[key] = (time.monotonic() + SEARCH_CACHE_TTL_S, [dict(r) for r in deduped])
+        _RESULT_CACHE.move_to_end(key)
+        while len(_RESULT_CACHE) > SEARCH_CACHE_ENTRIES:
+            _RESULT_CACHE.popitem(last=False)
     return deduped
@@ -0,0 +1,266 @@
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+from threading import RLock
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+# Content-addressed LLM response cache: an in-process LRU in front of a SQLite table.
+# Keys hash (model, normalized prompt, tools, temperature); only deterministic calls
+# (temperature == 0) are cached, everything else bypasses both tiers.
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", ".cache/llm_cache.sqlite")
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+LLM_CACHE_DISABLED = os.getenv("LLM_CACHE_DISABLED", "0") == "1"
+_SQL_BATCH = 500  # keys per IN (...) lookup, under SQLite's bound-parameter limit
+
+# Reasoning models reject `temperature`, so their output can't be pinned and isn't cached
+_NO_TEMPERATURE_MODELS = ("gpt-5", "o1", "o3", "o4")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+  key TEXT PRIMARY KEY,
+  site TEXT NOT NULL,
+  value TEXT NOT NULL,
+  elapsed_ms REAL NOT NULL,
+  created_at REAL NOT NULL,
+  expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_expires ON llm_cache(expires_at);
+"""
+
+def deterministic_temperature(model: str) -> Optional[float]:
+    """Temperature to request for a reproducible answer, or None if the model can't be pinned."""
+    return None if (model or "").lower().startswith(_NO_TEMPERATURE_MODELS) else 0.0
+
+def sampling_params(temperature: Optional[float]) -> Dict[str, Any]:
+    return {} if temperature is None else {"temperature": temperature}
+
+def is_deterministic(temperature: Optional[float]) -> bool:
+    return temperature is not None and float(temperature) == 0.0
+
+def normalize_prompt(prompt: Any) -> Any:
+    """Collapse whitespace in every string of a prompt (str, message list or nested dicts)."""
+    if isinstance(prompt, str):
+        return " ".join(prompt.split())
+    if isinstance(prompt, dict):
+        return {k: normalize_prompt(v) for k, v in prompt.items()}
+    if isinstance(prompt, (list, tuple)):
+        return [normalize_prompt(v) for v in prompt]
+    return prompt
+
+def cache_key(model: str, prompt: Any, tools: Any = None, temperature: Optional[float] = None) -> str:
+    payload = {"model": model, "prompt": normalize_prompt(prompt), "tools": tools or [], "temperature": temperature}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode()).hexdigest()
+
+class LLMResponseCache:
+    """
+    Two-tier store of JSON-encoded responses. The memory tier holds encoded strings so
+    every hit decodes a fresh copy that callers are free to mutate.
+    """
+
+    def __init__(self, db_path: str = LLM_CACHE_DB, memory_entries: int = LLM_CACHE_MEMORY_ENTRIES):
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()  # key -> (value, elapsed_ms, expires_at)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = RLock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: str, entry: Tuple[str, float, float]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Tuple[Any, float, str]]:
+        """(value, original elapsed_ms, tier) for a live entry, else None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            tier = "memory"
+            if entry is not None and entry[2] <= now:
+                del self._memory[key]
+                entry = None
+            if entry is None:
+                row = self._db().execute(
+                    "SELECT value, elapsed_ms, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is None:
+                    return None
+                entry, tier = (row[0], float(row[1]), float(row[2])), "disk"
+            self._remember(key, entry)
+        return json.loads(entry[0]), entry[1], tier
+
+    def set(self, key: str, site: str, value: Any, ttl_s: float, elapsed_ms: float) -> None:
+        now = time.time()
+        entry = (json.dumps(value, ensure_ascii=False, default=str), float(elapsed_ms), now + ttl_s)
+        with self._lock:
+            self._remember(key, entry)
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, site, value, elapsed_ms, created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, site, entry[0], entry[1], now, entry[2]),
+            )
+            db.commit()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Tuple[Any, float, str]]:
+        """`get` for many keys: the memory misses are looked up in one query."""
+        now = time.time()
+        found: Dict[str, Tuple[str, float, float]] = {}
+        tiers: Dict[str, str] = {}
+        with self._lock:
+            missing = []
+            for key in dict.fromkeys(keys):
+                entry = self._memory.get(key)
+                if entry is not None and entry[2] <= now:
+                    del self._memory[key]
+                    entry = None
+                if entry is None:
+                    missing.append(key)
+                else:
+                    found[key], tiers[key] = entry, "memory"
+            for i in range(0, len(missing), _SQL_BATCH):
+                batch = missing[i:i + _SQL_BATCH]
+                rows = self._db().execute(
+                    f"SELECT key, value, elapsed_ms, expires_at FROM llm_cache WHERE key IN ({','.join('?' * len(batch))}) AND expires_at > ?",
+                    (*batch, now),
+                ).fetchall()
+                for key, value, elapsed_ms, expires_at in rows:
+                    found[key], tiers[key] = (value, float(elapsed_ms), float(expires_at)), "disk"
+            for key, entry in found.items():
+                self._remember(key, entry)
+        return {key: (json.loads(entry[0]), entry[1], tiers[key]) for key, entry in found.items()}
+
+    def set_many(self, site: str, items: Sequence[Tuple[str, Any, float]], ttl_s: float) -> None:
+        """`set` for many (key, value, elapsed_ms) in one transaction."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, site, json.dumps(value, ensure_ascii=False, default=str), float(elapsed_ms), now, now + ttl_s)
+                for key, value, elapsed_ms in items]
+        with self._lock:
+            for key, _, value, elapsed_ms, _, expires_at in rows:
+                self._remember(key, (value, elapsed_ms, expires_at))
+            db = self._db()
+            db.executemany(
+                "INSERT OR REPLACE INTO llm_cache (key, site, value, elapsed_ms, created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            db.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            db = self._db()
+            n = db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            db.commit()
+            return n
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            db = self._db()
+            db.execute("DELETE FROM llm_cache")
+            db.commit()
+
+class CacheSite:
+    """One LLM call site: its TTL plus hit/miss/bypass counters and the latency hits saved."""
+
+    def __init__(self, name: str, ttl_s: float, cache: Optional[LLMResponseCache] = None):
+        self.name = name
+        self.ttl_s = ttl_s
+        self._cache = cache
+        self._lock = RLock()
+        self.hits = self.memory_hits = self.misses = self.bypassed = 0
+        self.saved_ms = 0.0
+
+    @property
+    def cache(self) -> LLMResponseCache:
+        return self._cache or get_llm_cache()
+
+    def _lookup(self, temperature: Optional[float], key_args: Dict[str, Any]) -> Tuple[Optional[str], Any]:
+        if LLM_CACHE_DISABLED or not is_deterministic(temperature):
+            with self._lock:
+                self.bypassed += 1
+            return None, None
+        key = cache_key(temperature=temperature, **key_args)
+        found = self.cache.get(key)
+        with self._lock:
+            if found is None:
+                self.misses += 1
+                return key, None
+            self.hits += 1
+            self.memory_hits += found[2] == "memory"
+            self.saved_ms += found[1]
+        return key, found
+
+    def call(self, fn: Callable[[], Any], *, model: str, prompt: Any, tools: Any = None,
+             temperature: Optional[float] = None) -> Any:
+        """Return the cached result for this request or run `fn` and cache what it returns."""
+        key, found = self._lookup(temperature, {"model": model, "prompt": prompt, "tools": tools})
+        if found is not None:
+            return found[0]
+        t0 = time.perf_counter()
+        value = fn()
+        if key is not None:
+            self.cache.set(key, self.name, value, self.ttl_s, (time.perf_counter() - t0) * 1000)
+        return value
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], *, model: str, prompt: Any, tools: Any = None,
+                    temperature: Optional[float] = None) -> Any:
+        key, found = self._lookup(temperature, {"model": model, "prompt": prompt, "tools": tools})
+        if found is not None:
+            return found[0]
+        t0 = time.perf_counter()
+        value = await fn()
+        if key is not None:
+            self.cache.set(key, self.name, value, self.ttl_s, (time.perf_counter() - t0) * 1000)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "saved_ms": round(self.saved_ms, 1),
+            }
+
+_CACHE: Optional[LLMResponseCache] = None
+_SITES: Dict[str, CacheSite] = {}
+_REGISTRY_LOCK = RLock()
+
+def get_llm_cache() -> LLMResponseCache:
+    global _CACHE
+    with _REGISTRY_LOCK:
+        if _CACHE is None:
+            _CACHE = LLMResponseCache()
+        return _CACHE
+
+def cache_site(name: str, ttl_s: float) -> CacheSite:
+    """Registered call site; LLM_CACHE_TTL_<NAME> (seconds) overrides the default TTL."""
+    with _REGISTRY_LOCK:
+        site = _SITES.get(name)
+        if site is None:
+            ttl_s = float(os.getenv(f"LLM_CACHE_TTL_{name.upper()}", ttl_s))
+            site = _SITES[name] = CacheSite(name, ttl_s)
+        return site
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    with _REGISTRY_LOCK:
+        return {name: site.stats() for name, site in sorted(_SITES.items())}
@@ -0,0 +1,127 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+import numpy as np
+
+# Goal-aware rerank of search candidates. A user's active goals are compiled once into a
+# GoalProfile (one array entry per goal); a rerank extracts one feature column per metric
+# the goals use and computes every goal gain and impact as array operations.
+
+_COST = (("total_cost", "unit_cost"), "avg_cost_benchmark")
+_TIME = (("total_days", "transit_days"), "avg_days_benchmark")
+
+def _metric_columns(goal: Mapping[str, Any]) -> Tuple[Tuple[str, ...], Optional[str]]:
+    """(item keys for the value, first truthy wins; benchmark key or None) of a goal."""
+    if goal.get("metric") == "cost":
+        return _COST
+    if goal.get("metric") == "time":
+        return _TIME
+    return (f"custom_value::{goal.get('unit', 'custom')}",), None
+
+@dataclass(frozen=True)
+class GoalProfile:
+    version: Hashable  # data version the goals were read at
+    goals: Tuple[Dict[str, Any], ...]
+    default_weight: float
+    columns: Tuple[Tuple[str, ...], ...]  # feature columns, as item keys
+    value_col: np.ndarray   # per goal: column of the candidate's value
+    bench_col: np.ndarray   # per goal: column of the benchmark (-1: none)
+    baseline: np.ndarray    # per goal: baseline_amount, 0 when unset
+    gain_bench: np.ndarray  # per goal: gain measured against the benchmark (baseline is None)
+    impact_bench: np.ndarray  # per goal: impact measured against the benchmark (baseline falsy)
+    sign: np.ndarray        # +1 when the goal is to decrease the metric, -1 to increase it
+    target: np.ndarray
+    weight: np.ndarray
+
+    @classmethod
+    def from_goals(cls, goals: Sequence[Mapping[str, Any]], version: Hashable = 0,
+                   default_weight: float = 0.30) -> "GoalProfile":
+        columns: Dict[Tuple[str, ...], int] = {}
+        value_col, bench_col = [], []
+        for g in goals:
+            keys, bench = _metric_columns(g)
+            value_col.append(columns.setdefault(keys, len(columns)))
+            bench_col.append(columns.setdefault((bench,), len(columns)) if bench else -1)
+        baselines = [g.get("baseline_amount") for g in goals]
+        has_bench = np.array(bench_col, dtype=np.int64) >= 0
+        return cls(
+            version=version,
+            goals=tuple(dict(g) for g in goals),
+            default_weight=default_weight,
+            columns=tuple(columns),
+            value_col=np.array(value_col, dtype=np.int64),
+            bench_col=np.array(bench_col, dtype=np.int64),
+            baseline=np.array([float(b or 0.0) for b in baselines]),
+            gain_bench=has_bench & np.array([b is None for b in baselines], dtype=bool),
+            impact_bench=has_bench & np.array([not b for b in baselines], dtype=bool),
+            sign=np.array([1.0 if g.get("direction") == "decrease" else -1.0 for g in goals]),
+            target=np.array([float(g.get("target_amount") or 0) for g in goals]),
+            weight=np.array([float(g.get("weight") or default_weight) for g in goals]),
+        )
+
+    def features(self, items: Sequence[Mapping[str, Any]]) -> np.ndarray:
+        """(len(items), len(columns)) candidate feature matrix; missing values are 0."""
+        out = np.zeros((len(items), len(self.columns)))
+        for j, keys in enumerate(self.columns):
+            if len(keys) == 1:
+                (k,) = keys
+                col = [it.get(k) or 0.0 for it in items]
+            else:
+                a, b = keys
+                col = [it.get(a) or it.get(b) or 0.0 for it in items]
+            out[:, j] = np.asarray(col, dtype=float)
+        return out
+
+    def gains(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (goal gain fraction per candidate, (n, goals) improvement toward each goal).
+        The gain is the weighted mean over goals of improvement / target, each clipped to
+        0..1; goals without a positive target count toward the weights but never gain.
+        """
+        values = features[:, self.value_col]
+        bench = features[:, np.maximum(self.bench_col, 0)]
+        ref = np.where(self.gain_bench, bench, self.baseline)
+        improve = np.maximum(0.0, self.sign * (ref - values))
+        positive = self.target > 0
+        frac = np.zeros_like(improve)
+        np.divide(improve, self.target, out=frac, where=positive)
+        total = float(self.weight.sum())
+        gain = np.minimum(frac, 1.0) @ self.weight / total if total > 0 else np.zeros(len(features))
+        ref = np.where(self.impact_bench, bench, self.baseline)
+        return gain, np.maximum(0.0, self.sign * (ref - values))
+
+def goal_rerank(items: List[Dict[str, Any]], profile: GoalProfile,
+                attach: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    `items` reordered by final score = base score * (1 + default_weight * goal gain), ties
+    kept in their incoming order. The first `attach` of the result (all when None) get
+    goal_gain_fraction, final_score and their per-goal goal_impacts.
+    """
+    if not profile.goals or not items:
+        return items
+    gain, delta = profile.gains(profile.features(items))
+    base = np.asarray([it.get("score") or it.get("base_score") or 0.0 for it in items], dtype=float)
+    final = base * (1.0 + profile.default_weight * gain)
+    order = np.argsort(-final, kind="stable")
+    top = order if attach is None else order[:attach]
+    pct = np.zeros_like(delta[top])
+    np.divide(delta[top], profile.target, out=pct, where=profile.target != 0)
+    pct = np.minimum(pct, 1.0)
+    for i, g_frac, f, row_delta, row_pct in zip(top.tolist(), gain[top].tolist(), final[top].tolist(),
+                                                 delta[top].tolist(), pct.tolist()):
+        it = items[i]
+        it["goal_gain_fraction"] = g_frac
+        it["final_score"] = f
+        it.setdefault("goal_impacts", []).extend(
+            {
+                "goal_id": g["id"],
+                "metric": g["metric"],
+                "unit": g["unit"],
+                "direction": g["direction"],
+                "delta": round(d, 3),
+                "target": float(g["target_amount"]),
+                "pct_to_goal": p,
+            }
+            for g, d, p in zip(profile.goals, row_delta, row_pct)
+        )
+    return [items[i] for i in order.tolist()]
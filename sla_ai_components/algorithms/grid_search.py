@@ -1,10 +1,12 @@
 from __future__ import annotations
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Sequence, Tuple
 from sla_ai_components.algorithms.score import (
     cosine_match,
     compute_cost,
+    cost_bounds,
     logistics_score,
     rank_candidates,
+    top_k_candidates,
 )
 
 def grid_rank(
@@ -15,9 +17,41 @@ def grid_rank(
     lanes: List[Dict[str, Any]],
     params: Dict[str, Any]
 ) -> List[Dict[str, Any]]:
+    return rank_candidates(grid_candidates(spec_vec=spec_vec, factories=factories,
+                                           materials=materials, lanes=lanes, params=params))
+
+def grid_rank_partial(*, top_k: int, **grid) -> Tuple[List[Dict[str, Any]], Optional[Tuple[float, float]]]:
+    """
+    One shard of a sharded `grid_rank` over a slice of the factories: the candidates that
+    can still make the overall top_k, plus the shard's cost range for normalization.
+    """
+    cands = grid_candidates(**grid)
+    if not cands:
+        return [], None
+    return top_k_candidates(cands, top_k), cost_bounds(cands)
+
+def merge_grid_partials(parts: Sequence[Tuple[List[Dict[str, Any]], Optional[Tuple[float, float]]]],
+                        top_k: int) -> List[Dict[str, Any]]:
+    """Top_k of the shards' partial results, identical to `grid_rank(...)[:top_k]` over all factories."""
+    ranges = [r for _, r in parts if r is not None]
+    if not ranges:
+        return []
+    cands = [c for part, _ in parts for c in part]
+    return rank_candidates(cands, cost_range=(min(r[0] for r in ranges), max(r[1] for r in ranges)))[:top_k]
+
+def grid_candidates(
+    *,
+    spec_vec,
+    factories: List[Dict[str, Any]],
+    materials: Dict[tuple, float],
+    lanes: List[Dict[str, Any]],
+    params: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """One unranked candidate per (factory, lane) pair."""
     cands: List[Dict[str, Any]] = []
     for f in factories:
-        match = cosine_match(spec_vec, f['factory_vec'])
+        # precomputed ANN similarity when the caller has one
+        match = f['match'] if 'match' in f else cosine_match(spec_vec, f['factory_vec'])
         mat_key = (f['material_id'], f['material_region'])
         mat_index = materials.get(mat_key, f.get('material_claim_price', 0.0))
         for lane in lanes:
@@ -51,4 +85,4 @@ def grid_rank(
                 "transit_days": lane['transit_days_p50'],
                 "on_time": lane['on_time_rate'],
             })
-    return rank_candidates(cands)
+    return cands
@@ -1,6 +1,7 @@
 from __future__ import annotations
+import heapq
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 
 def cosine_match(spec_vec: np.ndarray, factory_vec: np.ndarray) -> float:
     denom = (np.linalg.norm(spec_vec) * np.linalg.norm(factory_vec)) + 1e-9
@@ -32,15 +33,51 @@ def logistics_score(
 
 def rank_candidates(
     cands: List[Dict],
-    weights: Tuple[float, float, float, float] = (0.35, 0.35, 0.20, 0.10)
+    weights: Tuple[float, float, float, float] = (0.35, 0.35, 0.20, 0.10),
+    cost_range: Optional[Tuple[float, float]] = None,
 ) -> List[Dict]:
-    """cands require: match (0..1), cost (float), logistics (0..1), risk (0..1)."""
+    """
+    cands require: match (0..1), cost (float), logistics (0..1), risk (0..1).
+    `cost_range` is the (min, max) cost to normalize against when `cands` is a subset.
+    """
     w1, w2, w3, w4 = weights
-    costs = np.array([c['cost'] for c in cands], dtype=float)
-    cmin, cmax = float(costs.min()), float(costs.max())
+    if cost_range is None:
+        cost_range = cost_bounds(cands)
+    cmin, cmax = cost_range
     span = (cmax - cmin + 1e-9)
     for c in cands:
         cost_norm = (c['cost'] - cmin) / span
         c['cost_norm'] = cost_norm
         c['total'] = w1 * c['match'] + w2 * (1 - cost_norm) + w3 * c['logistics'] - w4 * c['risk']
     return sorted(cands, key=lambda x: x['total'], reverse=True)
+
+def cost_bounds(cands: List[Dict]) -> Tuple[float, float]:
+    costs = np.array([c['cost'] for c in cands], dtype=float)
+    return float(costs.min()), float(costs.max())
+
+def top_k_candidates(
+    cands: List[Dict],
+    k: int,
+    weights: Tuple[float, float, float, float] = (0.35, 0.35, 0.20, 0.10),
+) -> List[Dict]:
+    """
+    The candidates that can still reach the top k of `rank_candidates` once `cands` is
+    merged with others (whatever the merged cost range), in their original order.
+
+    A candidate's total is its cost-free part minus a positive multiple of its cost, so
+    one that k others beat on both counts (ties going to the earlier one) can't make it.
+    """
+    w1, _, w3, w4 = weights
+    base = [w1 * c['match'] + w3 * c['logistics'] - w4 * c['risk'] for c in cands]
+    order = sorted(range(len(cands)), key=lambda i: (-base[i], cands[i]['cost'], i))
+    cheapest: List[float] = []  # negated k lowest costs seen so far (max-heap)
+    keep = []
+    for i in order:
+        cost = cands[i]['cost']
+        if len(cheapest) < k or -cheapest[0] > cost:
+            keep.append(i)
+        if len(cheapest) < k:
+            heapq.heappush(cheapest, -cost)
+        elif -cheapest[0] > cost:
+            heapq.heapreplace(cheapest, -cost)
+    return [cands[i] for i in sorted(keep)]
@@ -0,0 +1,151 @@
+from __future__ import annotations
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+import asyncio
+import logging
+import os
+
+log = logging.getLogger(__name__)
+
+# CPU-bound scoring (index channels, fuzzy re-scoring, grid ranking) runs in a dedicated
+# process pool: on the event loop or in the default thread pool it holds the GIL and stalls
+# every other endpoint, health checks included. Work is split into shards whose partial
+# top-k results the caller merges.
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Scoring jobs admitted at once (running or waiting for a worker); past this callers get
+# ScoringBusy right away instead of queueing behind work that will miss its deadline
+SCORING_MAX_QUEUE = int(os.getenv("SCORING_MAX_QUEUE", "32"))
+
+class ScoringBusy(RuntimeError):
+    """SCORING_MAX_QUEUE scoring jobs are already in flight; retry later (HTTP 503)."""
+
+STATS = {"jobs": 0, "tasks": 0, "rejected": 0, "in_process": 0}
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = Lock()
+_IN_FLIGHT = 0
+
+def scoring_pool() -> ProcessPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(max_workers=SCORING_WORKERS)
+        return _POOL
+
+def _drop_pool(pool: ProcessPoolExecutor) -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is pool:
+            _POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _admit() -> None:
+    global _IN_FLIGHT
+    with _POOL_LOCK:
+        if _IN_FLIGHT >= SCORING_MAX_QUEUE:
+            STATS["rejected"] += 1
+            raise ScoringBusy(f"{_IN_FLIGHT} scoring jobs in flight")
+        _IN_FLIGHT += 1
+        STATS["jobs"] += 1
+
+def _release() -> None:
+    global _IN_FLIGHT
+    with _POOL_LOCK:
+        _IN_FLIGHT -= 1
+
+@contextmanager
+def admitted() -> Iterator[None]:
+    """Hold one of the SCORING_MAX_QUEUE job slots for the block. Raises ScoringBusy."""
+    _admit()
+    try:
+        yield
+    finally:
+        _release()
+
+def _release_when_done(futures: List[Future]) -> None:
+    """Hand the job's slot to its futures: it is released once the last one has finished."""
+    left = [len(futures)]
+    lock = Lock()
+    def done(_):
+        with lock:
+            left[0] -= 1
+            last = left[0] == 0
+        if last:
+            _release()
+    for f in futures:
+        f.add_done_callback(done)
+
+def _submit(fn: Callable, shards: Sequence[Tuple]) -> Optional[Tuple[ProcessPoolExecutor, List[Future]]]:
+    """
+    Submit every shard of an admitted job; its slot then belongs to the futures, so a caller
+    that stops waiting (cancelled, deadline) doesn't free it while workers still run them.
+    None when the pool can't take work; the caller keeps the slot.
+    """
+    futures: List[Future] = []
+    try:
+        pool = scoring_pool()
+        for args in shards:
+            futures.append(pool.submit(fn, *args))
+    except (OSError, RuntimeError) as e:  # no processes here, or the pool is shutting down
+        for f in futures:
+            f.cancel()
+        log.warning("scoring pool unavailable (%s); scoring in-process", e)
+        return None
+    STATS["tasks"] += len(futures)
+    if futures:
+        _release_when_done(futures)
+    else:
+        _release()
+    return pool, futures
+
+def _in_process(fn: Callable, shards: Sequence[Tuple]) -> List[Any]:
+    STATS["in_process"] += 1
+    return [fn(*args) for args in shards]
+
+def map_shards(fn: Callable, shards: Sequence[Tuple]) -> List[Any]:
+    """
+    `[fn(*args) for args in shards]` with each call in a pool worker; blocks the calling
+    thread (without the GIL) until all are done. `fn` and its arguments must be picklable.
+    A broken pool is replaced and the job scored in-process. Raises ScoringBusy.
+    """
+    _admit()
+    submitted = _submit(fn, shards)
+    if submitted is None:
+        try:
+            return _in_process(fn, shards)
+        finally:
+            _release()
+    pool, futures = submitted
+    try:
+        return [f.result() for f in futures]
+    except BrokenProcessPool:
+        _drop_pool(pool)
+        with admitted():
+            return _in_process(fn, shards)
+
+async def amap_shards(fn: Callable, shards: Sequence[Tuple]) -> List[Any]:
+    """
+    `map_shards` for the event loop: awaits the workers without holding a thread. When the
+    caller is cancelled, shards not yet started are cancelled; running ones keep the job's
+    slot until they finish, so SCORING_MAX_QUEUE bounds the work actually in the pool.
+    """
+    _admit()
+    submitted = _submit(fn, shards)
+    if submitted is None:
+        try:
+            return await asyncio.to_thread(_in_process, fn, shards)
+        finally:
+            _release()
+    pool, futures = submitted
+    try:
+        return list(await asyncio.gather(*(asyncio.wrap_future(f) for f in futures)))
+    except asyncio.CancelledError:
+        for f in futures:
+            f.cancel()
+        raise
+    except BrokenProcessPool:
+        _drop_pool(pool)
+        with admitted():
+            return await asyncio.to_thread(_in_process, fn, shards)
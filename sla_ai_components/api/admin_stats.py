@@ -4,6 +4,7 @@ from pydantic import BaseModel
 from typing import Optional
 
 from sla_ai_components.data.repos import count_distinct_vendors, count_total_factories
+from sla_ai_components.ai.llm_cache import cache_stats
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
@@ -24,3 +25,8 @@ def admin_stats():
         total_factories = 0
     # Ensure ints
     return {"vendor_count": int(vendors or 0), "factory_count_total": int(total_factories or 0)}
+
+@router.get("/llm-cache")
+def admin_llm_cache_stats():
+    """Per-call-site LLM cache counters (hits, misses, bypasses, latency saved)"""
+    return {"sites": cache_stats()}
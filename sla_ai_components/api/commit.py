@@ -41,7 +41,8 @@ def commit_upload(body: CommitBody, tenant_id: str = Depends(get_tenant_id)):
             # skip un-mapped sheets, but record
             stats.append({"sheet": sheet_name, "skipped": len(df)})
             continue
-        s = commit_sheet(tenant_id, body.upload_id, sheet_name, df, mapping_yaml)
+        s = commit_sheet(tenant_id, body.upload_id, sheet_name, df, mapping_yaml,
+                         feed=f"{info['filename']}#{sheet_name}")
         stats.append(s)
 
     _save_ingest_report(body.upload_id, {"sheets": stats})
@@ -2,8 +2,7 @@ from __future__ import annotations
 from fastapi import APIRouter, Query, Depends, HTTPException
 from typing import Optional
 from pathlib import Path
-from sla_ai_components.ingest.excel_loader import load_any
-from sla_ai_components.ingest.preview import make_preview
+from sla_ai_components.ingest.preview import preview_file
 from sla_ai_components.ingest.mapping_profiles import get_profile_for_tenant
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
@@ -23,8 +22,9 @@ def get_preview(upload_id: int = Query(...), tenant_id: str = Depends(get_tenant
     if info["status"] != "preview_ready":
         raise HTTPException(409, f"Upload status is {info['status']}")
 
-    frames = load_any(info["file_path"])  # store path in uploads table in real impl
-    preview = make_preview(frames)
+    # preview persisted at upload time; otherwise header + first rows via the SHA-256 keyed cache
+    stored = info.get("preview") or preview_file(info["file_path"], info.get("file_sha256"))
+    preview = [dict(p) for p in stored]
     # If a mapping profile exists for this tenant & sheet_type, attach it
     for p in preview:
         prof = get_profile_for_tenant(tenant_id, p["sheet_type"])
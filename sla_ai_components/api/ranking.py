@@ -1,5 +1,5 @@
 from __future__ import annotations
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Any
 import numpy as np
@@ -9,11 +9,20 @@ from sla_ai_components.data.repos import (
     fetch_factories_for_spec,
     fetch_material_index_map,
     fetch_lane_candidates,
+    fetch_factory_embeddings,
 )
-from sla_ai_components.algorithms.grid_search import grid_rank
+from sla_ai_components.algorithms.grid_search import grid_rank_partial, merge_grid_partials
+from sla_ai_components.algorithms.scoring_pool import SCORING_WORKERS, ScoringBusy, map_shards
 
 router = APIRouter(tags=["rank"])
 
+TOP_K = 5
+RANK_MIN_SHARD = 50  # factories per scoring-pool task at least; smaller grids stay one task
+
+def _rank_shard(spec_vec, factories, materials, lanes, params):
+    return grid_rank_partial(top_k=TOP_K, spec_vec=spec_vec, factories=factories,
+                             materials=materials, lanes=lanes, params=params)
+
 class CandidateOut(BaseModel):
     factory_id: str
     lane_id: str
@@ -41,6 +50,11 @@ def rank(req: RankRequest):
     spec_vec = np.array(embed_spec(req.sku_spec), dtype=float)
 
     factories = fetch_factories_for_spec(req.sku_spec)
+    # ANN lookup in the vector store replaces per-factory cosine over ad-hoc vectors
+    matches = fetch_factory_embeddings(spec_vec, k=max(200, len(factories)))
+    if matches:
+        for f in factories:
+            f["match"] = matches.get(f.get("vector_key"), 0.0)
     materials = fetch_material_index_map(req.sku_spec)
     lanes = fetch_lane_candidates(req.sku_spec)
 
@@ -48,18 +62,20 @@ def rank(req: RankRequest):
     # and use the detailed landed cost instead of the simple cost calculation
     # For now, we'll use the existing grid_rank logic
     
-    ranked = grid_rank(
-        spec_vec=spec_vec,
-        factories=factories,
-        materials=materials,
-        lanes=lanes,
-        params=dict(
-            duty_pct=req.duty_pct,
-            usage_per_unit=req.usage_per_unit,
-            unit_volume_or_weight=req.unit_volume_or_weight,
-            seasonal_penalty=req.seasonal_penalty,
-        ),
+    params = dict(
+        duty_pct=req.duty_pct,
+        usage_per_unit=req.usage_per_unit,
+        unit_volume_or_weight=req.unit_volume_or_weight,
+        seasonal_penalty=req.seasonal_penalty,
     )
+    # the factory x lane grid is scored in the scoring pool, one factory slice per task;
+    # each returns only what can still make the top 5
+    size = max(RANK_MIN_SHARD, -(-len(factories) // SCORING_WORKERS))
+    shards = [(spec_vec, factories[i:i + size], materials, lanes, params) for i in range(0, len(factories), size)]
+    try:
+        ranked = merge_grid_partials(map_shards(_rank_shard, shards), TOP_K)
+    except ScoringBusy as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "1"})
     return [
         CandidateOut(
             factory_id=c["factory_id"],
@@ -73,5 +89,5 @@ def rank(req: RankRequest):
             transit_days=c["transit_days"],
             on_time=c["on_time"],
         )
-        for c in ranked[:5]
+        for c in ranked
     ]
@@ -1,11 +1,13 @@
 from __future__ import annotations
-from fastapi import APIRouter, UploadFile, File, Form, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, BackgroundTasks, Depends, HTTPException, Query
 from typing import Optional
 from pathlib import Path
-import shutil, json
+import hashlib, json
 import pandas as pd
 
-from sla_ai_components.ingest.excel_loader import load_any
+from sla_ai_components.config import UPLOAD_REGISTRY_DB
+from sla_ai_components.data.uploads_repo import UploadRegistry
+from sla_ai_components.ingest.preview import preview_file
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
 
@@ -13,69 +15,42 @@ router = APIRouter(prefix="/ingest", tags=["ingest"])
 def get_tenant_id():
     return "tenant_demo"
 
-# Simple in-memory storage for demo - replace with real DB
-_UPLOADS = {}
-_UPLOAD_COUNTER = 0
+# Persistent upload registry (SQLite); dict-like for reads, keyed by upload id
+_UPLOADS = UploadRegistry(UPLOAD_REGISTRY_DB)
 
 def _save_upload_row(tenant_id: str, filename: str, mime: str, status: str, file_path: str = None, file_sha256: str = None) -> int:
-    global _UPLOAD_COUNTER
-    _UPLOAD_COUNTER += 1
-    upload_id = _UPLOAD_COUNTER
-    _UPLOADS[upload_id] = {
-        "id": upload_id,
-        "tenant_id": tenant_id,
-        "filename": filename,
-        "mime": mime,
-        "status": status,
-        "sheet_names": None,
-        "errors_json": None,
-        "file_path": file_path,
-        "file_sha256": file_sha256
-    }
-    return upload_id
+    return _UPLOADS.create(tenant_id, filename, mime, status, file_path=file_path, file_sha256=file_sha256)
 
 def _set_upload_sheet_names(upload_id: int, sheet_names: list[str]):
-    if upload_id in _UPLOADS:
-        _UPLOADS[upload_id]["sheet_names"] = sheet_names
+    _UPLOADS.update(upload_id, sheet_names=sheet_names)
 
 def _set_upload_status(upload_id: int, status: str):
-    if upload_id in _UPLOADS:
-        _UPLOADS[upload_id]["status"] = status
+    _UPLOADS.update(upload_id, status=status)
 
 def _set_upload_error(upload_id: int, error: str):
-    if upload_id in _UPLOADS:
-        _UPLOADS[upload_id]["errors_json"] = {"error": error}
-        _UPLOADS[upload_id]["status"] = "failed"
+    _UPLOADS.update(upload_id, errors_json={"error": error}, status="failed")
 
 def _set_upload_path(upload_id: int, path: str):
-    if upload_id in _UPLOADS:
-        _UPLOADS[upload_id]["file_path"] = path
+    _UPLOADS.update(upload_id, file_path=path)
+
+def _set_upload_sha(upload_id: int, file_sha256: str):
+    _UPLOADS.update(upload_id, file_sha256=file_sha256)
+
+def _set_upload_preview(upload_id: int, preview: list[dict]):
+    _UPLOADS.update(upload_id, preview=preview)
 
 def _get_upload_row(upload_id: int):
     return _UPLOADS.get(upload_id)
 
-def _get_upload_by_sha(file_sha256: str):
-    for upload in _UPLOADS.values():
-        if upload.get("file_sha256") == file_sha256:
-            return upload
-    return None
+def _get_upload_by_sha(file_sha256: str, tenant_id: Optional[str] = None):
+    return _UPLOADS.by_sha(file_sha256, tenant_id)
 
 def _save_upload_mappings(upload_id: int, sheet_name: str, mapping_yaml: str, confidence: float):
-    # Simple in-memory storage for mappings
-    if upload_id not in _UPLOADS:
-        _UPLOADS[upload_id]["mappings"] = {}
-    if "mappings" not in _UPLOADS[upload_id]:
-        _UPLOADS[upload_id]["mappings"] = {}
-    _UPLOADS[upload_id]["mappings"][sheet_name] = {
-        "mapping_yaml": mapping_yaml,
-        "confidence": confidence
-    }
+    _UPLOADS.save_mapping(upload_id, sheet_name, mapping_yaml, confidence)
 
 def _save_ingest_report(upload_id: int, stats_json: dict):
-    # Simple in-memory storage for ingest reports
-    if upload_id in _UPLOADS:
-        _UPLOADS[upload_id]["ingest_report"] = stats_json
-        print(f"[_save_ingest_report] Saved ingest report for upload {upload_id}")
+    _UPLOADS.update(upload_id, ingest_report=stats_json)
+    print(f"[_save_ingest_report] Saved ingest report for upload {upload_id}")
 
 @router.post("/upload")
 async def upload_file(
@@ -89,21 +64,45 @@ async def upload_file(
     tmp_dir = Path("./.ingest_uploads")
     tmp_dir.mkdir(parents=True, exist_ok=True)
     dest = tmp_dir / file.filename
+    # hash while streaming to disk so duplicate detection needs no second pass
+    h = hashlib.sha256()
     with dest.open("wb") as f:
-        shutil.copyfileobj(file.file, f)
-
-    # Create uploads row (replace with real DB)
-    upload_id = _save_upload_row(tenant_id, file.filename, file.content_type or "", status="received")
-    _set_upload_path(upload_id, str(dest))
-
-    # Background: parse sheet names & save
+        for chunk in iter(lambda: file.file.read(1024 * 1024), b""):
+            h.update(chunk)
+            f.write(chunk)
+    checksum = h.hexdigest()
+
+    previous = _get_upload_by_sha(checksum, tenant_id)
+    upload_id = _save_upload_row(tenant_id, file.filename, file.content_type or "", status="received",
+                                 file_path=str(dest), file_sha256=checksum)
+
+    # Same bytes already previewed for this tenant: reuse the stored preview
+    if previous and previous.get("preview"):
+        _set_upload_preview(upload_id, previous["preview"])
+        _set_upload_sheet_names(upload_id, previous.get("sheet_names") or [p["sheet_name"] for p in previous["preview"]])
+        _set_upload_status(upload_id, "preview_ready")
+        return {"upload_id": upload_id, "status": "preview_ready", "duplicate_of": previous["id"]}
+
+    # Background: read sheet headers + first rows, persist the preview
     def _prepare_preview():
         try:
-            frames = load_any(str(dest))
-            _set_upload_sheet_names(upload_id, list(frames.keys()))
+            preview = preview_file(str(dest), checksum)
+            _set_upload_preview(upload_id, preview)
+            _set_upload_sheet_names(upload_id, [p["sheet_name"] for p in preview])
             _set_upload_status(upload_id, "preview_ready")
         except Exception as e:
             _set_upload_error(upload_id, str(e))
 
     background_tasks.add_task(_prepare_preview)
-    return {"upload_id": upload_id, "status": "received"}
+    return {"upload_id": upload_id, "status": "received", "duplicate_of": previous["id"] if previous else None}
+
+@router.get("/uploads")
+def list_uploads(
+    status: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    tenant_id: str = Depends(get_tenant_id),
+):
+    rows, next_cursor = _UPLOADS.page(tenant_id=tenant_id, status=status, limit=limit, cursor=cursor)
+    items = [{k: v for k, v in r.items() if k not in ("preview", "mappings")} for r in rows]
+    return {"items": items, "next_cursor": next_cursor}
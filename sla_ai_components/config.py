@@ -1,4 +1,5 @@
 from __future__ import annotations
+import os
 
 # Auto-ingestion configuration
 DATA_FOLDER = "./data"
@@ -9,3 +10,12 @@ AUTO_COMMIT_FROM_DATA_FOLDER = True  # Set to False for manual confirmation
 
 # Dedupe and validation settings
 DISABLE_FACTORY_DEDUPE = False  # Re-enable factory deduplication
+DISABLE_NEAR_DUPE = False  # MinHash/LSH near-duplicate stage after exact dedupe
+NEAR_DUPE_MIN_SCORE = 90  # rapidfuzz token_sort_ratio on normalized names to merge a candidate pair
+NEAR_DUPE_ADDRESS_MIN_SCORE = 80  # token_set_ratio on addresses when both rows have one
+
+# Upload registry (SQLite) - persists uploads, mappings, previews and reports across restarts
+UPLOAD_REGISTRY_DB = os.getenv("UPLOAD_REGISTRY_DB", "./.ingest_uploads/registry.db")
+
+# Factory vector store (memory-mapped float32 matrix + IVF index), see embeddings/vector_store.py
+VECTOR_STORE_DIR = "./.vector_store"
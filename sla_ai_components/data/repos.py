@@ -2,6 +2,7 @@ from __future__ import annotations
 from typing import Dict, Any, List
 import sqlite3
 from pathlib import Path
+from sla_ai_components.ingest.embeddings import factory_key
 
 # Simple data access layer - replace with proper ORM later
 def get_db_connection():
@@ -30,7 +31,8 @@ def fetch_factories_for_spec(spec: Dict[str, Any]) -> List[Dict[str, Any]]:
                 "factory_id": f"F{row[0]:03d}",  # Convert to F001 format
                 "factory_name": row[1], 
                 "country_iso2": row[2],
-                "city": row[3]
+                "city": row[3],
+                "vector_key": factory_key({"factory_name": row[1], "country_iso2": row[2]}),
             })
         
         return factories
@@ -86,10 +88,15 @@ def fetch_material_index_map():
         "nylon": 0.5
     }
 
-def fetch_factory_embeddings():
-    """Fetch factory embeddings for ranking"""
-    # Mock implementation - replace with real data
-    return {}
+def fetch_factory_embeddings(spec_vec=None, k: int = 200) -> Dict[str, float]:
+    """
+    Nearest factories to spec_vec from the ANN vector store, as {factory_key: cosine}.
+    Without a query vector there is nothing to rank against and this returns {}.
+    """
+    if spec_vec is None:
+        return {}
+    from sla_ai_components.embeddings.vector_store import get_vector_store
+    return dict(get_vector_store().search(spec_vec, k=k))
 
 def fetch_lane_embeddings():
     """Fetch lane embeddings for ranking"""
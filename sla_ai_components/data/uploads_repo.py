@@ -0,0 +1,180 @@
+from __future__ import annotations
+from collections.abc import Mapping
+from pathlib import Path
+from threading import RLock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import sqlite3
+
+# JSON-encoded columns and the key they are exposed under in upload rows
+_JSON_FIELDS = {
+    "sheet_names": "sheet_names",
+    "errors_json": "errors_json",
+    "mappings_json": "mappings",
+    "ingest_report_json": "ingest_report",
+    "preview_json": "preview",
+}
+_PLAIN_FIELDS = ("tenant_id", "filename", "mime", "status", "file_path", "file_sha256")
+_OPTIONAL_KEYS = ("mappings", "ingest_report", "preview")  # absent from rows until set
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  tenant_id TEXT NOT NULL,
+  filename TEXT NOT NULL,
+  mime TEXT,
+  status TEXT NOT NULL DEFAULT 'received',
+  sheet_names TEXT,
+  errors_json TEXT,
+  file_path TEXT,
+  file_sha256 TEXT,
+  mappings_json TEXT,
+  ingest_report_json TEXT,
+  preview_json TEXT,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_uploads_file_sha ON uploads(file_sha256);
+CREATE INDEX IF NOT EXISTS idx_uploads_tenant ON uploads(tenant_id, id);
+CREATE INDEX IF NOT EXISTS idx_uploads_status ON uploads(status, id);
+"""
+
+class UploadRegistry(Mapping):
+    """
+    SQLite-backed upload registry.
+
+    Behaves like the old ``{upload_id: row}`` dict for reads (``len``, ``get``,
+    ``values``...), while writes go through explicit methods so upload, mapping,
+    preview and report state survive restarts. SHA-256, tenant and status lookups
+    are index-backed.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = RLock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, query: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            db = self._db()
+            cur = db.execute(query, params)
+            db.commit()
+            return cur
+
+    def _query(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._db().execute(query, params).fetchall()
+
+    @staticmethod
+    def _to_row(r: sqlite3.Row) -> Dict[str, Any]:
+        row: Dict[str, Any] = {"id": r["id"]}
+        for f in _PLAIN_FIELDS:
+            row[f] = r[f]
+        for col, key in _JSON_FIELDS.items():
+            val = json.loads(r[col]) if r[col] is not None else None
+            if val is not None or key not in _OPTIONAL_KEYS:
+                row[key] = val
+        return row
+
+    # -- writes ---------------------------------------------------------------
+
+    def create(self, tenant_id: str, filename: str, mime: str, status: str,
+               file_path: Optional[str] = None, file_sha256: Optional[str] = None) -> int:
+        cur = self._execute(
+            "INSERT INTO uploads (tenant_id, filename, mime, status, file_path, file_sha256) VALUES (?, ?, ?, ?, ?, ?)",
+            (tenant_id, filename, mime, status, file_path, file_sha256),
+        )
+        return int(cur.lastrowid)
+
+    def update(self, upload_id: int, **fields: Any) -> None:
+        """Set row fields by their row key (``status``, ``sheet_names``, ``preview``...)."""
+        cols, params = [], []
+        json_cols = {key: col for col, key in _JSON_FIELDS.items()}
+        for key, val in fields.items():
+            if key in _PLAIN_FIELDS:
+                cols.append(key); params.append(val)
+            elif key in json_cols:
+                cols.append(json_cols[key]); params.append(json.dumps(val, default=str) if val is not None else None)
+            else:
+                raise KeyError(f"Unknown upload field: {key}")
+        if not cols:
+            return
+        assignments = ", ".join(f"{c} = ?" for c in cols)
+        self._execute(f"UPDATE uploads SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                      (*params, upload_id))
+
+    def save_mapping(self, upload_id: int, sheet_name: str, mapping_yaml: str, confidence: float) -> None:
+        with self._lock:
+            row = self.get(upload_id)
+            if row is None:
+                return
+            mappings = row.get("mappings") or {}
+            mappings[sheet_name] = {"mapping_yaml": mapping_yaml, "confidence": confidence}
+            self.update(upload_id, mappings=mappings)
+
+    def clear(self) -> None:
+        self._execute("DELETE FROM uploads")
+
+    # -- reads ----------------------------------------------------------------
+
+    def get(self, upload_id: int, default: Any = None) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT * FROM uploads WHERE id = ?", (upload_id,))
+        return self._to_row(rows[0]) if rows else default
+
+    def by_sha(self, file_sha256: str, tenant_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Earliest upload of these exact bytes (optionally within a tenant)."""
+        if tenant_id is None:
+            rows = self._query("SELECT * FROM uploads WHERE file_sha256 = ? ORDER BY id LIMIT 1", (file_sha256,))
+        else:
+            rows = self._query("SELECT * FROM uploads WHERE file_sha256 = ? AND tenant_id = ? ORDER BY id LIMIT 1",
+                               (file_sha256, tenant_id))
+        return self._to_row(rows[0]) if rows else None
+
+    def page(self, tenant_id: Optional[str] = None, status: Optional[str] = None,
+             limit: int = 50, cursor: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Newest-first keyset page; pass the returned cursor back to get the next page."""
+        where, params = [], []
+        if tenant_id is not None:
+            where.append("tenant_id = ?"); params.append(tenant_id)
+        if status is not None:
+            where.append("status = ?"); params.append(status)
+        if cursor is not None:
+            where.append("id < ?"); params.append(cursor)
+        sql = "SELECT * FROM uploads"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT ?"
+        rows = [self._to_row(r) for r in self._query(sql, (*params, limit + 1))]
+        next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    def __getitem__(self, upload_id: int) -> Dict[str, Any]:
+        row = self.get(upload_id)
+        if row is None:
+            raise KeyError(upload_id)
+        return row
+
+    def __contains__(self, upload_id: object) -> bool:
+        return bool(self._query("SELECT 1 FROM uploads WHERE id = ?", (upload_id,)))
+
+    def __iter__(self) -> Iterator[int]:
+        return iter([r["id"] for r in self._query("SELECT id FROM uploads ORDER BY id")])
+
+    def __len__(self) -> int:
+        return int(self._query("SELECT COUNT(*) FROM uploads")[0][0])
+
+    def values(self) -> List[Dict[str, Any]]:  # one query instead of one per key
+        return [self._to_row(r) for r in self._query("SELECT * FROM uploads ORDER BY id")]
+
+    def items(self) -> List[Tuple[int, Dict[str, Any]]]:
+        return [(row["id"], row) for row in self.values()]
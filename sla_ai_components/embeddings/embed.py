@@ -11,7 +11,15 @@ def _hash_to_vec(s: str, dim: int = 4) -> List[float]:
     v = v / (np.linalg.norm(v) + 1e-9)
     return v.tolist()
 
+def spec_text(sku_spec: Any) -> str:
+    """Flatten a spec into the same kind of text factories are embedded from."""
+    if isinstance(sku_spec, dict):
+        return " | ".join(spec_text(v) if isinstance(v, (dict, list)) else f"{k} {v}" for k, v in sku_spec.items())
+    if isinstance(sku_spec, list):
+        return " ".join(spec_text(v) for v in sku_spec)
+    return str(sku_spec)
+
 def embed_spec(sku_spec: Any) -> list:
-    """Deterministic tiny embedding until real model is wired."""
-    s = json.dumps(sku_spec, sort_keys=True)
-    return _hash_to_vec(s, dim=4)
+    """Embed a spec with the local vector-store embedder (hashed TF-IDF + SVD, no network)."""
+    from .vector_store import get_vector_store
+    return get_vector_store().embed([spec_text(sku_spec)])[0].tolist()
@@ -0,0 +1,154 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import List, Sequence, Tuple
+import math
+import re
+import zlib
+import numpy as np
+
+# Local, network-free text embeddings: hashed TF-IDF (words + char 3-grams of words)
+# projected to EMBED_DIM with a truncated SVD fitted on the corpus. Until a corpus has
+# been fitted, a seeded random projection of the same hashed features is used.
+EMBED_DIM = 128
+_FEATURE_BITS = 16
+N_FEATURES = 1 << _FEATURE_BITS
+SVD_SAMPLE = 30_000  # docs used to fit idf + SVD; transform still covers every doc
+MIN_SVD_DOCS = 1000  # smaller corpora span too few directions; keep the random projection
+_CHUNK_DOCS = 4096
+_TOKEN = re.compile(r"\w+")
+
+def _sparse(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    COO rows/cols/vals (sorted by row, then col) of sublinear term frequencies over hashed
+    words and byte 3-grams of "#word#". Grams are hashed with numpy, words with crc32.
+    """
+    docs = [_TOKEN.findall(str(t).lower()) for t in texts]
+    word_rows = np.repeat(np.arange(len(docs), dtype=np.int64), [len(d) for d in docs])
+    word_cols = np.fromiter((zlib.crc32(w.encode()) % N_FEATURES for d in docs for w in d),
+                            dtype=np.int64, count=len(word_rows))
+
+    enc = [" ".join(f"#{w}#" for w in d).encode() for d in docs]
+    lengths = np.fromiter((len(e) for e in enc), dtype=np.int64, count=len(enc))
+    buf = np.frombuffer(b"".join(enc), dtype=np.uint8).astype(np.int64)
+    if len(buf) >= 3:
+        codes = (buf[:-2] << 16) | (buf[1:-1] << 8) | buf[2:]
+        owner = np.repeat(np.arange(len(enc), dtype=np.int64), lengths)
+        ends = np.cumsum(lengths)[owner][:len(codes)]
+        space = (buf[:-2] == 32) | (buf[1:-1] == 32) | (buf[2:] == 32)
+        valid = (np.arange(len(codes)) + 3 <= ends) & ~space
+        gram_rows = owner[:len(codes)][valid]
+        gram_cols = ((codes[valid] * 2654435761) & 0xFFFFFFFF) >> (32 - _FEATURE_BITS)
+    else:
+        gram_rows = gram_cols = np.empty(0, dtype=np.int64)
+
+    keys = np.concatenate((word_rows, gram_rows)) * N_FEATURES + np.concatenate((word_cols, gram_cols))
+    keys, counts = np.unique(keys, return_counts=True)
+    return keys // N_FEATURES, keys % N_FEATURES, (1.0 + np.log(counts)).astype(np.float32)
+
+def _segment_dot(seg: np.ndarray, other: np.ndarray, vals: np.ndarray, m: np.ndarray, n_out: int) -> np.ndarray:
+    """out[seg[i]] += vals[i] * m[other[i]] for `seg` sorted ascending, in bounded-memory slices."""
+    out = np.zeros((n_out, m.shape[1]), dtype=np.float32)
+    bounds = np.flatnonzero(np.diff(seg)) + 1
+    starts = np.concatenate(([0], bounds)) if len(seg) else np.empty(0, dtype=np.int64)
+    budget = max(1, (64 << 20) // (4 * m.shape[1]))  # ~64MB of products per slice
+    i = 0
+    while i < len(starts):
+        j = int(np.searchsorted(starts, starts[i] + budget, side="right"))
+        j = max(j, i + 1)
+        lo, hi = starts[i], (starts[j] if j < len(starts) else len(seg))
+        prod = vals[lo:hi, None] * m[other[lo:hi]]
+        out[seg[starts[i:j]]] = np.add.reduceat(prod, starts[i:j] - lo, axis=0)
+        i = j
+    return out
+
+def _row_normalize(rows: np.ndarray, vals: np.ndarray, n: int) -> np.ndarray:
+    norms = np.sqrt(np.bincount(rows, weights=vals.astype(np.float64) ** 2, minlength=n))
+    return (vals / np.maximum(norms[rows], 1e-9)).astype(np.float32)
+
+class LocalEmbedder:
+    """Hashed TF-IDF -> truncated SVD embedder; `fitted` is False for the random-projection fallback."""
+
+    def __init__(self, idf: np.ndarray, components: np.ndarray, fitted: bool):
+        self.idf = np.asarray(idf, dtype=np.float32)  # no copy for float32 input (e.g. a shared memmap)
+        self.components = np.asarray(components, dtype=np.float32)  # (N_FEATURES, EMBED_DIM)
+        self.fitted = fitted
+
+    @property
+    def dim(self) -> int:
+        return int(self.components.shape[1])
+
+    @staticmethod
+    def _random_components(dim: int = EMBED_DIM) -> np.ndarray:
+        rng = np.random.RandomState(1337)
+        return rng.standard_normal((N_FEATURES, dim)).astype(np.float32) / math.sqrt(dim)
+
+    @classmethod
+    def default(cls) -> "LocalEmbedder":
+        return cls(np.ones(N_FEATURES, dtype=np.float32), cls._random_components(), fitted=False)
+
+    @classmethod
+    def fit(cls, texts: Sequence[str], dim: int = EMBED_DIM, seed: int = 1337) -> "LocalEmbedder":
+        texts = list(texts)
+        if len(texts) > SVD_SAMPLE:
+            pick = np.random.RandomState(seed).choice(len(texts), SVD_SAMPLE, replace=False)
+            texts = [texts[i] for i in np.sort(pick)]
+        n = len(texts)
+        rows, cols, vals = _sparse(texts)
+        df = np.bincount(cols, minlength=N_FEATURES)
+        idf = (np.log((1.0 + n) / (1.0 + df)) + 1.0).astype(np.float32)
+        vals = _row_normalize(rows, vals * idf[cols], n)
+        if n < MIN_SVD_DOCS:
+            return cls(idf, cls._random_components(dim), fitted=True)
+
+        # Randomized SVD (Halko et al.) over the sparse matrix
+        l = min(dim + 10, max(n, 1))
+        rng = np.random.RandomState(seed)
+        omega = rng.standard_normal((N_FEATURES, l)).astype(np.float32)
+
+        by_col = np.argsort(cols, kind="stable")
+        cols_c, rows_c, vals_c = cols[by_col], rows[by_col], vals[by_col]
+
+        def x_dot(m: np.ndarray) -> np.ndarray:  # X @ m, m: (N_FEATURES, l)
+            return _segment_dot(rows, cols, vals, m, n)
+
+        def xt_dot(m: np.ndarray) -> np.ndarray:  # X.T @ m, m: (n, l)
+            return _segment_dot(cols_c, rows_c, vals_c, m, N_FEATURES)
+
+        q, _ = np.linalg.qr(x_dot(omega))
+        for _ in range(2):  # power iterations sharpen the spectrum
+            q, _ = np.linalg.qr(x_dot(xt_dot(q)))
+        b_t = xt_dot(q)  # (N_FEATURES, l) == (Q.T X).T
+        u, s, _ = np.linalg.svd(b_t, full_matrices=False)
+        k = min(dim, u.shape[1])
+        comp = np.zeros((N_FEATURES, dim), dtype=np.float32)
+        comp[:, :k] = u[:, :k]
+        return cls(idf, comp, fitted=True)
+
+    def transform(self, texts: Sequence[str]) -> np.ndarray:
+        """(n, dim) float32, L2-normalized; texts without tokens map to the zero vector."""
+        texts = list(texts)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), _CHUNK_DOCS):
+            chunk = texts[start:start + _CHUNK_DOCS]
+            rows, cols, vals = _sparse(chunk)
+            if not len(rows):
+                continue
+            vals = _row_normalize(rows, vals * self.idf[cols], len(chunk))
+            out[start:start + len(chunk)] = _segment_dot(rows, cols, vals, self.components, len(chunk))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-9)
+
+    def save(self, path: str) -> None:
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, idf=self.idf, components=self.components, fitted=np.array(self.fitted))
+        Path(tmp).replace(path)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalEmbedder":
+        with np.load(path) as z:
+            return cls(z["idf"], z["components"], bool(z["fitted"]))
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """Embed with the vector store's embedder so queries and factory vectors share a space."""
+    from .vector_store import get_vector_store
+    return get_vector_store().embedder.transform(texts)
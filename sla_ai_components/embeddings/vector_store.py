@@ -0,0 +1,341 @@
+from __future__ import annotations
+from pathlib import Path
+from threading import RLock
+from typing import Dict, List, Optional, Sequence, Tuple
+import json
+import os
+import numpy as np
+
+from .local import LocalEmbedder, EMBED_DIM
+from ..config import VECTOR_STORE_DIR
+
+# Factory vectors live in a memory-mapped float32 matrix (row i <-> ids[i]) behind an
+# IVF (inverted file) index: k-means centroids, with each row assigned to its nearest
+# centroid. Queries scan only the `nprobe` closest lists. Small stores are scanned exactly.
+# Writes are incremental: new and replaced rows are appended to a tail segment (assigned to
+# the existing centroids), replaced and deleted rows are tombstoned, and the base matrix is
+# only rewritten when a compaction folds the tail in.
+IVF_MIN_ROWS = 2048  # below this an exact scan is both faster and exact
+IVF_RETRAIN_GROWTH = 4  # retrain centroids once the store has grown 4x since training
+COMPACT_MIN_ROWS = 1024  # tail rows + tombstones tolerated regardless of store size
+COMPACT_FRACTION = 0.25  # ... or this fraction of the base, whichever is larger
+_KMEANS_ITERS = 12
+_KMEANS_SAMPLE = 50_000
+_FORMAT_VERSION = 2
+_READABLE_VERSIONS = (1, 2)  # version 1 stores have no tail segment
+
+def _atomic_write_bytes(path: Path, data: bytes) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+def _kmeans(x: np.ndarray, k: int, seed: int = 7) -> np.ndarray:
+    """Spherical k-means on a sample; returns (k, dim) unit centroids."""
+    rng = np.random.RandomState(seed)
+    sample = x[rng.choice(len(x), min(len(x), _KMEANS_SAMPLE), replace=False)]
+    cent = sample[rng.choice(len(sample), k, replace=False)].copy()
+    for _ in range(_KMEANS_ITERS):
+        assign = np.argmax(sample @ cent.T, axis=1)
+        sums = np.zeros_like(cent)
+        np.add.at(sums, assign, sample)
+        empty = np.bincount(assign, minlength=k) == 0
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]  # reseed dead centroids
+        cent = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-9)
+    return cent.astype(np.float32)
+
+def _assign(x: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+    out = np.empty(len(x), dtype=np.int32)
+    for s in range(0, len(x), chunk):
+        out[s:s + chunk] = np.argmax(np.asarray(x[s:s + chunk]) @ centroids.T, axis=1)
+    return out
+
+class VectorStore:
+    """
+    Persistent factory-vector store with approximate nearest-neighbour search.
+
+    On disk (under `root`): vectors.f32 (raw float32 base rows, memory-mapped), ids.json,
+    ivf.npz (centroids + per-row list assignment of the base), embedder.npz, the tail
+    segment (tail.f32 rows appended since the last compaction, and tail.log, one JSON line
+    per write with the rows added and the positions tombstoned) and meta.json, which is
+    written last and records how much of the tail is published, so a reader never sees a
+    half-written store.
+    """
+
+    def __init__(self, root: str = VECTOR_STORE_DIR):
+        self.root = Path(root)
+        self._lock = RLock()
+        self.embedder: LocalEmbedder = LocalEmbedder.default()
+        self._reset(np.zeros((0, EMBED_DIM), dtype=np.float32), [], np.zeros(0, dtype=np.int32))
+        self.centroids: Optional[np.ndarray] = None
+        self._trained_at = 0
+        self.load()
+
+    def _reset(self, vectors: np.ndarray, ids: List[str], assign: np.ndarray) -> None:
+        """Base segment only: no tail, no tombstones."""
+        self.vectors = vectors
+        self._ids = ids  # per row position: base rows, then tail rows (tombstoned ones too)
+        self._pos: Dict[str, int] = {fid: i for i, fid in enumerate(ids)}  # live id -> position
+        self.assign = assign
+        self.tail: np.ndarray = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+        self.tail_assign = np.zeros(0, dtype=np.int32)
+        self._dead: set = set()
+        self._dead_rows: Optional[np.ndarray] = None
+        self._log_bytes = 0
+        self._lists: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @property
+    def ids(self) -> List[str]:
+        """Live factory ids in row order."""
+        return [fid for i, fid in enumerate(self._ids) if i not in self._dead]
+
+    # -- persistence ------------------------------------------------------------
+
+    def load(self) -> None:
+        meta_path = self.root / "meta.json"
+        if not meta_path.exists():
+            return
+        meta = json.loads(meta_path.read_text())
+        if meta.get("version") not in _READABLE_VERSIONS:
+            return
+        with self._lock:
+            if (self.root / "embedder.npz").exists():
+                self.embedder = LocalEmbedder.load(str(self.root / "embedder.npz"))
+            n, dim = int(meta["count"]), int(meta["dim"])
+            vectors = (np.memmap(self.root / "vectors.f32", dtype=np.float32, mode="r", shape=(n, dim))
+                       if n else np.zeros((0, dim), dtype=np.float32))
+            self.centroids, assign = None, np.zeros(n, dtype=np.int32)
+            if (self.root / "ivf.npz").exists():
+                with np.load(self.root / "ivf.npz") as z:
+                    self.centroids = z["centroids"] if z["centroids"].size else None
+                    assign = z["assign"]
+            self._reset(vectors, json.loads((self.root / "ids.json").read_text()), assign)
+            self._trained_at = int(meta.get("trained_at", 0))
+            self._load_tail(int(meta.get("tail_rows", 0)), int(meta.get("log_bytes", 0)))
+
+    def _load_tail(self, rows: int, log_bytes: int) -> None:
+        dim = self.vectors.shape[1]
+        if rows:
+            self.tail = np.memmap(self.root / "tail.f32", dtype=np.float32, mode="r", shape=(rows, dim))
+        assigned: List[int] = []
+        with open(self.root / "tail.log", "rb") if log_bytes else open(os.devnull, "rb") as f:
+            for line in f.read(log_bytes).splitlines():
+                entry = json.loads(line)
+                self._tombstone(entry.get("drop", ()))
+                for fid in entry.get("add", ()):
+                    self._add_position(fid)
+                assigned += entry.get("assign", ())
+        self.tail_assign = np.asarray(assigned, dtype=np.int32)
+        self._log_bytes = log_bytes
+
+    def _add_position(self, fid: str) -> None:
+        old = self._pos.get(fid)
+        if old is not None:
+            self._dead.add(old)
+        self._pos[fid] = len(self._ids)
+        self._ids.append(fid)
+
+    def _tombstone(self, positions) -> None:
+        for p in positions:
+            self._dead.add(p)
+            if self._pos.get(self._ids[p]) == p:
+                del self._pos[self._ids[p]]
+        self._dead_rows = None
+
+    def _write_meta(self, base_rows: int, dim: int, tail_rows: int) -> None:
+        meta = {"version": _FORMAT_VERSION, "count": base_rows, "dim": dim, "trained_at": self._trained_at,
+                "embedder_fitted": self.embedder.fitted, "tail_rows": tail_rows, "log_bytes": self._log_bytes}
+        _atomic_write_bytes(self.root / "meta.json", json.dumps(meta).encode())
+
+    def _publish(self, vectors: np.ndarray, save_embedder: bool) -> None:
+        """Write `vectors` (one per self._ids entry) as the base segment, with an empty tail."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        if save_embedder:
+            self.embedder.save(str(self.root / "embedder.npz"))
+        _atomic_write_bytes(self.root / "vectors.f32", np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        _atomic_write_bytes(self.root / "ids.json", json.dumps(self._ids).encode())
+        cent = self.centroids if self.centroids is not None else np.zeros((0, EMBED_DIM), dtype=np.float32)
+        tmp = self.root / "ivf.tmp.npz"
+        np.savez(tmp, centroids=cent, assign=self.assign)
+        os.replace(tmp, self.root / "ivf.npz")
+        _atomic_write_bytes(self.root / "tail.f32", b"")
+        _atomic_write_bytes(self.root / "tail.log", b"")
+        self._log_bytes = 0
+        self._write_meta(len(self._ids), int(vectors.shape[1]), 0)
+        self.load()  # re-open the published file as a read-only memmap
+
+    def _append(self, ids: List[str], vectors: np.ndarray, assign: np.ndarray, drop: List[int]) -> None:
+        """Publish one write as tail rows + tombstones; O(rows written), not O(store)."""
+        if not (self.root / "embedder.npz").exists():
+            self.embedder.save(str(self.root / "embedder.npz"))
+        dim = self.vectors.shape[1]
+        tail_rows = len(self.tail)
+        entry = {"add": ids, "assign": assign.tolist(), "drop": drop}
+        line = (json.dumps(entry) + "\n").encode()
+        # drop anything past the published tail (a write that died before its meta.json)
+        for name, size, data in (("tail.f32", tail_rows * dim * 4, np.ascontiguousarray(vectors, dtype=np.float32).tobytes()),
+                                 ("tail.log", self._log_bytes, line)):
+            with open(self.root / name, "ab") as f:
+                f.truncate(size)
+                f.write(data)
+        self._tombstone(drop)
+        for fid in ids:
+            self._add_position(fid)
+        self.tail_assign = np.concatenate((self.tail_assign, assign.astype(np.int32)))
+        self._log_bytes += len(line)
+        tail_rows += len(ids)
+        self._write_meta(len(self.vectors), dim, tail_rows)
+        if ids:
+            self.tail = np.memmap(self.root / "tail.f32", dtype=np.float32, mode="r", shape=(tail_rows, dim))
+
+    # -- writes -----------------------------------------------------------------
+
+    def _train(self, vectors: np.ndarray) -> None:
+        n = len(vectors)
+        if n < IVF_MIN_ROWS:
+            self.centroids, self.assign, self._trained_at = None, np.zeros(n, dtype=np.int32), 0
+            return
+        nlist = int(min(4096, max(16, np.sqrt(n))))
+        self.centroids = _kmeans(np.asarray(vectors), nlist)
+        self.assign = _assign(vectors, self.centroids)
+        self._trained_at = n
+
+    def build(self, ids: Sequence[str], texts: Sequence[str]) -> None:
+        """Fit the embedder on `texts`, embed everything and (re)train the IVF index."""
+        first: Dict[str, int] = {}
+        for i, fid in enumerate(ids):
+            first.setdefault(str(fid), i)
+        keep = sorted(first.values())
+        with self._lock:
+            self.embedder = LocalEmbedder.fit(texts)
+            vectors = self.embedder.transform([texts[i] for i in keep])
+            self._ids = [str(ids[i]) for i in keep]
+            self._train(vectors)
+            self._publish(vectors, save_embedder=True)
+
+    def _needs_retrain(self) -> bool:
+        live = len(self._pos)
+        if self.centroids is None:
+            return live >= IVF_MIN_ROWS
+        return live < IVF_MIN_ROWS or live >= IVF_RETRAIN_GROWTH * max(self._trained_at, 1)
+
+    def _maybe_compact(self) -> None:
+        churn = len(self.tail) + len(self._dead)
+        if self._needs_retrain() or churn > max(COMPACT_MIN_ROWS, COMPACT_FRACTION * len(self.vectors)):
+            self.compact()
+
+    def compact(self) -> None:
+        """Fold the tail into a new base without tombstoned rows; retrains centroids when due."""
+        with self._lock:
+            live = np.array(sorted(self._pos.values()), dtype=np.int64)
+            vectors = self._take(live) if len(live) else np.zeros((0, self.vectors.shape[1]), dtype=np.float32)
+            retrain = self._needs_retrain()
+            self.assign = np.concatenate((self.assign, self.tail_assign))[live]
+            self._ids = [self._ids[i] for i in live]
+            if retrain:
+                self._train(vectors)
+            self._publish(vectors, save_embedder=not (self.root / "embedder.npz").exists())
+
+    def upsert(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        Insert or overwrite rows by factory id (the last vector of a repeated id wins). Only
+        the written rows are assigned and stored; compacts (and retrains centroids) when due.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        latest: Dict[str, int] = {}
+        for i, fid in enumerate(ids):
+            latest[str(fid)] = i
+        new_ids, rows = list(latest), vectors[list(latest.values())]
+        with self._lock:
+            if not (self.root / "meta.json").exists():  # nothing published yet: this is the base
+                self._ids = new_ids
+                self._train(rows)
+                self._publish(rows, save_embedder=True)
+                return
+            assign = (_assign(rows, self.centroids) if self.centroids is not None
+                      else np.zeros(len(rows), dtype=np.int32))
+            self._append(new_ids, rows, assign, [self._pos[fid] for fid in new_ids if fid in self._pos])
+            self._maybe_compact()
+
+    def delete(self, ids: Sequence[str]) -> int:
+        """Drop rows by factory id (unknown ids are ignored); returns how many were removed."""
+        with self._lock:
+            drop = sorted({self._pos[str(fid)] for fid in ids if str(fid) in self._pos})
+            if not drop:
+                return 0
+            self._append([], np.zeros((0, self.vectors.shape[1]), dtype=np.float32), np.zeros(0, dtype=np.int32), drop)
+            self._maybe_compact()
+            return len(drop)
+
+    # -- reads ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+    def _take(self, rows: np.ndarray, vectors: Optional[np.ndarray] = None,
+              tail: Optional[np.ndarray] = None) -> np.ndarray:
+        """Vectors at row positions `rows` (base and tail)."""
+        vectors = self.vectors if vectors is None else vectors
+        tail = self.tail if tail is None else tail
+        out = np.empty((len(rows), vectors.shape[1]), dtype=np.float32)
+        in_base = rows < len(vectors)
+        out[in_base] = vectors[rows[in_base]]
+        out[~in_base] = tail[rows[~in_base] - len(vectors)]
+        return out
+
+    def get(self, ids: Sequence[str]) -> np.ndarray:
+        """Stored vectors for `ids` (zero rows for unknown ids)."""
+        with self._lock:
+            out = np.zeros((len(ids), self.vectors.shape[1]), dtype=np.float32)
+            found = [(j, self._pos[str(fid)]) for j, fid in enumerate(ids) if str(fid) in self._pos]
+            if found:
+                js, rows = (np.array(x, dtype=np.int64) for x in zip(*found))
+                out[js] = self._take(rows)
+            return out
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return self.embedder.transform(texts)
+
+    def _inverted_lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Base rows grouped by list; tail rows are matched by their assignment directly."""
+        if self._lists is None:
+            order = np.argsort(self.assign, kind="stable").astype(np.int64)
+            offsets = np.searchsorted(self.assign[order], np.arange(len(self.centroids) + 1))
+            self._lists = (order, offsets)
+        return self._lists
+
+    def search(self, query: np.ndarray, k: int = 50, nprobe: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Top-k (factory_id, cosine) pairs for a query vector."""
+        with self._lock:
+            vectors, tail, ids, centroids = self.vectors, self.tail, self._ids, self.centroids
+            if not len(self._pos):
+                return []
+            q = np.asarray(query, dtype=np.float32).ravel()
+            q = q / max(float(np.linalg.norm(q)), 1e-9)
+            if centroids is None:
+                rows = np.arange(len(vectors) + len(tail))
+            else:
+                order, offsets = self._inverted_lists()
+                nprobe = nprobe or min(len(centroids), max(8, len(centroids) // 8))
+                probe = np.argsort(-(centroids @ q))[:nprobe]
+                parts = [order[offsets[c]:offsets[c + 1]] for c in probe]
+                parts.append(len(vectors) + np.flatnonzero(np.isin(self.tail_assign, probe)))
+                rows = np.sort(np.concatenate(parts))
+            if self._dead:
+                if self._dead_rows is None:
+                    self._dead_rows = np.fromiter(self._dead, dtype=np.int64, count=len(self._dead))
+                rows = rows[~np.isin(rows, self._dead_rows)]
+        if not len(rows):
+            return []
+        sims = self._take(rows, vectors, tail) @ q
+        top = np.argsort(-sims)[:k] if len(sims) > k else np.argsort(-sims)
+        return [(ids[rows[i]], float(sims[i])) for i in top]
+
+_STORE: Optional[VectorStore] = None
+_STORE_LOCK = RLock()
+
+def get_vector_store() -> VectorStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = VectorStore()
+        return _STORE
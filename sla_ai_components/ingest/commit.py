@@ -1,14 +1,23 @@
 from __future__ import annotations
+import json
 import pandas as pd, yaml
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .normalizers import apply_mapping
 from .validators import require_mapped_keys
 from .dedupe import dedupe_factories
-from .embeddings import embed_factory_row
-from .upsert import upsert_factories, upsert_material_prices, upsert_lanes, upsert_shipper_rates
+from .embeddings import factory_key, index_factory_rows, remove_factory_rows
+from .row_hashes import diff_rows, get_row_hash_store, row_hash
+from .upsert import delete_factories, factory_db_key, upsert_factories, upsert_material_prices, upsert_lanes, upsert_shipper_rates
 from ..config import DISABLE_FACTORY_DEDUPE
 
-def commit_sheet(tenant_id: str, upload_id: int, sheet_name: str, df: pd.DataFrame, mapping_yaml: str) -> dict:
+def commit_sheet(tenant_id: str, upload_id: int, sheet_name: str, df: pd.DataFrame, mapping_yaml: str,
+                 feed: Optional[str] = None) -> dict:
+    """
+    Map and commit one sheet. `feed` names the recurring source the sheet comes from (file
+    name + sheet); when given, factory rows are diffed against that feed's last commit by
+    key and content hash, so only inserted/updated rows are embedded and upserted and rows
+    missing from the new version are deleted.
+    """
     mapping = yaml.safe_load(mapping_yaml) or {}
     t = mapping.get("sheet_type","unknown")
     
@@ -41,10 +50,17 @@ def commit_sheet(tenant_id: str, upload_id: int, sheet_name: str, df: pd.DataFra
             mapped = dedupe_factories(mapped)
             stats["deduped"] = int(len(df) - len(mapped))
         
-        # embed vector
-        mapped["factory_vec"] = mapped.to_dict(orient="records")
-        mapped["factory_vec"] = mapped["factory_vec"].apply(embed_factory_row)
-        upsert_factories(mapped)
+        # only rows that changed since this feed's last commit go on to embedding/upsert
+        record = None
+        if feed is not None:
+            mapped, record = _diff_against_feed(tenant_id, feed, mapped, stats)
+        
+        # embed vectors in one batch and persist them in the ANN vector store
+        vecs = index_factory_rows(mapped.to_dict(orient="records"))
+        mapped["factory_vec"] = [v.tolist() for v in vecs]
+        # hashes are only recorded once the rows are written, so failed rows are retried
+        if upsert_factories(mapped) and record is not None:
+            record()
         stats["rows_out"] = int(len(mapped))
         return stats
 
@@ -58,3 +74,29 @@ def commit_sheet(tenant_id: str, upload_id: int, sheet_name: str, df: pd.DataFra
     # unknown -> skip but report
     stats["skipped"] = int(len(df))
     return stats
+
+def _diff_against_feed(tenant_id: str, feed: str, mapped: pd.DataFrame, stats: dict):
+    """
+    Changed rows of `mapped`, plus a callback that deletes the rows gone from `feed` and
+    records the new hashes (called once the changed rows are committed).
+    """
+    records = mapped.to_dict(orient="records")
+    keys = [factory_key(r) for r in records]
+    hashes = {k: row_hash(r) for k, r in zip(keys, records)}
+    # label: the (name, country) a row was upserted under, so it is deleted by that same key
+    labels = {k: json.dumps(factory_db_key(r)) for k, r in zip(keys, records)}
+
+    store = get_row_hash_store()
+    diff = diff_rows(store.load(tenant_id, feed), hashes)
+    stats.update(inserted=len(diff.inserts), updated=len(diff.updates),
+                 deleted=len(diff.deletes), unchanged=diff.unchanged)
+
+    def record():
+        if diff.deletes:
+            if not delete_factories([tuple(json.loads(l)) for l in store.labels(tenant_id, feed, diff.deletes)]):
+                return  # hashes stay as they were; the deletes are retried on the next commit
+            remove_factory_rows(diff.deletes)
+        store.apply(tenant_id, feed, diff, hashes, labels)
+
+    changed = diff.changed
+    return mapped[[k in changed for k in keys]].reset_index(drop=True), record
@@ -5,14 +5,14 @@ from typing import Optional, Dict
 from sla_ai_components.config import DATA_FOLDER, DEFAULT_TENANT_ID, WATCH_DATA_FOLDER, WATCH_INTERVAL_SECS, AUTO_COMMIT_FROM_DATA_FOLDER
 from .files import sha256_file, tenant_from_filename, is_supported_file
 from .excel_loader import load_any
-from .preview import make_preview
+from .preview import preview_file
 from .commit import commit_sheet
 import yaml
 
 # Import DB helpers from upload API
 from sla_ai_components.api.upload import (
     _save_upload_row, _get_upload_by_sha, _set_upload_status, 
-    _save_upload_mappings, _save_ingest_report
+    _save_upload_mappings, _save_ingest_report, _set_upload_preview
 )
 
 def _proposed_to_mappings(previews: list[dict]) -> Dict[str,str]:
@@ -36,8 +36,8 @@ def _ingest_file(path: Path):
     print(f"[AUTO-INGEST] Processing {path.name} for tenant {tenant_id} (upload_id: {upload_id})")
 
     try:
-        frames = load_any(str(path))
-        previews = make_preview(frames)
+        previews = preview_file(str(path), checksum)
+        _set_upload_preview(upload_id, previews)
         for p in previews:
             _save_upload_mappings(upload_id, p["sheet_name"], p["proposed_mapping_yaml"], p["confidence"])
         _set_upload_status(upload_id, "preview_ready")
@@ -45,13 +45,14 @@ def _ingest_file(path: Path):
         # Auto-commit with proposed mappings if enabled
         if AUTO_COMMIT_FROM_DATA_FOLDER:
             mappings = _proposed_to_mappings(previews)
+            frames = load_any(str(path))
             stats = []
             for sheet_name, df in frames.items():
                 mapping_yaml = mappings.get(sheet_name)
                 if not mapping_yaml:
                     stats.append({"sheet": sheet_name, "skipped": len(df)})
                     continue
-                s = commit_sheet(tenant_id, upload_id, sheet_name, df, mapping_yaml)
+                s = commit_sheet(tenant_id, upload_id, sheet_name, df, mapping_yaml, feed=f"{path.name}#{sheet_name}")
                 stats.append(s)
             _save_ingest_report(upload_id, {"sheets": stats})
             _set_upload_status(upload_id, "committed")
@@ -1,31 +1,200 @@
 from __future__ import annotations
+import hashlib
+import numpy as np
 import pandas as pd
 import re
+from typing import Optional, Sequence
+from rapidfuzz import fuzz
+from ..config import DISABLE_NEAR_DUPE, NEAR_DUPE_MIN_SCORE, NEAR_DUPE_ADDRESS_MIN_SCORE
 
 COMMON_WORDS = re.compile(r"\b(ltd|limited|inc|co|company|factory|manuf|manufacturing)\b", re.I)
 
+# MinHash / LSH parameters: 128 permutations split into 32 bands of 4 rows puts the
+# candidate threshold at roughly 0.42 Jaccard over byte 3-shingles, loose enough to
+# catch one-letter typos in short names; rapidfuzz verification keeps precision.
+SHINGLE_SIZE = 3
+NUM_PERM = 128
+LSH_BANDS = 32
+LSH_ROWS = NUM_PERM // LSH_BANDS
+STOP_SHINGLE_FRAC = 0.01  # shingles in more than 1% of rows ("garments", "textile") carry no identity
+MAX_BUCKET = 64  # larger buckets are degenerate (boilerplate names) and skipped
+_CHUNK_ROWS = 4096
+_PRIME = np.uint64(4294967291)  # largest prime < 2**32, so signatures fit in uint32
+_rng = np.random.RandomState(20240526)  # fixed seed -> signatures are stable across runs
+_PERM_A = _rng.randint(1, 1 << 30, size=(NUM_PERM, 1)).astype(np.uint64)
+_PERM_B = _rng.randint(0, 1 << 30, size=(NUM_PERM, 1)).astype(np.uint64)
+_BAND_MIX = (_rng.randint(1, 1 << 30, size=LSH_ROWS).astype(np.uint64) * np.uint64(2) + np.uint64(1))
+
 def norm_name(s: str) -> str:
     if not s: return ""
     s = re.sub(r"[^\w\s]", " ", str(s).lower())
     s = COMMON_WORDS.sub(" ", s)
     return re.sub(r"\s+", " ", s).strip()
 
+def norm_text(s: str) -> str:
+    if not s or str(s).lower() == "nan": return ""
+    s = re.sub(r"[^\w\s]", " ", str(s).lower())
+    return re.sub(r"\s+", " ", s).strip()
+
+def _shingle_codes(texts: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Byte 3-grams of every text packed into 24-bit ints, plus the gram count per text."""
+    encoded = [t.replace(" ", "").encode().ljust(SHINGLE_SIZE, b"\0") for t in texts]
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    buf = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    codes = (buf[:-2] << np.uint64(16)) | (buf[1:-1] << np.uint64(8)) | buf[2:]
+    valid = np.arange(len(codes)) + SHINGLE_SIZE <= np.repeat(np.cumsum(lengths), lengths)[:len(codes)]
+    return codes[valid], lengths - (SHINGLE_SIZE - 1)
+
+def _frequent_shingles(texts: Sequence[str]) -> np.ndarray:
+    """Sorted codes of the stop-shingles; counts only the shingles that occur."""
+    codes_seen, row_counts = [], []
+    for start in range(0, len(texts), _CHUNK_ROWS):
+        codes, counts = _shingle_codes(texts[start:start + _CHUNK_ROWS])
+        rows = np.repeat(np.arange(len(counts), dtype=np.uint64), counts)
+        per_row = np.unique((rows << np.uint64(24)) | codes) & np.uint64((1 << 24) - 1)
+        uniq, counts = np.unique(per_row, return_counts=True)
+        codes_seen.append(uniq)
+        row_counts.append(counts)
+    if not codes_seen:
+        return np.zeros(0, dtype=np.uint64)
+    uniq, inverse = np.unique(np.concatenate(codes_seen), return_inverse=True)
+    doc_freq = np.bincount(inverse, weights=np.concatenate(row_counts), minlength=len(uniq))
+    return uniq[doc_freq > max(50, int(STOP_SHINGLE_FRAC * len(texts)))]
+
+def lsh_band_keys(texts: Sequence[str], blocks: np.ndarray) -> np.ndarray:
+    """
+    (n, LSH_BANDS) uint32 bucket keys: MinHash signatures are computed chunk by chunk and
+    folded into one key per band (salted by block) so 1M rows never materialize the full
+    signature matrix.
+    """
+    n = len(texts)
+    frequent = _frequent_shingles(texts)
+    keys = np.empty((n, LSH_BANDS), dtype=np.uint32)
+    salt = blocks.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    for start in range(0, n, _CHUNK_ROWS):
+        codes, counts = _shingle_codes(texts[start:start + _CHUNK_ROWS])
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        keep = ~np.isin(codes, frequent)
+        # rows made only of stop-shingles keep all of them rather than becoming empty
+        keep |= np.repeat(np.add.reduceat(keep, offsets) == 0, counts)
+        codes, counts = codes[keep], np.add.reduceat(keep, offsets)
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        perm = (_PERM_A * codes[None, :] + _PERM_B) % _PRIME  # (NUM_PERM, total_shingles)
+        sig = np.minimum.reduceat(perm, offsets, axis=1).T.reshape(len(counts), LSH_BANDS, LSH_ROWS)
+        folded = (sig * _BAND_MIX).sum(axis=2) ^ salt[start:start + len(counts), None]
+        keys[start:start + len(counts)] = (folded ^ (folded >> np.uint64(32))).astype(np.uint32)
+    return keys
+
+def _candidate_pairs(keys: np.ndarray, active: np.ndarray):
+    """Yield (i, j) index pairs that share an LSH bucket in any band."""
+    idx = np.nonzero(active)[0]
+    if len(idx) < 2:
+        return
+    for b in range(LSH_BANDS):
+        col = keys[idx, b]
+        order = np.argsort(col, kind="stable")
+        bounds = np.flatnonzero(np.diff(col[order])) + 1
+        starts = np.concatenate(([0], bounds))
+        sizes = np.diff(np.concatenate((starts, [len(col)])))
+        for s, size in zip(starts[(sizes > 1) & (sizes <= MAX_BUCKET)], sizes[(sizes > 1) & (sizes <= MAX_BUCKET)]):
+            members = idx[order[s:s + size]].tolist()
+            for a in range(size):
+                for c in range(a + 1, size):
+                    yield members[a], members[c]
+
+def _compatible(a: str, b: str) -> bool:
+    return not a or not b or a == b
+
+def _find(parent: np.ndarray, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def near_duplicate_clusters(
+    names: Sequence[str],
+    countries: Sequence[str],
+    addresses: Optional[Sequence[str]] = None,
+    cities: Optional[Sequence[str]] = None,
+    vendors: Optional[Sequence[str]] = None,
+    *,
+    min_score: float = NEAR_DUPE_MIN_SCORE,
+    address_min_score: float = NEAR_DUPE_ADDRESS_MIN_SCORE,
+) -> list[str]:
+    """
+    Cluster near-duplicate factories and return one stable cluster id per row.
+
+    Rows are blocked by country, MinHash/LSH over name + address shingles proposes
+    candidates, and only candidates sharing a bucket are verified with rapidfuzz.
+    City and vendor act as guards: two rows with different non-empty values never merge.
+    Cluster ids hash the smallest member key, so they don't depend on row order.
+    """
+    n = len(names)
+    empty = [""] * n
+    nn = [norm_name(x) for x in names]
+    na = [norm_text(x) for x in (addresses if addresses is not None else empty)]
+    nc = [norm_text(x) for x in (cities if cities is not None else empty)]
+    nv = [norm_name(x) for x in (vendors if vendors is not None else empty)]
+    nco = [str(x or "").strip().upper() for x in countries]
+
+    block_ids = {c: i for i, c in enumerate(sorted(set(nco)))}
+    blocks = np.fromiter((block_ids[c] for c in nco), dtype=np.uint64, count=n)
+    active = np.fromiter((bool(x) for x in nn), dtype=bool, count=n)
+    keys = lsh_band_keys([f"{a} {b}".strip() for a, b in zip(nn, na)], blocks)
+
+    parent = np.arange(n)
+    for i, j in _candidate_pairs(keys, active):
+        ri, rj = _find(parent, i), _find(parent, j)
+        if ri == rj:
+            continue
+        if not (_compatible(nc[i], nc[j]) and _compatible(nv[i], nv[j])):
+            continue
+        if fuzz.token_sort_ratio(nn[i], nn[j]) < min_score:
+            continue
+        if na[i] and na[j] and fuzz.token_set_ratio(na[i], na[j]) < address_min_score:
+            continue
+        parent[max(ri, rj)] = min(ri, rj)
+
+    member_keys = [f"{nco[i]}|{nn[i]}|{na[i]}|{nc[i]}|{nv[i]}" for i in range(n)]
+    roots = [_find(parent, i) for i in range(n)]
+    smallest: dict[int, str] = {}
+    for r, k in zip(roots, member_keys):
+        if r not in smallest or k < smallest[r]:
+            smallest[r] = k
+    return ["fc_" + hashlib.sha1(smallest[r].encode()).hexdigest()[:16] for r in roots]
+
+def assign_cluster_ids(df: pd.DataFrame) -> pd.DataFrame:
+    """Add a stable `cluster_id` column grouping near-duplicate factory rows."""
+    df = df.copy()
+    blank = pd.Series([""] * len(df), index=df.index)
+    def col(name: str) -> list[str]:
+        return df.get(name, blank).fillna("").astype(str).tolist()
+    df["cluster_id"] = near_duplicate_clusters(
+        col("factory_name"), col("country_iso2"),
+        addresses=col("address_raw"), cities=col("city"), vendors=col("vendor_name"),
+    )
+    return df
+
 def dedupe_factories(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Conservative dedupe: within (country_iso2, city), keep first of same normalized (name + vendor).
+    Conservative dedupe: within (country_iso2, city), keep first of same normalized (name + vendor),
+    then collapse near-duplicates (MinHash/LSH + rapidfuzz) to the first row of each cluster.
     """
     df = df.copy()
-    
+
     # Handle missing columns gracefully
     country_col = df.get("country_iso2", pd.Series([""] * len(df), index=df.index))
     city_col = df.get("city", pd.Series([""] * len(df), index=df.index))
     factory_name_col = df.get("factory_name", pd.Series([""] * len(df), index=df.index))
     vendor_name_col = df.get("vendor_name", pd.Series([""] * len(df), index=df.index))
-    
+
     df["__k"] = (
         country_col.astype(str) + "|" +
         city_col.astype(str).str.lower() + "|" +
         factory_name_col.astype(str).map(norm_name) + "|" +
         vendor_name_col.astype(str).map(norm_name)
     )
-    return df.drop_duplicates("__k").drop(columns="__k", errors="ignore")
+    df = df.drop_duplicates("__k").drop(columns="__k", errors="ignore")
+    if DISABLE_NEAR_DUPE or df.empty:
+        return df
+    return assign_cluster_ids(df).drop_duplicates("cluster_id")
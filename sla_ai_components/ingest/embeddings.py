@@ -1,7 +1,8 @@
 from __future__ import annotations
-import json
+import hashlib
 import numpy as np
-from sla_ai_components.embeddings.embed import embed_spec
+from sla_ai_components.embeddings.vector_store import get_vector_store
+from .dedupe import norm_name
 
 def build_factory_text(row: dict) -> dict:
     parts = [
@@ -10,9 +11,38 @@ def build_factory_text(row: dict) -> dict:
       str(row.get("vendor_name","")),
       str(row.get("city","")), str(row.get("country_iso2",""))
     ]
-    return {"text": " | ".join([p for p in parts if p])}
+    return {"text": " | ".join([p for p in parts if p and p.lower() != "nan"])}
+
+def factory_key(row: dict) -> str:
+    """Stable vector-store id: explicit factory_id, else a hash of normalized name + country."""
+    fid = row.get("factory_id")
+    if fid is not None and str(fid).strip() and str(fid).lower() != "nan":
+        return str(fid).strip()
+    basis = f"{norm_name(str(row.get('factory_name') or ''))}|{str(row.get('country_iso2') or row.get('country') or '').upper()}"
+    return "fk_" + hashlib.sha1(basis.encode()).hexdigest()[:16]
+
+def embed_factory_rows(rows: list[dict]) -> np.ndarray:
+    return get_vector_store().embed([build_factory_text(r)["text"] for r in rows])
 
 def embed_factory_row(row: dict) -> list[float]:
-    text = build_factory_text(row)["text"]
-    v = np.array(embed_spec({"t":text}), dtype=float)
-    return v.tolist()
+    return embed_factory_rows([row])[0].tolist()
+
+def index_factory_rows(rows: list[dict]) -> np.ndarray:
+    """
+    Embed rows and persist them in the vector store. The first bulk load fits the
+    embedder (TF-IDF + SVD) on its own text; later loads reuse that fit.
+    """
+    store = get_vector_store()
+    if not rows:
+        return np.zeros((0, store.embedder.dim), dtype=np.float32)
+    ids = [factory_key(r) for r in rows]
+    if not len(store) and not store.embedder.fitted:
+        store.build(ids, [build_factory_text(r)["text"] for r in rows])
+        return store.get(ids)
+    vecs = embed_factory_rows(rows)
+    store.upsert(ids, vecs)
+    return vecs
+
+def remove_factory_rows(keys: list[str]) -> int:
+    """Drop factories (by `factory_key`) that disappeared from their feed from the vector store."""
+    return get_vector_store().delete(keys) if keys else 0
@@ -12,3 +12,46 @@ def load_any(path: str) -> dict[str, pd.DataFrame]:
         df = pd.read_csv(p, sep=sep)
         return {"Sheet1": df}
     raise ValueError(f"Unsupported file type: {p.suffix}")
+
+def _header_names(cells: tuple) -> list[str]:
+    # Mirror pandas: blank headers become "Unnamed: i", repeats get ".1", ".2" suffixes
+    names, seen = [], {}
+    for i, c in enumerate(cells):
+        name = f"Unnamed: {i}" if c is None or str(c).strip() == "" else str(c)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+def _load_xlsx_head(p: Path, nrows: int) -> dict[str, pd.DataFrame]:
+    from openpyxl import load_workbook
+    wb = load_workbook(p, read_only=True, data_only=True)
+    try:
+        out = {}
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(max_row=nrows + 1, values_only=True)
+            header = next(rows, None)
+            if header is None:
+                out[ws.title] = pd.DataFrame()
+                continue
+            width = len(header)
+            body = [list(r[:width]) + [None] * (width - len(r)) for r in rows if any(v is not None for v in r)]
+            out[ws.title] = pd.DataFrame(body, columns=_header_names(header))
+        return out
+    finally:
+        wb.close()
+
+def load_head(path: str, nrows: int = 50) -> dict[str, pd.DataFrame]:
+    """Like load_any, but reads only the header and the first `nrows` rows of every sheet."""
+    p = Path(path)
+    if p.suffix.lower() == ".xlsx":
+        return _load_xlsx_head(p, nrows)
+    if p.suffix.lower() == ".xls":
+        return pd.read_excel(p, sheet_name=None, nrows=nrows)
+    if p.suffix.lower() in (".csv", ".tsv"):
+        sep = "," if p.suffix.lower()==".csv" else "\t"
+        return {"Sheet1": pd.read_csv(p, sep=sep, nrows=nrows)}
+    raise ValueError(f"Unsupported file type: {p.suffix}")
@@ -1,7 +1,18 @@
 from __future__ import annotations
 import pandas as pd
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
 from .detectors import detect_sheet_type
 from .mappers import propose_mapping
+from .excel_loader import load_head
+from .files import sha256_file
+
+PREVIEW_ROWS = 50  # rows read per sheet; detection only needs headers, samples need 5
+_CACHE_SIZE = 256
+
+_preview_cache: "OrderedDict[str, list[dict]]" = OrderedDict()
+_cache_lock = Lock()
 
 def make_preview(frames: dict[str, pd.DataFrame]) -> list[dict]:
     out = []
@@ -18,3 +29,26 @@ def make_preview(frames: dict[str, pd.DataFrame]) -> list[dict]:
           "sample_rows": sample
         })
     return out
+
+def get_cached_preview(file_sha256: str) -> Optional[list[dict]]:
+    with _cache_lock:
+        prev = _preview_cache.get(file_sha256)
+        if prev is not None:
+            _preview_cache.move_to_end(file_sha256)
+        return prev
+
+def preview_file(path: str, file_sha256: Optional[str] = None, nrows: int = PREVIEW_ROWS) -> list[dict]:
+    """
+    Preview a workbook from its header and first rows only, cached by content SHA-256
+    so repeat previews of the same bytes skip the file entirely.
+    """
+    key = file_sha256 or sha256_file(path)
+    cached = get_cached_preview(key)
+    if cached is not None:
+        return cached
+    preview = make_preview(load_head(path, nrows=nrows))
+    with _cache_lock:
+        _preview_cache[key] = preview
+        while len(_preview_cache) > _CACHE_SIZE:
+            _preview_cache.popitem(last=False)
+    return preview
@@ -0,0 +1,112 @@
+from __future__ import annotations
+from pathlib import Path
+from threading import RLock
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence
+import hashlib
+import json
+import sqlite3
+
+from ..config import UPLOAD_REGISTRY_DB
+
+# Content hash per committed source row, per (tenant, feed). Re-committing an updated feed
+# diffs the new rows against the stored hashes by key, so only inserted and changed rows
+# are embedded and upserted and rows that vanished from the feed are deleted.
+
+# Bookkeeping columns that differ between uploads of the same content
+UNHASHED_FIELDS = ("tenant_id", "source_upload_id", "factory_vec")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_row_hashes (
+  tenant_id TEXT NOT NULL,
+  feed TEXT NOT NULL,
+  row_key TEXT NOT NULL,
+  row_hash TEXT NOT NULL,
+  label TEXT,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (tenant_id, feed, row_key)
+);
+"""
+
+def row_hash(row: Mapping, ignore: Sequence[str] = UNHASHED_FIELDS) -> str:
+    """Stable across processes and column order: SHA-1 of the row as canonical JSON."""
+    body = {k: v for k, v in row.items() if k not in ignore}
+    return hashlib.sha1(json.dumps(body, sort_keys=True, default=str, ensure_ascii=False).encode()).hexdigest()
+
+class RowDiff(NamedTuple):
+    inserts: List[str]
+    updates: List[str]
+    deletes: List[str]
+    unchanged: int
+
+    @property
+    def changed(self) -> set:
+        return set(self.inserts) | set(self.updates)
+
+def diff_rows(previous: Mapping[str, str], current: Mapping[str, str]) -> RowDiff:
+    """Keys to insert, update and delete going from `previous` to `current` ({key: hash})."""
+    inserts = [k for k in current if k not in previous]
+    updates = [k for k, h in current.items() if k in previous and previous[k] != h]
+    deletes = [k for k in previous if k not in current]
+    return RowDiff(inserts, updates, deletes, len(current) - len(inserts) - len(updates))
+
+class RowHashStore:
+    """SQLite table of row hashes, kept next to the upload registry."""
+
+    def __init__(self, db_path: str = UPLOAD_REGISTRY_DB):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = RLock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def load(self, tenant_id: str, feed: str) -> Dict[str, str]:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT row_key, row_hash FROM ingest_row_hashes WHERE tenant_id = ? AND feed = ?",
+                (tenant_id, feed)).fetchall()
+        return dict(rows)
+
+    def labels(self, tenant_id: str, feed: str, keys: Iterable[str]) -> List[str]:
+        """Stored labels for `keys` (for factories, the key their rows were written under), for deleting them."""
+        keys = list(keys)
+        out: List[str] = []
+        with self._lock:
+            db = self._db()
+            for s in range(0, len(keys), 500):
+                chunk = keys[s:s + 500]
+                marks = ",".join("?" * len(chunk))
+                out += [r[0] for r in db.execute(
+                    f"SELECT label FROM ingest_row_hashes WHERE tenant_id = ? AND feed = ? AND row_key IN ({marks})",
+                    (tenant_id, feed, *chunk)) if r[0] is not None]
+        return out
+
+    def apply(self, tenant_id: str, feed: str, diff: RowDiff,
+              hashes: Mapping[str, str], labels: Mapping[str, str]) -> None:
+        """Record the hashes of inserted/updated rows and forget deleted ones, in one transaction."""
+        with self._lock:
+            db = self._db()
+            with db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO ingest_row_hashes (tenant_id, feed, row_key, row_hash, label, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+                    [(tenant_id, feed, k, hashes[k], labels.get(k)) for k in diff.inserts + diff.updates])
+                db.executemany(
+                    "DELETE FROM ingest_row_hashes WHERE tenant_id = ? AND feed = ? AND row_key = ?",
+                    [(tenant_id, feed, k) for k in diff.deletes])
+
+_STORE: Optional[RowHashStore] = None
+_STORE_LOCK = RLock()
+
+def get_row_hash_store() -> RowHashStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = RowHashStore()
+        return _STORE
@@ -10,11 +10,15 @@ def get_db_connection():
     db_path = project_root / "sla.db"
     return sqlite3.connect(str(db_path))
 
-def upsert_factories(df: pd.DataFrame):
-    """Upsert factories to the database"""
+def factory_db_key(row) -> tuple[str, str]:
+    """(name, country) a factory row is stored under in the factories table"""
+    return row.get('factory_name', 'Unknown'), row.get('country_iso2', row.get('country', 'Unknown'))
+
+def upsert_factories(df: pd.DataFrame) -> bool:
+    """Upsert factories to the database, keyed by factory_db_key; False when nothing was written"""
     if df.empty:
         print("[UPSERT] No factories to upsert")
-        return
+        return True
     
     print(f"[UPSERT] Upserting {len(df)} factories")
     
@@ -23,8 +27,7 @@ def upsert_factories(df: pd.DataFrame):
     
     try:
         for _, row in df.iterrows():
-            factory_name = row.get('factory_name', 'Unknown')
-            country = row.get('country_iso2', row.get('country', 'Unknown'))
+            factory_name, country = factory_db_key(row)
             city = row.get('city', '')
             certifications = row.get('certifications', '[]')
             moq = row.get('moq', 0)
@@ -33,25 +36,49 @@ def upsert_factories(df: pd.DataFrame):
             contact_email = row.get('contact_email', '')
             contact_phone = row.get('contact_phone', '')
             website = row.get('website', '')
-            tenant_id = row.get('tenant_id', 'tenant_demo')
-            source_upload_id = row.get('source_upload_id', 0)
-            factory_vec = row.get('factory_vec', '')
             
-            # Insert or update factory
+            # Update the factory stored under the same key, or insert it
+            values = (city, certifications, moq, lead_time_days, rating, contact_email, contact_phone, website)
             cursor.execute("""
-                INSERT OR REPLACE INTO factories 
-                (name, country, city, certifications, moq, lead_time_days, rating, 
-                 contact_email, contact_phone, website, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'), datetime('now'))
-            """, (factory_name, country, city, certifications, moq, lead_time_days, rating,
-                  contact_email, contact_phone, website))
+                UPDATE factories SET city = ?, certifications = ?, moq = ?, lead_time_days = ?, rating = ?,
+                       contact_email = ?, contact_phone = ?, website = ?, updated_at = datetime('now')
+                WHERE name = ? AND country IS ?
+            """, values + (factory_name, country))
+            if cursor.rowcount == 0:
+                cursor.execute("""
+                    INSERT INTO factories 
+                    (name, country, city, certifications, moq, lead_time_days, rating, 
+                     contact_email, contact_phone, website, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'), datetime('now'))
+                """, (factory_name, country) + values)
             
         conn.commit()
         print(f"[UPSERT] Successfully upserted {len(df)} factories")
+        return True
         
     except Exception as e:
         print(f"[UPSERT] Error upserting factories: {e}")
         conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+def delete_factories(keys: list[tuple[str, str]]) -> bool:
+    """Delete factories by the (name, country) key they were upserted under; False on failure"""
+    if not keys:
+        return True
+    
+    print(f"[UPSERT] Deleting {len(keys)} factories")
+    
+    conn = get_db_connection()
+    try:
+        conn.executemany("DELETE FROM factories WHERE name = ? AND country IS ?", [tuple(k) for k in keys])
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"[UPSERT] Error deleting factories: {e}")
+        conn.rollback()
+        return False
     finally:
         conn.close()
 
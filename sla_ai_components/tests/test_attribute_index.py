@@ -0,0 +1,59 @@
+import os
+import api_server
+from services.api.app.search.attributes import AttributeIndex, terms
+
+HEADER = "Factory Name,Country,City,Product Specialties,Materials Handled,Customization Capabilities,Notes,"
+
+def _line(fields: str) -> str:
+    # the export wraps each physical line in one quoted field followed by tab padding
+    return '"' + fields.replace('"', '""') + '"' + "\t" * 5 + "\r\n"
+
+def _write(path, records):
+    body = _line(HEADER) + _line("Full name,Country code,City,Products,Materials,Custom,Notes,")
+    body += "".join(_line(r) for r in records)
+    path.write_bytes(body.encode("latin-1"))
+
+RECORDS = [
+    'Fleece Works,CN,Dongguan,"Hoodies, Sweatshirts","Cotton, Polyester fleece",Kangaroo pocket hoodies,Streetwear capsule; navy and black',
+    'Denim Co,BD,Dhaka,Jeans,"Denim, Cotton",Enzyme wash,Caf\xe9 owned',
+    'Split Record,"United States of',
+    'America",Ypsilanti,Tees,Cotton,Screenprint,Athletic',
+]
+
+def test_terms_fold_plurals():
+    assert terms("Hoodies, knits and dresses") == {"hoodie", "knit", "and", "dress"}
+
+def test_csv_is_parsed_once_into_indexes_and_reloaded_on_change(tmp_path, monkeypatch):
+    path = tmp_path / "factories.csv"
+    _write(path, RECORDS)
+    monkeypatch.setattr(api_server, "FACTORY_CSV_PATH", str(path))
+    monkeypatch.setattr(api_server, "_ATTRIBUTE_INDEX", None)
+
+    index = api_server._attribute_index()
+    assert [r["Factory Name"] for r in index.rows] == ["Fleece Works", "Denim Co", "Split Record"]
+    assert index.rows[2]["Country"] == "United States of\nAmerica" and index.rows[1]["Notes"] == "Caf\xe9 owned"
+    assert api_server._attribute_index() is index
+
+    out = api_server.match_factories_by_attributes({
+        "product_category": "hoodie",
+        "primary_materials": ["cotton", "polyester"],
+        "key_features": ["kangaroo pocket"],
+        "style_tags": ["streetwear", "athletic"],
+        "colors": ["navy"],
+        "region_hints": ["dongguan"],
+    }, limit=2)
+    assert [r["Factory Name"] for r in out] == ["Fleece Works", "Split Record"]
+    assert out[0]["matched_attributes"] == [
+        "category", "material_cotton", "feature_kangaroo pocket", "style_streetwear", "color_navy", "region_dongguan"]
+    assert abs(out[0]["score"] - 0.85) < 1e-9
+
+    _write(path, RECORDS[1:2])
+    os.utime(path, ns=(1, 1))
+    assert len(api_server._attribute_index()) == 1
+    assert api_server.match_factories_by_attributes({"product_category": "hoodie"}) == []
+
+def test_match_requires_every_phrase_term():
+    index = AttributeIndex([{"p": "Knit tops"}, {"p": "Woven tops"}], {"product": ("p",)})
+    assert index.match("product", "knit top") == {0}
+    assert index.match("product", "tops") == {0, 1}
+    assert index.match("product", "") == frozenset() and index.match("missing", "top") == frozenset()
@@ -2,10 +2,22 @@ from pathlib import Path
 import pandas as pd
 import tempfile
 import os
+import pytest
+from sla_ai_components.api import upload
+from sla_ai_components.data.uploads_repo import UploadRegistry
+from sla_ai_components.ingest import row_hashes
 from sla_ai_components.ingest.daemon import bootstrap_scan
 from sla_ai_components.ingest.files import sha256_file, tenant_from_filename, is_supported_file
 from sla_ai_components.config import DATA_FOLDER
 
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """Upload registry and row hashes in tmp_path instead of the shared UPLOAD_REGISTRY_DB"""
+    db = str(tmp_path / "registry.db")
+    monkeypatch.setattr(upload, "_UPLOADS", UploadRegistry(db))
+    monkeypatch.setattr(row_hashes, "_STORE", row_hashes.RowHashStore(db))
+    return upload._UPLOADS
+
 def test_sha256_file():
     with tempfile.NamedTemporaryFile(mode='w', delete=False) as f:
         f.write("test content")
@@ -29,7 +41,7 @@ def test_is_supported_file():
     assert is_supported_file(Path("test.txt")) == False
     assert is_supported_file(Path("test.pdf")) == False
 
-def test_bootstrap_scan_discovers_and_ingests(tmp_path):
+def test_bootstrap_scan_discovers_and_ingests(tmp_path, registry):
     data_dir = tmp_path / "data"
     data_dir.mkdir()
     
@@ -38,9 +50,7 @@ def test_bootstrap_scan_discovers_and_ingests(tmp_path):
     fpath = data_dir / "tenant_demo__suppliers.xlsx"
     df.to_excel(fpath, index=False)
 
-    # Clear the in-memory uploads database to avoid conflicts
-    from sla_ai_components.api.upload import _UPLOADS
-    _UPLOADS.clear()
+    _UPLOADS = registry
 
     # Test the bootstrap scan function directly
     def test_bootstrap_scan():
@@ -76,7 +86,7 @@ def test_bootstrap_scan_discovers_and_ingests(tmp_path):
     assert upload_record["status"] == "committed"
     assert upload_record["tenant_id"] == "tenant_demo"
 
-def test_bootstrap_scan_skips_unsupported_files(tmp_path):
+def test_bootstrap_scan_skips_unsupported_files(tmp_path, registry):
     data_dir = tmp_path / "data"
     data_dir.mkdir()
     
@@ -89,9 +99,7 @@ def test_bootstrap_scan_skips_unsupported_files(tmp_path):
     fpath = data_dir / "factories.xlsx"
     df.to_excel(fpath, index=False)
 
-    # Clear the in-memory uploads database to avoid conflicts
-    from sla_ai_components.api.upload import _UPLOADS
-    _UPLOADS.clear()
+    _UPLOADS = registry
 
     # Test the bootstrap scan function directly
     def test_bootstrap_scan():
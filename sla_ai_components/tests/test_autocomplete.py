@@ -0,0 +1,113 @@
+import random
+import time
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+import api_server
+import autocomplete
+from autocomplete import AutocompleteIndex
+from search_builder import FactorySearchBuilder
+
+WORDS = ["harbor", "delta", "summit", "golden", "river", "lotus", "pioneer", "crown", "meridian", "apex"]
+PRODUCTS = ["denim", "knitwear", "t-shirts", "hoodies", "dresses", "jackets", "socks"]
+MATERIALS = ["cotton", "polyester", "linen", "wool", "silk"]
+BRANDS = ["levis", "zara", "h&m", "uniqlo", "gap", "nike"]
+COUNTRIES = ["Bangladesh", "Vietnam", "China", "India", "Turkey"]
+
+def _factories(n, seed=5):
+    rnd = random.Random(seed)
+    return [{"factory_name": f"{rnd.choice(WORDS).title()} {rnd.choice(WORDS).title()} Garments {i}",
+             "product_specialties": rnd.sample(PRODUCTS, 2), "materials_handled": rnd.sample(MATERIALS, 2),
+             "past_clients": rnd.sample(BRANDS, rnd.randint(0, 2)), "country": rnd.choice(COUNTRIES)}
+            for i in range(n)]
+
+def _state(index):
+    return index.counts, index.keys, index.weights, index._top
+
+def test_completions_cover_names_facets_and_aliases():
+    index = AutocompleteIndex.build([
+        {"factory_name": "Harbor Denim Works", "product_specialties": ["Denim"], "materials_handled": ["Cotton"],
+         "past_clients": ["Levis"], "country": "Bangladesh"},
+        {"factory_name": "Delta Knit", "product_specialties": ["denim", "Knitwear"], "country": "bd"},
+    ])
+    top = index.complete("den")[0]
+    assert (top["kind"], top["value"], top["weight"]) == ("product", "denim", 2.0)
+    assert [s["text"] for s in index.complete("Harb")] == ["Harbor Denim Works"]
+    assert [s["value"] for s in index.complete("jea", kinds=["product"])] == ["denim"]  # "jeans" alias
+    assert index.complete("levis")[0]["value"] == "levi's"  # alias of the canonical brand
+    assert index.complete("ban", kinds=["country"]) == [
+        {"text": "Bangladesh", "kind": "country", "value": "bangladesh", "matched": "bangladesh", "weight": 2.0}]
+    assert [s["text"] for s in index.complete("knit", kinds=["factory"])] == ["Delta Knit"]  # later name word
+    assert index.complete("") == [] and index.complete("zzz") == []
+
+def test_incremental_changes_match_a_fresh_build(monkeypatch):
+    monkeypatch.setattr(autocomplete, "SCAN_LIMIT", 8)  # most prefixes get cached top lists
+    factories = _factories(300)
+    builder = FactorySearchBuilder(factories)
+    before = builder.autocomplete
+    rnd = random.Random(9)
+    for step in range(5):
+        live = builder.factories_data
+        upserts = [dict(f, past_clients=rnd.sample(BRANDS, 2), country=rnd.choice(COUNTRIES))
+                   for f in rnd.sample(live, 10)] + _factories(5, seed=100 + step)
+        upserts = [dict(f, factory_name=f"{f['factory_name']} {step}") if i >= 10 else f
+                   for i, f in enumerate(upserts)]
+        deletes = [f["factory_name"] for f in rnd.sample(live, 7) if f not in upserts]
+        builder.apply_changes(upserts, deletes)
+        assert _state(builder.autocomplete) == _state(AutocompleteIndex.build(builder.factories_data))
+    assert builder.autocomplete is not before and before.complete("har")  # older index still readable
+    for prefix in ["g", "ha", "delta r", "co", "vie", "h&", "summit golden garments 1"]:
+        cached = builder.autocomplete.complete(prefix, kinds=["factory", "brand"])
+        scanned = builder.autocomplete._ranked(
+            builder.autocomplete._best(*builder.autocomplete._range(prefix), kinds=("factory", "brand")), 10)
+        assert [(s["kind"], s["value"]) for s in cached] == [r[3] for r in scanned]
+
+def test_top_completions_p99_under_a_millisecond():
+    index = AutocompleteIndex.build(_factories(5000))
+    prefixes = [w[:n] for w in WORDS + PRODUCTS + MATERIALS + BRANDS for n in (1, 2, 3)] * 20
+    took = []
+    for prefix in prefixes:
+        t = time.perf_counter()
+        assert index.complete(prefix)
+        took.append(time.perf_counter() - t)
+    took.sort()
+    assert took[int(len(took) * 0.99)] < 0.001
+
+def _serve(monkeypatch, source, saved=None):
+    data = SimpleNamespace(source=source)
+    monkeypatch.setattr(api_server, "_factory_index", lambda: data)
+    monkeypatch.setattr(api_server, "_autocomplete", None)
+    monkeypatch.setattr(api_server, "FactoryDataIngest", lambda: SimpleNamespace(saved_row_hashes=lambda: saved))
+    return data, TestClient(api_server.app)
+
+def test_endpoint_applies_new_data_to_the_existing_index(monkeypatch):
+    data, client = _serve(monkeypatch, _factories(50))
+    body = client.get("/api/factories/autocomplete", params={"q": "Viet", "kinds": "country"}).json()
+    assert body["query"] == "Viet" and [s["text"] for s in body["suggestions"]] == ["Vietnam"]
+
+    build = AutocompleteIndex.build
+    monkeypatch.setattr(AutocompleteIndex, "build", None)  # new data must be applied, not rebuilt
+    data.source = [f for f in data.source if f["country"] != "Vietnam"] + [
+        {"factory_name": "Orchid Apparel", "product_specialties": ["denim"], "country": "Cambodia"}]
+    assert client.get("/api/factories/autocomplete", params={"q": "viet"}).json()["suggestions"] == []
+    body = client.get("/api/factories/autocomplete", params={"q": "orch", "limit": 3}).json()
+    assert [s["text"] for s in body["suggestions"]] == ["Orchid Apparel"]
+    assert _state(api_server._autocomplete[3]) == _state(build(data.source))
+    assert client.get("/api/factories/autocomplete", params={"q": "a", "kinds": "city"}).status_code == 400
+
+def test_ingest_row_hashes_pick_the_rows_to_apply(monkeypatch):
+    factories = _factories(50)
+    saved = {f["factory_name"]: f"h{i}" for i, f in enumerate(factories)}
+    data, client = _serve(monkeypatch, factories, saved)
+    assert client.get("/api/factories/autocomplete", params={"q": "harbor"}).json()["suggestions"]
+
+    decoded = []
+    rows = api_server._autocomplete_rows
+    monkeypatch.setattr(api_server, "_autocomplete_rows", lambda source, positions=None: decoded.append(positions) or rows(source, positions))
+    renamed = dict(factories[3], country="Cambodia")
+    data.source = factories[:3] + [renamed] + factories[4:]
+    saved[renamed["factory_name"]] = "changed"
+    body = client.get("/api/factories/autocomplete", params={"q": "camb"}).json()
+    assert [s["text"] for s in body["suggestions"]] == ["Cambodia"]
+    assert decoded == [[3], [3]]  # the changed row, before and after; nothing else decoded
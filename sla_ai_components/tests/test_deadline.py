@@ -0,0 +1,57 @@
+import asyncio
+import time
+from services.api.app.models.search import SearchRequest
+from services.api.app.search import orchestrator
+from services.api.app.utils.deadline import current_deadline, deadline, within_deadline
+
+def test_within_deadline_cancels_slow_stage_and_records_it():
+    state = {"cancelled": False}
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+    async def run():
+        assert await within_deadline("noop", asyncio.sleep(0, "free"), None) == "free"  # no deadline set
+        with deadline(30) as dl:
+            out = await within_deadline("web_recall", slow(), [])
+            late = await within_deadline("rerank", asyncio.sleep(0, "never"), None)
+        return out, late, dl
+    out, late, dl = asyncio.run(run())
+    assert out == [] and late is None and state["cancelled"]
+    assert dl.meta() == {"time_budget_ms": 30, "partial": True, "timed_out_stages": ["web_recall", "rerank"]}
+
+def test_nested_scopes_only_tighten():
+    with deadline(50) as outer:
+        with deadline(10_000) as inner:
+            assert inner is outer
+        with deadline(5) as tight:
+            assert tight is not outer and tight.timed_out is outer.timed_out
+            assert current_deadline() is tight
+        assert current_deadline() is outer
+    assert current_deadline() is None
+
+def test_orchestrator_returns_partial_results_within_budget(monkeypatch):
+    rows = [{"id": i, "name": f"Denim Mill {i}", "country": "BD", "product_types": "denim jeans"} for i in range(3)]
+    async def corpus():
+        return rows
+    async def hung_web(req):
+        await asyncio.sleep(5)
+        return []
+    monkeypatch.setattr(orchestrator, "get_corpus", corpus)
+    monkeypatch.setattr(orchestrator, "search_web", hung_web)
+    monkeypatch.setattr(orchestrator, "SEARCH_HARD_BUDGET_MS", 1000)
+
+    t0 = time.perf_counter()
+    items, meta = asyncio.run(orchestrator.perform_unified_search(SearchRequest(q="denim", country="BD", min_score=10)))
+    assert time.perf_counter() - t0 < 2.0
+    assert [it["name"] for it in items] and meta["partial"] and "web_recall" in meta["timed_out_stages"]
+
+def test_no_budget_still_yields_a_deadline():
+    with deadline(0) as dl:
+        assert current_deadline() is None and not dl.expired
+        assert dl.meta() == {"time_budget_ms": None, "partial": False, "timed_out_stages": []}
+    with deadline(50) as outer:
+        with deadline(None) as inner:
+            assert inner is outer
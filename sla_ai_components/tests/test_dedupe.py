@@ -0,0 +1,32 @@
+import pandas as pd
+from sla_ai_components.ingest.dedupe import dedupe_factories, near_duplicate_clusters
+
+def test_near_duplicates_merge_within_country():
+    ids = near_duplicate_clusters(
+        ["Shenzhen Bright Textile Co., Ltd", "Shenzhen Brigth Textile Company Limited", "Shenzhen Bright Textile", "Hangzhou Silk Works"],
+        ["CN", "CN", "VN", "CN"],
+    )
+    assert ids[0] == ids[1]
+    assert ids[0] != ids[2]  # different country block
+    assert ids[0] != ids[3]
+
+def test_cluster_ids_stable_across_row_order():
+    names = ["Alpha Knits Ltd", "Alpha Knitts Limited", "Beta Denim"]
+    countries = ["IN", "IN", "IN"]
+    a = near_duplicate_clusters(names, countries)
+    b = near_duplicate_clusters(names[::-1], countries[::-1])
+    assert a == b[::-1]
+
+def test_city_guard_keeps_branches_apart():
+    ids = near_duplicate_clusters(["Alpha Knits", "Alpha Knits Co"], ["IN", "IN"], cities=["Tiruppur", "Ludhiana"])
+    assert ids[0] != ids[1]
+
+def test_dedupe_factories_records_cluster_id():
+    df = pd.DataFrame([
+        {"factory_name": "Globex Garments Co., Ltd", "country_iso2": "BD", "city": "Dhaka"},
+        {"factory_name": "Globex Garmants Company Limited", "country_iso2": "BD", "city": "Dhaka"},
+        {"factory_name": "Initech Apparel", "country_iso2": "BD", "city": "Dhaka"},
+    ])
+    out = dedupe_factories(df)
+    assert len(out) == 2
+    assert out["cluster_id"].str.startswith("fc_").all()
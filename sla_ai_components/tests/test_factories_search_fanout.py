@@ -0,0 +1,99 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import api_server
+from connectors import alibaba_client
+
+STAGE_S = 0.4
+
+class _Alibaba(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so a pooled client reuses its connection
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        _Alibaba.requests.append((self.path, self.client_address[1]))
+        time.sleep(STAGE_S)
+        body = json.dumps({"items": [{"id": "77", "name": "Dhaka Knit Ltd", "country": "BD", "verified": True,
+                                      "years_active": 8, "response_rate": 95, "transaction_level": 3}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+async def _internal(**kw):
+    await asyncio.sleep(STAGE_S)
+    return {"results": [{"id": "f1", "name": "Harbor Denim Works", "country": "VN", "matchScore": 0.9,
+                         "unit_cost": 4.0, "yearsActive": 5, "responseRate": 80, "transactionLevel": 2}]}
+
+def _goals(user_id=1):
+    time.sleep(STAGE_S)
+    return [{"id": 1, "metric": "cost", "unit": "USD", "direction": "decrease", "target_amount": 2.0,
+             "baseline_amount": 5.0, "weight": 0.3}]
+
+def _setup(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Alibaba)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _Alibaba.requests = []
+    monkeypatch.setenv("FEATURE_ALIBABA", "1")
+    monkeypatch.setattr(alibaba_client, "API_BASE", f"http://127.0.0.1:{server.server_address[1]}/")
+    monkeypatch.setattr(alibaba_client, "_SEARCH_CACHE", OrderedDict())
+    monkeypatch.setattr(api_server, "search_factories_fast", _internal)
+    monkeypatch.setattr(api_server, "_load_active_goals", _goals)
+    monkeypatch.setattr(api_server, "_goal_version", lambda uid=1: (1,))
+    monkeypatch.setattr(api_server, "_GOAL_PROFILES", {})
+    return server
+
+def _search(query):
+    return api_server._factories_search(api_server.FactorySearchRequest(query=query))
+
+def test_stages_run_concurrently_and_alibaba_results_are_pooled_and_cached(monkeypatch):
+    server = _setup(monkeypatch)
+
+    async def run():
+        t = time.perf_counter()
+        first = await _search("knitwear")
+        took = time.perf_counter() - t
+        t = time.perf_counter()
+        cached = await _search("knitwear")
+        cached_took = time.perf_counter() - t
+        other = await _search("denim")
+        await alibaba_client.search_client().aclose()
+        return first, took, cached, cached_took, other
+
+    try:
+        first, took, cached, cached_took, other = asyncio.run(run())
+    finally:
+        server.shutdown()
+    assert took < 2 * STAGE_S  # the slowest stage, not the 3 * STAGE_S sum
+    assert {r["id"] for r in first.results} == {"f1", "ali:77"} and not first.meta["partial"]
+    assert all(r["goal_impacts"] for r in first.results)
+    assert cached.results == first.results and cached_took < took
+    assert [p.split("?")[0] for p, _ in _Alibaba.requests] == ["/b2b/suppliers/search"] * 2  # repeat served from cache
+    assert len({port for _, port in _Alibaba.requests}) == 1  # one pooled connection
+    assert len(other.results) == 2
+
+def test_slow_alibaba_stage_is_cut_off_at_its_budget(monkeypatch):
+    server = _setup(monkeypatch)
+    monkeypatch.setattr(api_server, "FACTORIES_ALIBABA_BUDGET_MS", 100)
+
+    async def run():
+        try:
+            return await _search("knitwear")
+        finally:
+            await alibaba_client.search_client().aclose()
+
+    try:
+        response = asyncio.run(run())
+    finally:
+        server.shutdown()
+    assert [r["id"] for r in response.results] == ["f1"]
+    assert response.meta["partial"] and response.meta["timed_out_stages"] == ["alibaba"]
+    assert response.search_time < 2 * STAGE_S
@@ -0,0 +1,97 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import api_server
+import database
+from models import Base
+from sla_ai_components.algorithms.goals import GoalProfile, goal_rerank
+
+GOALS = [
+    {"id": 1, "metric": "cost", "unit": "USD", "direction": "decrease", "target_amount": 2.0,
+     "baseline_amount": 6.0, "weight": 0.3},
+    {"id": 2, "metric": "time", "unit": "days", "direction": "decrease", "target_amount": 10.0,
+     "baseline_amount": None, "weight": 0.1},
+]
+
+def test_goal_rerank_orders_by_goal_gain_and_attaches_impacts_to_the_top():
+    items = [
+        {"id": "a", "score": 1.0, "unit_cost": 6.0, "transit_days": 30, "avg_days_benchmark": 30},
+        {"id": "b", "score": 0.9, "unit_cost": 4.0, "transit_days": 25, "avg_days_benchmark": 30},
+        {"id": "c", "score": 0.9, "total_cost": 5.0, "unit_cost": 1.0, "transit_days": 40},
+    ]
+    ranked = goal_rerank(items, GoalProfile.from_goals(GOALS), attach=2)
+    assert [r["id"] for r in ranked] == ["b", "c", "a"]
+    # b: cost improves 2/2 (weight .3), time 5/10 (weight .1); c: cost 1/2, time has no benchmark
+    assert ranked[0]["goal_gain_fraction"] == pytest.approx((0.3 * 1 + 0.1 * 0.5) / 0.4)
+    assert ranked[1]["goal_gain_fraction"] == pytest.approx(0.3 * 0.5 / 0.4)
+    assert ranked[0]["final_score"] == pytest.approx(0.9 * (1 + 0.3 * 0.875))
+    assert [(g["goal_id"], g["delta"], g["pct_to_goal"]) for g in ranked[0]["goal_impacts"]] == [(1, 2.0, 1.0), (2, 5.0, 0.5)]
+    assert "goal_impacts" not in ranked[2] and "final_score" not in ranked[2]
+    assert goal_rerank(items, GoalProfile.from_goals([])) is items
+
+def test_goal_rerank_of_5k_candidates_takes_milliseconds():
+    goals = [dict(GOALS[i % 2], id=i) for i in range(4)] + [
+        {"id": 9, "metric": "custom", "unit": "co2", "direction": "increase", "target_amount": 3.0,
+         "baseline_amount": 1.0, "weight": 0.2}]
+    profile = GoalProfile.from_goals(goals)
+    items = [{"id": i, "score": (i % 97) / 97, "unit_cost": i % 11, "transit_days": i % 40,
+              "avg_days_benchmark": 35, "custom_value::co2": i % 5} for i in range(5000)]
+    goal_rerank(items, profile, attach=10)
+    best = min(_timed(lambda: goal_rerank(items, profile, attach=10)) for _ in range(5))
+    assert best / len(goals) < 0.005  # the per-item loops took ~30ms per goal; see scripts/bench_goal_rerank.py
+
+def _timed(fn):
+    t = time.perf_counter()
+    fn()
+    return time.perf_counter() - t
+
+@pytest.fixture
+def goals_db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'goals.db'}", connect_args={"check_same_thread": False},
+                           poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(database, "SessionLocal", Session)
+    monkeypatch.setattr(api_server, "_GOAL_PROFILES", {})
+
+    def get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+    api_server.app.dependency_overrides[api_server.get_db] = get_db
+    yield TestClient(api_server.app)
+    api_server.app.dependency_overrides.pop(api_server.get_db, None)
+
+def test_goal_profile_is_cached_until_a_goal_write(goals_db, monkeypatch):
+    loads = []
+    load = api_server._load_active_goals
+    monkeypatch.setattr(api_server, "_load_active_goals", lambda uid=1: loads.append(uid) or load(uid))
+    assert api_server._goal_profile().goals == ()
+
+    body = {"metric": "cost", "unit": "USD", "target_amount": 2.0, "baseline_amount": 6.0, "title": "Cut cost"}
+    goal_id = goals_db.post("/api/goals", json=body).json()["id"]
+    profile = api_server._goal_profile()
+    assert [g["target_amount"] for g in profile.goals] == [2.0]
+    assert api_server._goal_profile() is profile and len(loads) == 2
+
+    goals_db.patch(f"/api/goals/{goal_id}", json={"target_amount": 4.0})
+    updated = api_server._goal_profile()
+    assert [g["target_amount"] for g in updated.goals] == [4.0] and updated.version != profile.version
+
+    goals_db.delete(f"/api/goals/{goal_id}")
+    assert api_server._goal_profile().goals == () and len(loads) == 4
+
+def test_goal_written_by_another_worker_is_seen_by_the_next_search(goals_db):
+    from models import UserGoal
+    assert api_server._goal_profile().goals == ()
+    with database.SessionLocal() as db:  # a write that never went through this process
+        db.add(UserGoal(user_id=1, metric="time", unit="days", target_amount=5.0, title="Faster"))
+        db.commit()
+    assert [g["metric"] for g in api_server._goal_profile().goals] == ["time"]
@@ -0,0 +1,88 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import api_server
+from models import Base, Factory
+from services.api.app.search import retrieval
+from services.api.app.search.retrieval import HybridIndex, get_index
+
+ROWS = [
+    {"factory_name": "Blue Denim Mills", "country": "BD", "city": "Dhaka",
+     "product_specialties": ["denim"], "materials_handled": ["cotton"], "past_clients": ["Levi's", "H&M"],
+     "max_monthly_capacity": 250000},
+    {"factory_name": "Alpha Knits", "country": "IN", "city": "Tiruppur",
+     "product_specialties": ["knitwear"], "materials_handled": ["cotton", "wool"], "past_clients": ["Zara"],
+     "max_monthly_capacity": 5000},
+    {"name": "Stride Shoes", "country": "VN", "city": "Ho Chi Minh",
+     "product_types": "footwear, sneakers", "materials": "leather", "past_clients": "Nike; Puma"},
+    {"name": "Indigo Jeans Works", "country": "CN", "city": "Xintang",
+     "product_types": "jeans", "materials": "denim, cotton"},
+]
+
+def _names(hits):
+    return [h.row.get("factory_name") or h.row.get("name") for h in hits]
+
+def test_channels_fuse_and_rank_relevant_rows_first():
+    idx = HybridIndex(ROWS)
+    hits = idx.search("denim jeans", k=4)
+    assert set(_names(hits)[:2]) == {"Blue Denim Mills", "Indigo Jeans Works"}
+    assert hits[0].score <= 1.0 and "bm25" in hits[0].ranks
+
+    # a misspelt factory name is still found through the fuzzy-name channel
+    assert _names(idx.search("Alpah Knits", k=1)) == ["Alpha Knits"]
+
+def test_filters_and_preferences_use_facet_bitsets():
+    idx = HybridIndex(ROWS)
+    assert _names(idx.search("cotton", k=5, filters={"country": "in"})) == ["Alpha Knits"]
+    assert _names(idx.search("", k=5, filters={"brand": "nike"})) == ["Stride Shoes"]
+    assert _names(idx.search("", k=5, filters={"size": "large"})) == ["Blue Denim Mills"]
+    assert _names(idx.search("cotton", k=5, filters={"location": "ho chi minh"})) == []
+    assert _names(idx.search("cotton", k=5, prefer={"country": "CN"}))[0] == "Indigo Jeans Works"
+
+def test_get_index_rebuilds_only_on_version_change():
+    calls = []
+    def load():
+        calls.append(1)
+        return ROWS
+    a = get_index("test_corpus", 1, load)
+    assert get_index("test_corpus", 1, load) is a
+    assert get_index("test_corpus", 2, load) is not a
+    assert len(calls) == 2
+
+def _on_loop():
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+def test_sla_search_loads_and_searches_the_table_index_off_the_loop(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sla.db'}", connect_args={"check_same_thread": False},
+                           poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with Session() as db:
+        db.add_all([Factory(name="Blue Denim Mills", country="BD", city="Dhaka", certifications=["WRAP"]),
+                     Factory(name="Alpha Knits", country="IN", city="Tiruppur")])
+        db.commit()
+
+    def get_db():
+        with Session() as db:
+            yield db
+    on_loop = []
+    index = api_server._db_factory_index
+    search = HybridIndex.search
+    monkeypatch.setattr(api_server, "_db_factory_index", lambda db: on_loop.append(_on_loop()) or index(db))
+    monkeypatch.setattr(HybridIndex, "search", lambda self, *a, **kw: on_loop.append(_on_loop()) or search(self, *a, **kw))
+    monkeypatch.setattr(retrieval, "_INDEXES", {})
+    api_server.app.dependency_overrides[api_server.get_db] = get_db
+    try:
+        body = TestClient(api_server.app).post("/api/sla/search", json={"q": "blue denim", "topK": 5}).json()
+    finally:
+        api_server.app.dependency_overrides.pop(api_server.get_db, None)
+    assert body["results"][0]["name"] == "Blue Denim Mills"
+    assert on_loop == [False, False]  # the version query, table load and scoring ran in threads
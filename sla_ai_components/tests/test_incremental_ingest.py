@@ -0,0 +1,111 @@
+import json
+import sqlite3
+import numpy as np
+import pandas as pd, yaml
+
+import ingest as root_ingest
+from ingest import FactoryDataIngest
+from sla_ai_components.ingest import commit, upsert
+from sla_ai_components.ingest.row_hashes import RowHashStore, diff_rows, row_hash
+
+MAPPING = yaml.safe_dump({"sheet_type": "factories", "factory_name": "Factory Name",
+                          "country": "Country", "city": "City"})
+
+def test_row_hash_ignores_column_order_and_upload_bookkeeping():
+    a = {"factory_name": "Alpha", "city": "Dhaka", "source_upload_id": 1}
+    b = {"source_upload_id": 2, "city": "Dhaka", "factory_name": "Alpha"}
+    assert row_hash(a) == row_hash(b) != row_hash({**a, "city": "Gazipur"})
+    diff = diff_rows({"a": "1", "b": "2", "c": "3"}, {"a": "1", "b": "9", "d": "4"})
+    assert (diff.inserts, diff.updates, diff.deletes, diff.unchanged) == (["d"], ["b"], ["c"], 1)
+
+def test_commit_sheet_only_commits_changed_rows_of_a_feed(tmp_path, monkeypatch):
+    monkeypatch.setattr(commit, "get_row_hash_store", lambda: store)
+    store = RowHashStore(str(tmp_path / "registry.db"))
+    embedded, upserted, deleted, dropped = [], [], [], []
+    db_up = {"ok": True}
+    monkeypatch.setattr(commit, "index_factory_rows",
+                        lambda rows: embedded.append([r["factory_name"] for r in rows]) or np.zeros((len(rows), 2)))
+    monkeypatch.setattr(commit, "upsert_factories",
+                        lambda df: upserted.append(list(df["factory_name"])) or db_up["ok"])
+    monkeypatch.setattr(commit, "delete_factories", lambda keys: deleted.extend(keys) or True)
+    monkeypatch.setattr(commit, "remove_factory_rows", dropped.extend)
+
+    def run(rows, upload_id):
+        df = pd.DataFrame(rows, columns=["Factory Name", "Country", "City"])
+        return commit.commit_sheet("t1", upload_id, "Sheet1", df, MAPPING, feed="daily.csv#Sheet1")
+
+    day1 = [["Alpha Co", "India", "Tiruppur"], ["Beta Knits", "Bangladesh", "Dhaka"], ["Gamma", "China", "Ningbo"]]
+    stats = run(day1, 1)
+    assert (stats["inserted"], stats["unchanged"], stats["rows_out"]) == (3, 0, 3)
+
+    day2 = [["Alpha Co", "India", "Tiruppur"], ["Beta Knits", "Bangladesh", "Gazipur"], ["Delta", "Vietnam", "Hanoi"]]
+    stats = run(day2, 2)
+    assert {k: stats[k] for k in ("inserted", "updated", "deleted", "unchanged", "rows_out")} == \
+        {"inserted": 1, "updated": 1, "deleted": 1, "unchanged": 1, "rows_out": 2}
+    assert embedded[-1] == upserted[-1] == ["Beta Knits", "Delta"]
+    assert deleted == [("Gamma", "CN")] and len(dropped) == 1
+
+    assert run(day2, 3)["rows_out"] == 0 and upserted[-1] == []
+
+    # a failed upsert records nothing, so the same rows are retried by the next commit
+    day3 = day2[:2] + [["Delta", "Vietnam", "Haiphong"]]
+    db_up["ok"] = False
+    assert run(day3, 4)["updated"] == 1
+    db_up["ok"] = True
+    assert run(day3, 5)["updated"] == 1 and upserted[-2:] == [["Delta"], ["Delta"]]
+    assert run(day3, 6)["rows_out"] == 0
+
+def test_factories_are_upserted_and_deleted_by_name_and_country(tmp_path, monkeypatch):
+    db = tmp_path / "sla.db"
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE factories (id INTEGER PRIMARY KEY, name TEXT, country TEXT, city TEXT, "
+                 "certifications TEXT, moq INTEGER, lead_time_days INTEGER, rating REAL, contact_email TEXT, "
+                 "contact_phone TEXT, website TEXT, created_at TEXT, updated_at TEXT)")
+    conn.commit()
+    monkeypatch.setattr(upsert, "get_db_connection", lambda: sqlite3.connect(db))
+    rows = pd.DataFrame([{"factory_name": "Acme", "country": "BD", "city": "Dhaka"},
+                         {"factory_name": "Acme", "country": "CN", "city": "Ningbo"}])
+    assert upsert.upsert_factories(rows) and upsert.upsert_factories(rows.assign(city="Gazipur"))
+    assert sorted(conn.execute("SELECT name, country, city FROM factories")) == [
+        ("Acme", "BD", "Gazipur"), ("Acme", "CN", "Gazipur")]  # updated in place, not duplicated
+    assert upsert.delete_factories([upsert.factory_db_key(rows.iloc[0])])
+    assert list(conn.execute("SELECT name, country FROM factories")) == [("Acme", "CN")]
+    monkeypatch.setattr(upsert, "get_db_connection", lambda: sqlite3.connect(tmp_path / "missing.db"))
+    assert not upsert.upsert_factories(rows)  # no factories table
+
+def _frame(rows):
+    cols = ["Factory Name", "Country", "Product Specialties", "Materials Handled", "Notes"]
+    return pd.DataFrame(rows, columns=cols)
+
+def test_reingest_normalizes_only_changed_rows_and_updates_the_index_in_place(tmp_path, monkeypatch):
+    rows = [["Alpha Co", "India", "Denim", "Cotton", ""],
+            ["Beta Knits", "Bangladesh", "Knitwear", "Wool", ""],
+            ["Gamma", "China", "Jeans denim", "Denim", ""]]
+    frames = {"df": _frame(rows)}
+    monkeypatch.setattr(FactoryDataIngest, "load_csv_data", lambda self, f: frames["df"].copy())
+    ingest = FactoryDataIngest(data_dir=str(tmp_path))
+    ingest.ingest_from_csv("feed.csv")
+    builder = ingest.search_builder
+
+    normalized = []
+    real = root_ingest.normalize_dataset
+    monkeypatch.setattr(root_ingest, "normalize_dataset", lambda df: normalized.append(list(df["Factory Name"])) or real(df))
+    frames["df"] = _frame([rows[0], ["Beta Knits", "Bangladesh", "Knitwear", "Cotton", ""],
+                           ["Delta", "Vietnam", "Knitwear", "Polyester", ""]])
+    ingest.ingest_from_csv("feed.csv")
+
+    assert normalized == [["Beta Knits", "Delta"]]
+    assert ingest.search_builder is builder
+    assert [f["factory_name"] for f in ingest.factories_data] == ["Alpha Co", "Beta Knits", "Delta"]
+    assert "gamma" not in builder.indexed_factories["by_keywords"]
+    assert [f["factory_name"] for f in builder.indexed_factories["by_keywords"]["cotton"]] == ["Alpha Co", "Beta Knits"]
+
+    # a fresh process picks up the saved data and manifest; the result matches a full ingest
+    fresh = FactoryDataIngest(data_dir=str(tmp_path))
+    fresh.ingest_from_csv("feed.csv")
+    assert len(normalized) == 1
+    full = FactoryDataIngest(data_dir=str(tmp_path / "full"))
+    (tmp_path / "full").mkdir()
+    full.ingest_from_csv("feed.csv")
+    canon = lambda data: sorted(json.dumps(f, sort_keys=True) for f in data)
+    assert canon(fresh.factories_data) == canon(full.factories_data) == canon(ingest.factories_data)
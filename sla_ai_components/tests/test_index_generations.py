@@ -0,0 +1,109 @@
+import pandas as pd
+
+from search_builder import FactorySearchBuilder
+from services.api.app import internal_index
+from services.api.app.search import retrieval
+from services.api.app.search.retrieval import HybridIndex, index_for_rows, update_index
+
+def _rows(n):
+    return [{"id": f"s{i}", "name": f"Supplier {i} Textiles", "country": "IN", "city": "Surat",
+             "product_types": "sarees", "materials": "silk"} for i in range(n)]
+
+def _key(row):
+    return row["id"]
+
+def _ids(hits):
+    return [h.row["id"] for h in hits]
+
+def test_apply_publishes_a_new_generation_and_leaves_the_old_one_searchable():
+    base = HybridIndex(_rows(40))
+    new = {"id": "n1", "name": "Harbor Denim Works", "country": "BD", "city": "Dhaka",
+           "product_types": "jeans", "materials": "denim"}
+    nxt = base.apply([new, {**_rows(2)[1], "materials": "silk, wool"}], ["s0"], _key)
+
+    assert nxt.generation == 1 and nxt.base_n == base.n == 40 and nxt.n == 42
+    assert [r["id"] for r in nxt.source][-2:] == ["n1", "s1"] and len(nxt.source) == 40
+    # inserted rows are found through every channel and the facet filters
+    assert _ids(nxt.search("denim jeans", k=3))[0] == "n1"
+    assert _ids(nxt.search("Harbr Denim Works", k=1)) == ["n1"]
+    assert _ids(nxt.search("", k=5, filters={"country": "bd"})) == ["n1"]
+    assert _ids(nxt.search("wool", k=5)) == ["s1"]
+    # deleted and replaced rows are tombstoned in the new generation only
+    assert "s0" not in _ids(nxt.search("Supplier 0 Textiles", k=50))
+    assert "s0" in _ids(base.search("Supplier 0 Textiles", k=50))
+    assert base.search("denim jeans", k=3) == [] and base.dead is None
+
+def test_enough_changes_compact_into_a_fresh_build():
+    idx = HybridIndex(_rows(10))
+    idx = idx.apply([], ["s1"], _key)
+    assert idx.dead is not None and idx.base_n == 10
+    idx = idx.apply([], ["s2", "s3"], _key)
+    assert idx.dead is None and idx.n == idx.base_n == 7 and idx.generation == 2
+    assert sorted(_ids(idx.search("", k=20))) == ["s0", "s4", "s5", "s6", "s7", "s8", "s9"]
+
+def test_update_index_is_resolved_by_index_for_rows_without_a_rebuild(monkeypatch):
+    rows = _rows(30)
+    first = index_for_rows("test_generations", rows)
+    nxt = update_index("test_generations", rows, [{**rows[0], "name": "Renamed Mill"}], [], _key)
+    assert nxt is not first and index_for_rows("test_generations", nxt.source) is nxt
+    monkeypatch.setattr(retrieval, "HybridIndex", None)  # a rebuild would fail
+    assert _ids(index_for_rows("test_generations", nxt.source).search("Renamed Mill", k=1)) == ["s0"]
+
+def test_internal_corpus_updates_in_place(monkeypatch):
+    monkeypatch.setattr(internal_index, "_DATAF", pd.DataFrame(_rows(30)))
+    monkeypatch.setattr(internal_index, "_CORPUS", None)
+    before = internal_index.get_internal_corpus()
+    internal_index.apply_internal_changes(
+        [{"id": "n1", "name": "Harbor Denim Works", "country": "BD", "product_types": "jeans"}], ["s5"])
+
+    corpus = internal_index.get_internal_corpus()
+    assert len(before) == 30 and len(corpus) == 30 and internal_index.internal_count() == 30
+    assert internal_index.by_country() == {"IN": 29, "BD": 1}
+    found = internal_index.recall_internal_legacy({"product_title": "denim jeans"}, top_k=5)
+    assert found[0]["id"] == "n1"
+
+def _factory(name, keywords, country="India"):
+    return {"factory_name": name, "country": country, "product_specialties": [],
+            "materials_handled": [], "certifications": [], "past_clients": [], "search_keywords": keywords}
+
+def test_search_builder_generations_tombstone_and_compact():
+    factories = [_factory(f"F{i}", ["cotton"]) for i in range(10)]
+    builder = FactorySearchBuilder(factories)
+    reader = builder.generation
+
+    gen = builder.apply_changes([_factory("F1", ["linen"]), _factory("New", ["cotton"], "Vietnam")], ["F2"])
+    assert gen.number == 1 and len(gen.dead) == 2
+    assert [f["factory_name"] for f in gen.lookup("by_keywords", "cotton")] == \
+        ["F0", "F3", "F4", "F5", "F6", "F7", "F8", "F9", "New"]
+    assert [f["factory_name"] for f in builder.get_factories_by_country("vietnam")] == ["New"]
+    assert [f["factory_name"] for f in builder.factories_data][:3] == ["F0", "F1", "F3"]
+    # a search that started before the update still sees its own generation
+    assert len(reader.lookup("by_keywords", "cotton")) == 10 and "linen" not in reader.postings["by_keywords"]
+    assert "F2" not in [f["factory_name"] for f in builder.indexed_factories["by_keywords"]["cotton"]]
+
+    gen = builder.apply_changes([], ["F3", "F4"])
+    assert not gen.dead and len(gen.postings["by_keywords"]["cotton"]) == 7
+
+def test_reingest_applies_only_changed_suppliers(monkeypatch, tmp_path):
+    import json, os
+    from services.api.app.search import shared_index
+    monkeypatch.setattr(shared_index, "SHARED_INDEX_DIR", str(tmp_path / "shared"))
+    monkeypatch.setattr(internal_index, "_CACHE_PATH", str(tmp_path / "cache.parquet"))
+    for name in ("_CORPUS", "_DATAF", "_DATA_PATH", "_DATA_VERSION"):
+        monkeypatch.setattr(internal_index, name, None)
+    data = tmp_path / "suppliers"
+    data.mkdir()
+    rows = _rows(30)
+    (data / "suppliers.json").write_text(json.dumps(rows))
+    internal_index.init_index(str(data))
+    first = index_for_rows("internal_index", internal_index.get_internal_corpus())
+
+    rows = [dict(r, materials="linen") if r["id"] == "s3" else r for r in rows if r["id"] != "s5"]
+    (data / "suppliers.json").write_text(json.dumps(rows + [{**_rows(1)[0], "id": "n1", "name": "Harbor Denim"}]))
+    os.utime(data / "suppliers.json", (1e10, 1e10))  # newer than the parquet cache
+    internal_index.init_index(str(data))
+    index = index_for_rows("internal_index", internal_index.get_internal_corpus())
+    assert index.generation == first.generation + 1 and index.base_n == first.n  # applied, not rebuilt
+    assert internal_index.internal_count() == 30
+    assert _ids(index.search("linen", k=5))[0] == "s3" and _ids(index.search("Harbor Denim", k=1)) == ["n1"]
+    assert "s5" not in _ids(index.search("Supplier 5 Textiles", k=50))
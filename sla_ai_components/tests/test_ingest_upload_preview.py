@@ -2,8 +2,8 @@ import pandas as pd
 from pathlib import Path
 import tempfile
 import os
-from sla_ai_components.ingest.excel_loader import load_any
-from sla_ai_components.ingest.preview import make_preview
+from sla_ai_components.ingest.excel_loader import load_any, load_head
+from sla_ai_components.ingest.preview import make_preview, preview_file
 
 def test_preview_makes_proposals():
     with tempfile.TemporaryDirectory() as tmp_dir:
@@ -43,3 +43,25 @@ def test_load_xlsx_multiple_sheets():
         assert "Factories" in frames
         assert "Materials" in frames
         assert len(frames) == 2
+
+def test_load_head_reads_only_first_rows():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        p = Path(tmp_dir) / "big.xlsx"
+        df = pd.DataFrame({"Factory Name": [f"F{i}" for i in range(300)], "Country": ["India"] * 300})
+        with pd.ExcelWriter(p) as writer:
+            df.to_excel(writer, sheet_name="Factories", index=False)
+            pd.DataFrame([{"Material":"Cotton","Price":2.5}]).to_excel(writer, sheet_name="Materials", index=False)
+        frames = load_head(str(p), nrows=10)
+        assert list(frames) == ["Factories", "Materials"]
+        assert len(frames["Factories"]) == 10
+        assert list(frames["Factories"].columns) == ["Factory Name", "Country"]
+        assert len(frames["Materials"]) == 1
+
+def test_preview_file_cached_by_sha():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        p = Path(tmp_dir) / "suppliers.csv"
+        pd.DataFrame([{"Factory Name":"Alpha Co","Country":"India"}]).to_csv(p, index=False)
+        first = preview_file(str(p), "sha-under-test")
+        p.unlink()  # a cache hit must not touch the file
+        assert preview_file(str(p), "sha-under-test") is first
+        assert first[0]["sheet_type"] == "factories"
@@ -0,0 +1,77 @@
+import asyncio
+import time
+import pytest
+from sla_ai_components.ai.llm_cache import (
+    CacheSite, LLMResponseCache, cache_key, deterministic_temperature,
+)
+
+def _site(tmp_path, ttl_s=60.0, memory_entries=8):
+    return CacheSite("test", ttl_s, cache=LLMResponseCache(str(tmp_path / "llm.sqlite"), memory_entries))
+
+def test_key_ignores_whitespace_but_not_model_tools_or_temperature():
+    msgs = [{"role": "user", "content": "denim  jeans\n factory"}]
+    base = cache_key("gpt-4o-mini", msgs, temperature=0.0)
+    assert base == cache_key("gpt-4o-mini", [{"role": "user", "content": "denim jeans factory"}], temperature=0.0)
+    assert base != cache_key("gpt-4o", msgs, temperature=0.0)
+    assert base != cache_key("gpt-4o-mini", msgs, tools=[{"type": "web_search"}], temperature=0.0)
+    assert base != cache_key("gpt-4o-mini", msgs, temperature=0.7)
+    assert deterministic_temperature("gpt-5") is None and deterministic_temperature("gpt-4o-mini") == 0.0
+
+def test_replayed_mix_hits_both_tiers_and_reports_saved_latency(tmp_path):
+    site = _site(tmp_path, memory_entries=1)
+    calls = []
+    def slow(q):
+        def fn():
+            calls.append(q)
+            time.sleep(0.01)
+            return {"q": q, "items": [1, 2]}
+        return fn
+
+    mix = ["denim", "knitwear", "denim", "denim", "knitwear"]
+    out = [site.call(slow(q), model="m", prompt=q, temperature=0.0) for q in mix]
+    assert calls == ["denim", "knitwear"]
+    assert out[2] == {"q": "denim", "items": [1, 2]}
+    out[2]["items"].append(3)  # hits hand out fresh copies
+    assert site.call(slow("denim"), model="m", prompt="denim", temperature=0.0)["items"] == [1, 2]
+
+    stats = site.stats()
+    assert (stats["hits"], stats["misses"]) == (4, 2)
+    assert 0 < stats["memory_hits"] < stats["hits"]  # one-entry LRU forces some disk hits
+    assert stats["saved_ms"] >= 4 * 10
+
+def test_non_deterministic_failures_and_expired_entries_are_not_served(tmp_path):
+    site = _site(tmp_path, ttl_s=0.05)
+    n = []
+    fn = lambda: n.append(1) or len(n)
+    assert site.call(fn, model="m", prompt="p", temperature=1.0) == 1
+    assert site.call(fn, model="m", prompt="p", temperature=1.0) == 2
+    assert site.stats()["bypassed"] == 2
+
+    def boom():
+        raise ValueError("non-JSON")
+    with pytest.raises(ValueError):
+        site.call(boom, model="m", prompt="q", temperature=0.0)
+    assert site.call(lambda: "ok", model="m", prompt="q", temperature=0.0) == "ok"
+
+    time.sleep(0.06)
+    assert site.call(lambda: "fresh", model="m", prompt="q", temperature=0.0) == "fresh"
+
+def test_async_call_site(tmp_path):
+    site = _site(tmp_path)
+    async def fetch():
+        return [{"name": "Blue Denim Mills"}]
+    async def run():
+        a = await site.acall(fetch, model="m", prompt="p", temperature=0.0)
+        b = await site.acall(fetch, model="m", prompt="p", temperature=0.0)
+        return a, b
+    a, b = asyncio.run(run())
+    assert a == b and site.stats()["hits"] == 1
+
+def test_batched_get_and_set_match_single_entry_calls(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"), memory_entries=2)
+    cache.set_many("rerank", [(f"k{i}", {"score": i}, 5.0) for i in range(5)], 60.0)
+    cache.set("gone", "rerank", {"score": 0}, -1.0, 1.0)
+    got = cache.get_many(["k0", "k3", "k4", "k3", "gone", "missing"])
+    assert {k: v[0]["score"] for k, v in got.items()} == {"k0": 0, "k3": 3, "k4": 4}
+    assert got["k4"][2] == "memory" and got["k0"][2] == "disk"
+    assert LLMResponseCache(cache.db_path).get("k2")[:2] == ({"score": 2}, 5.0)
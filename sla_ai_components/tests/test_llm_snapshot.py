@@ -0,0 +1,52 @@
+import json
+from types import SimpleNamespace
+import pytest
+
+llm_search = pytest.importorskip("services.api.app.llm_search")
+
+ROWS = [
+    {"factory_name": f"Mill {i}", "country": "cn" if i % 2 else "bd", "product_specialties": ["denim", "woven"],
+     "materials_handled": "cotton; denim", "customization_capabilities": "OEM " * 40, "notes": "x" * 500}
+    for i in range(200)
+]
+
+def test_refs_restore_untruncated_ids_and_urls():
+    rows = [{"id": f"supplier-{'x' * 40}-{i}", "name": f"Mill {i}", "url": f"https://example.com/{'p' * 80}/{i}"}
+            for i in range(3)]
+    items = [llm_search.LLMVendor(id="r2", name="Mill", url="https://example.com/ppp…", score=90,
+                                  source="internal", rationale="fit"),
+             llm_search.LLMVendor(id="r9", name="Ghost", score=50, source="internal", rationale="?"),
+             llm_search.LLMVendor(id="w1", name="Web Co", url="https://web.example", score=70,
+                                  source="web", rationale="web")]
+    llm_search._restore_refs(items, rows)
+    assert (items[0].id, items[0].name, items[0].url) == (rows[2]["id"], "Mill 2", rows[2]["url"])
+    assert items[1].id == "r9" and items[2].url == "https://web.example"
+
+class _NotFound(Exception):
+    status_code = 404
+
+def test_snapshot_is_dictionary_encoded_and_fits_the_budget():
+    snap = [llm_search._compact_row(r) for r in ROWS]
+    table, n = llm_search._snapshot_table(snap, budget_tokens=600)
+    assert 0 < n < len(snap) and llm_search._estimate_tokens(table) <= 600
+    lines = table.splitlines()
+    assert lines[:4] == ["DICT", "country: c0=bd; c1=cn", "product_types: p0=denim; p1=woven", "materials: m0=cotton; m1=denim"]
+    assert lines[5:7] == ["ref|name|country|product_types|materials|capabilities|moq",
+                          "r0|Mill 0|c0|p0,p1|m0,m1|" + "OEM " * 14 + "OEM…|"]
+    # the old prompt dumped every field of every row as JSON
+    assert llm_search._estimate_tokens(json.dumps(snap, default=str)) > 20 * llm_search._estimate_tokens(table)
+
+def test_model_check_is_cached_for_definitive_answers_only(monkeypatch):
+    monkeypatch.setattr(llm_search, "_MODEL_CHECKS", {})
+    calls = []
+    def retrieve(model):
+        calls.append(model)
+        if model == "gpt-5":
+            raise _NotFound("model not found")
+        if model == "flaky":
+            raise ConnectionError("reset")
+    client = SimpleNamespace(models=SimpleNamespace(retrieve=retrieve))
+    assert [llm_search._resolve_model(client, "gpt-5") for _ in range(3)] == ["gpt-4o-mini"] * 3
+    assert [llm_search._resolve_model(client, "gpt-4o") for _ in range(3)] == ["gpt-4o"] * 3
+    assert [llm_search._resolve_model(client, "flaky") for _ in range(2)] == ["gpt-4o-mini"] * 2
+    assert calls == ["gpt-5", "gpt-4o", "flaky", "flaky"]
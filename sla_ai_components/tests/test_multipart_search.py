@@ -0,0 +1,54 @@
+import asyncio
+from fastapi.testclient import TestClient
+import api_server
+
+client = TestClient(api_server.app)
+
+LATENCY = 0.3
+
+def _files(n, size=1024):
+    return [("files", (f"img{i}.jpg", b"\xff\xd8" + bytes(size), "image/jpeg")) for i in range(n)]
+
+def test_images_are_analyzed_concurrently_and_matched_once(monkeypatch):
+    seen, passes, in_flight = [], [], [0, 0]  # current, peak
+    async def analyze(image_path, hints=""):
+        seen.append(image_path)
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight[1], in_flight[0])
+        await asyncio.sleep(LATENCY)
+        in_flight[0] -= 1
+        if len(seen) == 3:
+            raise RuntimeError("vision backend error")
+        return {"product_category": "hoodie", "primary_materials": ["cotton"], "confidence": 0.8}
+    def match(attributes, limit=10):
+        passes.append(attributes)
+        return []
+    monkeypatch.setattr(api_server, "analyze_image_with_mistral", analyze)
+    monkeypatch.setattr(api_server, "match_factories_by_attributes", match)
+
+    resp = client.post("/api/search/unified/multipart", data={"q": "hoodie", "topK": "5"}, files=_files(5, 3 * 1024 * 1024))
+    assert resp.status_code == 200
+    assert len(seen) == 5 and len(passes) == 1
+    assert resp.json()["extracted_attributes"]["product_category"] == "hoodie"
+    assert in_flight[1] == api_server.MAX_IMAGES_PER_SEARCH  # one wave, not one image after another
+
+    resp = client.post("/api/search/unified/multipart", files=_files(api_server.MAX_IMAGES_PER_SEARCH + 1))
+    assert resp.status_code == 400 and len(seen) == 5
+
+def test_slow_image_times_out_and_oversized_upload_is_rejected(monkeypatch):
+    finished = []
+    async def analyze(image_path, hints=""):
+        await asyncio.sleep(5 if image_path.endswith(".png") else 0)
+        finished.append(image_path)
+        return {"product_category": "tee"}
+    monkeypatch.setattr(api_server, "analyze_image_with_mistral", analyze)
+    monkeypatch.setattr(api_server, "match_factories_by_attributes", lambda attributes, limit=10: [])
+    monkeypatch.setattr(api_server, "IMAGE_ANALYSIS_TIMEOUT_S", 0.2)
+
+    files = _files(1) + [("files", ("slow.png", b"\x89PNG" + bytes(16), "image/png"))]
+    resp = client.post("/api/search/unified/multipart", files=files)
+    assert resp.status_code == 200 and len(finished) == 1  # the slow one was cancelled, not awaited
+    assert resp.json()["extracted_attributes"] == {"product_category": "tee"}
+
+    resp = client.post("/api/search/unified/multipart", files=_files(1, api_server.MAX_IMAGE_BYTES + 1))
+    assert resp.status_code == 413
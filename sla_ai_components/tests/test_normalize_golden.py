@@ -0,0 +1,38 @@
+import json
+from pathlib import Path
+import pandas as pd
+from normalizers import FactoryDataNormalizer, normalize_dataset
+
+GOLDEN = Path(__file__).parent / "golden"
+
+def _canonical(rows):
+    # JSON round-trip only: tuples become lists, term lists keep their first-seen order
+    return json.loads(json.dumps(rows))
+
+def _golden():
+    """
+    normalize_input.json: every 34th record of data/main_factory_data_only.csv plus hand-written
+    edge rows (numeric cells, NaN, unit/range/week parsing, an overflowing capacity that drops
+    its row). normalize_output.json: the row-by-row implementation's output for it, with de-duplicated
+    term lists in first-seen order (it emitted them in set order).
+    """
+    rows = json.loads((GOLDEN / "normalize_input.json").read_text(encoding="utf-8"))
+    expected = json.loads((GOLDEN / "normalize_output.json").read_text(encoding="utf-8"))
+    return pd.DataFrame(rows), expected
+
+def test_vectorized_normalize_matches_golden_output():
+    df, expected = _golden()
+    assert _canonical(normalize_dataset(df, workers=1)) == expected
+
+def test_chunked_process_pool_matches_golden_output():
+    df, expected = _golden()
+    assert _canonical(normalize_dataset(df, workers=2, chunk_rows=64)) == expected
+
+def test_single_row_and_scalar_parsers_agree_with_the_frame_path():
+    df, expected = _golden()
+    normalizer = FactoryDataNormalizer()
+    assert _canonical([normalizer.normalize_factory_data(df.iloc[i].to_dict()) for i in range(5)]) == expected[:5]
+    assert normalizer.parse_quantity("5 kg or 1,200 pcs") == 1200
+    assert normalizer.parse_price_range("$1.20 - $5.00") == (1.2, 5.0)
+    assert normalizer.parse_lead_time("10 to 20 days") == 20 and normalizer.parse_lead_time("4-6 weeks") == 42
+    assert normalizer.extract_past_clients("H&M, Nordstrom Rack") == ["H&M", "Nordstrom", "Nordstrom Rack"]
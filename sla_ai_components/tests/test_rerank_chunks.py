@@ -0,0 +1,66 @@
+import asyncio
+import ast
+import json
+from types import SimpleNamespace
+from sla_ai_components.ai.llm_cache import LLMResponseCache
+from services.api.app.providers import rerank
+
+PER_CANDIDATE_S = 0.002  # fake completion latency grows with the candidates in the prompt
+
+def _candidates(n, start=0):
+    return [{"id": f"s{i}", "name": f"Supplier {i}", "score": 50} for i in range(start, start + n)]
+
+def _fake_model(monkeypatch, tmp_path, broken_ids=()):
+    calls = []
+    in_flight = [0]
+    async def respond(model, messages, **params):
+        user = ast.literal_eval(messages[1]["content"])
+        ids = [c["id"] for c in user["candidates"]]
+        in_flight[0] += 1
+        calls.append({"ids": ids, "tokens": sum(len(m["content"]) for m in messages) // 4, "in_flight": in_flight[0]})
+        try:
+            await asyncio.sleep(PER_CANDIDATE_S * len(ids))
+        finally:
+            in_flight[0] -= 1
+        if set(ids) & set(broken_ids):
+            return SimpleNamespace(output_text="Sorry, I can't score these.")
+        return SimpleNamespace(output_text=json.dumps(
+            [{"id": i, "score": 100 - int(i[1:]) % 100, "reasons": "fit"} for i in ids]))
+    monkeypatch.setattr(rerank, "respond", respond)
+    monkeypatch.setattr(rerank, "get_llm_cache", lambda: LLMResponseCache(str(tmp_path / "llm.sqlite")))
+    return calls
+
+def _run(*args):
+    return asyncio.run(rerank.rerank_with_llm("denim jeans", *args, quantity=500, customization=None))
+
+def test_chunked_rerank_runs_chunks_concurrently_at_similar_token_cost(monkeypatch, tmp_path):
+    calls = _fake_model(monkeypatch, tmp_path / "single")
+    monkeypatch.setattr(rerank, "RERANK_CHUNK_SIZE", 200)
+    single = _run(_candidates(200))
+    single_tokens = sum(c["tokens"] for c in calls)
+
+    calls = _fake_model(monkeypatch, tmp_path / "chunked")
+    monkeypatch.setattr(rerank, "RERANK_CHUNK_SIZE", 20)
+    chunked = _run(_candidates(200))
+    assert len(calls) == 10 and all(len(c["ids"]) == 20 for c in calls)
+    # chunks are scored RERANK_CONCURRENCY at a time, not one after another
+    assert max(c["in_flight"] for c in calls) == rerank.RERANK_CONCURRENCY
+    assert sum(c["tokens"] for c in calls) < single_tokens * 1.3
+    # calibrated chunk scores agree with the single prompt on who belongs at the top
+    assert {c["id"] for c in chunked[:10]} <= {c["id"] for c in single[:20]}
+
+def test_malformed_chunk_only_loses_its_own_candidates(monkeypatch, tmp_path):
+    _fake_model(monkeypatch, tmp_path, broken_ids={"s3"})
+    out = _run(_candidates(60))
+    unscored = [c for c in out if c["reasoning"] == "No extra reasoning available."]
+    assert len(unscored) == 20 and all(c["score"] == 50 for c in unscored)
+    assert out[-20:] == unscored  # upstream scores aren't comparable with calibrated ones
+
+def test_pagination_reranks_only_new_candidates(monkeypatch, tmp_path):
+    calls = _fake_model(monkeypatch, tmp_path)
+    first = _run(_candidates(40))
+    n = len(calls)
+    second = _run(_candidates(60))
+    assert [c["ids"] for c in calls[n:]] == [[f"s{i}" for i in range(40, 60)]]
+    assert {c["id"]: c["score"] for c in second if c["id"] in {"s0", "s39"}} == \
+           {c["id"]: c["score"] for c in first if c["id"] in {"s0", "s39"}}
@@ -0,0 +1,121 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+from sla_ai_components.algorithms import scoring_pool as pool_core
+from sla_ai_components.algorithms.grid_search import grid_rank, grid_rank_partial, merge_grid_partials
+from services.api.app.search import scoring_pool
+from services.api.app.search import shared_index as shared
+
+WORDS = ["denim", "knit", "cotton", "linen", "silk", "wool", "leather", "fleece", "twill", "jersey"]
+
+def _rows(n):
+    rnd = random.Random(7)
+    return [{"id": f"s{i}", "name": f"{rnd.choice(WORDS).title()} {rnd.choice(WORDS).title()} Mills {i}",
+             "country": rnd.choice(["BD", "IN", "VN", "CN"]), "product_types": " ".join(rnd.sample(WORDS, 2)),
+             "materials": rnd.choice(WORDS)} for i in range(n)]
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared, "SHARED_INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(shared, "_ATTACHED", {})
+    monkeypatch.setattr(pool_core, "SCORING_WORKERS", 3)
+    monkeypatch.setattr(scoring_pool, "SCORING_SHARD_ROWS", 40)
+    with ProcessPoolExecutor(2) as executor:
+        monkeypatch.setattr(pool_core, "_POOL", executor)
+        yield executor
+
+def _hits(hits):
+    return [(h.index, round(h.score, 6), h.ranks) for h in hits]
+
+def test_sharded_search_matches_the_in_process_search(pool):
+    index = shared.shared_index("scoring", ("v1",), lambda: _rows(150))
+    tasks = scoring_pool.STATS["tasks"]
+    for query, kw in [("denim mills", {}), ("Silk Wool Mills 17", {}), ("knit", {"filters": {"country": "bd"}}),
+                      ("cotton jersey", {"prefer": {"country": "vn"}, "product_type": "linen"})]:
+        assert _hits(scoring_pool.search(index, query, 20, **kw)) == _hits(index.search(query, 20, **kw))
+    assert scoring_pool.STATS["tasks"] - tasks == 4 * 3  # three 50-row shards per search
+    found = asyncio.run(scoring_pool.asearch(index, "fleece twill", 10))
+    assert _hits(found) == _hits(index.search("fleece twill", 10))
+    assert scoring_pool.search(index, "", 5, filters={"country": "in"}) == index.search("", 5, filters={"country": "in"})
+
+def test_full_queue_sheds_instead_of_queueing(pool, monkeypatch):
+    index = shared.shared_index("scoring", ("v1",), lambda: _rows(60))
+    monkeypatch.setattr(pool_core, "SCORING_MAX_QUEUE", 0)
+    rejected = scoring_pool.STATS["rejected"]
+    with pytest.raises(scoring_pool.ScoringBusy):
+        scoring_pool.search(index, "denim", 5)
+    with pytest.raises(scoring_pool.ScoringBusy):
+        asyncio.run(scoring_pool.asearch(index, "denim", 5))
+    assert scoring_pool.STATS["rejected"] == rejected + 2
+
+def test_shards_score_only_their_rows(pool, monkeypatch):
+    index = shared.shared_index("scoring", ("v3",), lambda: _rows(150))
+    seen = []
+    monkeypatch.setattr(type(index), "_top", staticmethod(lambda scores, k: seen.append(len(scores)) or
+                                                          (np.zeros(0, dtype=np.int64), np.zeros(0))))
+    index.channels("denim mills", shard=(50, 100))
+    assert seen == [50, 50]  # BM25 and vector scores cover just the shard
+
+def test_cancelled_caller_keeps_its_slot_until_the_workers_finish(pool):
+    async def run():
+        task = asyncio.ensure_future(pool_core.amap_shards(time.sleep, [(0.3,), (0.3,)]))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return pool_core._IN_FLIGHT
+    assert asyncio.run(run()) == 1  # the shards still run in the pool
+    deadline = time.monotonic() + 5
+    while pool_core._IN_FLIGHT and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert pool_core._IN_FLIGHT == 0
+
+def test_sharded_grid_rank_keeps_the_exact_top_k(pool):
+    rnd = random.Random(3)
+    factories = [{"factory_id": f"f{i}", "match": rnd.random(), "material_id": "m", "material_region": "r",
+                  "quoted_fob": round(rnd.uniform(2, 9), 1), "defect_rate_90d": rnd.random() / 10} for i in range(60)]
+    lanes = [{"lane_id": f"l{j}", "rate": rnd.uniform(50, 300), "transit_days_p50": rnd.randint(10, 40),
+              "on_time_rate": rnd.random(), "congestion_index": rnd.random()} for j in range(4)]
+    grid = dict(spec_vec=np.ones(4), materials={("m", "r"): 3.0}, lanes=lanes,
+                params={"usage_per_unit": 0.4, "duty_pct": 0.1, "unit_volume_or_weight": 0.01})
+    expected = grid_rank(factories=factories, **grid)[:5]
+    shards = [(factories[i:i + 15],) for i in range(0, 60, 15)]
+    parts = scoring_pool.map_shards(_grid_shard, [(chunk, grid) for (chunk,) in shards])
+    assert sum(len(p[0]) for p in parts) < 60 * 4
+    assert merge_grid_partials(parts, 5) == expected
+
+def _grid_shard(factories, grid):
+    return grid_rank_partial(top_k=5, factories=factories, **grid)
+
+def test_event_loop_stays_responsive_under_search_load(pool):
+    index = shared.shared_index("scoring", ("v2",), lambda: _rows(4000))
+
+    in_process = scoring_pool.STATS["in_process"]
+    searches = [(w, v) for w in WORDS for v in WORDS[:3]]
+    async def run():
+        pending, ticks = [0, 0], []  # searches running, peak
+        async def search(w, v):
+            pending[0] += 1
+            pending[1] = max(pending[1], pending[0])
+            try:
+                return await scoring_pool.asearch(index, f"{w} {v} mills", 50)
+            finally:
+                pending[0] -= 1
+        async def ticker():  # stands in for health checks and other light endpoints
+            while True:
+                ticks.append(pending[0])
+                await asyncio.sleep(0)
+        tick = asyncio.create_task(ticker())
+        await asyncio.gather(*(search(w, v) for w, v in searches))
+        tick.cancel()
+        return pending[1], ticks
+
+    peak, ticks = asyncio.run(run())
+    # every search awaited the pool at once and the loop kept serving other tasks meanwhile
+    assert peak == len(searches) and sum(1 for running in ticks if running) > 10
+    assert scoring_pool.STATS["in_process"] == in_process
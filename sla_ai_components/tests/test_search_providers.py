@@ -0,0 +1,52 @@
+import asyncio
+import time
+from services.api.app.utils.url_utils import canonical_url
+from services.api.app.web import search_providers as sp
+
+def _provider(name, urls, delay=0.0, calls=None):
+    async def search(query, max_results):
+        if calls is not None:
+            calls.append(name)
+        await asyncio.sleep(delay)
+        return [{"title": u, "url": u, "snippet": "", "source": name} for u in urls[:max_results]]
+    return search
+
+def test_canonical_url_ignores_scheme_www_tracking_and_trailing_slash():
+    assert canonical_url("https://www.Denim-Mills.com/about/?utm_source=x#team") == "denim-mills.com/about"
+    assert canonical_url("denim-mills.com/about") == canonical_url("http://denim-mills.com/about/")
+    assert canonical_url("https://denim-mills.com/p?id=2&b=1") == "denim-mills.com/p?b=1&id=2"
+
+def test_fan_out_dedupes_times_out_and_returns_early():
+    sp._RESULT_CACHE.clear()
+    providers = {
+        "fast": _provider("fast", ["https://a.com/", "https://www.b.com", "https://c.com/?utm_medium=ad"]),
+        "dupes": _provider("dupes", ["http://a.com", "https://b.com/", "https://d.com"], delay=0.01),
+        "hung": _provider("hung", ["https://e.com"], delay=5),
+    }
+    t0 = time.perf_counter()
+    out = asyncio.run(sp.search_all_providers("denim", 10, providers=providers, timeout_s=0.2))
+    assert time.perf_counter() - t0 < 1.0  # the hung provider is cut off by its own timeout
+    assert [r["url"] for r in out] == ["https://a.com/", "https://www.b.com", "https://c.com/?utm_medium=ad", "https://d.com"]
+
+    # by default every provider contributes, even when the first already has max_results
+    out = asyncio.run(sp.search_all_providers("denim", 3, providers=providers, timeout_s=0.2))
+    assert [r["url"] for r in out] == ["https://a.com/", "https://www.b.com", "https://c.com/?utm_medium=ad", "https://d.com"]
+
+    # with enough=3 the fast provider alone satisfies the request
+    t0 = time.perf_counter()
+    out = asyncio.run(sp.search_all_providers("denim", 10, enough=3, providers=providers, timeout_s=5))
+    assert len(out) == 3 and time.perf_counter() - t0 < 0.5
+
+def test_results_are_cached_per_query_for_a_short_ttl(monkeypatch):
+    sp._RESULT_CACHE.clear()
+    calls = []
+    providers = {"fast": _provider("fast", ["https://a.com"], calls=calls)}
+    for q in ("Denim  Jeans", "denim jeans"):
+        assert len(asyncio.run(sp.search_all_providers(q, 5, providers=providers))) == 1
+    assert calls == ["fast"]
+
+    monkeypatch.setattr(sp, "SEARCH_CACHE_TTL_S", 0)
+    sp._RESULT_CACHE.clear()
+    asyncio.run(sp.search_all_providers("denim", 5, providers=providers))
+    asyncio.run(sp.search_all_providers("denim", 5, providers=providers))
+    assert len(calls) == 3
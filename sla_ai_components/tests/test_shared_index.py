@@ -0,0 +1,91 @@
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("pyarrow")
+from services.api.app import internal_loader
+from services.api.app.search import shared_index as shared
+from services.api.app.search.retrieval import HybridIndex, index_for_rows
+
+ROWS = [{"id": f"s{i}", "name": f"{name} {i}", "country": country, "product_types": product,
+         "materials": material, "brands": ["Levis"] if i % 5 == 0 else []}
+        for i, (name, country, product, material) in enumerate(
+            [("Harbor Denim Works", "BD", "jeans", "denim"), ("Alpine Knits", "IN", "sweaters", "wool"),
+             ("Pacific Tees", "VN", "t-shirts", "cotton")] * 8)]
+
+def _hits(index, *args, **kw):
+    return [(h.index, round(h.score, 6)) for h in index.search(*args, **kw)]
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared, "SHARED_INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(shared, "_ATTACHED", {})
+    return tmp_path
+
+def test_saved_index_searches_like_the_in_memory_build(tmp_path):
+    built = HybridIndex(ROWS)
+    built.save(tmp_path)
+    opened = HybridIndex.open(tmp_path, ROWS)
+    for args, kw in [(("denim jeans", 5), {}), (("Alpine Knts 4", 3), {}), (("", 30), {"filters": {"brand": "levis"}}),
+                     (("cotton", 10), {"prefer": {"country": "in"}}), (("sweaters", 10), {"filters": {"country": "vn"}})]:
+        assert _hits(opened, *args, **kw) == _hits(built, *args, **kw)
+    nxt = opened.apply([{"id": "n1", "name": "Delta Mills", "materials": "linen"}], ["s0"], lambda r: r["id"])
+    assert [h.row["id"] for h in nxt.search("linen", 3)] == ["n1"]
+
+def test_workers_build_once_attach_and_follow_new_generations(cache_dir):
+    loads = []
+    def load():
+        loads.append(1)
+        return ROWS
+    first = shared.shared_index("suppliers", ("v1",), load)
+    assert len(loads) == 1 and len(first.source) == len(ROWS) and index_for_rows("other", first.source) is first
+
+    shared._ATTACHED.clear()  # another worker: attaches to the published generation, no rebuild
+    second = shared.shared_index("suppliers", ("v1",), load)
+    assert len(loads) == 1 and second is not first
+    assert _hits(second, "denim", 5) == _hits(first, "denim", 5)
+    assert json.loads(json.dumps(second.source[1])) == ROWS[1]
+
+    third = shared.shared_index("suppliers", ("v2",), lambda: ROWS[:6])
+    assert third.n == 6 and shared.shared_index("suppliers", ("v2",), load) is third
+    assert len(list((cache_dir / "suppliers").glob("gen-*"))) == shared.KEEP_GENERATIONS
+
+def test_supplier_files_corpus_reloads_when_the_files_change(cache_dir, tmp_path, monkeypatch):
+    data = tmp_path / "suppliers"
+    data.mkdir()
+    monkeypatch.setattr(internal_loader, "DATA_DIR", str(data))
+    (data / "a.json").write_text(json.dumps(ROWS[:3]))
+    corpus = asyncio.run(internal_loader.get_corpus())
+    assert asyncio.run(internal_loader.get_corpus()) is corpus and len(corpus) == 3
+    (data / "b.ndjson").write_text("\n".join(json.dumps(r) for r in ROWS[3:5]))
+    corpus = asyncio.run(internal_loader.get_corpus())
+    assert [r["id"] for r in corpus] == ["s0", "s1", "s2", "s3", "s4"]
+    assert [h.row["id"] for h in index_for_rows("supplier_files", corpus).search("Pacific Tees 5", 1)] == ["s2"]
+
+def test_supplier_files_are_read_off_the_event_loop(cache_dir, monkeypatch):
+    import threading
+    threads = []
+    def fake(name, version, load_rows):
+        threads.append(threading.current_thread())
+        return HybridIndex(ROWS)
+    monkeypatch.setattr(internal_loader, "shared_index", fake)
+    assert len(asyncio.run(internal_loader.get_corpus())) == len(ROWS)
+    assert threads and threads[0] is not threading.main_thread()
+
+def test_only_the_building_worker_reads_the_internal_data(cache_dir, tmp_path, monkeypatch):
+    from services.api.app import internal_index
+    data = tmp_path / "internal.json"
+    data.write_text(json.dumps(ROWS))
+    monkeypatch.setattr(internal_index, "_CACHE_PATH", str(tmp_path / "cache.parquet"))
+    for name in ("_CORPUS", "_DATAF", "_DATA_PATH", "_DATA_VERSION"):
+        monkeypatch.setattr(internal_index, name, None)
+    loads = []
+    load = internal_index.load_internal_data
+    monkeypatch.setattr(internal_index, "load_internal_data", lambda path: loads.append(path) or load(path))
+    internal_index.init_index(str(data))
+    assert len(loads) == 1 and internal_index.internal_count() == len(ROWS)
+
+    shared._ATTACHED.clear()  # another worker starting up: attaches, never loads the rows
+    monkeypatch.setattr(internal_index, "_CORPUS", None)
+    internal_index.init_index(str(data))
+    assert len(loads) == 1 and internal_index.internal_count() == len(ROWS) and internal_index._DATAF is None
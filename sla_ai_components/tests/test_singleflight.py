@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from services.api.app.utils.singleflight import SingleFlight, request_fingerprint
+
+def test_fingerprint_folds_case_and_whitespace_only():
+    assert request_fingerprint(" Denim  Jeans", country="BD") == request_fingerprint("Denim Jeans ", country="BD")
+    assert request_fingerprint("Denim Jeans", country="BD") != request_fingerprint("denim jeans", country="bd")
+    assert request_fingerprint("denim", b"img") != request_fingerprint("denim", b"other")
+    assert request_fingerprint("denim", limit=10) != request_fingerprint("denim", limit=20)
+
+def test_concurrent_identical_requests_hit_backend_once():
+    group = SingleFlight("test")
+    backend = []
+    async def search():
+        backend.append(1)
+        await asyncio.sleep(0.02)
+        return {"results": [1, 2]}
+    async def run():
+        return await asyncio.gather(*(group.do("k", search) for _ in range(50)))
+    out = asyncio.run(run())
+    assert len(backend) == 1 and all(r == {"results": [1, 2]} for r in out)
+    assert group.stats() == {"calls": 50, "executions": 1, "coalesced": 49, "in_flight": 0}
+
+def test_errors_reach_every_waiter_and_are_not_remembered():
+    group = SingleFlight("test")
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+    async def run():
+        out = await asyncio.gather(*(group.do("k", boom) for _ in range(5)), return_exceptions=True)
+        assert all(isinstance(e, ValueError) for e in out)
+        async def ok():
+            return "ok"
+        return await group.do("k", ok)
+    assert asyncio.run(run()) == "ok"
+    assert group.executions == 2
+
+def test_cancelling_one_waiter_keeps_the_flight_but_last_one_cancels_it():
+    group = SingleFlight("test")
+    state = {"cancelled": False}
+    async def slow():
+        try:
+            await asyncio.sleep(0.05)
+            return "done"
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+    async def run():
+        a = asyncio.create_task(group.do("k", slow))
+        b = asyncio.create_task(group.do("k", slow))
+        await asyncio.sleep(0.01)
+        a.cancel()
+        assert await b == "done" and not state["cancelled"]
+        with pytest.raises(asyncio.CancelledError):
+            await a
+
+        c = asyncio.create_task(group.do("k2", slow))
+        await asyncio.sleep(0.01)
+        c.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await c
+        await asyncio.sleep(0)
+    asyncio.run(run())
+    assert state["cancelled"] and group.stats()["in_flight"] == 0
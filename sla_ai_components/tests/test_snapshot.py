@@ -0,0 +1,52 @@
+import json
+import os
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import snapshot
+from ingest import FactoryDataIngest
+
+ROWS = [
+    {"factory_name": "Denim Co", "country": "BD", "product_specialties": ["denim", "jeans"],
+     "price_per_unit": [1.2, 5.0], "max_monthly_capacity": 300000500000, "certifications": [],
+     "labor_cost": "0.3", "notes": "Café owned"},
+    {"factory_name": "Knit Works", "country": "BD", "product_specialties": ["knit"],
+     "price_per_unit": None, "max_monthly_capacity": None, "certifications": ["OEKO-TEX"],
+     "labor_cost": 0.3, "notes": None},
+    {"factory_name": "No Lists", "country": None, "product_specialties": None,
+     "price_per_unit": [2.0, 3.0], "max_monthly_capacity": 1000, "certifications": None,
+     "labor_cost": None, "notes": "x"},
+]
+
+def test_round_trip_is_lossless_and_dictionary_encoded(tmp_path):
+    path = tmp_path / "f.arrow"
+    assert snapshot.write_snapshot(ROWS, path)
+    table = snapshot.read_snapshot(path)
+    assert pa.types.is_dictionary(table.schema.field("country").type)
+    assert pa.types.is_dictionary(table.schema.field("product_specialties").type.value_type)
+    # mixed str/float column falls back to JSON text
+    assert json.loads(table.schema.metadata[b"json_columns"]) == ["labor_cost"]
+    assert snapshot.table_to_rows(table) == ROWS
+
+def test_ingest_prefers_a_current_snapshot_and_ignores_stale_or_foreign_ones(tmp_path, monkeypatch):
+    ingest = FactoryDataIngest(data_dir=str(tmp_path))
+    ingest.save_normalized_data(ROWS, "factories.json")
+    src, snap = tmp_path / "factories.json", tmp_path / "factories.arrow"
+    assert snap.exists()
+
+    loads = []
+    monkeypatch.setattr(json, "load", lambda f: loads.append(f) or [])
+    assert ingest.load_normalized_data("factories.json") == ROWS and loads == []
+
+    # JSON edited by hand: the snapshot is stale, JSON wins and the snapshot is rewritten
+    monkeypatch.undo()
+    src.write_text(json.dumps(ROWS[:1]), encoding="utf-8")
+    assert ingest.load_normalized_data("factories.json") == ROWS[:1]
+    assert snapshot.table_to_rows(snapshot.read_snapshot(snap, src)) == ROWS[:1]
+
+    monkeypatch.setattr(snapshot, "SNAPSHOT_SCHEMA_VERSION", snapshot.SNAPSHOT_SCHEMA_VERSION + 1)
+    assert snapshot.read_snapshot(snap, src) is None
+    monkeypatch.undo()
+    snap.write_bytes(b"not arrow")
+    assert snapshot.read_snapshot(snap) is None
+    assert ingest.load_normalized_data("factories.json") == ROWS[:1]
@@ -0,0 +1,63 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+
+tool_web = pytest.importorskip("services.api.app.llm.tool_web")
+
+LATENCY = 0.05
+
+def _call(i, name, **args):
+    return SimpleNamespace(id=f"call_{i}", function=SimpleNamespace(name=name, arguments=json.dumps(args)))
+
+class _ScriptedModel:
+    """Replays a typical 3-step agentic search: search, fetch, answer."""
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.requests = []
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, **kwargs):
+        self.requests.append(list(kwargs["messages"]))
+        await asyncio.sleep(0.01)
+        tool_calls, content = self.steps.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=tool_calls, content=content))])
+
+def test_tool_calls_of_a_step_run_concurrently_and_are_memoized(monkeypatch):
+    searches, fetches, in_flight = [], [], [0, 0]  # current, peak
+    async def busy():
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight[1], in_flight[0])
+        await asyncio.sleep(LATENCY)
+        in_flight[0] -= 1
+    async def search(query, max_results, enough=None):
+        assert enough == max_results  # tool calls settle for the first max_results
+        searches.append(query)
+        await busy()
+        return [{"url": f"https://{query.replace(' ', '-')}.com"}]
+    async def fetch(url):
+        fetches.append(url)
+        await busy()
+        return f"Factory page with OEM and ISO certification at {url}"
+    monkeypatch.setattr(tool_web, "search_all_providers", search)
+    monkeypatch.setattr(tool_web, "fetch_url_content", fetch)
+
+    urls = [f"https://supplier{i}.com" for i in range(8)]
+    model = _ScriptedModel([
+        ([_call(1, "web_search", query="denim mills"), _call(2, "web_search", query="Denim  Mills"),
+          _call(3, "web_search", query="jeans factory")], None),
+        ([_call(4, "web_fetch", urls=urls), _call(5, "web_fetch", urls=urls[:3]),
+          _call(6, "web_search", query="denim mills")], None),
+        (None, '[{"name": "Supplier 0"}]'),
+    ])
+
+    out = asyncio.run(tool_web.call_tools_loop("sys", {"q": "denim"}, client=model))
+    assert out == '[{"name": "Supplier 0"}]'
+    assert sorted(searches) == ["denim mills", "jeans factory"] and sorted(fetches) == urls
+    # every URL of the second step is fetched at once; sequential tools would peak at 1
+    assert in_flight[1] == len(urls)
+
+    step2 = model.requests[2][-3:]
+    assert [m["tool_call_id"] for m in step2] == ["call_4", "call_5", "call_6"]
+    assert json.loads(step2[0]["content"])["urls_analyzed"] == 8
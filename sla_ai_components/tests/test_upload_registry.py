@@ -0,0 +1,32 @@
+from sla_ai_components.data.uploads_repo import UploadRegistry
+
+def test_registry_survives_reopen(tmp_path):
+    db = str(tmp_path / "registry.db")
+    reg = UploadRegistry(db)
+    uid = reg.create("tenant_demo", "a.csv", "text/csv", status="received", file_sha256="abc")
+    reg.update(uid, status="preview_ready", sheet_names=["Sheet1"], preview=[{"sheet_name": "Sheet1"}])
+    reg.save_mapping(uid, "Sheet1", "sheet_type: factories\n", 0.8)
+
+    reopened = UploadRegistry(db)
+    row = reopened[uid]
+    assert row["status"] == "preview_ready"
+    assert row["sheet_names"] == ["Sheet1"]
+    assert row["preview"] == [{"sheet_name": "Sheet1"}]
+    assert row["mappings"]["Sheet1"]["confidence"] == 0.8
+    assert reopened.by_sha("abc")["id"] == uid
+    assert reopened.by_sha("abc", tenant_id="other") is None
+
+def test_registry_pagination_and_filters(tmp_path):
+    reg = UploadRegistry(str(tmp_path / "registry.db"))
+    ids = [reg.create("t1", f"{i}.csv", "text/csv", status="received") for i in range(5)]
+    reg.create("t2", "other.csv", "text/csv", status="received")
+    reg.update(ids[0], status="committed")
+
+    page, cursor = reg.page(tenant_id="t1", limit=2)
+    assert [r["id"] for r in page] == [ids[4], ids[3]]
+    page, cursor = reg.page(tenant_id="t1", limit=2, cursor=cursor)
+    assert [r["id"] for r in page] == [ids[2], ids[1]]
+    page, cursor = reg.page(tenant_id="t1", limit=2, cursor=cursor)
+    assert [r["id"] for r in page] == [ids[0]] and cursor is None
+    assert [r["id"] for r in reg.page(status="committed")[0]] == [ids[0]]
+    assert len(reg) == 6
@@ -0,0 +1,72 @@
+import numpy as np
+from sla_ai_components.embeddings.local import LocalEmbedder
+from sla_ai_components.embeddings.vector_store import VectorStore
+
+TEXTS = [
+    "knitwear | Alpha Knits | Tiruppur | IN",
+    "denim | Blue Denim Mills | Dhaka | BD",
+    "footwear | Stride Shoes | Ho Chi Minh | VN",
+    "knitwear hoodies | Cotton Loop Knitting | Ludhiana | IN",
+]
+
+def test_local_embedder_ranks_related_text_higher():
+    emb = LocalEmbedder.fit(TEXTS)
+    q, *docs = emb.transform(["hoodie knitwear India"] + TEXTS)
+    sims = np.array(docs) @ q
+    assert np.argmax(sims) in (0, 3)
+    assert np.allclose(np.linalg.norm(docs, axis=1), 1.0, atol=1e-5)
+
+def test_vector_store_persists_and_upserts(tmp_path):
+    store = VectorStore(str(tmp_path))
+    store.build(["a", "b", "c", "d"], TEXTS)
+    top_id, _ = store.search(store.embed(["denim jeans Dhaka"])[0], k=1)[0]
+    assert top_id == "b"
+
+    reopened = VectorStore(str(tmp_path))
+    assert reopened.ids == ["a", "b", "c", "d"]
+    assert isinstance(reopened.vectors, np.memmap)
+    reopened.upsert(["e", "b"], reopened.embed(["leather bags | Kanpur Leather | IN", TEXTS[1]]))
+    assert len(reopened) == 5
+    assert reopened.search(reopened.embed(["leather bags Kanpur"])[0], k=1)[0][0] == "e"
+
+def test_ivf_search_matches_exact_neighbour(tmp_path):
+    rng = np.random.RandomState(0)
+    vecs = rng.standard_normal((5000, 128)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    store = VectorStore(str(tmp_path))
+    store.upsert([f"f{i}" for i in range(len(vecs))], vecs)
+    assert store.centroids is not None
+    hits = sum(store.search(vecs[i], k=1)[0][0] == f"f{i}" for i in range(0, 5000, 250))
+    assert hits == 20
+
+def test_delete_drops_rows_and_survives_reopen(tmp_path):
+    store = VectorStore(str(tmp_path))
+    store.build(["a", "b", "c", "d"], TEXTS)
+    assert store.delete(["b", "zz"]) == 1 and store.delete([]) == 0
+    assert store.ids == ["a", "c", "d"]
+    assert all(fid != "b" for fid, _ in store.search(store.embed(["denim jeans Dhaka"])[0], k=4))
+    assert VectorStore(str(tmp_path)).ids == ["a", "c", "d"]
+
+def test_writes_append_to_the_tail_until_compaction(tmp_path, monkeypatch):
+    import sla_ai_components.embeddings.vector_store as vs
+    monkeypatch.setattr(vs, "COMPACT_MIN_ROWS", 8)
+    monkeypatch.setattr(vs, "COMPACT_FRACTION", 0.0)
+    rng = np.random.RandomState(1)
+    vecs = rng.standard_normal((3000, 32)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    store = VectorStore(str(tmp_path))
+    store.upsert([f"f{i}" for i in range(2500)], vecs[:2500])
+    base = (tmp_path / "vectors.f32").stat()
+    store.upsert(["f0", "f2500"], vecs[[2999, 2500]])
+    assert store.delete(["f1"]) == 1
+    assert (tmp_path / "vectors.f32").stat().st_ino == base.st_ino  # base untouched
+    assert len(store.tail) == 2 and len(store) == 2500
+    reopened = VectorStore(str(tmp_path))
+    assert reopened.search(vecs[2999], k=1)[0][0] == "f0" and reopened.search(vecs[2500], k=1)[0][0] == "f2500"
+    assert "f1" not in reopened.ids and np.allclose(reopened.get(["f0"])[0], vecs[2999])
+
+    store.upsert([f"f{i}" for i in range(2501, 2510)], vecs[2501:2510])  # past COMPACT_MIN_ROWS
+    assert len(store.tail) == 0 and not store._dead
+    assert (tmp_path / "vectors.f32").stat().st_ino != base.st_ino
+    assert store.ids == VectorStore(str(tmp_path)).ids and len(store) == 2509
+    assert all(store.search(vecs[i], k=1)[0][0] == f"f{i}" for i in range(2500, 2510))
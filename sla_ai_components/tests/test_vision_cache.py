@@ -0,0 +1,102 @@
+import asyncio
+import json
+from io import BytesIO
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("openai")
+from PIL import Image, ImageDraw
+from services.api.app.media import vision
+from services.api.app.media.phash import PerceptualIndex
+from services.api.app.utils.deadline import deadline
+
+def _photo(seed: int, size=(800, 600), fmt="JPEG", quality=90) -> bytes:
+    img = Image.new("RGB", size, (240, 240, 240))
+    d = ImageDraw.Draw(img)
+    w, h = size
+    for i in range(6):
+        k = (seed * 7 + i * 13) % 17
+        x, y = (k * 37 + i * 71) % (w // 2), (k * 53 + i * 29) % (h // 2)
+        d.ellipse([x, y, x + w // 3, y + h // 3], fill=((k * 40) % 256, (i * 60) % 256, (seed * 90) % 256))
+    out = BytesIO()
+    img.save(out, format=fmt, quality=quality)
+    return out.getvalue()
+
+@pytest.fixture
+def fake_vision(tmp_path, monkeypatch):
+    monkeypatch.setattr(vision, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(vision, "THUMB_DIR", str(tmp_path / "thumbs"))
+    (tmp_path / "cache").mkdir()
+    (tmp_path / "thumbs").mkdir()
+    monkeypatch.setattr(vision, "_INDEX", PerceptualIndex(str(tmp_path / "cache" / "phash_index.jsonl")))
+    calls = []
+    async def respond(model, messages):
+        calls.append(messages)
+        await asyncio.sleep(0.05)
+        return SimpleNamespace(text=json.dumps({"productName": f"item {len(calls)}"}))
+    monkeypatch.setattr(vision, "respond", respond)
+    monkeypatch.setattr(vision, "output_text", lambda r: r.text)
+    return calls
+
+def test_resized_copy_hits_the_perceptual_cache_and_a_different_image_misses(fake_vision):
+    original = _photo(1)
+    first = asyncio.run(vision.extract_needs_from_image(original))
+    assert first == {"productName": "item 1"}
+
+    buf = BytesIO()
+    Image.open(BytesIO(original)).resize((400, 300)).save(buf, format="PNG")
+    assert asyncio.run(vision.extract_needs_from_image(buf.getvalue())) == first
+    assert len(fake_vision) == 1
+
+    assert asyncio.run(vision.extract_needs_from_image(_photo(5))) == {"productName": "item 2"}
+    assert len(fake_vision) == 2
+
+def test_multi_image_upload_runs_concurrently_and_coalesces_duplicates(fake_vision, monkeypatch):
+    in_flight, respond = [0, 0], vision.respond  # current, peak
+    async def tracked(model, messages):
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight[1], in_flight[0])
+        try:
+            return await respond(model, messages)
+        finally:
+            in_flight[0] -= 1
+    monkeypatch.setattr(vision, "respond", tracked)
+    images = [_photo(i) for i in (1, 5, 9)]
+    out = asyncio.run(vision.extract_needs_from_images(images + [images[0], b"not an image"]))
+    assert len(fake_vision) == 3 and in_flight[1] == 3
+    assert out[0] == out[3] and "_error" in out[4]
+
+def test_thumbnail_is_cached_separately_and_the_source_is_untouched(fake_vision, tmp_path):
+    src = tmp_path / "upload.jpg"
+    data = _photo(2, size=(2400, 1800))
+    src.write_bytes(data)
+    thumb = vision.cached_thumbnail(src.read_bytes())
+    assert src.read_bytes() == data
+    assert max(Image.open(BytesIO(thumb)).size) == 1024
+    assert len(list((tmp_path / "thumbs").iterdir())) == 1
+
+def test_rate_limit_backoff_yields_the_loop_and_respects_the_deadline(fake_vision, monkeypatch):
+    attempts = []
+    async def limited(model, messages):
+        attempts.append(messages)
+        raise RuntimeError("Error code: 429 rate limit")
+    monkeypatch.setattr(vision, "respond", limited)
+
+    async def run():
+        ticks = 0
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+        t = asyncio.create_task(ticker())
+        with deadline(500):
+            out = await vision.extract_needs_from_image(_photo(3))
+        t.cancel()
+        return out, ticks
+
+    out, ticks = asyncio.run(run())
+    # 1.5s backoff exceeds the 500ms budget, so it gives up instead of sleeping to retry
+    assert out == {"_error": "vision_rate_limited"} and len(attempts) == 1
+    assert ticks >= 1
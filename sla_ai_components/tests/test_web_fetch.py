@@ -0,0 +1,99 @@
+import asyncio
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from services.api.app.web.fetch import TextCache, WebFetcher
+
+PAGES = 60
+
+def _strip_tags(html, url):
+    # stands in for trafilatura: burn some CPU in the worker, then return the body text
+    sum(i * i for i in range(50_000))
+    return re.sub(r"<[^>]+>", " ", html).split("|")[0].strip() or None
+
+class _ThreadCache(TextCache):
+    """Records the threads its file reads and writes run on."""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.threads = set()
+
+    def get(self, url):
+        self.threads.add(threading.get_ident())
+        return super().get(url)
+
+    def put(self, url, entry):
+        self.threads.add(threading.get_ident())
+        super().put(url, entry)
+
+class _Stub(BaseHTTPRequestHandler):
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        with _Stub.lock:
+            _Stub.active += 1
+            _Stub.peak = max(_Stub.peak, _Stub.active)
+        try:
+            time.sleep(0.05)
+            etag = f'"{self.path}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = b"x" * 30_000 if self.path == "/big" else f"<html><p>Supplier {self.path}</p>|</html>".encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with _Stub.lock:
+                _Stub.active -= 1
+
+def test_pooled_fetch_stays_responsive_and_revalidates(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/page/{i}" for i in range(PAGES)]
+    cache = _ThreadCache(str(tmp_path))
+
+    async def run(pool):
+        fetcher = WebFetcher(cache=cache, per_host=8, max_bytes=10_000,
+                             fresh_s=0, extractor=_strip_tags, executor=pool)
+        lag = []
+        async def ticker():
+            while True:
+                t = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lag.append(time.perf_counter() - t - 0.005)
+        tick = asyncio.create_task(ticker())
+        t0 = time.perf_counter()
+        first = await asyncio.gather(*(fetcher.fetch_text(u) for u in urls))
+        elapsed = time.perf_counter() - t0
+        second = await asyncio.gather(*(fetcher.fetch_text(u) for u in urls))
+        big = await fetcher.fetch_text(f"{base}/big")
+        tick.cancel()
+        await fetcher.aclose()
+        return first, second, big, elapsed, max(lag), fetcher.counts
+
+    try:
+        with ProcessPoolExecutor(2) as pool:
+            first, second, big, elapsed, max_lag, counts = asyncio.run(run(pool))
+    finally:
+        server.shutdown()
+
+    assert first == second == [f"Supplier /page/{i}" for i in range(PAGES)]
+    assert _Stub.peak <= 8  # per-host limit
+    assert elapsed < PAGES * 0.05 * 0.6  # overlapping, not one page after another
+    assert max_lag < 0.2  # extraction never blocks the loop
+    assert cache.threads and threading.get_ident() not in cache.threads  # nor do cache files
+    assert counts["not_modified"] == PAGES  # second pass is conditional (ETag) and served from the text cache
+    assert counts["truncated"] == 1 and big is not None
@@ -0,0 +1,155 @@
+"""
+Binary columnar snapshot of normalized factory data
+
+Written next to normalized_factories.json as an uncompressed Arrow IPC file, so a cold
+start or reload memory-maps the columns instead of parsing JSON. Text fields (and lists
+of text) are dictionary-encoded; a field whose values don't share one Arrow type is kept
+as dictionary-encoded JSON text. The snapshot records its schema version and the JSON
+file's mtime/size and is ignored when either no longer matches.
+"""
+
+import json
+import os
+from pathlib import Path
+from collections.abc import Sequence as SequenceABC
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: without pyarrow only the JSON file is used
+    pa = None
+
+SNAPSHOT_SCHEMA_VERSION = 1
+SNAPSHOT_SUFFIX = ".arrow"
+
+def snapshot_path(json_path: Path) -> Path:
+    return Path(json_path).with_suffix(SNAPSHOT_SUFFIX)
+
+def _source_stamp(path: Path) -> str:
+    st = os.stat(path)
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+def _column(values: List[Any]) -> "pa.Array":
+    arr = pa.array(values)
+    if pa.types.is_string(arr.type):
+        return arr.dictionary_encode()
+    if pa.types.is_list(arr.type) and pa.types.is_string(arr.type.value_type):
+        return pa.ListArray.from_arrays(arr.offsets, arr.values.dictionary_encode(), mask=arr.is_null())
+    return arr
+
+def write_snapshot(rows: Sequence[Dict[str, Any]], path: Path, source: Optional[Path] = None) -> bool:
+    """Write `rows` to `path` atomically; `source` is the JSON file the snapshot mirrors."""
+    if pa is None:
+        return False
+    keys = list(dict.fromkeys(k for row in rows for k in row))
+    arrays, json_columns = [], []
+    for key in keys:
+        values = [row.get(key) for row in rows]
+        try:
+            arrays.append(_column(values))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            json_columns.append(key)
+            arrays.append(pa.array([None if v is None else json.dumps(v, ensure_ascii=False) for v in values],
+                                   type=pa.string()).dictionary_encode())
+    metadata = {
+        "schema_version": str(SNAPSHOT_SCHEMA_VERSION),
+        "json_columns": json.dumps(json_columns),
+        "source": _source_stamp(source) if source is not None else "",
+    }
+    table = pa.Table.from_arrays(arrays, names=keys).replace_schema_metadata(metadata)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+    return True
+
+def read_snapshot(path: Path, source: Optional[Path] = None) -> Optional["pa.Table"]:
+    """Memory-mapped table, or None when missing, unreadable, another schema version or stale."""
+    if pa is None or not Path(path).exists():
+        return None
+    try:
+        table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None
+    meta = table.schema.metadata or {}
+    if meta.get(b"schema_version") != str(SNAPSHOT_SCHEMA_VERSION).encode():
+        return None
+    if source is not None and meta.get(b"source", b"").decode() != _source_stamp(source):
+        return None
+    return table
+
+def _words(dictionary: "pa.Array") -> np.ndarray:
+    # trailing None so null indices (mapped to -1) decode to None
+    return np.array(dictionary.to_pylist() + [None], dtype=object)
+
+def _indices(indices: "pa.Array") -> np.ndarray:
+    return indices.fill_null(-1).to_numpy(zero_copy_only=False)
+
+def _decode(col: "pa.ChunkedArray") -> List[Any]:
+    """Python values for one column; each distinct text value is materialized once and shared."""
+    out: List[Any] = []
+    for chunk in col.chunks:
+        if pa.types.is_dictionary(chunk.type):
+            out.extend(_words(chunk.dictionary)[_indices(chunk.indices)].tolist())
+        elif pa.types.is_list(chunk.type) and pa.types.is_dictionary(chunk.type.value_type):
+            flat = _words(chunk.values.dictionary)[_indices(chunk.values.indices)].tolist()
+            offsets = chunk.offsets.to_numpy().tolist()
+            lists = [flat[a:b] for a, b in zip(offsets, offsets[1:])]
+            if chunk.null_count:
+                lists = [v if ok else None for v, ok in zip(lists, chunk.is_valid().to_pylist())]
+            out.extend(lists)
+        else:
+            out.extend(chunk.to_pylist())
+    return out
+
+def table_to_rows(table: "pa.Table") -> List[Dict[str, Any]]:
+    json_columns = set(json.loads((table.schema.metadata or {}).get(b"json_columns", b"[]")))
+    names = table.column_names
+    columns = []
+    for name in names:
+        values = _decode(table.column(name))
+        if name in json_columns:
+            values = [None if v is None else json.loads(v) for v in values]
+        columns.append(values)
+    return [dict(zip(names, values)) for values in zip(*columns)]
+
+class SnapshotRows(SequenceABC):
+    """
+    Read-only row sequence over a snapshot table. Rows are decoded on access (iteration
+    decodes in batches), so processes sharing one memory-mapped snapshot don't each hold
+    the whole corpus as Python objects.
+    """
+
+    BATCH_ROWS = 4096
+
+    def __init__(self, table: "pa.Table"):
+        self.table = table
+        self._json = set(json.loads((table.schema.metadata or {}).get(b"json_columns", b"[]")))
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def _decoded(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        for row in rows:
+            for name in self._json:
+                if row.get(name) is not None:
+                    row[name] = json.loads(row[name])
+        return rows
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._decoded(self.table.slice(i, 1).to_pylist())[0]
+
+    def take(self, indices: Sequence[int]) -> List[Dict[str, Any]]:
+        return self._decoded(self.table.take(pa.array(indices, type=pa.int64())).to_pylist()) if len(indices) else []
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for start in range(0, len(self), self.BATCH_ROWS):
+            yield from self._decoded(self.table.slice(start, self.BATCH_ROWS).to_pylist())